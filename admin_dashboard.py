@@ -0,0 +1,117 @@
+"""
+Admin dashboard: cohort analytics over the plan history
+
+Open with ?page=admin. Everything shown comes from the precomputed cohort
+aggregates, so the page never reads the history CSV. Coaches can also search
+saved plans through the plan search index.
+"""
+
+import time
+from datetime import datetime
+from typing import Optional
+
+import streamlit as st
+
+from cohort_analytics import (ALL, COHORT_DIMENSIONS, COHORT_METRICS, CohortStore, get_cohort_store,
+                              rebuild_cohorts)
+from plan_index import PlanIndex, get_plan_index
+from ui_components import AIUIComponents
+
+
+LABELS = {"bmi_cat": "BMI Category", "dietary_pref": "Diet", "cultural_food": "Cuisine", "bmi": "BMI",
+          "weight_kg": "Weight (kg)", "height_cm": "Height (cm)", "time_available": "Minutes per Session"}
+
+
+def _title(name: str) -> str:
+    return LABELS.get(name, name.replace("_", " ").title())
+
+
+def render_admin_dashboard(cohorts: Optional[CohortStore] = None):
+    """Render cohort tables and plans-over-time charts"""
+    cohorts = cohorts or get_cohort_store()
+    ui = AIUIComponents()
+    ui.ai_header("🛠️ Cohort Analytics", "Plan history grouped by profile")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        dimension = st.selectbox("Group by", COHORT_DIMENSIONS, format_func=_title)
+    with col2:
+        grain = st.selectbox("Period", ("week", "month"), format_func=str.title)
+    with col3:
+        metric = st.selectbox("Metric", COHORT_METRICS, format_func=_title)
+
+    started = time.perf_counter()
+    total = cohorts.total_plans()
+    summary = cohorts.summary(dimension)
+    series = cohorts.plans_over_time(dimension, grain)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    ui.ai_metric_card("Plans", f"{total}", f"{len(summary)} {_title(dimension).lower()} groups", "📋")
+    if not total:
+        st.info("No aggregates yet. Rebuild them from the plan history below.")
+
+    if summary:
+        st.markdown(f"#### {_title(metric)} by {_title(dimension).lower()}")
+        st.dataframe(
+            [{_title(dimension): row["value"], "Plans": row["plans"], "Share": f"{row['share']:.0%}",
+              f"Mean {_title(metric)}": row[f"mean_{metric}"], f"Std {_title(metric)}": row[f"std_{metric}"]}
+             for row in summary],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+    if series["periods"]:
+        import plotly.graph_objects as go
+
+        st.markdown(f"#### Plans per {grain} by {_title(dimension).lower()}")
+        fig = go.Figure()
+        for value, counts in series.items():
+            if value != "periods" and value != ALL:
+                fig.add_trace(go.Bar(x=series["periods"], y=counts, name=value))
+        fig.update_layout(barmode="stack", xaxis_title=grain.title(), yaxis_title="Plans",
+                          template="plotly_dark", height=400)
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.caption(f"⚡ Read from precomputed aggregates in {elapsed_ms:.1f} ms")
+
+    render_plan_search()
+
+    with st.expander("Maintenance"):
+        st.write("Aggregates update on every saved plan. Rebuild them after editing the history file by hand.")
+        if st.button("🔄 Rebuild from plan history"):
+            with st.spinner("Aggregating plan history..."):
+                count = rebuild_cohorts(cohorts)
+            st.success(f"Aggregated {count} plans")
+            st.rerun()
+        if st.button("🔎 Rebuild plan search index"):
+            with st.spinner("Indexing saved plans..."):
+                count = get_plan_index().reindex_search()
+            st.success(f"Indexed {count} plans")
+
+
+def render_plan_search(plans: Optional[PlanIndex] = None):
+    """Search box over saved plans with ranked results"""
+    plans = plans or get_plan_index()
+    st.markdown("#### 🔎 Search saved plans")
+    query = st.text_input("Query", placeholder="burpees diet:vegan   |   squat OR lunge -keto   |   food:lent*",
+                          help="Words match exercises, foods, muscles and profile tags; field:word restricts "
+                               "to one field (exercise, food, muscle, goal, diet, cuisine, ...); * matches a "
+                               "prefix; OR joins alternatives; -word excludes.")
+    if not query:
+        return
+
+    started = time.perf_counter()
+    hits = plans.search.search(query)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if not hits:
+        st.info("No saved plans match.")
+    else:
+        st.dataframe(
+            [{"Saved": datetime.fromtimestamp(hit.saved_at).strftime("%Y-%m-%d %H:%M"),
+              "Goal": hit.profile.get("goal"), "Diet": hit.profile.get("dietary_pref"),
+              "Cuisine": hit.profile.get("cultural_food"), "Score": hit.score, "Plan": hit.plan_id}
+             for hit in hits],
+            use_container_width=True,
+            hide_index=True,
+        )
+    st.caption(f"⚡ Searched {plans.search.doc_count()} plans in {elapsed_ms:.1f} ms")
@@ -3,14 +3,16 @@ AI-Powered Dashboard for Advanced Analytics and Insights
 """
 
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
 import json
 from ai_services import AIOrchestrator, AIInsight
+from insights_job import get_insight_store, index_key
 from ui_components import AIUIComponents
+from session_store import streamlit_session
+
+if TYPE_CHECKING:
+    from forecasting import Forecast
 
 
 class AIDashboard:
@@ -20,12 +22,31 @@ class AIDashboard:
         self.ai = ai_orchestrator
         self.ui = AIUIComponents()
     
-    def render_ai_overview(self, user_profile: Dict, progress_data: List[Dict]):
-        """Render AI overview dashboard"""
+    def render_ai_overview(self, user_profile: Dict, progress_data: List[Dict], browser_id: Optional[str] = None):
+        """Render AI overview dashboard for the user on browser_id (see insights_job.index_key)"""
         self.ui.ai_header("🧠 AI-Powered Analytics", "Advanced insights powered by artificial intelligence")
         
-        # Get AI insights
-        insights = self.ai.get_ai_insights(user_profile, progress_data)
+        # Prefer insights precomputed by the off-peak job; compute (and keep) them on a miss.
+        # Reruns reuse this session's result until the profile or progress changes.
+        basis = (browser_id, json.dumps({k: v for k, v in user_profile.items() if k != "generate"},
+                                        sort_keys=True, default=str),
+                 len(progress_data), json.dumps(progress_data[-1:], sort_keys=True, default=str))
+        cached = st.session_state.get("ai_overview")
+        if cached is None or cached["basis"] != basis:
+            store = get_insight_store()
+            key = store.save_profile(user_profile, browser_id)
+            stored = store.load_insights(key)
+            if stored is not None:
+                insights = stored.insights
+            else:
+                insights = self.ai.get_ai_insights(user_profile, progress_data)
+                if key is not None and insights:
+                    store.save_insights(key, insights, [], store.user(key)["updated_at"])
+            cached = st.session_state.ai_overview = {"basis": basis, "insights": insights, "stored": stored}
+        insights, stored = cached["insights"], cached["stored"]
+        if stored is not None:
+            freshness = f"🕒 Insights updated {stored.age_hours:.0f} h ago"
+            st.caption(freshness + (" - new data since then, they refresh overnight." if stored.stale else "."))
         
         # Display key metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -49,7 +70,7 @@ class AIDashboard:
         with col3:
             self.ui.ai_metric_card(
                 "Optimization",
-                "5",
+                str(len(stored.recommendations)) if stored is not None and stored.recommendations else "5",
                 "AI Recommendations",
                 "⚡"
             )
@@ -72,42 +93,49 @@ class AIDashboard:
                 "priority": insight.priority
             })
     
-    def render_predictions_dashboard(self, user_profile: Dict, historical_data: List[Dict]):
-        """Render AI predictions dashboard"""
+    def render_predictions_dashboard(self, user_profile: Dict, historical_data: List[Dict],
+                                     browser_id: Optional[str] = None):
+        """Render AI predictions dashboard from the user's progress log"""
+        # Imported here: numpy-backed fitting is only needed once someone opens the forecasts
+        from forecasting import LIFT_PREFIX, forecast_progress, summarize_forecasts
+        
         self.ui.ai_header("🔮 AI Predictions", "Future progress predictions based on your data")
         
-        # Generate predictions
-        predictions = self.ai.analytics_ai.generate_predictions(user_profile, historical_data)
+        # Forecasts are fitted locally; AI only narrates the numbers, once per distinct set of them
+        forecasts = forecast_progress(historical_data, user_profile)
+        basis = (user_profile.get("goal"), tuple(summarize_forecasts(forecasts)))
+        cached = st.session_state.get("ai_predictions")
+        if cached is None or cached["basis"] != basis:
+            stored = get_insight_store().load_insights(index_key(user_profile, browser_id))
+            recommendations = stored.recommendations if stored is not None else []
+            cached = st.session_state.ai_predictions = {
+                "basis": basis,
+                "predictions": self.ai.analytics_ai.generate_predictions(
+                    user_profile, historical_data, forecasts)["predictions"],
+                "recommendations": recommendations or self.ai.analytics_ai.generate_recommendations(
+                    user_profile, historical_data[-1] if historical_data else {}),
+            }
         
         # Create prediction charts
         col1, col2 = st.columns(2)
         
         with col1:
             st.markdown("#### 📊 Weight Progression Prediction")
-            self._create_weight_prediction_chart()
+            self._create_weight_prediction_chart(forecasts.get("weight"))
         
         with col2:
             st.markdown("#### 💪 Strength Gains Prediction")
-            self._create_strength_prediction_chart()
+            self._create_strength_prediction_chart(
+                {metric[len(LIFT_PREFIX):]: fc for metric, fc in forecasts.items() if metric.startswith(LIFT_PREFIX)}
+            )
+        
+        if cached["predictions"]:
+            st.markdown(cached["predictions"])
         
         # AI recommendations
         st.markdown("#### 🎯 AI Recommendations")
-        recommendations = self.ai.analytics_ai.generate_recommendations(user_profile, {})
-        
-        for i, rec in enumerate(recommendations[:3], 1):
-            st.markdown(f"""
-            <div style="
-                background: linear-gradient(135deg, #1e1e2e 0%, #2d2d44 100%);
-                border-left: 4px solid #00d4ff;
-                border-radius: 10px;
-                padding: 1.5rem;
-                margin: 1rem 0;
-                box-shadow: 0 10px 25px rgba(0,0,0,0.2);
-            ">
-                <h4 style="color: #00d4ff; margin-bottom: 0.5rem;">{i}. {rec.get('title', 'AI Recommendation')}</h4>
-                <p style="color: #e0e0e0; margin: 0;">{rec.get('description', 'No description available.')}</p>
-            </div>
-            """, unsafe_allow_html=True)
+        for i, rec in enumerate(cached["recommendations"][:3], 1):
+            self.ui.ai_recommendation_card(i, rec)
     
     def render_nutrition_analytics(self, nutrition_data: List[Dict]):
         """Render AI nutrition analytics"""
@@ -133,15 +161,9 @@ class AIDashboard:
         
         st.markdown("#### 🧠 AI Nutrition Analysis")
         st.markdown(f"""
-        <div style="
-            background: linear-gradient(135deg, #1e1e2e 0%, #2d2d44 100%);
-            border-radius: 15px;
-            padding: 2rem;
-            border: 1px solid #00d4ff;
-            box-shadow: 0 10px 25px rgba(0, 212, 255, 0.1);
-        ">
-            <h4 style="color: #00d4ff; margin-bottom: 1rem;">🤖 AI Analysis</h4>
-            <p style="color: #e0e0e0; line-height: 1.6;">{analysis.get('analysis', 'No analysis available.')}</p>
+        <div class="ai-analysis-card">
+            <h4>🤖 AI Analysis</h4>
+            <p>{analysis.get('analysis', 'No analysis available.')}</p>
         </div>
         """, unsafe_allow_html=True)
     
@@ -191,12 +213,12 @@ class AIDashboard:
         """Render AI chat interface"""
         self.ui.ai_header("💬 AI Fitness Coach", "Chat with your personal AI fitness coach")
         
-        # Initialize chat history
-        if "chat_history" not in st.session_state:
-            st.session_state.chat_history = []
+        # Chat history lives in the size-managed session store
+        session = streamlit_session()
+        chat_history = session.get("chat_history", [])
         
         # Display chat history
-        for message in st.session_state.chat_history:
+        for message in chat_history:
             self.ui.ai_chat_bubble(message["content"], message["is_user"])
         
         # Chat input
@@ -215,7 +237,7 @@ class AIDashboard:
         
         if send_button and user_input:
             # Add user message to history
-            st.session_state.chat_history.append({
+            chat_history.append({
                 "content": user_input,
                 "is_user": True
             })
@@ -225,32 +247,61 @@ class AIDashboard:
                 ai_response = self.ai.chat_ai.chat_with_ai(user_input, user_context)
             
             # Add AI response to history
-            st.session_state.chat_history.append({
+            chat_history.append({
                 "content": ai_response,
                 "is_user": False
             })
+            session.put("chat_history", chat_history)
             
             st.rerun()
         
         if clear_button:
-            st.session_state.chat_history = []
+            session.put("chat_history", [])
             st.rerun()
     
-    def _create_weight_prediction_chart(self):
+    def _add_forecast_traces(self, fig, forecast: "Forecast", name: str, color: str):
+        """Add logged points, the forecast line and its interval band to a figure"""
+        import plotly.graph_objects as go
+
+        history_weeks = [d / 7.0 for d in forecast.history_days]
+        forecast_weeks = [d / 7.0 for d in forecast.days]
+        fig.add_trace(go.Scatter(
+            x=forecast_weeks + forecast_weeks[::-1],
+            y=forecast.upper + forecast.lower[::-1],
+            fill='toself',
+            fillcolor=color,
+            opacity=0.2,
+            line=dict(width=0),
+            hoverinfo='skip',
+            showlegend=False
+        ))
+        fig.add_trace(go.Scatter(
+            x=history_weeks,
+            y=forecast.history_values,
+            mode='markers',
+            name=f'{name} (logged)',
+            marker=dict(size=7, color=color)
+        ))
+        fig.add_trace(go.Scatter(
+            x=history_weeks[-1:] + forecast_weeks,
+            y=forecast.history_values[-1:] + forecast.mean,
+            mode='lines',
+            name=f'{name} (forecast)',
+            line=dict(color=color, width=3, dash='dash')
+        ))
+    
+    def _create_weight_prediction_chart(self, forecast: Optional["Forecast"]):
         """Create weight prediction chart"""
-        # Sample data - in real app, this would come from AI predictions
-        weeks = list(range(1, 9))
-        predicted_weights = [70, 69.5, 69, 68.5, 68, 67.5, 67, 66.5]
+        import plotly.graph_objects as go
+
+        if forecast is None:
+            st.info("Log your weight to see a forecast.")
+            return
         
         fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=weeks,
-            y=predicted_weights,
-            mode='lines+markers',
-            name='AI Prediction',
-            line=dict(color='#00d4ff', width=3),
-            marker=dict(size=8, color='#00d4ff')
-        ))
+        self._add_forecast_traces(fig, forecast, 'Weight', '#00d4ff')
+        if forecast.method == "energy_balance":
+            st.caption("No weight log yet - projected from your calorie target and TDEE.")
         
         fig.update_layout(
             title="Weight Progression Forecast",
@@ -265,27 +316,18 @@ class AIDashboard:
         
         st.plotly_chart(fig, use_container_width=True)
     
-    def _create_strength_prediction_chart(self):
-        """Create strength prediction chart"""
-        weeks = list(range(1, 9))
-        bench_press = [60, 65, 70, 75, 80, 85, 90, 95]
-        squat = [80, 85, 90, 95, 100, 105, 110, 115]
+    def _create_strength_prediction_chart(self, forecasts: Dict[str, "Forecast"]):
+        """Create strength prediction chart from forecasts keyed by exercise"""
+        import plotly.graph_objects as go
+
+        if not forecasts:
+            st.info("Log your lifts to see strength forecasts.")
+            return
         
+        colors = ['#00ff88', '#ff6b6b', '#ffd93d', '#a78bfa']
         fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=weeks,
-            y=bench_press,
-            mode='lines+markers',
-            name='Bench Press',
-            line=dict(color='#00ff88', width=3)
-        ))
-        fig.add_trace(go.Scatter(
-            x=weeks,
-            y=squat,
-            mode='lines+markers',
-            name='Squat',
-            line=dict(color='#ff6b6b', width=3)
-        ))
+        for i, (metric, forecast) in enumerate(sorted(forecasts.items())):
+            self._add_forecast_traces(fig, forecast, metric, colors[i % len(colors)])
         
         fig.update_layout(
             title="Strength Gains Forecast",
@@ -302,6 +344,8 @@ class AIDashboard:
     
     def _create_macro_chart(self, nutrition_data: List[Dict]):
         """Create macronutrient chart"""
+        import plotly.graph_objects as go
+
         # Sample data - in real app, calculate from nutrition_data
         labels = ['Protein', 'Carbs', 'Fat']
         values = [30, 45, 25]
@@ -325,6 +369,8 @@ class AIDashboard:
     
     def _create_calorie_trend_chart(self, nutrition_data: List[Dict]):
         """Create calorie trend chart"""
+        import plotly.graph_objects as go
+
         # Sample data - in real app, use actual nutrition_data
         days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
         calories = [2000, 2200, 1800, 2400, 2100, 1900, 2300]
@@ -354,6 +400,8 @@ class AIDashboard:
     
     def _create_workout_trends_chart(self, workout_data: List[Dict]):
         """Create workout trends chart"""
+        import plotly.graph_objects as go
+
         # Sample data - in real app, use actual workout_data
         days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
         duration = [45, 60, 30, 75, 50, 40, 65]
@@ -4,12 +4,50 @@ AI Services Module - Advanced AI-powered features for the workout planner
 
 import os
 import json
+import time
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
-import google.generativeai as genai
-from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple, Any
+from dataclasses import dataclass, replace
 import streamlit as st
 
+import config
+from context_packing import pack_context, pack_history, pack_mapping
+from generation_profiles import GenerationProfile, generation_profile
+from plan_cache import get_plan_cache, replace_name
+from plan_chunks import merge_week, parse_week_response, summarize_week, week_ranges, week_skeleton
+from plan_engine import build_nutrition_plan, build_workout_plan, generate_local_plan, plan_duration
+from section_stream import GUIDANCE_HEADINGS, stream_sections
+from usage_tracking import UsageRecord, current_user, record_usage, usage_from_response
+
+if TYPE_CHECKING:
+    from forecasting import Forecast
+
+
+logger = logging.getLogger(__name__)
+
+def _genai():
+    """Import google.generativeai on first use (it dominates cold-start time)"""
+    import google.generativeai as genai
+    return genai
+
+
+def _extract_json(response: str) -> Any:
+    """
+    JSON payload of a model reply: a ```json fence, or the reply itself in JSON mode
+
+    Returns:
+        The decoded payload, or None if the reply holds no JSON (malformed JSON raises)
+    """
+    if "```json" in response:
+        json_start = response.find("```json") + 7
+        json_end = response.find("```", json_start)
+        return json.loads(response[json_start:json_end])
+    text = response.strip()
+    return json.loads(text) if text.startswith(("{", "[")) else None
+
 
 @dataclass
 class AIInsight:
@@ -25,72 +63,252 @@ class AIInsight:
 class AIService:
     """Base AI service class"""
     
+    SERVICE_NAME = "base"  # usage accounting label
+    
     def __init__(self, api_key: str):
         self.api_key = api_key
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-2.0-flash")
+        self._model = None
+    
+    @property
+    def model(self):
+        """Gemini model client (fake_model.FakeModel with the fake backend), created on first use"""
+        if self._model is None and config.AI_BACKEND == "fake":
+            from fake_model import FakeModel
+            self._model = FakeModel()
+        if self._model is None:
+            genai = _genai()
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel("gemini-2.0-flash")
+        return self._model
     
-    def generate_content(self, prompt: str, temperature: float = 0.7) -> str:
-        """Generate content using Gemini"""
+    def _call_model(self, prompt: str, profile: GenerationProfile, stream: bool = False):
+        """Send one request to Gemini and return the raw response (an iterable of chunks when streaming)"""
+        options = {"temperature": profile.temperature, "max_output_tokens": profile.max_tokens}
+        if profile.stop_sequences:
+            options["stop_sequences"] = list(profile.stop_sequences)
+        if profile.json_output:
+            options["response_mime_type"] = "application/json"
+        return self.model.generate_content(
+            prompt,
+            generation_config=options,  # a GenerationConfig dict
+            request_options={"timeout": config.AI_REQUEST_TIMEOUT},
+            stream=stream,
+        )
+    
+    def _profile(self, call_type: str, temperature: Optional[float], max_tokens: Optional[int]) -> GenerationProfile:
+        """The call type's profile with any explicit overrides applied"""
+        profile = generation_profile(call_type)
+        if temperature is not None:
+            profile = replace(profile, temperature=temperature)
+        if max_tokens is not None:
+            profile = replace(profile, max_tokens=max_tokens, adapted=False)
+        return profile
+    
+    @staticmethod
+    def _report_failure(call_type: str, error: Exception, failures: Optional[List[str]] = None):
+        """Log a failed call and show it to the user, or add it to failures to show later"""
+        logger.warning("AI generation failed (%s): %s", call_type, error)
+        if failures is None:
+            st.error(f"AI generation failed: {str(error)}")
+        else:
+            failures.append(str(error))
+    
+    def generate_content(
+        self,
+        prompt: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        call_type: str = "default",
+        failures: Optional[List[str]] = None,
+    ) -> str:
+        """
+        Generate content using Gemini, recording tokens, latency and cost for usage accounting
+        
+        Args:
+            prompt: Prompt text
+            temperature: Override of the profile temperature
+            max_tokens: Override of the profile output cap
+            call_type: Generation profile to use (see config.GENERATION_PROFILES)
+            failures: Collects the error instead of showing it; for calls made off the
+                script thread, where Streamlit elements can't be drawn
+        
+        Returns:
+            Generated text ("" on failure)
+        """
+        profile = self._profile(call_type, temperature, max_tokens)
+        started = time.perf_counter()
+        response, text = None, ""
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=temperature,
-                    max_output_tokens=4000,
-                )
-            )
-            return response.text
+            response = self._call_model(prompt, profile)
+            text = response.text
+        except Exception as e:
+            self._report_failure(call_type, e, failures)
+        latency_ms = (time.perf_counter() - started) * 1000
+        record_usage(usage_from_response(self.SERVICE_NAME, prompt, response, text, latency_ms, call_type))
+        return text
+    
+    def stream_content(
+        self,
+        prompt: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        call_type: str = "default",
+    ) -> Iterator[str]:
+        """Generate content using Gemini, yielding text chunks as they arrive (usage is recorded at the end)"""
+        profile = self._profile(call_type, temperature, max_tokens)
+        started = time.perf_counter()
+        response, parts = None, []
+        try:
+            response = self._call_model(prompt, profile, stream=True)
+            for chunk in response:
+                parts.append(chunk.text)
+                yield parts[-1]
         except Exception as e:
-            st.error(f"AI generation failed: {str(e)}")
-            return ""
+            self._report_failure(call_type, e)
+        finally:
+            latency_ms = (time.perf_counter() - started) * 1000
+            record_usage(usage_from_response(self.SERVICE_NAME, prompt, response, "".join(parts), latency_ms,
+                                             call_type))
+
+
+# Profile fields a week prompt needs (time_available in minutes)
+WEEK_PROFILE_KEYS = ("age", "gender", "goal", "experience", "equipment", "time_available", "injuries")
 
 
 class WorkoutAIService(AIService):
     """AI service for workout-related features"""
     
-    def generate_smart_workout_plan(self, user_profile: Dict) -> Dict[str, Any]:
-        """Generate intelligent workout plan with AI insights"""
+    SERVICE_NAME = "workout"
+    
+    def generate_smart_workout_plan(
+        self,
+        user_profile: Dict,
+        on_week: Optional[Callable[[int, List[Dict[str, Any]]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generate a workout plan of the profile's plan_days, one AI request per week
+        
+        Weeks are requested in parallel and stitched in order, each grounded
+        in excerpts of similar past plans (plan_retrieval). A week the AI
+        fails to fill keeps the local engine's days and is listed in
+        "local_weeks"; if every week fails the result is empty. Call errors in
+        the week workers are collected and shown once, after stitching.
+        
+        Args:
+            user_profile: Profile dict as collected by enhanced_sidebar_form
+            on_week: Called with (week number, days) as each week completes
+            
+        Returns:
+            Workout plan in the plan_engine layout
+        """
+        # Imported here: plan_retrieval -> plan_index -> insights_job imports this module
+        from plan_retrieval import grounding_examples
+
+        plan = build_workout_plan(user_profile, plan_duration(user_profile))
+        ranges = week_ranges(len(plan["days"]))
+        examples = grounding_examples(user_profile)
+        weeks: Dict[int, Optional[List[Dict[str, Any]]]] = {}
+        failures: List[str] = []
+        for index, days in self.iter_workout_weeks(user_profile, plan, examples, failures):
+            weeks[index] = days
+            if on_week is not None:
+                start, end = ranges[index]
+                on_week(index + 1, days or plan["days"][start:end])
+        if failures:
+            st.error(f"AI generation failed for {len(failures)} of {len(ranges)} week(s): {failures[0]}")
+        
+        if not any(weeks.values()):
+            return {}
+        local_weeks = [index + 1 for index in range(len(ranges)) if not weeks[index]]
+        plan["days"] = [day for index, (start, end) in enumerate(ranges)
+                        for day in (weeks[index] or plan["days"][start:end])]
+        if local_weeks:
+            plan["local_weeks"] = local_weeks
+        return plan
+    
+    def iter_workout_weeks(
+        self, user_profile: Dict, skeleton: Dict[str, Any], examples: str = "",
+        failures: Optional[List[str]] = None,
+    ) -> Iterator[Tuple[int, Optional[List[Dict[str, Any]]]]]:
+        """
+        Request every week of a skeleton plan in parallel, yielding (week index, days) as each completes
+
+        Workers have no Streamlit script context, so their call errors go to
+        failures (or are only logged) for the caller to show.
+        """
+        failures = [] if failures is None else failures
+        ranges = week_ranges(len(skeleton["days"]))
+        with ThreadPoolExecutor(max_workers=min(config.PLAN_CHUNK_WORKERS, len(ranges))) as pool:
+            # Each week runs in a copy of this context so its usage is charged to the same user
+            futures = {
+                pool.submit(contextvars.copy_context().run, self.generate_workout_week,
+                            user_profile, skeleton, start, end, examples, failures): index
+                for index, (start, end) in enumerate(ranges)
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+    
+    def generate_workout_week(
+        self, user_profile: Dict, skeleton: Dict[str, Any], start: int, end: int, examples: str = "",
+        failures: Optional[List[str]] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fill one week of a skeleton plan with AI-chosen exercises
+        
+        Args:
+            user_profile: Profile dict as collected by enhanced_sidebar_form
+            skeleton: Plan from plan_engine.build_workout_plan
+            start: First day index of the week (0-based)
+            end: Day index after the week's last day
+            examples: Excerpts of similar past plans (plan_retrieval.grounding_examples)
+            failures: Collects call errors (see generate_content)
+            
+        Returns:
+            The week's days, or None if the response was unusable
+        """
+        week_no = start // config.PLAN_CHUNK_DAYS + 1
+        days = skeleton["days"]
+        previous = "\n".join(
+            f"- {summarize_week(i + 1, days[s:e])}" for i, (s, e) in enumerate(week_ranges(start))
+        )
+        profile = pack_mapping({key: user_profile.get(key) for key in WEEK_PROFILE_KEYS})
+        grounding = f"SIMILAR PAST PLANS (match their style and volume):\n{examples}\n" if examples else ""
         
         prompt = f"""
-        You are an advanced AI fitness coach with access to cutting-edge exercise science. 
-        Create a highly personalized, scientifically-optimized workout plan.
-        
-        USER PROFILE:
-        - Name: {user_profile.get('name', 'User')}
-        - Age: {user_profile.get('age', 25)}
-        - Gender: {user_profile.get('gender', 'Unknown')}
-        - Height: {user_profile.get('height_cm', 170)} cm
-        - Weight: {user_profile.get('weight_kg', 70)} kg
-        - BMI: {user_profile.get('bmi', 24.2)} ({user_profile.get('bmi_cat', 'Normal')})
-        - Goal: {user_profile.get('goal', 'General Health')}
-        - Experience: {user_profile.get('experience', 'Beginner')}
-        - Equipment: {user_profile.get('equipment', 'None')}
-        - Time Available: {user_profile.get('time_available', 45)} minutes
-        - Injuries: {user_profile.get('injuries', 'None')}
-        
-        Create a comprehensive plan with:
-        1. SMART GOALS (Specific, Measurable, Achievable, Relevant, Time-bound)
-        2. PROGRESSIVE OVERLOAD SCHEDULE
-        3. RECOVERY OPTIMIZATION
-        4. INJURY PREVENTION STRATEGIES
-        5. PERFORMANCE METRICS
-        6. ADAPTIVE MODIFICATIONS
-        
-        Format as structured JSON with scientific rationale for each recommendation.
+        You are an advanced AI fitness coach. Choose the exercises for week {week_no}
+        of a {len(days)}-day training plan. The schedule, focus and target volume
+        below are fixed; progress sensibly from the previous weeks and vary exercises.
+        
+        USER PROFILE: {profile}
+        {grounding}
+        PREVIOUS WEEKS:
+        {previous or "- none, this is the first week"}
+        
+        WEEK {week_no}:
+        {week_skeleton(days[start:end])}
+        
+        Only use the listed equipment and avoid anything that aggravates the injuries.
+        Reply with JSON for the training days only, numbered as listed above (Day {start + 1} onwards),
+        using "reps": null for timed holds:
+        ```json
+        {{"days": [{{"day": {start + 1}, "exercises": [{{"name": "Goblet Squat", "sets": 3, "reps": 10, "rest_seconds": 60}}]}}]}}
+        ```
         """
         
-        response = self.generate_content(prompt)
-        return self._parse_workout_response(response)
+        response = self.generate_content(prompt, call_type="workout_week", failures=failures)
+        ai_days = parse_week_response(response)
+        return merge_week(days[start:end], ai_days) if ai_days else None
     
     def generate_ai_insights(self, user_data: Dict, progress_data: List[Dict]) -> List[AIInsight]:
         """Generate AI-powered insights from user data"""
+        user_text, progress_text = pack_context(user_data, progress_data)
         
         prompt = f"""
         Analyze this fitness data and provide AI-powered insights:
         
-        USER DATA: {json.dumps(user_data, indent=2)}
-        PROGRESS DATA: {json.dumps(progress_data, indent=2)}
+        USER DATA: {user_text}
+        PROGRESS DATA:
+        {progress_text}
         
         Provide insights on:
         1. Performance trends
@@ -99,20 +317,23 @@ class WorkoutAIService(AIService):
         4. Success patterns
         5. Personalized recommendations
         
-        Format as JSON with insight type, title, description, confidence, and priority.
+        Reply with JSON only:
+        {{"insights": [{{"type": "performance", "title": "...", "description": "...", "confidence": 0.8, "actionable": true, "priority": "high"}}]}}
         """
         
-        response = self.generate_content(prompt)
+        response = self.generate_content(prompt, call_type="insights")
         return self._parse_insights_response(response)
     
     def predict_optimal_workout_time(self, user_profile: Dict, historical_data: List[Dict]) -> Dict:
         """Predict optimal workout timing based on user patterns"""
+        profile_text, history_text = pack_context(user_profile, historical_data)
         
         prompt = f"""
         Based on user profile and historical performance data, predict optimal workout timing:
         
-        PROFILE: {json.dumps(user_profile, indent=2)}
-        HISTORICAL DATA: {json.dumps(historical_data, indent=2)}
+        PROFILE: {profile_text}
+        HISTORICAL DATA:
+        {history_text}
         
         Consider:
         - Circadian rhythms
@@ -124,20 +345,14 @@ class WorkoutAIService(AIService):
         Provide optimal timing recommendations with scientific rationale.
         """
         
-        response = self.generate_content(prompt)
+        response = self.generate_content(prompt, call_type="workout_timing")
         return self._parse_timing_response(response)
     
     def _parse_workout_response(self, response: str) -> Dict[str, Any]:
         """Parse AI workout response"""
         try:
-            # Try to extract JSON from response
-            if "```json" in response:
-                json_start = response.find("```json") + 7
-                json_end = response.find("```", json_start)
-                json_str = response[json_start:json_end]
-                return json.loads(json_str)
-            else:
-                return {"raw_response": response}
+            data = _extract_json(response)
+            return data if data is not None else {"raw_response": response}
         except:
             return {"raw_response": response}
     
@@ -145,22 +360,18 @@ class WorkoutAIService(AIService):
         """Parse AI insights response"""
         insights = []
         try:
-            if "```json" in response:
-                json_start = response.find("```json") + 7
-                json_end = response.find("```", json_start)
-                json_str = response[json_start:json_end]
-                data = json.loads(json_str)
-                
-                for insight_data in data.get("insights", []):
-                    insight = AIInsight(
-                        type=insight_data.get("type", "general"),
-                        title=insight_data.get("title", "Insight"),
-                        description=insight_data.get("description", ""),
-                        confidence=insight_data.get("confidence", 0.8),
-                        actionable=insight_data.get("actionable", True),
-                        priority=insight_data.get("priority", "medium")
-                    )
-                    insights.append(insight)
+            data = _extract_json(response) or {}
+            
+            for insight_data in data.get("insights", []):
+                insight = AIInsight(
+                    type=insight_data.get("type", "general"),
+                    title=insight_data.get("title", "Insight"),
+                    description=insight_data.get("description", ""),
+                    confidence=insight_data.get("confidence", 0.8),
+                    actionable=insight_data.get("actionable", True),
+                    priority=insight_data.get("priority", "medium")
+                )
+                insights.append(insight)
         except:
             # Fallback insight
             insights.append(AIInsight(
@@ -177,13 +388,8 @@ class WorkoutAIService(AIService):
     def _parse_timing_response(self, response: str) -> Dict:
         """Parse timing response"""
         try:
-            if "```json" in response:
-                json_start = response.find("```json") + 7
-                json_end = response.find("```", json_start)
-                json_str = response[json_start:json_end]
-                return json.loads(json_str)
-            else:
-                return {"recommendation": response}
+            data = _extract_json(response)
+            return data if data is not None else {"recommendation": response}
         except:
             return {"recommendation": response}
 
@@ -191,20 +397,40 @@ class WorkoutAIService(AIService):
 class NutritionAIService(AIService):
     """AI service for nutrition-related features"""
     
-    def generate_smart_nutrition_plan(self, user_profile: Dict) -> Dict[str, Any]:
-        """Generate AI-powered nutrition plan"""
+    SERVICE_NAME = "nutrition"
+    
+    def generate_smart_nutrition_plan(
+        self, user_profile: Dict, on_update: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a nutrition plan: meals solved locally, narrative guidance from AI
+        
+        Args:
+            user_profile: Profile dict as collected by enhanced_sidebar_form
+            on_update: Called with the plan as soon as the meals are solved and
+                again as each guidance topic finishes streaming
+        
+        Returns:
+            Nutrition plan with "guidance" when the AI produced some
+        """
+        plan = build_nutrition_plan(user_profile, plan_duration(user_profile))
+        if on_update is not None:
+            on_update(dict(plan))
+        targets = plan["targets"]
+        sample_day = "; ".join(
+            f"{meal}: " + ", ".join(f"{item['name']} x{item['servings']:g}" for item in items)
+            for meal, items in plan["days"][0]["meals"].items() if items
+        )
         
         prompt = f"""
         You are an advanced AI nutritionist with expertise in personalized nutrition science.
-        Create a highly optimized nutrition plan.
+        The meal plan below has already been calculated; do not change foods, portions or numbers.
+        Write concise guidance to accompany it.
         
         USER PROFILE:
         - Name: {user_profile.get('name', 'User')}
         - Age: {user_profile.get('age', 25)}
         - Gender: {user_profile.get('gender', 'Unknown')}
-        - Height: {user_profile.get('height_cm', 170)} cm
-        - Weight: {user_profile.get('weight_kg', 70)} kg
-        - BMI: {user_profile.get('bmi', 24.2)} ({user_profile.get('bmi_cat', 'Normal')})
         - Goal: {user_profile.get('goal', 'General Health')}
         - Dietary Preference: {user_profile.get('dietary_pref', 'Balanced')}
         - Cultural Food: {user_profile.get('cultural_food', 'International')}
@@ -212,20 +438,37 @@ class NutritionAIService(AIService):
         - Allergies: {user_profile.get('allergies', 'None')}
         - Dislikes: {user_profile.get('dislikes', 'None')}
         
-        Create a comprehensive plan with:
-        1. MACRONUTRIENT OPTIMIZATION
-        2. MICRONUTRIENT TARGETING
-        3. MEAL TIMING STRATEGIES
-        4. HYDRATION PROTOCOLS
-        5. SUPPLEMENT RECOMMENDATIONS
-        6. CULTURAL ADAPTATIONS
-        7. BUDGET OPTIMIZATION
+        DAILY TARGETS: {targets['calories']} kcal, {targets['protein_g']} g protein, {targets['carbs_g']} g carbs, {targets['fat_g']} g fat
+        SAMPLE DAY: {sample_day}
         
-        Include scientific rationale and metabolic considerations.
+        Cover:
+        1. MEAL TIMING STRATEGIES
+        2. HYDRATION PROTOCOLS ({plan['hydration_liters']} L/day)
+        3. MICRONUTRIENT FOCUS
+        4. SUPPLEMENT CONSIDERATIONS
+        5. CULTURAL AND BUDGET TIPS
         """
         
-        response = self.generate_content(prompt)
-        return self._parse_nutrition_response(response)
+        if on_update is None:
+            guidance = self.generate_content(prompt, call_type="nutrition_guidance")
+        else:
+            # Stream the guidance and show each topic as soon as the next one starts
+            chunks = []
+            
+            def recorded(stream: Iterator[str]) -> Iterator[str]:
+                for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+            
+            topics = []
+            for _, text in stream_sections(recorded(self.stream_content(prompt, call_type="nutrition_guidance")),
+                                           GUIDANCE_HEADINGS):
+                topics.append(text)
+                on_update(dict(plan, guidance="\n\n".join(topics)))
+            guidance = "".join(chunks)
+        if guidance.strip():
+            plan["guidance"] = guidance
+        return plan
     
     def analyze_nutrition_patterns(self, nutrition_data: List[Dict]) -> Dict[str, Any]:
         """Analyze nutrition patterns with AI"""
@@ -233,7 +476,8 @@ class NutritionAIService(AIService):
         prompt = f"""
         Analyze these nutrition patterns and provide AI insights:
         
-        NUTRITION DATA: {json.dumps(nutrition_data, indent=2)}
+        NUTRITION DATA:
+        {pack_history(nutrition_data)}
         
         Analyze:
         1. Macronutrient balance
@@ -245,47 +489,54 @@ class NutritionAIService(AIService):
         Provide actionable recommendations with scientific backing.
         """
         
-        response = self.generate_content(prompt)
+        response = self.generate_content(prompt, call_type="nutrition_patterns")
         return {"analysis": response}
-    
-    def _parse_nutrition_response(self, response: str) -> Dict[str, Any]:
-        """Parse nutrition response"""
-        try:
-            if "```json" in response:
-                json_start = response.find("```json") + 7
-                json_end = response.find("```", json_start)
-                json_str = response[json_start:json_end]
-                return json.loads(json_str)
-            else:
-                return {"raw_response": response}
-        except:
-            return {"raw_response": response}
 
 
 class AnalyticsAIService(AIService):
     """AI service for analytics and predictions"""
     
-    def generate_predictions(self, user_data: Dict, historical_data: List[Dict]) -> Dict[str, Any]:
-        """Generate AI predictions for user progress"""
+    SERVICE_NAME = "analytics"
+    
+    def generate_predictions(
+        self,
+        user_data: Dict,
+        historical_data: List[Dict],
+        forecasts: Optional[Dict[str, "Forecast"]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Forecast progress locally and have AI narrate the numbers
+        
+        Args:
+            user_data: Profile dict as collected by enhanced_sidebar_form
+            historical_data: Progress log entries (see forecasting.extract_series)
+            forecasts: Forecasts already computed from historical_data
+            
+        Returns:
+            Dictionary with the forecasts and the narration ("predictions")
+        """
+        # Imported here so only sessions that open the forecasts load the fitting code
+        from forecasting import forecast_progress, summarize_forecasts
         
-        prompt = f"""
-        As an AI fitness analyst, predict future progress based on current data:
+        if forecasts is None:
+            forecasts = forecast_progress(historical_data, user_data)
+        if not forecasts:
+            return {"forecasts": {}, "predictions": ""}
         
-        USER DATA: {json.dumps(user_data, indent=2)}
-        HISTORICAL DATA: {json.dumps(historical_data, indent=2)}
+        prompt = f"""
+        As an AI fitness analyst, explain these progress forecasts to the user.
+        The numbers were computed from their logs; do not change them or add new ones.
         
-        Provide predictions for:
-        1. Weight progression (next 4 weeks)
-        2. Strength gains (next 8 weeks)
-        3. Performance improvements
-        4. Risk factors
-        5. Optimal adjustments
+        USER: {user_data.get('name', 'User')}, goal {user_data.get('goal', 'General Health')}
+        FORECASTS ({config.FORECAST_HORIZON_WEEKS} weeks, 90% ranges):
+        {chr(10).join(summarize_forecasts(forecasts))}
         
-        Include confidence intervals and recommendations.
+        In under 150 words: what the trends mean for their goal, how confident
+        the ranges are, and one adjustment to consider.
         """
         
-        response = self.generate_content(prompt)
-        return {"predictions": response}
+        response = self.generate_content(prompt, call_type="predictions")
+        return {"forecasts": forecasts, "predictions": response}
     
     def generate_recommendations(self, user_profile: Dict, current_progress: Dict) -> List[Dict]:
         """Generate personalized AI recommendations"""
@@ -293,8 +544,8 @@ class AnalyticsAIService(AIService):
         prompt = f"""
         Generate personalized AI recommendations:
         
-        USER PROFILE: {json.dumps(user_profile, indent=2)}
-        CURRENT PROGRESS: {json.dumps(current_progress, indent=2)}
+        USER PROFILE: {pack_mapping(user_profile)}
+        CURRENT PROGRESS: {pack_mapping(current_progress)}
         
         Provide:
         1. Immediate actions (next 7 days)
@@ -303,24 +554,20 @@ class AnalyticsAIService(AIService):
         4. Risk mitigation
         5. Success optimization
         
-        Format as actionable recommendations with priority levels.
+        Reply with JSON only, one entry per recommendation:
+        {{"recommendations": [{{"title": "...", "description": "...", "priority": "high", "timeframe": "next 7 days"}}]}}
         """
         
-        response = self.generate_content(prompt)
+        response = self.generate_content(prompt, call_type="recommendations")
         return self._parse_recommendations_response(response)
     
     def _parse_recommendations_response(self, response: str) -> List[Dict]:
         """Parse recommendations response"""
-        recommendations = []
         try:
-            if "```json" in response:
-                json_start = response.find("```json") + 7
-                json_end = response.find("```", json_start)
-                json_str = response[json_start:json_end]
-                data = json.loads(json_str)
-                return data.get("recommendations", [])
-            else:
+            data = _extract_json(response)
+            if data is None:
                 return [{"title": "AI Recommendation", "description": response}]
+            return data.get("recommendations", [])
         except:
             return [{"title": "AI Recommendation", "description": response}]
 
@@ -328,6 +575,8 @@ class AnalyticsAIService(AIService):
 class AIChatService(AIService):
     """AI chat assistant for fitness guidance"""
     
+    SERVICE_NAME = "chat"
+    
     def __init__(self, api_key: str):
         super().__init__(api_key)
         self.conversation_history = []
@@ -366,7 +615,7 @@ class AIChatService(AIService):
         Always consider the user's experience level and goals.
         """
         
-        response = self.generate_content(prompt)
+        response = self.generate_content(prompt, call_type="chat")
         
         # Add AI response to history
         self.conversation_history.append({"role": "assistant", "content": response})
@@ -390,25 +639,190 @@ class AIChatService(AIService):
         self.conversation_history = []
 
 
+PLAN_SECTIONS = ["workout_plan", "nutrition_plan", "ai_insights", "recommendations"]
+
+# Profile fields each plan section is generated from. Services only see these
+# fields, so a section can be reused when none of them changed. The name is
+# always passed along but only substituted, never regenerated for.
+_OVERVIEW_FIELDS = ("age", "gender", "bmi", "bmi_cat", "goal", "experience", "workout_frequency",
+                    "time_available", "injuries", "dietary_pref")
+SECTION_DEPENDENCIES = {
+    "workout_plan": ("age", "gender", "height_cm", "weight_kg", "bmi", "bmi_cat", "goal", "experience",
+                     "equipment", "time_available", "injuries", "workout_frequency", "plan_days"),
+    "nutrition_plan": ("age", "gender", "height_cm", "weight_kg", "goal", "workout_frequency",
+                       "dietary_pref", "cultural_food", "budget", "allergies", "dislikes", "plan_days"),
+    "ai_insights": _OVERVIEW_FIELDS,
+    "recommendations": _OVERVIEW_FIELDS,
+}
+
+
+def profile_subset(user_profile: Dict, section: str) -> Dict[str, Any]:
+    """Fields of the profile a section depends on (plus the name)"""
+    fields = ("name",) + SECTION_DEPENDENCIES[section]
+    return {field: user_profile[field] for field in fields if field in user_profile}
+
+
+def changed_sections(old_profile: Optional[Dict], new_profile: Dict) -> List[str]:
+    """
+    Plan sections affected by a profile change
+    
+    Args:
+        old_profile: Profile the existing plan was generated for (None for no plan)
+        new_profile: Updated profile
+        
+    Returns:
+        Sections to regenerate, in PLAN_SECTIONS order
+    """
+    if not old_profile:
+        return list(PLAN_SECTIONS)
+    changed = {field for field in set(old_profile) | set(new_profile)
+               if old_profile.get(field) != new_profile.get(field)}
+    return [section for section in PLAN_SECTIONS if changed & set(SECTION_DEPENDENCIES[section])]
+
+
+def _section_is_empty(key: str, section: Any) -> bool:
+    """True when a plan section came back empty (Gemini failed or timed out)"""
+    if not section:
+        return True
+    if key == "workout_plan":
+        return set(section) == {"raw_response"} and not section["raw_response"].strip()
+    if key == "nutrition_plan":
+        # Meals are always solved locally; only the guidance comes from Gemini
+        return not section.get("guidance")
+    if key == "recommendations":
+        return all(not str(rec.get("description", "")).strip() for rec in section)
+    return False
+
+
 class AIOrchestrator:
     """Orchestrates all AI services"""
     
     def __init__(self, api_key: str):
         self.api_key = api_key
-        self.workout_ai = WorkoutAIService(api_key)
-        self.nutrition_ai = NutritionAIService(api_key)
-        self.analytics_ai = AnalyticsAIService(api_key)
-        self.chat_ai = AIChatService(api_key)
-    
-    def generate_comprehensive_plan(self, user_profile: Dict) -> Dict[str, Any]:
-        """Generate comprehensive AI-powered plan"""
-        return {
-            "workout_plan": self.workout_ai.generate_smart_workout_plan(user_profile),
-            "nutrition_plan": self.nutrition_ai.generate_smart_nutrition_plan(user_profile),
-            "ai_insights": self.workout_ai.generate_ai_insights(user_profile, []),
-            "recommendations": self.analytics_ai.generate_recommendations(user_profile, {}),
-            "generated_at": datetime.now().isoformat()
+        self._services: Dict[str, AIService] = {}
+    
+    def _service(self, name: str, service_cls: type) -> AIService:
+        """Return the named service, constructing it on first access"""
+        if name not in self._services:
+            self._services[name] = service_cls(self.api_key)
+        return self._services[name]
+    
+    @property
+    def workout_ai(self) -> "WorkoutAIService":
+        return self._service("workout", WorkoutAIService)
+    
+    @property
+    def nutrition_ai(self) -> "NutritionAIService":
+        return self._service("nutrition", NutritionAIService)
+    
+    @property
+    def analytics_ai(self) -> "AnalyticsAIService":
+        return self._service("analytics", AnalyticsAIService)
+    
+    @property
+    def chat_ai(self) -> "AIChatService":
+        return self._service("chat", AIChatService)
+    
+    def generate_comprehensive_plan(
+        self,
+        user_profile: Dict,
+        use_cache: bool = config.PLAN_CACHE_ENABLED,
+        previous_plan: Optional[Dict[str, Any]] = None,
+        previous_profile: Optional[Dict] = None,
+        on_workout_week: Optional[Callable[[int, List[Dict[str, Any]]], None]] = None,
+        on_section: Optional[Callable[[str, Any], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generate comprehensive AI-powered plan, filling failed sections from the local engine
+        
+        When a previous plan and its profile are given, only the sections whose
+        SECTION_DEPENDENCIES changed, or that came from the local engine, are
+        regenerated; the rest are reused.
+        
+        Args:
+            user_profile: Profile dict as collected by enhanced_sidebar_form
+            use_cache: Serve and store plans in the similar-profile plan cache
+            previous_plan: Plan currently shown to the user
+            previous_profile: Profile previous_plan was generated for
+            on_workout_week: Called with (week number, days) as each workout week completes
+            on_section: Called with (section key, value) as each section is ready, and
+                repeatedly for the nutrition plan while its guidance streams
+            
+        Returns:
+            Plan dictionary
+        """
+        if previous_plan is None:
+            previous_profile = None
+        sections = changed_sections(previous_profile, user_profile)
+        if previous_profile is not None:
+            # Local fallbacks are retried, so one outage does not pin a section to the local engine
+            retry = set(previous_plan.get("local_sections", []))
+            sections = [key for key in PLAN_SECTIONS
+                        if key in sections or key in retry or not previous_plan.get(key)]
+        
+        cache = get_plan_cache() if use_cache else None
+        if cache is not None and len(sections) == len(PLAN_SECTIONS):
+            cached = cache.get(user_profile)
+            if cached is not None:
+                record_usage(UsageRecord(service="plan_cache", prompt_tokens=0, completion_tokens=0,
+                                         latency_ms=0.0, cache="hit", user=current_user()))
+                # Shared (JSON) cache entries hold insights as plain dicts
+                cached["ai_insights"] = [
+                    AIInsight(**insight) if isinstance(insight, dict) else insight
+                    for insight in cached.get("ai_insights", [])
+                ]
+                return cached
+        
+        generators = {
+            "workout_plan": lambda profile: self.workout_ai.generate_smart_workout_plan(profile, on_workout_week),
+            "nutrition_plan": lambda profile: self.nutrition_ai.generate_smart_nutrition_plan(
+                profile, (lambda partial: on_section("nutrition_plan", partial)) if on_section else None),
+            "ai_insights": lambda profile: self.workout_ai.generate_ai_insights(profile, []),
+            "recommendations": lambda profile: self.analytics_ai.generate_recommendations(profile, {}),
         }
+        plan = {"generated_at": datetime.now().isoformat()}
+        for key in PLAN_SECTIONS:
+            if key in sections:
+                plan[key] = generators[key](profile_subset(user_profile, key))
+                if on_section is not None and not _section_is_empty(key, plan[key]):
+                    on_section(key, plan[key])
+                continue
+            plan[key] = replace_name(previous_plan[key], previous_profile.get("name"), user_profile.get("name", ""))
+            if key == "ai_insights":
+                plan[key] = [AIInsight(**i) if isinstance(i, dict) else i for i in plan[key]]
+            if on_section is not None:
+                on_section(key, plan[key])
+        
+        missing = [key for key in sections if _section_is_empty(key, plan[key])]
+        if missing:
+            local_plan = self.generate_local_plan(user_profile)
+            for key in missing:
+                plan[key] = local_plan[key]
+                if on_section is not None:
+                    on_section(key, plan[key])
+        local_sections = [key for key in PLAN_SECTIONS if key in missing]
+        
+        if len(local_sections) == len(PLAN_SECTIONS):
+            plan["source"] = "local"
+        elif local_sections:
+            plan["source"] = "mixed"
+        else:
+            plan["source"] = "gemini"
+        if local_sections:
+            plan["local_sections"] = local_sections
+        if previous_profile is not None:
+            plan["regenerated_sections"] = sections
+        
+        if cache is not None and plan["source"] == "gemini":
+            # Only complete Gemini plans are worth sharing with similar profiles
+            cache.put(user_profile, plan)
+        return plan
+    
+    def generate_local_plan(self, user_profile: Dict, days: Optional[int] = None) -> Dict[str, Any]:
+        """Generate an instant rule-based plan without calling Gemini"""
+        plan = generate_local_plan(user_profile, days)
+        plan["ai_insights"] = [AIInsight(**insight) for insight in plan["ai_insights"]]
+        return plan
     
     def get_ai_insights(self, user_data: Dict, progress_data: List[Dict]) -> List[AIInsight]:
         """Get AI insights from all services"""
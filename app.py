@@ -2,20 +2,31 @@ import os
 import io
 import base64
 from datetime import datetime
-from typing import Dict, Tuple, List, Any
+from typing import Dict, List, Any
 import re
+import secrets
 
 import streamlit as st
-import pandas as pd
 from dotenv import load_dotenv
-from fpdf import FPDF
-import google.generativeai as genai
+
+# pandas, fpdf and google.generativeai are imported inside the functions
+# that use them so a cold start only pays for Streamlit and the app modules.
 
 # Import our AI modules
-from ai_services import AIOrchestrator, WorkoutAIService, NutritionAIService, AnalyticsAIService, AIChatService
+from ai_services import PLAN_SECTIONS, AIOrchestrator, WorkoutAIService, NutritionAIService, AnalyticsAIService, AIChatService
 from ai_dashboard import AIDashboard
 from ui_components import AIUIComponents
-from utils import calculate_bmi, calculate_bmr, calculate_tdee, validate_user_inputs
+from health_metrics import activity_level, profile_metrics
+from utils import validate_user_inputs
+from plan_chunks import week_ranges
+from plan_engine import format_nutrition_text, format_workout_text, plan_duration
+from plan_models import PackedPlan
+from insights_job import get_insight_store, user_key
+from plan_index import IndexedPlan, get_plan_index, index_key
+from session_store import streamlit_session
+from usage_tracking import attributed_to
+from admin_dashboard import render_admin_dashboard
+from cohort_analytics import get_cohort_store
 import config
 
 
@@ -27,210 +38,10 @@ def configure_page() -> None:
         initial_sidebar_state="expanded",
     )
 
-    # Futuristic AI styling
+    # Futuristic AI styling (single consolidated stylesheet) and main header
+    AIUIComponents.apply_styles()
     st.markdown(
         """
-        <style>
-        @import url('https://fonts.googleapis.com/css2?family=Orbitron:wght@400;700;900&family=Exo+2:wght@300;400;600;700&display=swap');
-        
-        /* Global AI Theme */
-        .main .block-container {
-            padding-top: 1rem;
-            padding-bottom: 1rem;
-            max-width: 1400px;
-            background: linear-gradient(135deg, #0f0f23 0%, #1a1a2e 50%, #16213e 100%);
-            color: #e0e0e0;
-        }
-        
-        /* AI Header */
-        .ai-main-header {
-            background: linear-gradient(135deg, #0f0f23 0%, #1a1a2e 25%, #16213e 50%, #0f3460 75%, #533483 100%);
-            padding: 3rem 2rem;
-            border-radius: 25px;
-            margin-bottom: 2rem;
-            position: relative;
-            overflow: hidden;
-            box-shadow: 0 25px 50px rgba(0,0,0,0.4);
-            border: 2px solid #00d4ff;
-        }
-        
-        .ai-main-header::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: -100%;
-            width: 100%;
-            height: 100%;
-            background: linear-gradient(90deg, transparent, rgba(0,212,255,0.1), transparent);
-            animation: ai-scan 4s infinite;
-        }
-        
-        @keyframes ai-scan {
-            0% { left: -100%; }
-            100% { left: 100%; }
-        }
-        
-        .ai-title {
-            font-family: 'Orbitron', monospace;
-            font-size: 3rem;
-            font-weight: 900;
-            background: linear-gradient(45deg, #00d4ff, #00ff88, #ff6b6b, #ffd93d, #9d4edd);
-            background-size: 500% 500%;
-            -webkit-background-clip: text;
-            background-clip: text;
-            color: transparent;
-            animation: ai-gradient-flow 6s ease-in-out infinite;
-            text-align: center;
-            margin-bottom: 1rem;
-            text-shadow: 0 0 40px rgba(0, 212, 255, 0.6);
-            letter-spacing: 2px;
-        }
-        
-        @keyframes ai-gradient-flow {
-            0%, 100% { background-position: 0% 50%; }
-            50% { background-position: 100% 50%; }
-        }
-        
-        .ai-subtitle {
-            font-family: 'Exo 2', sans-serif;
-            font-size: 1.3rem;
-            color: #a0a0a0;
-            text-align: center;
-            font-weight: 300;
-            letter-spacing: 1px;
-            margin-bottom: 0.5rem;
-        }
-        
-        .ai-badge {
-            display: inline-block;
-            background: linear-gradient(135deg, #00d4ff, #00ff88);
-            color: #0f0f23;
-            padding: 0.5rem 1rem;
-            border-radius: 20px;
-            font-family: 'Exo 2', sans-serif;
-            font-weight: 600;
-            font-size: 0.9rem;
-            margin: 0.5rem;
-            box-shadow: 0 5px 15px rgba(0, 212, 255, 0.3);
-        }
-        
-        /* AI Particles */
-        .ai-particles {
-            position: absolute;
-            width: 6px;
-            height: 6px;
-            background: #00d4ff;
-            border-radius: 50%;
-            animation: ai-float 8s infinite ease-in-out;
-            box-shadow: 0 0 10px #00d4ff;
-        }
-        
-        .ai-particles:nth-child(1) { top: 15%; left: 10%; animation-delay: 0s; }
-        .ai-particles:nth-child(2) { top: 25%; left: 85%; animation-delay: 2s; }
-        .ai-particles:nth-child(3) { top: 60%; left: 15%; animation-delay: 4s; }
-        .ai-particles:nth-child(4) { top: 70%; left: 80%; animation-delay: 6s; }
-        
-        @keyframes ai-float {
-            0%, 100% { transform: translateY(0px) rotate(0deg); opacity: 0.6; }
-            50% { transform: translateY(-30px) rotate(180deg); opacity: 1; }
-        }
-        
-        /* Enhanced Tabs */
-        .stTabs [data-baseweb="tab-list"] {
-            gap: 4px;
-            background: #1e1e2e;
-            border-radius: 15px;
-            padding: 0.5rem;
-        }
-        
-        .stTabs [data-baseweb="tab"] {
-            background: transparent;
-            border-radius: 10px;
-            padding: 0.75rem 1.5rem;
-            font-family: 'Exo 2', sans-serif;
-            font-weight: 600;
-            color: #a0a0a0;
-            transition: all 0.3s ease;
-        }
-        
-        .stTabs [aria-selected="true"] {
-            background: linear-gradient(135deg, #00d4ff, #00ff88);
-            color: #0f0f23;
-            box-shadow: 0 5px 15px rgba(0, 212, 255, 0.3);
-        }
-        
-        /* Enhanced Buttons */
-        .stButton > button {
-            background: linear-gradient(135deg, #00d4ff, #00ff88);
-            color: #0f0f23;
-            border: none;
-            border-radius: 12px;
-            padding: 0.75rem 2rem;
-            font-family: 'Exo 2', sans-serif;
-            font-weight: 600;
-            transition: all 0.3s ease;
-            box-shadow: 0 5px 15px rgba(0, 212, 255, 0.3);
-        }
-        
-        .stButton > button:hover {
-            transform: translateY(-3px);
-            box-shadow: 0 10px 25px rgba(0, 212, 255, 0.4);
-        }
-        
-        /* AI Sidebar */
-        .css-1d391kg {
-            background: linear-gradient(180deg, #0f0f23 0%, #1a1a2e 50%, #16213e 100%);
-            border-right: 3px solid #00d4ff;
-        }
-        
-        .stSidebar .stSelectbox > div > div {
-            background: #1e1e2e;
-            border: 2px solid #00d4ff;
-            border-radius: 10px;
-            color: #e0e0e0;
-        }
-        
-        .stSidebar .stTextInput > div > div > input {
-            background: #1e1e2e;
-            border: 2px solid #00d4ff;
-            border-radius: 10px;
-            color: #e0e0e0;
-            font-family: 'Exo 2', sans-serif;
-        }
-        
-        .stSidebar .stButton > button {
-            background: linear-gradient(135deg, #00d4ff, #00ff88);
-            color: #0f0f23;
-            border: none;
-            border-radius: 12px;
-            font-weight: 600;
-            transition: all 0.3s ease;
-        }
-        
-        .stSidebar .stButton > button:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 20px rgba(0, 212, 255, 0.4);
-        }
-        
-        /* AI Footer */
-        .ai-footer {
-            text-align: center;
-            color: #a0a0a0;
-            margin-top: 3rem;
-            padding: 2rem;
-            background: linear-gradient(135deg, #1e1e2e 0%, #2d2d44 100%);
-            border-radius: 20px;
-            border: 1px solid #00d4ff;
-            font-family: 'Exo 2', sans-serif;
-        }
-        
-        /* Responsive Design */
-        @media (max-width: 768px) {
-            .ai-title { font-size: 2rem; }
-            .ai-subtitle { font-size: 1rem; }
-        }
-        </style>
-        
         <div class="ai-main-header">
             <div class="ai-particles"></div>
             <div class="ai-particles"></div>
@@ -238,7 +49,7 @@ def configure_page() -> None:
             <div class="ai-particles"></div>
             <div class="ai-title">🤖 AI-POWERED FITNESS PLANNER</div>
             <div class="ai-subtitle">Advanced Artificial Intelligence for Personalized Health & Fitness</div>
-            <div style="text-align: center; margin-top: 1rem;">
+            <div class="ai-badges">
                 <span class="ai-badge">🧠 AI-Powered</span>
                 <span class="ai-badge">⚡ Real-time</span>
                 <span class="ai-badge">🎯 Personalized</span>
@@ -257,142 +68,16 @@ def load_api_key() -> str:
 
 
 def configure_gemini(api_key: str) -> None:
+    import google.generativeai as genai
     genai.configure(api_key=api_key)
 
 
-def build_prompt(user_inputs: Dict[str, str]) -> str:
-    # Enhanced prompt with more detailed instructions
-    return f"""
-You are an expert fitness and nutrition coach with 15+ years of experience. Create a comprehensive, science-based 7-day plan for the following individual. Focus on sustainability, safety, and realistic progression.
-
-CLIENT PROFILE:
-- Name: {user_inputs['name']}
-- Age: {user_inputs['age']} years
-- Gender: {user_inputs['gender']}
-- Height: {user_inputs['height_cm']} cm
-- Weight: {user_inputs['weight_kg']} kg
-- BMI: {user_inputs['bmi']} ({user_inputs['bmi_cat']})
-- Primary Goal: {user_inputs['goal']}
-- Cultural Food Preferences: {user_inputs['cultural_food']}
-- Dietary Restrictions: {user_inputs['dietary_pref']}
-- Available Equipment: {user_inputs['equipment']}
-- Daily Time Commitment: {user_inputs['time_available']} minutes
-- Budget Level: {user_inputs['budget']}
-
-REQUIRED OUTPUT FORMAT:
-
-1. WORKOUT PLAN (Day 1-7)
-   For each day, provide:
-   - Warm-up (5-10 minutes)
-   - Main workout with specific exercises, sets, reps, and rest periods
-   - Cool-down and stretching
-   - Alternative exercises if equipment is limited
-   - Estimated calories burned
-   - Difficulty level (Beginner/Intermediate/Advanced)
-
-2. NUTRITION PLAN (Day 1-7)
-   For each day, provide:
-   - Breakfast with portion sizes and calories
-   - Lunch with portion sizes and calories
-   - Dinner with portion sizes and calories
-   - 1-2 healthy snacks with calories
-   - Hydration goals (water intake)
-   - Total daily calories and macronutrient breakdown
-   - Shopping list for the week
-
-3. PROGRESS TRACKING
-   - Weekly milestones
-   - Key metrics to monitor
-   - Success indicators
-
-4. MOTIVATION & TIPS
-   - Daily motivational quote
-   - 3 practical tips for success
-   - Common challenges and solutions
-
-5. SAFETY NOTES
-   - Important safety considerations
-   - When to consult a healthcare provider
-   - Warning signs to watch for
-
-Use clear, actionable language. Include specific measurements and timing. Make it practical and achievable for their lifestyle and constraints.
-""".strip()
-
-
-def call_gemini(prompt: str) -> str:
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    response = model.generate_content(prompt)
-    # google-generativeai returns .text on the response
-    return getattr(response, "text", "").strip()
-
-
-def parse_sections(full_text: str) -> Tuple[str, str, str]:
-    # Try to split by the required headings; fall back gracefully.
-    lower = full_text.lower()
-    workout_text = ""
-    meal_text = ""
-    motivation = ""
-
-    # Identify indices for sections
-    i_workout = lower.find("1. workout")
-    i_meal = lower.find("2. meal")
-    i_mot = lower.find("3. motivation")
-
-    if i_workout != -1 and i_meal != -1:
-        workout_text = full_text[i_workout:i_meal].strip()
-    if i_meal != -1 and i_mot != -1:
-        meal_text = full_text[i_meal:i_mot].strip()
-    if i_mot != -1:
-        motivation = full_text[i_mot:].strip()
-
-    # Regex-based robust fallback extraction
-    def extract_regex(pattern: str) -> str:
-        match = re.search(pattern, full_text, re.IGNORECASE | re.DOTALL | re.MULTILINE)
-        return match.group(1).strip() if match else ""
-
-    if not workout_text or len(workout_text) < 120:
-        workout_pattern = r"(?:^|\n)\s*1\s*[\).:-]?\s*[^\n]*workout[^\n]*\n(.*?)(?=\n\s*2\s*[\).:-]?\s*[^\n]*meal|\Z)"
-        rx = extract_regex(workout_pattern)
-        if rx:
-            workout_text = f"Workout Plan\n{rx}"
-
-    if not meal_text or len(meal_text) < 120:
-        meal_pattern = r"(?:^|\n)\s*2\s*[\).:-]?\s*[^\n]*meal[^\n]*\n(.*?)(?=\n\s*3\s*[\).:-]?\s*[^\n]*motivation|\Z)"
-        rx = extract_regex(meal_pattern)
-        if rx:
-            meal_text = f"Meal Plan\n{rx}"
-
-    if not motivation:
-        mot_pattern = r"(?:^|\n)\s*3\s*[\).:-]?\s*[^\n]*motivation[^\n]*\n(.*)$"
-        rx = extract_regex(mot_pattern)
-        if rx:
-            motivation = rx
-
-    # Final fallback split into thirds
-    if not workout_text or not meal_text:
-        parts = full_text.split("\n\n")
-        if len(parts) >= 3:
-            workout_text = workout_text or "\n\n".join(parts[: max(1, len(parts)//3)])
-            meal_text = meal_text or "\n\n".join(parts[max(1, len(parts)//3): max(2, 2*len(parts)//3)])
-            motivation = motivation or "\n\n".join(parts[max(2, 2*len(parts)//3):])
-        else:
-            workout_text = workout_text or full_text
-
-    # Clean motivation: reduce to a single line if possible
-    if motivation:
-        lines = [l.strip("- • ") for l in motivation.splitlines() if l.strip()]
-        last_line = lines[-1] if lines else motivation
-        motivation = last_line
-
-    return workout_text, meal_text, motivation
-
-
 def ensure_section_text(section: str, displayed_text: str) -> str:
     # If the displayed text is too short, try re-extracting from full response
     txt = (displayed_text or "").strip()
-    if len(txt) >= 200 or not st.session_state.get("full_response"):
+    full = streamlit_session().get("full_response")
+    if len(txt) >= 200 or not full:
         return txt
-    full = st.session_state.get("full_response")
     if section == "workout":
         match = re.search(r"(?:^|\n)\s*1\s*[\).:-]?\s*[^\n]*workout[^\n]*\n(.*?)(?=\n\s*2\s*[\).:-]?\s*[^\n]*meal|\Z)", full, re.IGNORECASE | re.DOTALL | re.MULTILINE)
         return (match.group(1).strip() if match else full)
@@ -422,6 +107,7 @@ def _sanitize_for_pdf(text: str) -> str:
 
 
 def generate_pdf_bytes(title: str, content: str) -> bytes:
+    from fpdf import FPDF
     pdf = FPDF()
     # Set margins explicitly to avoid layout issues
     left_margin = 20
@@ -500,22 +186,6 @@ def build_data_uri_pdf(pdf_bytes: bytes, filename: str) -> str:
     return f"<a download=\"{filename}\" href=\"data:application/pdf;base64,{b64}\">⬇️ Alternate download link (click if normal download fails)</a>"
 
 
-def compute_bmi(height_cm: float, weight_kg: float) -> Tuple[float, str]:
-    if height_cm <= 0:
-        return 0.0, "Invalid height"
-    m = height_cm / 100.0
-    bmi = weight_kg / (m * m)
-    if bmi < 18.5:
-        cat = "Underweight"
-    elif bmi < 25:
-        cat = "Normal"
-    elif bmi < 30:
-        cat = "Overweight"
-    else:
-        cat = "Obese"
-    return round(bmi, 1), cat
-
-
 def init_session_state() -> None:
     defaults = {
         "full_response": "",
@@ -524,12 +194,11 @@ def init_session_state() -> None:
         "motivation_text": "",
         "plans_df": None,
         "show_progress": False,
-        "progress_data": [],
         "current_week": 1,
     }
+    session = streamlit_session()
     for k, v in defaults.items():
-        if k not in st.session_state:
-            st.session_state[k] = v
+        session.setdefault(k, v)
 
 
 def create_progress_dashboard():
@@ -603,127 +272,9 @@ def create_progress_dashboard():
         st.markdown("- Goal achievement rate")
 
 
-def sidebar_form() -> Dict[str, str]:
-    with st.sidebar:
-        st.header("🎯 Your Profile")
-        
-        # Personal Information
-        with st.expander("👤 Personal Details", expanded=True):
-            name = st.text_input("Full Name", value="", placeholder="Enter your name")
-            age = st.number_input("Age", min_value=10, max_value=90, value=22, step=1)
-            gender = st.selectbox("Gender", ["Male", "Female", "Other"])
-
-            c1, c2 = st.columns(2)
-            with c1:
-                height_cm = st.number_input("Height (cm)", min_value=100, max_value=230, value=170, step=1)
-            with c2:
-                weight_kg = st.number_input("Weight (kg)", min_value=30, max_value=200, value=70, step=1)
-
-        # Fitness Goals
-        with st.expander("🏋️ Fitness Goals", expanded=True):
-            goal = st.selectbox("Primary Goal", [
-                "Weight Loss", 
-                "Muscle Gain", 
-                "Maintain Fitness",
-                "Improve Endurance",
-                "Build Strength",
-                "General Health"
-            ])
-            
-            experience = st.selectbox("Fitness Experience", [
-                "Beginner (0-6 months)",
-                "Intermediate (6 months - 2 years)", 
-                "Advanced (2+ years)"
-            ])
-            
-            injuries = st.text_area("Any Injuries/Concerns", placeholder="List any injuries or health concerns...")
-
-        # Nutrition Preferences
-        with st.expander("🍽️ Nutrition Preferences", expanded=True):
-            cultural_food = st.selectbox(
-                "Cultural / Regional Food",
-                ["Indian", "Mediterranean", "Continental", "East Asian", "Middle Eastern", "Latin American", "Other"],
-            )
-            dietary_pref = st.selectbox("Dietary Preference", [
-                "Vegetarian", 
-                "Non-Vegetarian", 
-                "Vegan", 
-                "Eggetarian",
-                "Pescatarian",
-                "Keto",
-                "Paleo"
-            ])
-            
-            allergies = st.text_area("Food Allergies", placeholder="List any food allergies...")
-            dislikes = st.text_area("Food Dislikes", placeholder="Foods you don't like...")
-
-        # Equipment & Schedule
-        with st.expander("⚙️ Equipment & Schedule"):
-            equipment = st.multiselect(
-                "Available Equipment", 
-                ["None", "Dumbbells", "Resistance Bands", "Gym Access", "Yoga Mat", "Pull-up Bar", "Kettlebell"],
-                default=["None"]
-            )
-            time_available = st.slider("Daily Time Availability (minutes)", min_value=10, max_value=180, value=45, step=5)
-            budget = st.selectbox("Budget Level", ["Low", "Moderate", "High"])
-            
-            workout_frequency = st.selectbox("Workout Frequency", [
-                "3 days/week",
-                "4 days/week", 
-                "5 days/week",
-                "6 days/week",
-                "Daily"
-            ])
-
-        # BMI Calculator with enhanced display
-        bmi, bmi_cat = compute_bmi(height_cm=height_cm, weight_kg=weight_kg)
-        with st.expander("📊 Health Metrics"):
-            st.metric("BMI", f"{bmi}", f"{bmi_cat}")
-            
-            # BMI color coding
-            if bmi_cat == "Normal":
-                st.success("✅ Healthy BMI range!")
-            elif bmi_cat == "Underweight":
-                st.warning("⚠️ Consider consulting a healthcare provider")
-            elif bmi_cat == "Overweight":
-                st.warning("⚠️ Focus on balanced nutrition and regular exercise")
-            else:
-                st.error("🚨 Please consult a healthcare provider before starting any fitness program")
-
-        # Progress Tracking
-        with st.expander("📈 Progress Tracking"):
-            st.info("Track your progress weekly to stay motivated!")
-            if st.button("📊 View Progress Dashboard"):
-                st.session_state.show_progress = True
-
-        generate = st.button("✨ Generate My Personalized Plan", use_container_width=True, type="primary")
-
-    return {
-        "name": name,
-        "age": int(age),
-        "gender": gender,
-        "height_cm": int(height_cm),
-        "weight_kg": int(weight_kg),
-        "goal": goal,
-        "experience": experience,
-        "injuries": injuries,
-        "cultural_food": cultural_food,
-        "dietary_pref": dietary_pref,
-        "allergies": allergies,
-        "dislikes": dislikes,
-        "equipment": ", ".join(equipment),
-        "time_available": int(time_available),
-        "budget": budget,
-        "workout_frequency": workout_frequency,
-        "generate": generate,
-        "bmi": bmi,
-        "bmi_cat": bmi_cat,
-    }
-
-
 def save_to_csv_if_requested(user_inputs: Dict[str, str]) -> None:
     with st.expander("Save Plan History"):
-        if st.button("💾 Save this plan to CSV", use_container_width=True, disabled=not bool(st.session_state.get("full_response"))):
+        if st.button("💾 Save this plan to CSV", use_container_width=True, disabled=not bool(streamlit_session().get("full_response"))):
             row = {
                 "timestamp": datetime.utcnow().isoformat(),
                 "name": user_inputs["name"],
@@ -739,54 +290,53 @@ def save_to_csv_if_requested(user_inputs: Dict[str, str]) -> None:
                 "budget": user_inputs["budget"],
                 "bmi": user_inputs["bmi"],
                 "bmi_cat": user_inputs["bmi_cat"],
-                "motivation": st.session_state.get("motivation_text", ""),
+                "motivation": streamlit_session().get("motivation_text", ""),
             }
-            df_row = pd.DataFrame([row])
-            csv_path = "plans_history.csv"
-            if os.path.exists(csv_path):
-                existing = pd.read_csv(csv_path)
-                combined = pd.concat([existing, df_row], ignore_index=True)
-            else:
-                combined = df_row
-            combined.to_csv(csv_path, index=False)
-            st.success(f"Saved to {csv_path}")
+            # Locked append (safe with several worker processes) plus the cohort aggregates
+            cohorts = get_cohort_store()
+            cohorts.save_plans([row])
+            st.success(f"Saved to {cohorts.history_path}")
 
 
 def main() -> None:
     configure_page()
     init_session_state()
 
+    # Admin page: cohort analytics only, no AI services needed
+    if st.query_params.get("page") == "admin":
+        render_admin_dashboard()
+        return
+
     # Initialize AI services
     api_key = load_api_key()
-    if not api_key:
+    if not api_key and config.AI_BACKEND != "fake":
         st.error("🚨 GEMINI_API_KEY is missing. Please set it in your .env file.")
         st.stop()
     
     # Initialize AI orchestrator and components
-    ai_orchestrator = AIOrchestrator(api_key)
+    ai_orchestrator = session_orchestrator(api_key)
     ai_dashboard = AIDashboard(ai_orchestrator)
     ui_components = AIUIComponents()
     
-    # Apply AI sidebar styling
-    ui_components.ai_sidebar_style()
-
     # Get user inputs with enhanced AI sidebar
     user_inputs = enhanced_sidebar_form(ui_components)
 
     # Display AI-powered profile summary
     display_ai_profile_summary(user_inputs, ui_components)
 
-    # Main AI-powered interface
-    if user_inputs["generate"]:
-        generate_ai_plan(user_inputs, ai_orchestrator, ui_components)
+    # Model calls below are charged to this user in the usage accounting
+    with attributed_to(user_key(user_inputs)):
+        # Main AI-powered interface
+        if user_inputs["generate"]:
+            generate_ai_plan(user_inputs, ai_orchestrator, ui_components)
 
-    # Display AI dashboard
-    if st.session_state.get("show_ai_dashboard", False):
-        display_ai_dashboard(user_inputs, ai_dashboard, ui_components)
+        # Display AI dashboard
+        if st.session_state.get("show_ai_dashboard", False):
+            display_ai_dashboard(user_inputs, ai_dashboard, ui_components)
 
-    # Display generated plans with AI features
-    if st.session_state.get("ai_plan_generated", False):
-        display_ai_plans(user_inputs, ai_orchestrator, ui_components)
+        # Display generated plans with AI features
+        if st.session_state.get("ai_plan_generated", False) or streamlit_session().get("ai_plan") is not None:
+            display_ai_plans(user_inputs, ai_orchestrator, ui_components)
 
     # AI Footer
     st.markdown("""
@@ -798,69 +348,163 @@ def main() -> None:
     """, unsafe_allow_html=True)
 
 
+GENDERS = ["Male", "Female", "Other"]
+
+
+def option_index(options: List[str], value: Any) -> int:
+    """Position of a saved choice in a selectbox's options (0 if unknown)"""
+    return options.index(value) if value in options else 0
+
+
+def restore_indexed_plan(record: IndexedPlan) -> None:
+    """Show a plan from the user's plan index again without generating anything"""
+    plan = get_plan_index().load(record)
+    if plan is None:
+        st.warning("That plan is no longer available - generate a new one.")
+        return
+    session = streamlit_session()
+    session.put("ai_plan", plan)
+    session.put("user_profile", record.profile)
+    st.session_state.ai_plan_generated = True
+    st.session_state.restored_plan_at = record.saved_at
+    st.rerun()
+
+
+BROWSER_ID_PARAM = "device"
+_BROWSER_ID = re.compile(r"[A-Za-z0-9_-]{22,64}")
+
+
+def browser_id() -> str:
+    """
+    Random id of this browser, kept in the URL (?device=...) so reloads and bookmarks keep it
+
+    Saved plans are restored only for the same name on the same browser id;
+    anyone given the full link can restore them too.
+    """
+    value = st.query_params.get(BROWSER_ID_PARAM, "")
+    if not _BROWSER_ID.fullmatch(value):
+        value = secrets.token_urlsafe(16)
+        st.query_params[BROWSER_ID_PARAM] = value
+    return value
+
+
+def session_orchestrator(api_key: str) -> AIOrchestrator:
+    """This session's AI orchestrator, built once instead of on every rerun"""
+    orchestrator = st.session_state.get("ai_orchestrator")
+    if orchestrator is None or orchestrator.api_key != api_key:
+        orchestrator = st.session_state.ai_orchestrator = AIOrchestrator(api_key)
+    return orchestrator
+
+
 def enhanced_sidebar_form(ui_components: AIUIComponents) -> Dict[str, Any]:
-    """Enhanced sidebar with AI-powered styling"""
+    """
+    Enhanced sidebar with AI-powered styling
+
+    The profile form is a fragment: editing a field reruns only the sidebar
+    (BMI, BMR, TDEE and validation are local), not the AI-backed main page.
+    The page picks up the profile on the next full rerun, which the Generate,
+    Dashboard and Restore buttons trigger.
+
+    Returns:
+        The profile inputs, with "generate" set if a plan was requested
+    """
     with st.sidebar:
-        ui_components.ai_header("🎯 AI Profile", "Configure your AI-powered fitness profile")
-        
-        # Personal Information
-        with st.expander("👤 Personal Details", expanded=True):
-            name = st.text_input("Full Name", value="", placeholder="Enter your name")
-            age = st.number_input("Age", min_value=10, max_value=90, value=22, step=1)
-            gender = st.selectbox("Gender", ["Male", "Female", "Other"])
-
-            c1, c2 = st.columns(2)
-            with c1:
-                height_cm = st.number_input("Height (cm)", min_value=100, max_value=230, value=170, step=1)
-            with c2:
-                weight_kg = st.number_input("Weight (kg)", min_value=30, max_value=200, value=70, step=1)
-
-        # AI-Enhanced Fitness Goals
-        with st.expander("🏋️ AI Fitness Goals", expanded=True):
-            goal = st.selectbox("Primary Goal", config.FITNESS_GOALS)
-            experience = st.selectbox("Fitness Experience", config.EXPERIENCE_LEVELS)
-            injuries = st.text_area("Injuries/Concerns", placeholder="List any injuries or health concerns...")
-
-        # AI Nutrition Preferences
-        with st.expander("🍽️ AI Nutrition", expanded=True):
-            cultural_food = st.selectbox("Cultural Food", config.CULTURAL_FOOD_TYPES)
-            dietary_pref = st.selectbox("Dietary Preference", config.DIETARY_PREFERENCES)
-            allergies = st.text_area("Food Allergies", placeholder="List any food allergies...")
-            dislikes = st.text_area("Food Dislikes", placeholder="Foods you don't like...")
-
-        # AI Equipment & Schedule
-        with st.expander("⚙️ AI Equipment & Schedule"):
-            equipment = st.multiselect("Available Equipment", config.EQUIPMENT_OPTIONS, default=["None"])
-            time_available = st.slider("Daily Time (minutes)", min_value=10, max_value=180, value=45, step=5)
-            budget = st.selectbox("Budget Level", config.BUDGET_LEVELS)
-            workout_frequency = st.selectbox("Workout Frequency", config.WORKOUT_FREQUENCY)
-
-        # AI Health Metrics
-        bmi, bmi_cat = calculate_bmi(height_cm=height_cm, weight_kg=weight_kg)
-        with st.expander("📊 AI Health Metrics"):
-            ui_components.ai_metric_card("BMI", f"{bmi}", f"{bmi_cat}", "📏")
-            
-            # BMI color coding
-            if bmi_cat == "Normal":
-                st.success("✅ AI Analysis: Healthy BMI range!")
-            elif bmi_cat == "Underweight":
-                st.warning("⚠️ AI Recommendation: Consider consulting a healthcare provider")
-            elif bmi_cat == "Overweight":
-                st.warning("⚠️ AI Suggestion: Focus on balanced nutrition and regular exercise")
-            else:
-                st.error("🚨 AI Alert: Please consult a healthcare provider before starting any fitness program")
+        profile_form(ui_components)
+    user_inputs = dict(st.session_state.profile_inputs)
+    user_inputs["generate"] = st.session_state.pop("generate_requested", False)
+    return user_inputs
 
-        # AI Dashboard Access
-        with st.expander("🧠 AI Dashboard"):
-            st.info("Access advanced AI analytics and insights!")
-            if st.button("📊 Open AI Dashboard", use_container_width=True):
-                st.session_state.show_ai_dashboard = True
-                st.rerun()
 
-        # Generate AI Plan
-        generate = st.button("🤖 Generate AI-Powered Plan", use_container_width=True, type="primary")
+@st.fragment
+def profile_form(ui_components: AIUIComponents) -> None:
+    """Sidebar profile widgets; stores the inputs in st.session_state.profile_inputs"""
+    ui_components.ai_header("🎯 AI Profile", "Configure your AI-powered fitness profile")
+    
+    # Personal Information
+    with st.expander("👤 Personal Details", expanded=True):
+        name = st.text_input("Full Name", value="", placeholder="Enter your name")
+        # Returning users: prefill from the profile of their last plan and offer it back instantly
+        last_plan = get_plan_index().latest(index_key({"name": name}, browser_id()))
+        saved = last_plan.profile if last_plan is not None else {}
+        if last_plan is not None:
+            saved_on = datetime.fromtimestamp(last_plan.saved_at).strftime("%b %d, %H:%M")
+            st.caption(f"👋 Welcome back! Your last plan is from {saved_on}.")
+            if st.button("⚡ Restore last plan", use_container_width=True):
+                restore_indexed_plan(last_plan)
+        age = st.number_input("Age", min_value=10, max_value=90, value=int(saved.get("age", 22)), step=1)
+        gender = st.selectbox("Gender", GENDERS, index=option_index(GENDERS, saved.get("gender")))
+
+        c1, c2 = st.columns(2)
+        with c1:
+            height_cm = st.number_input("Height (cm)", min_value=100, max_value=230,
+                                        value=int(saved.get("height_cm", 170)), step=1)
+        with c2:
+            weight_kg = st.number_input("Weight (kg)", min_value=30, max_value=200,
+                                        value=int(saved.get("weight_kg", 70)), step=1)
+
+    # AI-Enhanced Fitness Goals
+    with st.expander("🏋️ AI Fitness Goals", expanded=True):
+        goal = st.selectbox("Primary Goal", config.FITNESS_GOALS,
+                            index=option_index(config.FITNESS_GOALS, saved.get("goal")))
+        experience = st.selectbox("Fitness Experience", config.EXPERIENCE_LEVELS,
+                                  index=option_index(config.EXPERIENCE_LEVELS, saved.get("experience")))
+        injuries = st.text_area("Injuries/Concerns", value=saved.get("injuries", ""),
+                                placeholder="List any injuries or health concerns...")
+
+    # AI Nutrition Preferences
+    with st.expander("🍽️ AI Nutrition", expanded=True):
+        cultural_food = st.selectbox("Cultural Food", config.CULTURAL_FOOD_TYPES,
+                                     index=option_index(config.CULTURAL_FOOD_TYPES, saved.get("cultural_food")))
+        dietary_pref = st.selectbox("Dietary Preference", config.DIETARY_PREFERENCES,
+                                    index=option_index(config.DIETARY_PREFERENCES, saved.get("dietary_pref")))
+        allergies = st.text_area("Food Allergies", value=saved.get("allergies", ""),
+                                 placeholder="List any food allergies...")
+        dislikes = st.text_area("Food Dislikes", value=saved.get("dislikes", ""),
+                                placeholder="Foods you don't like...")
+
+    # AI Equipment & Schedule
+    with st.expander("⚙️ AI Equipment & Schedule"):
+        saved_equipment = [e for e in str(saved.get("equipment", "")).split(", ") if e in config.EQUIPMENT_OPTIONS]
+        equipment = st.multiselect("Available Equipment", config.EQUIPMENT_OPTIONS,
+                                   default=saved_equipment or ["None"])
+        time_available = st.slider("Daily Time (minutes)", min_value=10, max_value=180,
+                                   value=int(saved.get("time_available", 45)), step=5)
+        budget = st.selectbox("Budget Level", config.BUDGET_LEVELS,
+                              index=option_index(config.BUDGET_LEVELS, saved.get("budget")))
+        workout_frequency = st.selectbox("Workout Frequency", config.WORKOUT_FREQUENCY,
+                                         index=option_index(config.WORKOUT_FREQUENCY,
+                                                            saved.get("workout_frequency")))
+        plan_days = st.slider("Plan Length (days)", min_value=config.DEFAULT_PLAN_DURATION,
+                              max_value=config.MAX_PLAN_DURATION,
+                              value=int(saved.get("plan_days", config.DEFAULT_PLAN_DURATION)))
+
+    # AI Health Metrics
+    metrics = profile_metrics(height_cm, weight_kg, int(age), gender, activity_level(workout_frequency), goal)
+    bmi, bmi_cat = metrics.bmi, metrics.bmi_cat
+    with st.expander("📊 AI Health Metrics"):
+        ui_components.ai_metric_card("BMI", f"{bmi}", f"{bmi_cat}", "📏")
+        c1, c2 = st.columns(2)
+        c1.metric("BMR", f"{metrics.bmr:.0f} kcal")
+        c2.metric("TDEE", f"{metrics.tdee:.0f} kcal")
+        
+        # BMI color coding
+        if bmi_cat == "Normal":
+            st.success("✅ AI Analysis: Healthy BMI range!")
+        elif bmi_cat == "Underweight":
+            st.warning("⚠️ AI Recommendation: Consider consulting a healthcare provider")
+        elif bmi_cat == "Overweight":
+            st.warning("⚠️ AI Suggestion: Focus on balanced nutrition and regular exercise")
+        else:
+            st.error("🚨 AI Alert: Please consult a healthcare provider before starting any fitness program")
+
+    # AI Dashboard Access
+    with st.expander("🧠 AI Dashboard"):
+        st.info("Access advanced AI analytics and insights!")
+        if st.button("📊 Open AI Dashboard", use_container_width=True):
+            st.session_state.show_ai_dashboard = True
+            st.rerun()
 
-    return {
+    profile = {
         "name": name,
         "age": int(age),
         "gender": gender,
@@ -877,10 +521,19 @@ def enhanced_sidebar_form(ui_components: AIUIComponents) -> Dict[str, Any]:
         "time_available": int(time_available),
         "budget": budget,
         "workout_frequency": workout_frequency,
-        "generate": generate,
+        "plan_days": int(plan_days),
         "bmi": bmi,
         "bmi_cat": bmi_cat,
     }
+    st.session_state.profile_inputs = profile
+
+    # Generate AI Plan (only valid profiles reach the model)
+    is_valid, errors = validate_user_inputs(profile)
+    for error in errors:
+        st.caption(f"⚠️ {error.capitalize()}")
+    if st.button("🤖 Generate AI-Powered Plan", use_container_width=True, type="primary", disabled=not is_valid):
+        st.session_state.generate_requested = True
+        st.rerun()
 
 
 def display_ai_profile_summary(user_inputs: Dict, ui_components: AIUIComponents):
@@ -925,43 +578,157 @@ def display_ai_profile_summary(user_inputs: Dict, ui_components: AIUIComponents)
 
 def generate_ai_plan(user_inputs: Dict, ai_orchestrator: AIOrchestrator, ui_components: AIUIComponents):
     """Generate AI-powered comprehensive plan"""
+    # Instant rule-based draft shown while Gemini works (and kept if it fails)
+    draft_plan = ai_orchestrator.generate_local_plan(user_inputs)
+    st.info("⚡ Instant draft ready from the local plan engine - your AI plan is on its way...")
+    with st.expander("👀 Preview your draft workout"):
+        st.text(format_workout_text(draft_plan["workout_plan"]))
+    
     with st.spinner("🤖 AI is analyzing your profile and generating personalized plans..."):
         ui_components.ai_loading_spinner("AI is thinking...")
         
+        # Workout weeks are generated in parallel; show each one as it arrives
+        total_weeks = len(week_ranges(plan_duration(user_inputs)))
+        progress = st.progress(0.0, text=f"🗓️ Planning {total_weeks} week(s) of workouts...")
+        ready_weeks = []
+        
+        # Sections fill these tabs as soon as they are ready, so reading can start before the plan is done
+        live_tabs = st.tabs(["🏋️ Workout", "🍽️ Nutrition", "💡 Insights"])
+        slots = {}
+        for tab, key, waiting in zip(live_tabs, PLAN_SECTIONS, ("workout weeks", "meals", "insights")):
+            with tab:
+                slots[key] = st.empty()
+                slots[key].info(f"🤖 Preparing your {waiting}...")
+        
+        def show_week(week_no: int, days: List[Dict[str, Any]]):
+            ready_weeks.append(week_no)
+            progress.progress(len(ready_weeks) / total_weeks,
+                              text=f"🗓️ {len(ready_weeks)} of {total_weeks} workout week(s) ready")
+            with live_tabs[0]:
+                with st.expander(f"✅ Week {week_no} is ready"):
+                    st.text(format_workout_text({"days": days}))
+        
+        def show_section(key: str, value: Any):
+            if key == "workout_plan":
+                slots[key].success(f"✅ Workout plan ready - {len(value.get('days', []))} days")
+            elif key == "nutrition_plan":
+                # Called again as each guidance topic finishes streaming
+                with slots[key].container():
+                    if value.get("guidance"):
+                        st.markdown(value["guidance"])
+                    st.text(format_nutrition_text(dict(value, days=value.get("days", [])[:1])))
+            elif key == "ai_insights":
+                with slots[key].container():
+                    for insight in value:
+                        insight = insight if isinstance(insight, dict) else insight.__dict__
+                        st.markdown(f"**{insight.get('title', '')}** - {insight.get('description', '')}")
+        
+        # Reuse the sections of the current plan that the profile change doesn't affect
+        session = streamlit_session()
+        previous_plan = session.get("ai_plan")
         try:
             # Generate comprehensive AI plan
-            ai_plan = ai_orchestrator.generate_comprehensive_plan(user_inputs)
-            
-            # Store in session state
-            st.session_state.ai_plan = ai_plan
-            st.session_state.ai_plan_generated = True
-            st.session_state.user_profile = user_inputs
-            
+            ai_plan = ai_orchestrator.generate_comprehensive_plan(
+                user_inputs,
+                previous_plan=previous_plan.to_dict() if previous_plan is not None else None,
+                previous_profile=session.get("user_profile"),
+                on_workout_week=show_week,
+                on_section=show_section,
+            )
             st.success("🎉 AI has generated your personalized plan!")
-            st.rerun()
-            
         except Exception as e:
             st.error(f"❌ AI generation failed: {str(e)}")
+            ai_plan = draft_plan
+        
+        # Store in session state (packed: days are decoded only when shown)
+        packed_plan = PackedPlan.from_dict(ai_plan)
+        session.put("ai_plan", packed_plan)
+        st.session_state.ai_plan_generated = True
+        st.session_state.pop("restored_plan_at", None)
+        session.put("user_profile", user_inputs)
+        # Indexed under the user so a later visit can restore it without the model
+        get_plan_index().save(user_inputs, packed_plan, browser_id())
+        # Marks the user active so the overnight insights job refreshes them
+        get_insight_store().save_profile(user_inputs, browser_id())
+        st.rerun()
+
+
+def stored_progress(user_inputs: Dict) -> List[Dict[str, Any]]:
+    """This browser's progress log for the profile's user, oldest first"""
+    return get_insight_store().progress(index_key(user_inputs, browser_id()))
+
+
+PROGRESS_FIELDS = {  # progress log form: metric -> (label, max value, step)
+    "weight": ("Weight (kg)", 300.0, 0.1),
+    "calories_consumed": ("Calories consumed", 10000.0, 50.0),
+    "calories_burned": ("Calories burned", 10000.0, 50.0),
+    "workouts_completed": ("Workouts completed", 14.0, 1.0),
+    "sleep_hours": ("Sleep (hours)", 24.0, 0.5),
+}
+
+
+def progress_log_form(user_inputs: Dict, key: str) -> None:
+    """Form that appends a progress entry to the user's stored log (feeds insights and forecasts)"""
+    with st.form(key, clear_on_submit=True):
+        st.markdown("#### 📝 Log Progress")
+        day = st.date_input("Date")
+        cols = st.columns(len(PROGRESS_FIELDS))
+        values = {metric: col.number_input(label, min_value=0.0, max_value=top, value=None, step=step)
+                  for col, (metric, (label, top, step)) in zip(cols, PROGRESS_FIELDS.items())}
+        if st.form_submit_button("Log Progress"):
+            entry = {"date": day.isoformat(), **{m: v for m, v in values.items() if v is not None}}
+            if len(entry) == 1:
+                st.warning("Enter at least one value to log.")
+            elif get_insight_store().record_progress(user_inputs, entry, browser_id()) is None:
+                st.warning("Enter your name in the sidebar to keep a progress log.")
+            else:
+                st.success("Progress logged - your insights refresh overnight.")
 
 
 def display_ai_dashboard(user_inputs: Dict, ai_dashboard: AIDashboard, ui_components: AIUIComponents):
     """Display AI dashboard"""
-    ai_dashboard.render_ai_overview(user_inputs, [])
+    ai_dashboard.render_ai_overview(user_inputs, stored_progress(user_inputs), browser_id())
+    progress_log_form(user_inputs, "dashboard_progress_log")
     
     if st.button("← Back to Main"):
         st.session_state.show_ai_dashboard = False
         st.rerun()
 
 
+def plan_day_selector(key: str, day_count: int) -> int:
+    """Day picker for paged plan views; returns a 0-based day index"""
+    if day_count == 1:
+        return 0
+    return st.select_slider("📅 Day", options=list(range(day_count)), format_func=lambda i: f"Day {i + 1}", key=key)
+
+
 def display_ai_plans(user_inputs: Dict, ai_orchestrator: AIOrchestrator, ui_components: AIUIComponents):
     """Display AI-generated plans with advanced features"""
-    ai_plan = st.session_state.get("ai_plan", {})
+    packed_plan = streamlit_session().get("ai_plan")
+    if packed_plan is None:
+        return
+    ai_plan = packed_plan.meta
+    
+    if ai_plan.get("source") == "local":
+        st.warning("⚡ AI is unavailable right now - showing a plan from the local plan engine.")
+    elif ai_plan.get("source") == "mixed":
+        sections = ", ".join(s.replace("_", " ") for s in ai_plan.get("local_sections", []))
+        st.info(f"⚡ Some sections ({sections}) were generated by the local plan engine.")
+    if st.session_state.get("restored_plan_at"):
+        saved_on = datetime.fromtimestamp(st.session_state.restored_plan_at).strftime("%b %d, %H:%M")
+        st.caption(f"⚡ Restored your plan from {saved_on} - generate again to refresh it.")
+    if ai_plan.get("cache_hit"):
+        st.caption("♻️ Adapted from a plan generated for a very similar profile.")
+    if "regenerated_sections" in ai_plan:
+        updated = ", ".join(s.replace("_", " ") for s in ai_plan["regenerated_sections"]) or "nothing"
+        st.caption(f"🔁 Updated only what your changes affect: {updated}.")
     
     # Enhanced tabs with AI features
     tabs = st.tabs([
         "🤖 AI Workout Plan", 
         "🍽️ AI Nutrition Plan", 
         "📊 AI Analytics", 
+        "🔮 AI Predictions",
         "💬 AI Coach Chat",
         "📋 AI Summary"
     ])
@@ -969,59 +736,61 @@ def display_ai_plans(user_inputs: Dict, ai_orchestrator: AIOrchestrator, ui_comp
     with tabs[0]:
         ui_components.ai_header("🏋️ AI-Powered Workout Plan", "Scientifically optimized by advanced AI")
         
-        workout_plan = ai_plan.get("workout_plan", {})
-        if workout_plan:
-            st.json(workout_plan)  # Display structured workout plan
+        if packed_plan.workout_day_count:
+            day = plan_day_selector("workout_day", packed_plan.workout_day_count)
+            st.text(format_workout_text({"days": [packed_plan.workout_day(day).to_dict()]}))
+            if packed_plan.workout.get("local_weeks"):
+                weeks = ", ".join(str(w) for w in packed_plan.workout["local_weeks"])
+                st.caption(f"⚡ Week(s) {weeks} come from the local plan engine.")
+            for note in packed_plan.workout.get("notes", []):
+                st.caption(f"💡 {note}")
+        elif packed_plan.workout:
+            st.json(packed_plan.workout)  # Display structured workout plan
         else:
             st.info("🤖 AI is preparing your workout plan...")
     
     with tabs[1]:
         ui_components.ai_header("🍽️ AI-Powered Nutrition Plan", "Metabolically optimized by advanced AI")
         
-        nutrition_plan = ai_plan.get("nutrition_plan", {})
-        if nutrition_plan:
-            st.json(nutrition_plan)  # Display structured nutrition plan
+        nutrition_plan = packed_plan.nutrition
+        for note in nutrition_plan.get("notes", []):
+            st.caption(f"💡 {note}")
+        if nutrition_plan.get("guidance"):
+            st.markdown(nutrition_plan["guidance"])
+        if packed_plan.nutrition_day_count:
+            day = plan_day_selector("nutrition_day", packed_plan.nutrition_day_count)
+            st.text(format_nutrition_text(dict(nutrition_plan, days=[packed_plan.nutrition_day(day).to_dict()])))
+        elif nutrition_plan:
+            st.json({k: v for k, v in nutrition_plan.items() if k != "guidance"})  # Display structured nutrition plan
         else:
             st.info("🤖 AI is preparing your nutrition plan...")
     
     with tabs[2]:
         ai_dashboard = AIDashboard(ai_orchestrator)
-        ai_dashboard.render_ai_overview(user_inputs, [])
+        ai_dashboard.render_ai_overview(user_inputs, stored_progress(user_inputs), browser_id())
+        progress_log_form(user_inputs, "plan_progress_log")
     
     with tabs[3]:
         ai_dashboard = AIDashboard(ai_orchestrator)
-        ai_dashboard.render_ai_chat(user_inputs)
+        ai_dashboard.render_predictions_dashboard(user_inputs, stored_progress(user_inputs), browser_id())
     
     with tabs[4]:
+        ai_dashboard = AIDashboard(ai_orchestrator)
+        ai_dashboard.render_ai_chat(user_inputs)
+    
+    with tabs[5]:
         ui_components.ai_header("📋 AI Plan Summary", "Comprehensive overview of your AI-generated plan")
         
         # Display AI insights
         insights = ai_plan.get("ai_insights", [])
         for insight in insights:
-            ui_components.ai_insight_card({
-                "title": insight.title,
-                "description": insight.description,
-                "confidence": insight.confidence,
-                "priority": insight.priority
-            })
+            ui_components.ai_insight_card(insight)
         
         # Display recommendations
         recommendations = ai_plan.get("recommendations", [])
         st.markdown("#### 🎯 AI Recommendations")
         for i, rec in enumerate(recommendations[:3], 1):
-            st.markdown(f"""
-            <div style="
-                background: linear-gradient(135deg, #1e1e2e 0%, #2d2d44 100%);
-                border-left: 4px solid #00d4ff;
-                border-radius: 10px;
-                padding: 1.5rem;
-                margin: 1rem 0;
-                box-shadow: 0 10px 25px rgba(0,0,0,0.2);
-            ">
-                <h4 style="color: #00d4ff; margin-bottom: 0.5rem;">{i}. {rec.get('title', 'AI Recommendation')}</h4>
-                <p style="color: #e0e0e0; margin: 0;">{rec.get('description', 'No description available.')}</p>
-            </div>
-            """, unsafe_allow_html=True)
+            ui_components.ai_recommendation_card(i, rec)
 
 
 if __name__ == "__main__":
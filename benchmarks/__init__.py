@@ -0,0 +1,3 @@
+"""
+Benchmark suite for the AI-Powered Workout & Diet Planner
+"""
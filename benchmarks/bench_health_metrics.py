@@ -0,0 +1,102 @@
+"""
+Micro-benchmark for the health calculators.
+
+Times BMI, BMR, TDEE and calorie goals over a batch of history-like rows,
+drawn from a smaller set of distinct synthetic profiles (whole-number
+heights, weights and ages, as the sidebar collects them) because batch jobs
+see the same users many times. Each batch goes once through the separate
+calculators and once through the memoized profile_metrics, and the
+benchmark checks both give the same numbers. With --profiles above the
+cache size, the memoized path shows its worst case.
+
+Usage:
+    python -m benchmarks.bench_health_metrics [--rows 100000] [--profiles 1000] [--runs 5]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from typing import Callable, List, Tuple
+
+import config
+from health_metrics import (
+    activity_level,
+    calculate_bmi,
+    calculate_bmr,
+    calculate_calorie_goals,
+    calculate_tdee,
+    profile_metrics,
+)
+
+Row = Tuple[int, int, int, str, str, str]
+
+
+def make_rows(count: int, profiles: int, seed: int = 7) -> List[Row]:
+    """Synthetic (height, weight, age, gender, activity, goal) rows drawn from `profiles` distinct profiles"""
+    rng = random.Random(seed)
+    distinct = [
+        (rng.randint(150, 195), rng.randint(45, 110), rng.randint(18, 70), rng.choice(["Male", "Female", "Other"]),
+         activity_level(rng.choice(config.WORKOUT_FREQUENCY)), rng.choice(config.FITNESS_GOALS))
+        for _ in range(profiles)
+    ]
+    return [rng.choice(distinct) for _ in range(count)]
+
+
+def separate(rows: List[Row]) -> List[Tuple[float, str, float, float, int]]:
+    results = []
+    for height_cm, weight_kg, age, gender, activity, goal in rows:
+        bmi, bmi_cat = calculate_bmi(height_cm, weight_kg)
+        bmr = calculate_bmr(weight_kg, height_cm, age, gender)
+        tdee = calculate_tdee(bmr, activity)
+        results.append((bmi, bmi_cat, bmr, tdee, calculate_calorie_goals(tdee, goal)["daily_calories"]))
+    return results
+
+
+def memoized(rows: List[Row]) -> List[Tuple[float, str, float, float, int]]:
+    results = []
+    for row in rows:
+        m = profile_metrics(*row)
+        results.append((m.bmi, m.bmi_cat, m.bmr, m.tdee, m.daily_calories))
+    return results
+
+
+def _time(func: Callable[[List[Row]], list], rows: List[Row], runs: int, clear: bool = False) -> List[float]:
+    timings = []
+    for _ in range(runs):
+        if clear:
+            profile_metrics.cache_clear()
+        start = time.perf_counter()
+        func(rows)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run(rows: int, profiles: int, runs: int) -> int:
+    batch = make_rows(rows, profiles)
+    same = separate(batch) == memoized(batch)
+
+    print(f"Health calculators ({rows} rows of {profiles} distinct profiles, {runs} runs)")
+    for label, func, clear in [("separate calculators", separate, False),
+                               ("profile_metrics, cold cache", memoized, True),
+                               ("profile_metrics, warm cache", memoized, False)]:
+        timings = _time(func, batch, runs, clear)
+        print(f"  {label:<30} median {statistics.median(timings) / rows * 1e9:>7.0f} ns/row")
+    info = profile_metrics.cache_info()
+    print(f"  cache: {info.currsize} entries, {info.hits / max(info.hits + info.misses, 1):.0%} hits")
+    print(f"  results match: {same}")
+    return 0 if same else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the health calculators")
+    parser.add_argument("--rows", type=int, default=100000, help="Rows per run")
+    parser.add_argument("--profiles", type=int, default=1000, help="Distinct profiles among the rows")
+    parser.add_argument("--runs", type=int, default=5, help="Number of timed runs")
+    args = parser.parse_args()
+    sys.exit(run(args.rows, args.profiles, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Import-time profiling report for application cold starts.
+
+Runs ``python -X importtime -c "import <module>"`` in fresh interpreters and
+reports wall time, the slowest imports by cumulative time and any heavy
+modules that were loaded eagerly.
+
+Usage:
+    python -m benchmarks.bench_imports [--module app] [--runs 5] [--top 15]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported on first use
+HEAVY_MODULES = ["pandas", "fpdf", "google.generativeai", "scipy", "sklearn", "pyarrow"]
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Parse ``-X importtime`` output
+    
+    Args:
+        stderr: Captured stderr of the interpreter
+        
+    Returns:
+        Dictionary of module name -> (self_us, cumulative_us) for top-level entries
+    """
+    timings = {}
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            timings[name] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def profile_once(module: str) -> Tuple[float, Dict[str, Tuple[int, int]], List[str]]:
+    """Import ``module`` in a fresh interpreter and return (wall_s, timings, heavy_loaded)"""
+    code = (
+        f"import sys; import {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return wall, parse_importtime(proc.stderr), heavy
+
+
+def run(module: str, runs: int, top: int) -> int:
+    walls = []
+    cumulative = defaultdict(list)
+    heavy_loaded = set()
+    
+    for _ in range(runs):
+        wall, timings, heavy = profile_once(module)
+        walls.append(wall)
+        heavy_loaded.update(heavy)
+        for name, (_, cum_us) in timings.items():
+            cumulative[name].append(cum_us)
+    
+    print(f"Cold import of '{module}' ({runs} runs)")
+    print(f"  wall time: median {statistics.median(walls) * 1000:.0f} ms, "
+          f"min {min(walls) * 1000:.0f} ms, max {max(walls) * 1000:.0f} ms")
+    print()
+    print(f"  {'module':<60} {'cumulative (ms)':>16}")
+    ranked = sorted(cumulative.items(), key=lambda kv: statistics.median(kv[1]), reverse=True)
+    for name, values in ranked[:top]:
+        print(f"  {name:<60} {statistics.median(values) / 1000:>16.1f}")
+    print()
+    
+    if heavy_loaded:
+        print(f"  heavy modules loaded eagerly: {', '.join(sorted(heavy_loaded))}")
+        return 1
+    print("  heavy modules loaded eagerly: none")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Profile application import time")
+    parser.add_argument("--module", default="app", help="Module to import (default: app)")
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold imports")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to show")
+    args = parser.parse_args()
+    sys.exit(run(args.module, args.runs, args.top))
+
+
+if __name__ == "__main__":
+    main()
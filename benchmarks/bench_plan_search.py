@@ -0,0 +1,87 @@
+"""
+Query-latency benchmark for the plan search index.
+
+Indexes a large number of saved plans in a temporary shared store (the
+terms of a few dozen generated local plans, reused across many users) and
+times a mix of boolean, prefix and negated queries.
+
+Usage:
+    python -m benchmarks.bench_plan_search [--plans 200000] [--runs 5]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import config
+from plan_engine import generate_local_plan
+from plan_models import PackedPlan
+from plan_search import PlanSearch, plan_terms
+from shared_store import SharedStore
+
+from benchmarks.load_multiprocess import BASE_PROFILE
+
+QUERIES = [
+    "burpees diet:vegan",
+    "squat OR lunge -keto",
+    "food:lent*",
+    "goal:muscle exercise:push*",
+    "tofu",
+]
+VARIANTS = 40
+CHUNK_PLANS = 20000
+
+
+def profile_variants(count: int, seed: int = 11) -> List[Tuple[Dict, Dict[str, int]]]:
+    """(profile, plan terms) of `count` generated local plans with varied goals, diets and equipment"""
+    rng = random.Random(seed)
+    variants = []
+    for i in range(count):
+        profile = dict(BASE_PROFILE, name=f"Variant {i}", goal=rng.choice(config.FITNESS_GOALS),
+                       dietary_pref=rng.choice(config.DIETARY_PREFERENCES),
+                       cultural_food=rng.choice(config.CULTURAL_FOOD_TYPES),
+                       equipment=rng.choice(["None", "Dumbbells", "Dumbbells, Pull-up Bar"]))
+        variants.append((profile, plan_terms(profile, PackedPlan.from_dict(generate_local_plan(profile)))))
+    return variants
+
+
+def run(plans: int, runs: int) -> int:
+    variants = profile_variants(VARIANTS)
+    with tempfile.TemporaryDirectory() as workdir:
+        search = PlanSearch(SharedStore(os.path.join(workdir, "planner.db")))
+        start = time.perf_counter()
+        for first in range(0, plans, CHUNK_PLANS):
+            search.add_many((f"user{i}|{i}", f"user{i}", float(i), *variants[i % VARIANTS])
+                            for i in range(first, min(first + CHUNK_PLANS, plans)))
+        build_s = time.perf_counter() - start
+
+        print(f"Plan search ({plans} indexed plans, {runs} runs per query)")
+        print(f"  index build: {build_s:.1f} s ({build_s / plans * 1e6:.0f} us per plan)")
+        worst = 0.0
+        for query in QUERIES:
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                hits = search.search(query)
+                timings.append(time.perf_counter() - start)
+            worst = max(worst, statistics.median(timings))
+            print(f"  {query:<32} median {statistics.median(timings) * 1000:>6.1f} ms, {len(hits)} hits")
+    print(f"  slowest query: {worst * 1000:.1f} ms")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark plan search query latency")
+    parser.add_argument("--plans", type=int, default=200000, help="Number of indexed plans")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per query")
+    args = parser.parse_args()
+    sys.exit(run(args.plans, args.runs))
+
+
+if __name__ == "__main__":
+    main()
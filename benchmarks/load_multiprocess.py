@@ -0,0 +1,163 @@
+"""
+Multi-process load test for the shared deployment mode.
+
+Spawns several worker processes that, like Streamlit workers on one node,
+concurrently look up and fill the shared plan cache, write session state
+under their own session ids and append to the plan history CSV. Afterwards
+it checks that nothing was lost: every CSV row is intact, cache counters add
+up, and every session can be restored from a process that never saw it.
+
+Usage:
+    python -m benchmarks.load_multiprocess [--workers 4] [--iterations 50]
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+from plan_cache import SharedPlanCache
+from plan_engine import generate_local_plan
+from plan_models import PackedPlan
+from session_store import BlobStore, SessionStore
+from shared_store import SharedStore, append_csv_row
+
+BASE_PROFILE = {
+    "name": "Load Tester",
+    "age": 30,
+    "gender": "Female",
+    "height_cm": 165,
+    "weight_kg": 62,
+    "goal": "Weight Loss",
+    "experience": "Beginner (0-6 months)",
+    "injuries": "",
+    "cultural_food": "Mediterranean",
+    "dietary_pref": "Vegetarian",
+    "allergies": "",
+    "dislikes": "",
+    "equipment": "Dumbbells",
+    "time_available": 45,
+    "budget": "Moderate",
+    "workout_frequency": "3 days/week",
+    "bmi": 22.8,
+    "bmi_cat": "Normal",
+}
+GOALS = ["Weight Loss", "Muscle Gain", "Maintain Fitness"]
+
+
+def _paths(workdir: str) -> Tuple[str, str, str]:
+    return (
+        os.path.join(workdir, "planner.db"),
+        os.path.join(workdir, "blobs"),
+        os.path.join(workdir, "history.csv"),
+    )
+
+
+def worker(args: Tuple[str, int, int]) -> Tuple[List[float], List[str]]:
+    """
+    Simulate one worker process serving a stream of requests
+
+    Args:
+        args: (work directory, worker number, iterations)
+
+    Returns:
+        Tuple of (request latencies in seconds, session ids written)
+    """
+    workdir, worker_no, iterations = args
+    db_path, blob_dir, csv_path = _paths(workdir)
+    shared = SharedStore(db_path)
+    blobs = BlobStore(blob_dir)
+    cache = SharedPlanCache(store=shared)
+
+    latencies, session_ids = [], []
+    for i in range(iterations):
+        start = time.perf_counter()
+        profile = dict(BASE_PROFILE, name=f"User {worker_no}-{i}", goal=GOALS[i % len(GOALS)],
+                       weight_kg=62 + (i % 3) * 0.5)
+        plan = cache.get(profile)
+        if plan is None:
+            plan = generate_local_plan(profile)  # stands in for a Gemini call
+            cache.put(profile, plan)
+
+        session_id = uuid.uuid4().hex
+        session = SessionStore({}, blobs, shared=shared, session_id=session_id)
+        session.put("ai_plan", PackedPlan.from_dict(plan))
+        session.put("chat_history", [{"content": f"hello from {profile['name']}", "is_user": True}])
+        session_ids.append(session_id)
+
+        append_csv_row(csv_path, {"worker": worker_no, "iteration": i, "name": profile["name"]})
+        latencies.append(time.perf_counter() - start)
+    return latencies, session_ids
+
+
+def verify(workdir: str, workers: int, iterations: int, session_ids: List[str]) -> Dict[str, object]:
+    """Check the shared state left behind by the workers"""
+    db_path, blob_dir, csv_path = _paths(workdir)
+    shared = SharedStore(db_path)
+    blobs = BlobStore(blob_dir)
+
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    expected = {(str(w), str(i)) for w in range(workers) for i in range(iterations)}
+    rows_ok = len(rows) == len(expected) and {(r["worker"], r["iteration"]) for r in rows} == expected
+
+    restored = 0
+    for session_id in session_ids:
+        session = SessionStore({}, blobs, shared=shared, session_id=session_id)
+        plan = session.get("ai_plan")
+        history = session.get("chat_history")
+        if plan is not None and plan.workout_day_count and history:
+            restored += 1
+
+    stats = SharedPlanCache(store=shared).stats()
+    return {
+        "csv_rows_ok": rows_ok,
+        "sessions_restored": restored,
+        "cache": stats,
+        "cache_ok": stats["hits"] + stats["misses"] == workers * iterations,
+    }
+
+
+def run(workers: int, iterations: int) -> int:
+    """Run the load test and print a report; returns a process exit code"""
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(worker, [(workdir, w, iterations) for w in range(workers)])
+        elapsed = time.perf_counter() - start
+
+        latencies = [lat for lats, _ in results for lat in lats]
+        session_ids = [sid for _, sids in results for sid in sids]
+        report = verify(workdir, workers, iterations, session_ids)
+
+    latencies.sort()
+    total = workers * iterations
+    print(f"Multi-process load test ({workers} workers x {iterations} requests)")
+    print(f"  throughput: {total / elapsed:.1f} requests/s ({elapsed:.2f} s total)")
+    print(f"  latency: median {statistics.median(latencies) * 1000:.1f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms")
+    print(f"  plan cache: {report['cache']}")
+    print(f"  history rows intact: {report['csv_rows_ok']}")
+    print(f"  sessions restored by another process: {report['sessions_restored']}/{len(session_ids)}")
+
+    ok = report["csv_rows_ok"] and report["cache_ok"] and report["sessions_restored"] == len(session_ids)
+    print(f"  result: {'PASS' if ok else 'FAIL'}")
+    return 0 if ok else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the multi-process deployment mode")
+    parser.add_argument("--workers", type=int, default=4, help="Number of worker processes")
+    parser.add_argument("--iterations", type=int, default=50, help="Requests per worker")
+    args = parser.parse_args()
+    sys.exit(run(args.workers, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
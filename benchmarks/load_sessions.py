@@ -0,0 +1,195 @@
+"""
+Load test simulating concurrent Streamlit sessions on one node.
+
+Runs app.py headlessly (streamlit.testing AppTest) for N concurrent sessions
+against the local fake model backend (fake_model), so no API key or network
+is needed. AppTest keeps process-global state, so every session gets its
+own process; the processes share the plan cache, session store and history
+in a temporary directory, as the workers of the multi-process deployment
+mode do. Each session warms up (imports, catalogs), waits for the others,
+then follows a user's flow: open the app, fill in the profile, generate a
+plan, page through the workout and nutrition tabs, ask the coach a question
+and export what it sees to PDF. The app doesn't offer a PDF download at the
+moment, so the export step times generate_pdf_bytes on the displayed plan.
+
+Reports latency percentiles per step (a step is one script rerun, except
+the export), resident memory a session adds to its warmed-up process and
+completed flows per second. Exits non-zero if a session fails or, with
+--max-p95-ms, if any step's p95 is above the limit, so it can gate CI runs.
+
+Usage:
+    python -m benchmarks.load_sessions [--sessions 8] [--latency 0.2] [--max-p95-ms 0]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import config
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+STEPS = ("open", "profile", "generate", "tabs", "chat", "export")
+CHAT_MESSAGE = "How should I warm up before squats?"
+
+
+def rss_bytes() -> int:
+    """Resident memory of this process (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+class SessionRun:
+    """One simulated user driving app.py through AppTest"""
+
+    def __init__(self, session_no: int, timeout: float):
+        from streamlit.testing.v1 import AppTest
+        self.session_no = session_no
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.timings: Dict[str, float] = {}
+
+    def _step(self, name: str, action: Callable[[], object]):
+        start = time.perf_counter()
+        action()
+        self.timings[name] = time.perf_counter() - start
+        if self.app.exception:
+            raise RuntimeError(f"session {self.session_no}, step {name}: {self.app.exception[0].message}")
+        if self.app.main.error:
+            raise RuntimeError(f"session {self.session_no}, step {name}: {self.app.main.error[0].value}")
+
+    @staticmethod
+    def _button(widgets, label: str):
+        return next(widget for widget in widgets if label in widget.label)
+
+    @staticmethod
+    def _pick(widgets, label: str, value: str):
+        next(widget for widget in widgets if widget.label == label).set_value(value)
+
+    def run(self):
+        """Play the whole flow, recording each step's wall time"""
+        app = self.app
+        rng = random.Random(self.session_no)
+        self._step("open", app.run)
+
+        # Distinct profiles, so sessions don't all share one cached plan
+        app.sidebar.text_input[0].input(f"Load Tester {self.session_no}")
+        self._pick(app.sidebar.selectbox, "Primary Goal", rng.choice(config.FITNESS_GOALS))
+        self._pick(app.sidebar.selectbox, "Dietary Preference", rng.choice(config.DIETARY_PREFERENCES))
+        self._step("profile", app.run)
+
+        self._button(app.sidebar.button, "Generate").click()
+        self._step("generate", app.run)
+
+        # Tabs render together; paging a day in each is what reruns the script
+        for slider in app.select_slider:
+            slider.set_value(1)
+        self._step("tabs", app.run)
+
+        next(area for area in app.main.text_area if "AI coach" in area.label).input(CHAT_MESSAGE)
+        self._button(app.button, "Send").click()
+        self._step("chat", app.run)
+
+        from app import generate_pdf_bytes
+        content = "\n\n".join(text.value for text in app.main.text)
+        self._step("export", lambda: generate_pdf_bytes("Your Plan", content))
+
+
+def session_worker(args: Tuple[str, int, float, float, Any]) -> Dict[str, Any]:
+    """
+    Serve one simulated session in its own process
+
+    Args:
+        args: (work directory, session number, fake model latency, script timeout,
+               barrier every session waits on once warmed up)
+
+    Returns:
+        {"timings", "start", "end", "rss", "session_rss", "error"} (wall-clock start/end for throughput)
+    """
+    workdir, session_no, latency, timeout, ready = args
+    # Relative store paths (plan cache, session blobs, history CSV) are shared through the work directory
+    os.chdir(workdir)
+    config.AI_BACKEND = "fake"
+    config.FAKE_MODEL_LATENCY = latency
+    from streamlit.testing.v1 import AppTest
+    from app import generate_pdf_bytes
+    # Warm-up: imports (fpdf included), catalogs and stylesheet load once per process, as on a live server
+    AppTest.from_file(APP_PATH, default_timeout=timeout).run()
+    generate_pdf_bytes("Warm-up", "Warm-up")
+    baseline = rss_bytes()
+    ready.wait()
+
+    session = SessionRun(session_no, timeout)
+    start, error = time.time(), ""
+    try:
+        session.run()
+    except Exception as e:
+        error = str(e) or repr(e)
+    end = time.time()
+    rss = rss_bytes()
+    return {"timings": session.timings, "start": start, "end": end, "rss": rss,
+            "session_rss": rss - baseline, "error": error}
+
+
+def run(sessions: int, latency: float, timeout: float, max_p95_ms: float) -> int:
+    """Run the load test and print a report; returns a process exit code"""
+    with tempfile.TemporaryDirectory() as workdir, multiprocessing.Manager() as manager:
+        ready = manager.Barrier(sessions)
+        with multiprocessing.Pool(sessions) as pool:
+            results = pool.map(session_worker, [(workdir, i, latency, timeout, ready) for i in range(sessions)])
+
+    errors = [result["error"] for result in results if result["error"]]
+    done = [result for result in results if not result["error"]]
+    elapsed = max(r["end"] for r in results) - min(r["start"] for r in results)
+    print(f"Concurrent sessions ({sessions} sessions, fake model {latency * 1000:.0f} ms per reply)")
+    slow = []
+    for step in STEPS:
+        timings = [result["timings"][step] * 1000 for result in done]
+        if not timings:
+            continue
+        p95 = percentile(timings, 95)
+        print(f"  {step:<9} p50 {statistics.median(timings):>7.0f} ms  p95 {p95:>7.0f} ms  "
+              f"max {max(timings):>7.0f} ms")
+        if max_p95_ms and p95 > max_p95_ms:
+            slow.append(step)
+    if done:
+        print(f"  RSS per session: {statistics.mean(r['session_rss'] for r in done) / 2 ** 20:.1f} MiB "
+              f"(process total {statistics.mean(r['rss'] for r in done) / 2 ** 20:.0f} MiB)")
+    print(f"  throughput: {len(done) / elapsed:.2f} flows/s ({elapsed:.1f} s for all sessions)")
+    for error in errors:
+        print(f"  failed: {error}")
+    if slow:
+        print(f"  p95 above {max_p95_ms:.0f} ms: {', '.join(slow)}")
+    return 1 if errors or slow else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test concurrent Streamlit sessions against a fake model")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent sessions")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake model seconds per reply")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds allowed per script run")
+    parser.add_argument("--max-p95-ms", type=float, default=0, help="Fail if a step's p95 exceeds this (0: off)")
+    args = parser.parse_args()
+    sys.exit(run(args.sessions, args.latency, args.timeout, args.max_p95_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Cohort analytics over the plan history
+
+Questions like "average BMI by goal" or "Muscle Gain plans per week" used to
+mean reading plans_history.csv by hand. Every saved plan now also updates a
+set of group-by aggregates in the shared store: one running count/sum/sum of
+squares per (time grain, period, dimension, value), where the dimensions are
+the profile fields in COHORT_DIMENSIONS and "all". The admin dashboard reads
+these few thousand small rows instead of the history, so it renders in
+milliseconds however long the history grows. rebuild_cohorts recomputes them
+from the CSV (e.g. for history saved before aggregates existed).
+"""
+
+import csv
+import json
+import math
+import os
+from dataclasses import dataclass, field
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+import config
+from shared_store import SharedStore, append_csv_rows, get_shared_store
+
+
+COHORT_DIMENSIONS = ("goal", "bmi_cat", "dietary_pref", "cultural_food", "budget")
+COHORT_METRICS = ("bmi", "age", "weight_kg", "height_cm", "time_available")
+TIME_GRAINS = ("all", "week", "month")
+
+ALL = "all"  # the dimension (and value) aggregating every plan
+UNKNOWN = "Unknown"  # value for rows missing a dimension
+
+
+def time_bucket(timestamp: Any, grain: str) -> str:
+    """
+    Period a plan's timestamp falls in
+
+    Args:
+        timestamp: ISO date or datetime
+        grain: "all", "week" (Monday date) or "month" ("YYYY-MM")
+
+    Returns:
+        Period label, "" for grain "all" or an unparseable timestamp
+    """
+    if grain == "all":
+        return ""
+    try:
+        day = date.fromisoformat(str(timestamp)[:10])
+    except ValueError:
+        return ""
+    if grain == "week":
+        return date.fromordinal(day.toordinal() - day.weekday()).isoformat()
+    return day.isoformat()[:7]
+
+
+def _label(value: Any) -> str:
+    text = str(value).strip() if value is not None else ""
+    return text.replace("|", "/") or UNKNOWN
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def group_key(grain: str, dimension: str, period: str, value: str) -> str:
+    """Store key of one aggregate; grain and dimension lead so a dashboard query is a prefix scan"""
+    return f"{grain}|{dimension}|{period}|{value}"
+
+
+@dataclass
+class CohortStats:
+    """Data class for the running aggregate of one cohort"""
+    count: int = 0
+    sums: Dict[str, float] = field(default_factory=dict)
+    squares: Dict[str, float] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)  # rows with a value, per metric
+
+    def add(self, values: Dict[str, float]):
+        """Count one plan with its numeric metric values (see metric_values)"""
+        self.count += 1
+        for metric, value in values.items():
+            self.sums[metric] = self.sums.get(metric, 0.0) + value
+            self.squares[metric] = self.squares.get(metric, 0.0) + value * value
+            self.counts[metric] = self.counts.get(metric, 0) + 1
+
+    def merge(self, other: "CohortStats"):
+        self.count += other.count
+        for metric, n in other.counts.items():
+            self.sums[metric] = self.sums.get(metric, 0.0) + other.sums[metric]
+            self.squares[metric] = self.squares.get(metric, 0.0) + other.squares[metric]
+            self.counts[metric] = self.counts.get(metric, 0) + n
+
+    def mean(self, metric: str) -> Optional[float]:
+        n = self.counts.get(metric, 0)
+        return self.sums[metric] / n if n else None
+
+    def std(self, metric: str) -> Optional[float]:
+        n = self.counts.get(metric, 0)
+        if n < 2:
+            return None
+        variance = (self.squares[metric] - self.sums[metric] ** 2 / n) / (n - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def to_bytes(self) -> bytes:
+        return json.dumps({"count": self.count, "sums": self.sums, "squares": self.squares,
+                           "counts": self.counts}, separators=(",", ":")).encode("utf-8")
+
+    @classmethod
+    def from_bytes(cls, payload: Optional[bytes]) -> "CohortStats":
+        return cls(**json.loads(payload.decode("utf-8"))) if payload else cls()
+
+
+def metric_values(row: Dict[str, Any]) -> Dict[str, float]:
+    """The COHORT_METRICS a history row has a numeric value for"""
+    values = {metric: _number(row.get(metric)) for metric in COHORT_METRICS}
+    return {metric: value for metric, value in values.items() if value is not None}
+
+
+def _group_keys(row: Dict[str, Any]) -> List[str]:
+    """Every aggregate a history row contributes to"""
+    keys = []
+    for grain in TIME_GRAINS:
+        period = time_bucket(row.get("timestamp"), grain)
+        if grain != "all" and not period:
+            continue
+        keys.append(group_key(grain, ALL, period, ALL))
+        keys.extend(group_key(grain, d, period, _label(row.get(d))) for d in COHORT_DIMENSIONS)
+    return keys
+
+
+class CohortStore:
+    """Plan history CSV plus its cohort aggregates in the shared store"""
+
+    NAMESPACE = "cohorts"
+
+    def __init__(self, store: Optional[SharedStore] = None, history_path: str = config.PLAN_HISTORY_PATH):
+        self.store = store or get_shared_store()
+        self.history_path = history_path
+
+    def record(self, rows: List[Dict[str, Any]]):
+        """Add history rows to the aggregates in one transaction"""
+        # Aggregate the batch in memory first so each key is written once
+        batch: Dict[str, CohortStats] = {}
+        for row in rows:
+            values = metric_values(row)
+            for key in _group_keys(row):
+                stats = batch.get(key)
+                if stats is None:
+                    stats = batch[key] = CohortStats()
+                stats.add(values)
+
+        def update(key: str, payload: Optional[bytes]) -> bytes:
+            stats = CohortStats.from_bytes(payload)
+            stats.merge(batch[key])
+            return stats.to_bytes()
+
+        self.store.update_many(self.NAMESPACE, batch, update)
+
+    def save_plans(self, rows: List[Dict[str, Any]], fieldnames: Optional[List[str]] = None):
+        """
+        Append plans to the history CSV and update the aggregates
+
+        Args:
+            rows: History rows (timestamp, profile fields, motivation)
+            fieldnames: Column order for a new history file
+        """
+        if not rows:
+            return
+        append_csv_rows(self.history_path, rows, fieldnames)
+        self.record(rows)
+
+    def cohorts(self, dimension: str, grain: str = "all") -> Dict[str, Dict[str, CohortStats]]:
+        """
+        Read the aggregates of one dimension
+
+        Args:
+            dimension: One of COHORT_DIMENSIONS, or ALL
+            grain: One of TIME_GRAINS
+
+        Returns:
+            Period -> value -> CohortStats, periods in ascending order ("" for grain "all")
+        """
+        result: Dict[str, Dict[str, CohortStats]] = {}
+        for key, payload in self.store.items(self.NAMESPACE, prefix=f"{grain}|{dimension}|"):
+            _, _, period, value = key.split("|", 3)
+            result.setdefault(period, {})[value] = CohortStats.from_bytes(payload)
+        return result
+
+    def summary(self, dimension: str) -> List[Dict[str, Any]]:
+        """
+        All-time table for one dimension, largest cohort first
+
+        Returns:
+            One row per value: value, plans, share and mean (and std) of each metric
+        """
+        groups = self.cohorts(dimension).get("", {})
+        total = sum(stats.count for stats in groups.values()) or 1
+        rows = []
+        for value, stats in sorted(groups.items(), key=lambda item: -item[1].count):
+            row: Dict[str, Any] = {"value": value, "plans": stats.count, "share": round(stats.count / total, 3)}
+            for metric in COHORT_METRICS:
+                mean, std = stats.mean(metric), stats.std(metric)
+                row[f"mean_{metric}"] = round(mean, 1) if mean is not None else None
+                row[f"std_{metric}"] = round(std, 1) if std is not None else None
+            rows.append(row)
+        return rows
+
+    def plans_over_time(self, dimension: str = ALL, grain: str = "week") -> Dict[str, List[int]]:
+        """
+        Plan counts per period, one series per value of a dimension
+
+        Returns:
+            {"periods": [...], <value>: [count per period], ...}
+        """
+        by_period = self.cohorts(dimension, grain)
+        periods = sorted(by_period)
+        values = sorted({value for groups in by_period.values() for value in groups})
+        series: Dict[str, List[Any]] = {"periods": periods}
+        for value in values:
+            series[value] = [by_period[p][value].count if value in by_period[p] else 0 for p in periods]
+        return series
+
+    def total_plans(self) -> int:
+        stats = self.cohorts(ALL).get("", {}).get(ALL)
+        return stats.count if stats else 0
+
+    def clear(self):
+        self.store.delete(self.NAMESPACE)
+
+
+@lru_cache(maxsize=1)
+def get_cohort_store() -> CohortStore:
+    """Return the cohort store for this process's shared store and history file"""
+    return CohortStore()
+
+
+def _iter_history(path: str) -> Iterable[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def rebuild_cohorts(cohorts: Optional[CohortStore] = None, chunk_rows: int = config.TRANSFER_CHUNK_ROWS) -> int:
+    """
+    Recompute every aggregate from the history CSV, streaming it in chunks
+
+    Plans saved while the rebuild runs may be counted twice or missed;
+    run it when nothing is writing (it is only needed once per history).
+
+    Returns:
+        Number of history rows aggregated
+    """
+    cohorts = cohorts or get_cohort_store()
+    cohorts.clear()
+    chunk: List[Dict[str, Any]] = []
+    total = 0
+    for row in _iter_history(cohorts.history_path):
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            cohorts.record(chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        cohorts.record(chunk)
+        total += len(chunk)
+    return total
+
+
+if __name__ == "__main__":
+    print(f"Aggregated {rebuild_cohorts()} plans from {config.PLAN_HISTORY_PATH}")
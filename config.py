@@ -2,6 +2,8 @@
 Configuration settings for the AI-Powered Workout & Diet Planner
 """
 
+import os
+
 # App Configuration
 APP_NAME = "AI-Powered Personalized Workout & Diet Planner"
 APP_VERSION = "2.0.0"
@@ -16,13 +18,90 @@ SIDEBAR_STATE = "expanded"
 GEMINI_MODEL = "gemini-2.0-flash"
 MAX_TOKENS = 4000
 TEMPERATURE = 0.7
+AI_REQUEST_TIMEOUT = 60  # seconds before falling back to the local plan engine
+# "gemini", or "fake": canned local replies (fake_model) for load tests and offline development
+AI_BACKEND = os.getenv("PLANNER_AI_BACKEND", "gemini")
+FAKE_MODEL_LATENCY = float(os.getenv("PLANNER_FAKE_LATENCY", "0.2"))  # seconds per fake reply
+PROMPT_CONTEXT_TOKENS = 1500  # budget for profile + history embedded in one prompt
+PROMPT_RECENT_DAYS = 14  # history newer than this is sent as logged, older as weekly averages
+
+# Plan Cache Configuration (similar profiles share one generated plan)
+PLAN_CACHE_ENABLED = True
+PLAN_CACHE_MAX_ENTRIES = 512
+PLAN_CACHE_TTL = 24 * 60 * 60  # seconds
+PLAN_CACHE_BMI_BAND = 2.5  # BMI points per bucket
+PLAN_CACHE_AGE_BAND = 10  # years per bucket
+PLAN_CACHE_TIME_BAND = 15  # minutes per bucket
+
+# Session Storage Configuration (large session values are kept out of memory)
+SESSION_STORE_DIR = ".session_store"
+SESSION_BLOB_MEMORY_BYTES = 64 * 1024 * 1024  # shared in-memory blob cache
+SESSION_BUDGET_BYTES = 256 * 1024  # inline bytes per session before spilling
+SESSION_DEDUP_BYTES = 4 * 1024  # values at least this large are stored by hash
+SESSION_BLOB_SWEEP_INTERVAL = 60 * 60  # seconds between deletions of blobs unused for SESSION_TTL
+
+# Deployment Configuration
+# "single": one Streamlit process; "multi": several worker processes per node
+# sharing the plan cache and session state through SQLite
+DEPLOYMENT_MODE = os.getenv("PLANNER_DEPLOYMENT_MODE", "single")
+SHARED_DB_PATH = os.getenv("PLANNER_SHARED_DB", ".shared/planner.db")
+SHARED_DB_TIMEOUT = 30  # seconds to wait for a write lock
+SESSION_TTL = 7 * 24 * 60 * 60  # seconds shared session state is kept
+PLAN_HISTORY_PATH = "plans_history.csv"
+TRANSFER_CHUNK_ROWS = 10_000  # rows per chunk (and checkpoint) in bulk export/import
+PLAN_INDEX_MAX_PER_USER = 5  # generated plans kept per user for restoring
+PLAN_SEARCH_SEGMENT_DOCS = 4096  # doc ids per posting segment (a save rewrites one segment per term)
+PLAN_SEARCH_RESULTS = 20  # hits returned by a plan search
+GROUNDING_ENABLED = True  # show the model excerpts of similar past plans when generating workouts
+GROUNDING_EXAMPLES = 2  # past plans retrieved per generation
+GROUNDING_TOKENS = 250  # budget for all excerpts in one prompt
 
 # Plan Configuration
 DEFAULT_PLAN_DURATION = 7  # days
 MAX_PLAN_DURATION = 30
+PLAN_CHUNK_DAYS = 7  # days per workout request; longer plans are generated week by week
+PLAN_CHUNK_WORKERS = 4  # week requests in flight at once
+PLAN_CHUNK_MAX_TOKENS = 2000  # output cap per week request
 MIN_TIME_AVAILABLE = 10  # minutes
 MAX_TIME_AVAILABLE = 180  # minutes
 
+# Generation Profiles (per call type: output cap, temperature, stop sequences, JSON mode)
+GENERATION_PROFILES = {
+    "default": {"max_tokens": MAX_TOKENS, "temperature": TEMPERATURE},
+    "workout_week": {"max_tokens": PLAN_CHUNK_MAX_TOKENS, "temperature": 0.5, "json": True},
+    "insights": {"max_tokens": 1200, "temperature": 0.4, "json": True},
+    "workout_timing": {"max_tokens": 600, "temperature": 0.5},
+    "nutrition_guidance": {"max_tokens": 1500, "temperature": 0.7},
+    "nutrition_patterns": {"max_tokens": 1000, "temperature": 0.5},
+    "predictions": {"max_tokens": 400, "temperature": 0.4},
+    "recommendations": {"max_tokens": 1200, "temperature": 0.5, "json": True},
+    "chat": {"max_tokens": 700, "temperature": 0.8, "stop": ["\nUser:"]},
+}
+GENERATION_ADAPTIVE = True  # learn each call type's output cap from recorded output lengths
+GENERATION_ADAPTIVE_MIN_SAMPLES = 20  # outputs observed before the cap adapts
+GENERATION_ADAPTIVE_HEADROOM = 1.3  # cap = 95th percentile output length x headroom
+GENERATION_ADAPTIVE_MIN_TOKENS = 128
+GENERATION_ADAPTIVE_MAX_TRUNCATED = 0.02  # above this share of truncated outputs, use the profile cap
+GENERATION_ADAPTIVE_REFRESH = 300  # seconds a process reuses the learned caps
+
+# Insights Job Configuration (off-peak precomputed dashboard insights)
+INSIGHTS_JOB_WORKERS = 4  # users refreshed concurrently
+INSIGHTS_MAX_AGE = 36 * 60 * 60  # seconds before stored insights count as stale
+PROGRESS_LOG_MAX_ENTRIES = 730  # progress entries kept per user
+
+# Usage Accounting (Gemini tokens, latency and cost per service, user and day)
+USAGE_TRACKING_ENABLED = True
+USAGE_PRICE_PER_MTOK = {"prompt": 0.10, "cached": 0.025, "completion": 0.40}  # USD per million tokens
+USAGE_DAILY_BUDGET_USD = float(os.getenv("PLANNER_DAILY_BUDGET_USD", "5"))  # alert threshold, all users
+USAGE_USER_DAILY_BUDGET_USD = float(os.getenv("PLANNER_USER_DAILY_BUDGET_USD", "0.25"))  # alert threshold, per user
+USAGE_LATENCY_BUCKETS_MS = (500, 1000, 2000, 5000, 10000, 30000)  # upper bounds of the latency histogram
+
+# Forecasting Configuration (progress predictions on the AI dashboard)
+FORECAST_HORIZON_WEEKS = 8
+FORECAST_HALF_LIFE_DAYS = 28  # older log entries count half after this many days
+FORECAST_MIN_POINTS = 3  # entries needed before a series gets a fitted trend
+FORECAST_INTERVAL_Z = 1.645  # 90% prediction interval
+
 # BMI Categories
 BMI_CATEGORIES = {
     "Underweight": {"min": 0, "max": 18.5, "color": "#3b82f6"},
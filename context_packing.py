@@ -0,0 +1,207 @@
+"""
+Compact prompt context for the AI services
+
+Profiles and progress logs used to be embedded in prompts as indented JSON,
+so prompt size (and latency and cost) grew with every logged day. This
+module encodes them as compact key/value lines and CSV-like tables instead,
+and fits history into a token budget: recent entries are kept as logged,
+older ones are aggregated into weekly averages, and if that is still too
+large both tables are down-sampled, always keeping the newest rows.
+"""
+
+import csv
+import io
+import json
+import math
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+
+
+CHARS_PER_TOKEN = 4  # rough average for English text and numbers
+MAX_VALUE_CHARS = 200  # longer free-text values are truncated
+
+# Form fields that carry no information for the model
+OMIT_KEYS = ("generate",)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a prompt fragment"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, float):
+        return format(value, ".4g")
+    if isinstance(value, (dict, list, tuple)):
+        value = json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+    text = str(value).replace("\n", " ").strip()
+    return text if len(text) <= MAX_VALUE_CHARS else text[:MAX_VALUE_CHARS - 1] + "…"
+
+
+def _truncate(text: str, budget_tokens: int) -> str:
+    limit = budget_tokens * CHARS_PER_TOKEN
+    return text if len(text) <= limit else text[:max(limit - 1, 0)] + "…"
+
+
+def pack_mapping(data: Optional[Dict[str, Any]], budget_tokens: int = config.PROMPT_CONTEXT_TOKENS) -> str:
+    """
+    Encode a profile or summary dict as one compact line
+
+    Args:
+        data: Mapping to encode; empty values and OMIT_KEYS are skipped
+        budget_tokens: Maximum size of the result
+
+    Returns:
+        "key: value; key: value" text, or "none"
+    """
+    parts = [f"{key}: {_format_value(value)}" for key, value in (data or {}).items()
+             if key not in OMIT_KEYS and value is not None and value != ""]
+    return _truncate("; ".join(parts), budget_tokens) if parts else "none"
+
+
+def _flatten(record: Dict[str, Any]) -> Dict[str, Any]:
+    """One level of nesting becomes dotted columns, e.g. lifts.Squat"""
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flat.update({f"{key}.{sub}": v for sub, v in value.items()})
+        else:
+            flat[key] = value
+    return flat
+
+
+def _table(records: List[Dict[str, Any]]) -> str:
+    """Encode records as a CSV table with the union of their columns"""
+    columns: List[str] = []
+    for record in records:
+        columns.extend(key for key in record if key not in columns)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for record in records:
+        writer.writerow(["" if record.get(c) is None else _format_value(record[c]) for c in columns])
+    return buffer.getvalue().rstrip("\n")
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def weekly_stats(records: List[Dict[str, Any]], date_key: str = "date") -> List[Dict[str, Any]]:
+    """
+    Aggregate dated records into weekly averages
+
+    Args:
+        records: Flat records with an ISO date under date_key
+        date_key: Name of the date field
+
+    Returns:
+        One row per Monday-starting week, oldest first: "week" (the Monday),
+        "n" (entries) and the mean of every numeric column
+    """
+    weeks: Dict[date, List[Dict[str, Any]]] = {}
+    for record in records:
+        day = _parse_date(record.get(date_key))
+        if day is not None:
+            weeks.setdefault(day - timedelta(days=day.weekday()), []).append(record)
+
+    rows = []
+    for monday in sorted(weeks):
+        entries = weeks[monday]
+        row: Dict[str, Any] = {"week": monday.isoformat(), "n": len(entries)}
+        columns: List[str] = []
+        for entry in entries:
+            columns.extend(key for key in entry if key not in columns and key != date_key)
+        for column in columns:
+            values = [e[column] for e in entries
+                      if isinstance(e.get(column), (int, float)) and not isinstance(e.get(column), bool)]
+            if values:
+                row[column] = round(sum(values) / len(values), 2)
+        rows.append(row)
+    return rows
+
+
+def _downsample(rows: List[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    """Keep ``count`` evenly spaced rows, always including the newest (last) one"""
+    if count >= len(rows):
+        return rows
+    if count <= 1:
+        return rows[-1:]
+    step = (len(rows) - 1) / (count - 1)
+    return [rows[round(len(rows) - 1 - i * step)] for i in reversed(range(count))]
+
+
+def pack_history(
+    records: Optional[List[Dict[str, Any]]],
+    budget_tokens: int = config.PROMPT_CONTEXT_TOKENS,
+    recent_days: int = config.PROMPT_RECENT_DAYS,
+    date_key: str = "date",
+) -> str:
+    """
+    Encode a progress or nutrition log within a token budget
+
+    Args:
+        records: Log entries, oldest or newest first
+        budget_tokens: Maximum size of the result
+        recent_days: Entries this close to the newest one are kept unaggregated
+        date_key: Name of the date field
+
+    Returns:
+        One or two CSV tables ("weekly averages" then "recent entries"), or "none"
+    """
+    if not records:
+        return "none"
+    flat = [_flatten(r) for r in records]
+    dated = all(_parse_date(r.get(date_key)) for r in flat)
+    if dated:
+        flat.sort(key=lambda r: _parse_date(r[date_key]))
+
+    text = _table(flat)
+    if estimate_tokens(text) <= budget_tokens:
+        return text
+
+    older: List[Dict[str, Any]] = []
+    recent = flat
+    if dated:
+        cutoff = _parse_date(flat[-1][date_key]) - timedelta(days=recent_days)
+        older = weekly_stats([r for r in flat if _parse_date(r[date_key]) <= cutoff], date_key)
+        recent = [r for r in flat if _parse_date(r[date_key]) > cutoff]
+
+    while True:
+        sections = []
+        if older:
+            sections.append(f"weekly averages (older):\n{_table(older)}")
+        sections.append(f"recent entries:\n{_table(recent)}" if older else _table(recent))
+        text = "\n".join(sections)
+        if estimate_tokens(text) <= budget_tokens or (len(older) <= 1 and len(recent) <= 1):
+            return _truncate(text, budget_tokens)
+        # Thin whichever table is longer, keeping the newest rows
+        if len(older) > len(recent):
+            older = _downsample(older, len(older) // 2)
+        else:
+            recent = _downsample(recent, len(recent) // 2)
+
+
+def pack_context(
+    mapping: Optional[Dict[str, Any]],
+    records: Optional[List[Dict[str, Any]]],
+    budget_tokens: int = config.PROMPT_CONTEXT_TOKENS,
+) -> Tuple[str, str]:
+    """
+    Pack a profile and a log for one prompt, sharing one token budget
+
+    Args:
+        mapping: Profile or summary dict
+        records: Log entries
+        budget_tokens: Budget for both together; the profile may use a quarter
+
+    Returns:
+        Tuple of (profile text, history text)
+    """
+    mapping_text = pack_mapping(mapping, budget_tokens // 4)
+    return mapping_text, pack_history(records, budget_tokens - estimate_tokens(mapping_text))
@@ -0,0 +1,416 @@
+"""
+Streaming export and import of plan history and progress logs
+
+Rows are read and written in chunks of TRANSFER_CHUNK_ROWS, so memory stays
+bounded however large the plan history CSV or the progress store grows.
+Exports go to CSV, JSONL or Parquet (a directory of part files, one per
+chunk) and can be filtered by user and date. After every chunk a checkpoint
+is written next to the output; an interrupted transfer rerun with --resume
+continues from the last completed chunk.
+
+Usage:
+    python -m data_transfer export history --output history.parquet --since 2025-01-01
+    python -m data_transfer export progress --output progress.jsonl --user "Jane Doe" --resume
+    python -m data_transfer import progress --input progress.jsonl
+"""
+
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+from datetime import date
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import config
+from cohort_analytics import CohortStore, get_cohort_store
+from insights_job import InsightStore, user_key
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+PROGRESS_COLUMNS = ["user_key", "name", "date"] + config.TRACKING_METRICS + ["lifts"]
+PROGRESS_NUMERIC = set(config.TRACKING_METRICS)
+HISTORY_NUMERIC = {"age", "height_cm", "weight_kg", "time_available", "bmi"}
+
+
+def infer_format(path: str) -> str:
+    """Transfer format from a file extension"""
+    extension = os.path.splitext(path.rstrip("/\\"))[1].lower().lstrip(".")
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot infer format from {path!r}; use one of {', '.join(FORMATS)}")
+    return extension
+
+
+def _in_range(stamp: str, since: Optional[str], until: Optional[str]) -> bool:
+    day = (stamp or "")[:10]
+    return (not since or day >= since) and (not until or day <= until)
+
+
+def _user_keys(users: Optional[Sequence[str]]) -> Optional[set]:
+    return {user_key({"name": name}) for name in users} if users else None
+
+
+def iter_plan_history(
+    path: str = config.PLAN_HISTORY_PATH,
+    users: Optional[Sequence[str]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream plan history rows
+
+    Args:
+        path: Plan history CSV
+        users: Only rows for these names (matched like user_key)
+        since: First ISO date to include
+        until: Last ISO date to include
+
+    Yields:
+        Rows keyed by the CSV header
+    """
+    keys = _user_keys(users)
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            if keys is not None and user_key(row) not in keys:
+                continue
+            if _in_range(row.get("timestamp", ""), since, until):
+                yield row
+
+
+def history_columns(path: str = config.PLAN_HISTORY_PATH) -> List[str]:
+    """Plan history CSV header"""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return next(csv.reader(f), [])
+
+
+def iter_progress(
+    store: Optional[InsightStore] = None,
+    users: Optional[Sequence[str]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream progress entries of every stored user, one row per entry
+
+    Args:
+        store: Insight store holding the progress logs
+        users: Only entries of these names
+        since: First ISO date to include
+        until: Last ISO date to include
+
+    Yields:
+        Rows with PROGRESS_COLUMNS; lifts are a JSON string
+    """
+    store = store or InsightStore()
+    keys = _user_keys(users)
+    for key, payload in store.store.iter_items(InsightStore.USERS_NAMESPACE):
+        if keys is not None and key not in keys:
+            continue
+        user = json.loads(payload.decode("utf-8"))
+        name = (user.get("profile") or {}).get("name", "")
+        for entry in user.get("progress", []):
+            if not _in_range(str(entry.get("date", "")), since, until):
+                continue
+            row = {column: entry.get(column) for column in PROGRESS_COLUMNS}
+            row.update(user_key=key, name=name, date=str(entry.get("date", "")))
+            row["lifts"] = json.dumps(entry["lifts"], separators=(",", ":")) if entry.get("lifts") else None
+            yield row
+
+
+def _typed(row: Dict[str, Any], columns: Sequence[str], numeric: set) -> Dict[str, Any]:
+    """Normalize a row to its columns: numbers as floats, blanks as None"""
+    typed = {}
+    for column in columns:
+        value = row.get(column)
+        if value == "" or value is None:
+            typed[column] = None
+        elif column in numeric:
+            try:
+                typed[column] = float(value)
+            except (TypeError, ValueError):
+                typed[column] = None
+        else:
+            typed[column] = str(value)
+    return typed
+
+
+class _Checkpoint:
+    """Progress marker written after every completed chunk"""
+
+    def __init__(self, path: str, signature: Dict[str, Any]):
+        self.path = path
+        self.signature = signature
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("signature") != self.signature:
+            raise ValueError(f"Checkpoint {self.path} belongs to a different transfer; delete it to start over")
+        return state
+
+    def save(self, **state):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(state, signature=self.signature), f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _parquet_schema(columns: Sequence[str], numeric: set):
+    import pyarrow as pa
+    return pa.schema([(c, pa.float64() if c in numeric else pa.string()) for c in columns])
+
+
+def export_rows(
+    rows: Iterable[Dict[str, Any]],
+    output: str,
+    columns: Sequence[str],
+    numeric: set = frozenset(),
+    fmt: Optional[str] = None,
+    chunk_rows: int = config.TRANSFER_CHUNK_ROWS,
+    resume: bool = False,
+    signature: Optional[Dict[str, Any]] = None,
+) -> int:
+    """
+    Write rows to CSV, JSONL or Parquet in chunks
+
+    Args:
+        rows: Rows to export (consumed lazily)
+        output: Output file (a directory of part files for Parquet)
+        columns: Output columns, in order
+        numeric: Columns written as numbers
+        fmt: One of FORMATS (inferred from output when None)
+        chunk_rows: Rows per chunk (and per Parquet part file)
+        resume: Continue from the checkpoint of an interrupted export
+        signature: What is being exported; a checkpoint is only resumed for the same signature
+
+    Returns:
+        Total rows in the output
+    """
+    fmt = fmt or infer_format(output)
+    checkpoint = _Checkpoint(output.rstrip("/\\") + ".checkpoint.json", dict(signature or {}, format=fmt))
+    state = checkpoint.load() if resume else None
+    written = state["rows"] if state else 0
+    rows = islice(rows, written, None)
+
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = _parquet_schema(columns, numeric)
+        os.makedirs(output, exist_ok=True)
+        part = state["parts"] if state else 0
+        if state is None:
+            for stale in glob.glob(os.path.join(output, "part-*.parquet")):
+                os.remove(stale)
+        for chunk in _chunks(rows, chunk_rows):
+            table = pa.Table.from_pylist([_typed(r, columns, numeric) for r in chunk], schema=schema)
+            part_path = os.path.join(output, f"part-{part:05d}.parquet")
+            pq.write_table(table, part_path + ".tmp")
+            os.replace(part_path + ".tmp", part_path)
+            part += 1
+            written += len(chunk)
+            checkpoint.save(rows=written, parts=part)
+        checkpoint.clear()
+        return written
+
+    with open(output, "a+" if state else "w", encoding="utf-8", newline="") as f:
+        if state:
+            # Drop anything written after the last completed chunk
+            f.truncate(state["bytes"])
+            f.seek(state["bytes"])
+        writer = csv.DictWriter(f, fieldnames=list(columns), extrasaction="ignore", lineterminator="\n")
+        if state is None and fmt == "csv":
+            writer.writeheader()
+        for chunk in _chunks(rows, chunk_rows):
+            typed = [_typed(r, columns, numeric) for r in chunk]
+            if fmt == "csv":
+                writer.writerows(typed)
+            else:
+                f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in typed)
+            f.flush()
+            os.fsync(f.fileno())
+            written += len(chunk)
+            checkpoint.save(rows=written, bytes=f.tell())
+    checkpoint.clear()
+    return written
+
+
+def read_rows(path: str, fmt: Optional[str] = None, batch_rows: int = config.TRANSFER_CHUNK_ROWS) -> Iterator[Dict[str, Any]]:
+    """
+    Stream rows from a CSV, JSONL or Parquet export
+
+    Args:
+        path: Export file (or Parquet part directory)
+        fmt: One of FORMATS (inferred from path when None)
+        batch_rows: Rows decoded at a time from Parquet
+
+    Yields:
+        Row dicts
+    """
+    fmt = fmt or infer_format(path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        parts = sorted(glob.glob(os.path.join(path, "part-*.parquet"))) if os.path.isdir(path) else [path]
+        for part in parts:
+            for batch in pq.ParquetFile(part).iter_batches(batch_size=batch_rows):
+                yield from batch.to_pylist()
+        return
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def import_rows(
+    rows: Iterable[Dict[str, Any]],
+    write_chunk,
+    checkpoint_path: str,
+    chunk_rows: int = config.TRANSFER_CHUNK_ROWS,
+    resume: bool = False,
+    signature: Optional[Dict[str, Any]] = None,
+) -> int:
+    """
+    Feed rows to write_chunk in chunks, checkpointing after each
+
+    A crash between a chunk's write and its checkpoint re-imports that one
+    chunk on resume (at-least-once).
+
+    Args:
+        rows: Source rows (consumed lazily)
+        write_chunk: Callable storing one list of rows
+        checkpoint_path: Where progress is recorded
+        chunk_rows: Rows per chunk
+        resume: Skip rows already imported by an interrupted run
+        signature: What is being imported
+
+    Returns:
+        Rows imported by this run
+    """
+    checkpoint = _Checkpoint(checkpoint_path, signature or {})
+    state = checkpoint.load() if resume else None
+    done = state["rows"] if state else 0
+    imported = 0
+    for chunk in _chunks(islice(rows, done, None), chunk_rows):
+        write_chunk(chunk)
+        imported += len(chunk)
+        checkpoint.save(rows=done + imported)
+    checkpoint.clear()
+    return imported
+
+
+def _plain_number(value: Any) -> Any:
+    """Undo the float widening of typed exports (70.0 -> 70) for CSV round trips"""
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def import_history_chunk(rows: List[Dict[str, Any]], cohorts: Optional[CohortStore] = None):
+    """Append imported plan history rows with one locked write and update the cohort aggregates"""
+    cohorts = cohorts or get_cohort_store()
+    header = history_columns(cohorts.history_path) or list(rows[0])
+    cohorts.save_plans([{c: "" if r.get(c) is None else _plain_number(r.get(c)) for c in header} for r in rows],
+                       header)
+
+
+def _valid_date(value: Any) -> bool:
+    """True for an ISO date or datetime (only its date part is checked)"""
+    try:
+        date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return False
+    return True
+
+
+def import_progress_chunk(rows: List[Dict[str, Any]], store: Optional[InsightStore] = None):
+    """Append imported progress entries, one store write per user in the chunk (rows without a valid date are skipped)"""
+    store = store or InsightStore()
+    by_user: Dict[str, List[Dict[str, Any]]] = {}
+    names: Dict[str, str] = {}
+    bad_dates = 0
+    for row in rows:
+        key = row.get("user_key") or user_key(row)
+        if not key:
+            continue
+        if not _valid_date(row.get("date")):
+            bad_dates += 1
+            continue
+        entry = {c: row[c] for c in config.TRACKING_METRICS if row.get(c) not in (None, "")}
+        for metric, value in entry.items():
+            entry[metric] = float(value)
+        entry["date"] = row.get("date")
+        if row.get("lifts"):
+            entry["lifts"] = json.loads(row["lifts"])
+        by_user.setdefault(key, []).append(entry)
+        names[key] = row.get("name", "")
+    if bad_dates:
+        logger.warning("Skipped %d progress rows without a valid ISO date", bad_dates)
+    for key, entries in by_user.items():
+        store.add_progress(key, entries, names[key])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stream plan history and progress to and from files")
+    parser.add_argument("direction", choices=["export", "import"])
+    parser.add_argument("dataset", choices=["history", "progress"])
+    parser.add_argument("--output", help="Export destination")
+    parser.add_argument("--input", help="Import source")
+    parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--user", action="append", help="Only this user (repeatable)")
+    parser.add_argument("--since", help="First ISO date to include")
+    parser.add_argument("--until", help="Last ISO date to include")
+    parser.add_argument("--chunk-rows", type=int, default=config.TRANSFER_CHUNK_ROWS)
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted transfer")
+    args = parser.parse_args()
+
+    signature = {"dataset": args.dataset, "users": args.user, "since": args.since, "until": args.until}
+    if args.direction == "export":
+        if not args.output:
+            parser.error("export needs --output")
+        if args.dataset == "history":
+            rows = iter_plan_history(users=args.user, since=args.since, until=args.until)
+            columns, numeric = history_columns(), HISTORY_NUMERIC
+        else:
+            rows = iter_progress(users=args.user, since=args.since, until=args.until)
+            columns, numeric = PROGRESS_COLUMNS, PROGRESS_NUMERIC
+        total = export_rows(rows, args.output, columns, numeric, args.format, args.chunk_rows,
+                            args.resume, signature)
+        print(f"Exported {total} {args.dataset} rows to {args.output}")
+    else:
+        if not args.input:
+            parser.error("import needs --input")
+        keys = _user_keys(args.user)
+        rows = (row for row in read_rows(args.input, args.format)
+                if (keys is None or (row.get("user_key") or user_key(row)) in keys)
+                and _in_range(row.get("timestamp") or row.get("date") or "", args.since, args.until))
+        write_chunk = import_history_chunk if args.dataset == "history" else import_progress_chunk
+        count = import_rows(rows, write_chunk, args.input.rstrip("/\\") + ".import.checkpoint.json",
+                            args.chunk_rows, args.resume, dict(signature, input=os.path.abspath(args.input)))
+        print(f"Imported {count} {args.dataset} rows from {args.input}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Exercise knowledge base for the AI-Powered Workout & Diet Planner
+
+Loads the bundled exercise catalogue (data/exercises.csv) and builds an
+Aho-Corasick index over every alias so free-text plans can be scanned for
+exercises in a single pass.
+"""
+
+import csv
+import os
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+EXERCISES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "exercises.csv")
+
+
+@dataclass(frozen=True)
+class Exercise:
+    """Data class for a catalogue exercise"""
+    name: str
+    aliases: Tuple[str, ...]
+    category: str  # strength, cardio, core, plyometric, mobility, flexibility
+    muscle_groups: Tuple[str, ...]
+    equipment: Tuple[str, ...]  # values from config.EQUIPMENT_OPTIONS
+
+
+@dataclass(frozen=True)
+class ExerciseMatch:
+    """Data class for an exercise found in text"""
+    exercise: Exercise
+    start: int
+    end: int
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercase text and treat hyphens as spaces, preserving character offsets
+
+    Args:
+        text: Raw text
+
+    Returns:
+        Normalized text of the same length as the input
+    """
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # A few characters expand when lowercased; keep offsets aligned
+        lowered = "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+    return lowered.replace("-", " ")
+
+
+def load_exercises(path: str = EXERCISES_PATH) -> List[Exercise]:
+    """
+    Load the exercise catalogue
+
+    Args:
+        path: Path to the catalogue CSV
+
+    Returns:
+        List of exercises in catalogue order
+    """
+    exercises = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            exercises.append(Exercise(
+                name=row["name"],
+                aliases=tuple(a for a in row["aliases"].split(";") if a),
+                category=row["category"],
+                muscle_groups=tuple(m for m in row["muscle_groups"].split(";") if m),
+                equipment=tuple(e for e in row["equipment"].split(";") if e),
+            ))
+    return exercises
+
+
+class ExerciseIndex:
+    """Aho-Corasick automaton over exercise names and aliases"""
+
+    def __init__(self, exercises: List[Exercise]):
+        self.exercises = exercises
+        self._by_name = {ex.name.lower(): ex for ex in exercises}
+
+        # State 0 is the root; each state has goto edges, a failure link and
+        # the (pattern length, exercise index) pairs that end there.
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, int]]] = [[]]
+
+        seen = set()
+        for idx, ex in enumerate(exercises):
+            for alias in (ex.name,) + ex.aliases:
+                pattern = normalize_text(alias.strip())
+                if pattern and pattern not in seen:
+                    seen.add(pattern)
+                    self._add_pattern(pattern, idx)
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern: str, exercise_idx: int):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), exercise_idx))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt].extend(self._out[self._fail[nxt]])
+
+    def get(self, name: str) -> Optional[Exercise]:
+        """Look up an exercise by its canonical name (case-insensitive)"""
+        return self._by_name.get(name.lower())
+
+    def find(self, text: str) -> List[ExerciseMatch]:
+        """
+        Find exercises mentioned in text
+
+        Matches must sit on word boundaries (a trailing plural "s"/"es" is
+        allowed). Overlapping matches resolve leftmost-longest, so
+        "dumbbell bench press" wins over "bench press".
+
+        Args:
+            text: Free text such as a workout plan
+
+        Returns:
+            Non-overlapping matches in text order
+        """
+        normalized = normalize_text(text)
+        n = len(normalized)
+        goto, fail, out = self._goto, self._fail, self._out
+
+        candidates = []
+        state = 0
+        for i, ch in enumerate(normalized):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, idx in out[state]:
+                start = i + 1 - length
+                if start > 0 and normalized[start - 1].isalnum():
+                    continue
+                end = i + 1
+                if normalized.startswith("es", end) and (end + 2 >= n or not normalized[end + 2].isalnum()):
+                    end += 2
+                elif normalized.startswith("s", end) and (end + 1 >= n or not normalized[end + 1].isalnum()):
+                    end += 1
+                if end < n and normalized[end].isalnum():
+                    continue
+                candidates.append((start, end, idx))
+
+        candidates.sort(key=lambda c: (c[0], c[0] - c[1]))
+        matches = []
+        last_end = 0
+        for start, end, idx in candidates:
+            if start >= last_end:
+                matches.append(ExerciseMatch(self.exercises[idx], start, end))
+                last_end = end
+        return matches
+
+
+@lru_cache(maxsize=1)
+def get_exercise_index() -> ExerciseIndex:
+    """Return the process-wide index over the bundled catalogue"""
+    return ExerciseIndex(load_exercises())
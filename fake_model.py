@@ -0,0 +1,87 @@
+"""
+Local stand-in for the Gemini model client
+
+With config.AI_BACKEND = "fake" (PLANNER_AI_BACKEND=fake) every AI service
+talks to FakeModel instead of Gemini: no API key, network or cost, and
+replies shaped like real ones for each kind of prompt (week JSON, insights
+and recommendations JSON, numbered nutrition guidance, plain text) so the
+parsers and UI take their normal paths. Each reply waits
+config.FAKE_MODEL_LATENCY seconds, spread over the chunks when streaming,
+which makes load tests (benchmarks.load_sessions) and offline development
+behave like a slow remote model without calling one.
+"""
+
+import json
+import re
+import time
+from types import SimpleNamespace
+from typing import Any, Iterator, List, Optional
+
+import config
+from context_packing import estimate_tokens
+
+
+_TRAINING_DAY = re.compile(r"- Day (\d+) \([^)]*\): (?!rest)")
+FAKE_EXERCISES = ("Goblet Squat", "Push-up", "Bent-over Row", "Reverse Lunge")
+CHUNK_CHARS = 80  # characters per streamed chunk
+
+GUIDANCE = """1. MEAL TIMING STRATEGIES
+Eat the largest meal within two hours after training and keep breakfast protein-rich.
+
+2. HYDRATION PROTOCOLS
+Drink a glass of water with every meal and sip during workouts.
+
+3. MICRONUTRIENT FOCUS
+Favour leafy greens, legumes and colourful vegetables for iron, magnesium and vitamin C.
+
+4. SUPPLEMENT CONSIDERATIONS
+Vitamin D in winter and B12 on plant-based diets; anything else is optional.
+
+5. CULTURAL AND BUDGET TIPS
+Cook staples in bulk and build meals around seasonal produce.
+"""
+
+
+def fake_reply(prompt: str) -> str:
+    """Canned reply in the format the prompt asks for"""
+    if "Choose the exercises for week" in prompt:
+        days = [{"day": int(day), "exercises": [
+            {"name": name, "sets": 3, "reps": 10, "rest_seconds": 60} for name in FAKE_EXERCISES[:3]
+        ]} for day in _TRAINING_DAY.findall(prompt)]
+        return json.dumps({"days": days})
+    if '{"insights":' in prompt:
+        return json.dumps({"insights": [{
+            "type": "performance", "title": "Consistent training",
+            "description": "Sessions are regular; add load gradually.", "confidence": 0.8,
+            "actionable": True, "priority": "medium"}]})
+    if '{"recommendations":' in prompt:
+        return json.dumps({"recommendations": [{
+            "title": "Schedule your sessions", "description": "Book training days in your calendar.",
+            "priority": "high", "timeframe": "next 7 days"}]})
+    if "MEAL TIMING STRATEGIES" in prompt:
+        return GUIDANCE
+    return "Keep training consistently, progress gradually and prioritise sleep and protein."
+
+
+class FakeModel:
+    """Drop-in for genai.GenerativeModel.generate_content with canned replies"""
+
+    def __init__(self, latency: Optional[float] = None):
+        self.latency = config.FAKE_MODEL_LATENCY if latency is None else latency
+
+    def generate_content(self, prompt: str, generation_config: Optional[Any] = None,
+                         request_options: Optional[Any] = None, stream: bool = False):
+        """Reply to a prompt like Gemini: a response with .text and .usage_metadata, or its chunks"""
+        text = fake_reply(prompt)
+        usage = SimpleNamespace(prompt_token_count=estimate_tokens(prompt),
+                                candidates_token_count=estimate_tokens(text), cached_content_token_count=0)
+        if stream:
+            return self._stream(text, usage)
+        time.sleep(self.latency)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def _stream(self, text: str, usage: Any) -> Iterator[Any]:
+        chunks: List[str] = [text[i:i + CHUNK_CHARS] for i in range(0, len(text), CHUNK_CHARS)]
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            yield SimpleNamespace(text=chunk, usage_metadata=usage)
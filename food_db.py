@@ -0,0 +1,338 @@
+"""
+Food and nutrition database for the AI-Powered Workout & Diet Planner
+
+Loads the bundled food table (data/foods.csv) and filters it by dietary
+preference, cuisine, budget, allergies and dislikes. The table is also exposed
+as compact column arrays (FoodArrays) for the vectorized meal solver.
+"""
+
+import csv
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+import config
+
+
+FOODS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "foods.csv")
+
+MEAL_SLOTS = ["breakfast", "lunch", "dinner", "snack"]
+
+# Budget level -> food cost levels that fit it
+BUDGET_COSTS = {
+    "Low": ("Low",),
+    "Moderate": ("Low", "Moderate"),
+    "High": ("Low", "Moderate", "High"),
+}
+
+# Free-text allergy terms -> allergen tags used in the food table
+ALLERGEN_SYNONYMS = {
+    "milk": "dairy",
+    "lactose": "dairy",
+    "cheese": "dairy",
+    "wheat": "gluten",
+    "celiac": "gluten",
+    "coeliac": "gluten",
+    "peanut": "peanuts",
+    "groundnut": "peanuts",
+    "nut": "nuts",
+    "tree nut": "nuts",
+    "tree nuts": "nuts",
+    "almond": "nuts",
+    "cashew": "nuts",
+    "walnut": "nuts",
+    "eggs": "egg",
+    "shrimp": "shellfish",
+    "prawn": "shellfish",
+    "crab": "shellfish",
+    "seafood": "shellfish",
+    "soya": "soy",
+    "tofu": "soy",
+    "sesame seeds": "sesame",
+    "tahini": "sesame",
+    "butter": "dairy",
+    "cream": "dairy",
+    "ghee": "dairy",
+    "paneer": "dairy",
+    "whey": "dairy",
+    "casein": "dairy",
+    "yogurt": "dairy",
+    "yoghurt": "dairy",
+    "barley": "gluten",
+    "rye": "gluten",
+    "seitan": "gluten",
+    "hazelnut": "nuts",
+    "pistachio": "nuts",
+    "pecan": "nuts",
+    "lobster": "shellfish",
+    "soybean": "soy",
+    "edamame": "soy",
+    "salmon": "fish",
+    "tuna": "fish",
+}
+
+# Allergen tags used in the food table, in bitmask order
+ALLERGENS = ["dairy", "egg", "fish", "gluten", "nuts", "peanuts", "sesame", "shellfish", "soy"]
+
+# Macro columns of FoodArrays.macros
+MACRO_COLUMNS = ["calories", "protein_g", "carbs_g", "fat_g"]
+
+_NONE_TERMS = {"", "none", "no", "nil", "n/a", "na", "nothing"}
+
+# Wording around the allergen itself: "peanut allergy", "allergic to milk", "lactose intolerant", "gluten-free"
+_FILLER = re.compile(
+    r"\b(?:severe|mild|(?:an?\s+)?allerg(?:y|ies|ic)(?:\s+to)?|intoleran(?:t|ce)(?:\s+to)?|sensitiv(?:e|ity)(?:\s+to)?"
+    r"|avoid|no|free|diet|can'?t\s+eat|cannot\s+eat)\b"
+)
+_WORD = re.compile(r"[a-z]+")
+
+
+@dataclass(frozen=True)
+class Food:
+    """Data class for a food table entry (one serving)"""
+    name: str
+    meal: str  # breakfast, lunch, dinner, snack
+    cuisine: str
+    diets: Tuple[str, ...]  # compatible config.DIETARY_PREFERENCES values
+    serving: str
+    calories: int
+    protein_g: float
+    carbs_g: float
+    fat_g: float
+    cost: str  # Low, Moderate, High
+    allergens: Tuple[str, ...]
+
+
+def load_foods(path: str = FOODS_PATH) -> List[Food]:
+    """
+    Load the food table
+
+    Args:
+        path: Path to the food CSV
+
+    Returns:
+        List of foods in table order
+    """
+    foods = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            foods.append(Food(
+                name=row["name"],
+                meal=row["meal"],
+                cuisine=row["cuisine"],
+                diets=tuple(d for d in row["diets"].split(";") if d),
+                serving=row["serving"],
+                calories=int(row["calories"]),
+                protein_g=float(row["protein_g"]),
+                carbs_g=float(row["carbs_g"]),
+                fat_g=float(row["fat_g"]),
+                cost=row["cost"],
+                allergens=tuple(a for a in row["allergens"].split(";") if a),
+            ))
+    return foods
+
+
+@lru_cache(maxsize=1)
+def get_foods() -> Tuple[Food, ...]:
+    """Return the process-wide bundled food table"""
+    return tuple(load_foods())
+
+
+def parse_exclusions(text: Optional[str]) -> List[str]:
+    """
+    Split a free-text allergy/dislike field into lowercase terms
+
+    Args:
+        text: User input such as "peanuts, milk and mushrooms"
+
+    Returns:
+        List of terms, empty when the user entered nothing meaningful
+    """
+    if not text:
+        return []
+    parts = re.split(r"[,;/\n]|\band\b|\bor\b", text.lower())
+    terms = [" ".join(_FILLER.sub(" ", p.replace("-", " ")).split()) for p in parts]
+    return [t for t in terms if t not in _NONE_TERMS]
+
+
+def _singular(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def allergen_tags(terms: List[str]) -> Set[str]:
+    """
+    Allergen tags (ALLERGENS) named by parsed allergy terms
+
+    Each term is looked up whole ("tree nuts") and word by word, singular
+    and plural ("lactose", "peanuts"), so "peanut allergy" and "allergic to
+    milk and eggs" block the same foods as "peanuts, milk, egg".
+    """
+    tags = set()
+    for term in terms:
+        words = _WORD.findall(term)
+        for candidate in [term] + words + [_singular(word) for word in words]:
+            tag = ALLERGEN_SYNONYMS.get(candidate, candidate)
+            if tag in ALLERGENS:
+                tags.add(tag)
+    return tags
+
+
+def _name_terms(terms: List[str]) -> List[str]:
+    """Terms matched against food names, also in the singular ("mushrooms" excludes "Mushroom Curry")"""
+    return sorted({variant for term in terms for variant in (term, " ".join(map(_singular, term.split())))})
+
+
+def _bitmask(values, vocabulary) -> int:
+    return sum(1 << vocabulary.index(v) for v in values if v in vocabulary)
+
+
+@dataclass(frozen=True, eq=False)
+class FoodArrays:
+    """Column-oriented NumPy view of a food table (row i is foods[i])"""
+    foods: Tuple[Food, ...]
+    macros: np.ndarray  # (n, 4) float64 per serving, columns as MACRO_COLUMNS
+    meal: np.ndarray  # int8 index into MEAL_SLOTS
+    cuisine: np.ndarray  # int8 index into config.CULTURAL_FOOD_TYPES
+    cost: np.ndarray  # int8 index into config.BUDGET_LEVELS
+    diets: np.ndarray  # uint8 bitmask over config.DIETARY_PREFERENCES
+    allergens: np.ndarray  # uint16 bitmask over ALLERGENS
+
+    @classmethod
+    def from_foods(cls, foods) -> "FoodArrays":
+        """
+        Pack foods into column arrays
+
+        Args:
+            foods: Foods to pack
+
+        Returns:
+            FoodArrays over the foods, in input order
+        """
+        foods = tuple(foods)
+        n = len(foods)
+        macros = np.array(
+            [(f.calories, f.protein_g, f.carbs_g, f.fat_g) for f in foods], dtype=np.float64
+        ).reshape(n, len(MACRO_COLUMNS))
+        return cls(
+            foods=foods,
+            macros=macros,
+            meal=np.array([MEAL_SLOTS.index(f.meal) for f in foods], dtype=np.int8),
+            cuisine=np.array([config.CULTURAL_FOOD_TYPES.index(f.cuisine) for f in foods], dtype=np.int8),
+            cost=np.array([config.BUDGET_LEVELS.index(f.cost) for f in foods], dtype=np.int8),
+            diets=np.array([_bitmask(f.diets, config.DIETARY_PREFERENCES) for f in foods], dtype=np.uint8),
+            allergens=np.array([_bitmask(f.allergens, ALLERGENS) for f in foods], dtype=np.uint16),
+        )
+
+    def mask(
+        self,
+        dietary_pref: str,
+        cuisine: Optional[str] = None,
+        budget: Optional[str] = None,
+        allergies: Optional[str] = None,
+        dislikes: Optional[str] = None,
+        meal: Optional[str] = None,
+    ) -> np.ndarray:
+        """
+        Boolean row mask with the same semantics as filter_foods
+
+        Args:
+            dietary_pref: Value from config.DIETARY_PREFERENCES
+            cuisine: Value from config.CULTURAL_FOOD_TYPES (None for any)
+            budget: Value from config.BUDGET_LEVELS (None for any)
+            allergies: Free-text allergies
+            dislikes: Free-text dislikes
+            meal: Meal slot (None for any)
+
+        Returns:
+            Boolean array, True for foods that pass every filter
+        """
+        keep = np.ones(len(self.foods), dtype=bool)
+        if dietary_pref:
+            if dietary_pref not in config.DIETARY_PREFERENCES:
+                return ~keep
+            keep &= (self.diets & (1 << config.DIETARY_PREFERENCES.index(dietary_pref))) != 0
+        if meal:
+            keep &= self.meal == MEAL_SLOTS.index(meal)
+        if cuisine and cuisine != "Other":
+            other = config.CULTURAL_FOOD_TYPES.index("Other")
+            keep &= (self.cuisine == config.CULTURAL_FOOD_TYPES.index(cuisine)) | (self.cuisine == other)
+        if budget in BUDGET_COSTS:
+            keep &= self.cost <= config.BUDGET_LEVELS.index(budget)
+
+        allergy_terms = parse_exclusions(allergies)
+        dislike_terms = parse_exclusions(dislikes)
+        blocked = _bitmask(allergen_tags(allergy_terms), ALLERGENS)
+        if blocked:
+            keep &= (self.allergens & blocked) == 0
+        name_terms = _name_terms(allergy_terms + dislike_terms)
+        if name_terms:
+            names = (f.name.lower() for f in self.foods)
+            keep &= ~np.fromiter((any(t in name for t in name_terms) for name in names), dtype=bool, count=len(self.foods))
+        return keep
+
+
+@lru_cache(maxsize=1)
+def get_food_arrays() -> FoodArrays:
+    """Return the process-wide bundled food table as column arrays"""
+    return FoodArrays.from_foods(get_foods())
+
+
+def _is_excluded(food: Food, blocked_tags: Set[str], name_terms: List[str]) -> bool:
+    if blocked_tags.intersection(food.allergens):
+        return True
+    name = food.name.lower()
+    return any(term in name for term in name_terms)
+
+
+def filter_foods(
+    foods,
+    dietary_pref: str,
+    cuisine: Optional[str] = None,
+    budget: Optional[str] = None,
+    allergies: Optional[str] = None,
+    dislikes: Optional[str] = None,
+    meal: Optional[str] = None,
+) -> List[Food]:
+    """
+    Filter foods by the user's nutrition preferences
+
+    Diet, allergies and dislikes are hard constraints; allergies are matched
+    by allergen tag (see allergen_tags) as well as by food name. Cuisine also admits the
+    universal "Other" staples; budget admits every cost level at or below it.
+
+    Args:
+        foods: Foods to filter
+        dietary_pref: Value from config.DIETARY_PREFERENCES
+        cuisine: Value from config.CULTURAL_FOOD_TYPES (None for any)
+        budget: Value from config.BUDGET_LEVELS (None for any)
+        allergies: Free-text allergies
+        dislikes: Free-text dislikes
+        meal: Meal slot (None for any)
+
+    Returns:
+        Matching foods in input order
+    """
+    allergy_terms = parse_exclusions(allergies)
+    blocked_tags = allergen_tags(allergy_terms)
+    name_terms = _name_terms(allergy_terms + parse_exclusions(dislikes))
+    costs = BUDGET_COSTS.get(budget) if budget else None
+    cuisines = (cuisine, "Other") if cuisine and cuisine != "Other" else None
+
+    result = []
+    for food in foods:
+        if dietary_pref and dietary_pref not in food.diets:
+            continue
+        if meal and food.meal != meal:
+            continue
+        if cuisines and food.cuisine not in cuisines:
+            continue
+        if costs and food.cost not in costs:
+            continue
+        if _is_excluded(food, blocked_tags, name_terms):
+            continue
+        result.append(food)
+    return result
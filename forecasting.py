@@ -0,0 +1,264 @@
+"""
+Progress forecasting for the AI-Powered Workout & Diet Planner
+
+Fits a recency-weighted linear trend with a prediction interval to each
+logged progress series (body weight, calories, lift weights). Series from any
+number of users are padded into one matrix and fitted together with NumPy, so
+a dashboard for one user and a nightly job over thousands cost the same code
+path. When there is not enough weight history yet, the weight forecast falls
+back to the energy balance of the user's nutrition targets.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import config
+from plan_engine import calculate_nutrition_targets
+
+
+# Logged entry fields forecast as series; lifts come from entry["lifts"]
+FORECAST_METRICS = ("weight", "calories_consumed", "calories_burned")
+LIFT_PREFIX = "lift:"
+
+KCAL_PER_KG = 7700  # energy in one kg of body mass
+PRIOR_WEEKLY_SD_KG = 0.35  # spread of week-to-week weight change around the energy balance
+
+
+@dataclass
+class Forecast:
+    """Data class for one forecast series"""
+    metric: str
+    method: str  # trend, energy_balance
+    history_days: List[float]  # days since the first observation
+    history_values: List[float]
+    days: List[float]  # forecast days, on the same axis as history_days
+    mean: List[float]
+    lower: List[float]
+    upper: List[float]
+    slope_per_week: float
+    points: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _parse_day(value: Any) -> Optional[np.datetime64]:
+    """Calendar day of an ISO string, date or datetime; None if it isn't one"""
+    try:
+        day = np.datetime64(str(value)[:10], "D")
+    except ValueError:
+        return None
+    return None if np.isnat(day) else day
+
+
+def extract_series(progress_data: List[Dict[str, Any]]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Split progress log entries into per-metric series
+
+    Args:
+        progress_data: Entries with a "date" plus any of FORECAST_METRICS and
+            an optional "lifts" mapping of exercise -> kg
+
+    Returns:
+        Metric -> (day numbers, values), sorted by day; lifts are keyed "lift:<name>".
+        Entries without a parseable date are skipped.
+    """
+    dated = [(_parse_day(entry.get("date")), entry) for entry in progress_data if entry.get("date")]
+    dated = [(day, entry) for day, entry in dated if day is not None]
+    if not dated:
+        return {}
+    first = min(day for day, _ in dated)
+    points: Dict[str, List[Tuple[float, float]]] = {}
+    for day, entry in dated:
+        day = float((day - first).astype(int))
+        values = {metric: entry.get(metric) for metric in FORECAST_METRICS}
+        values.update({LIFT_PREFIX + name: kg for name, kg in (entry.get("lifts") or {}).items()})
+        for metric, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                points.setdefault(metric, []).append((day, float(value)))
+
+    series = {}
+    for metric, pairs in points.items():
+        pairs.sort()
+        data = np.array(pairs)
+        series[metric] = (data[:, 0], data[:, 1])
+    return series
+
+
+def fit_trends(
+    t: np.ndarray, y: np.ndarray, mask: np.ndarray, half_life_days: float = config.FORECAST_HALF_LIFE_DAYS
+) -> Dict[str, np.ndarray]:
+    """
+    Fit recency-weighted linear trends to a batch of padded series
+
+    Observations are weighted by 0.5 ** (age / half_life_days). Weights are
+    rescaled to the effective sample size so the usual least-squares
+    interval formulas apply.
+
+    Args:
+        t: (series, points) observation days
+        y: (series, points) observed values
+        mask: (series, points) True where an observation exists
+        half_life_days: Age at which an observation counts half
+
+    Returns:
+        Per-series arrays: t_mean, y_mean, slope (per day), sigma, sxx, n_eff
+    """
+    t_last = np.where(mask, t, -np.inf).max(axis=1, keepdims=True)
+    w = np.where(mask, 0.5 ** ((t_last - t) / half_life_days), 0.0)
+    n_eff = w.sum(axis=1) ** 2 / np.maximum((w ** 2).sum(axis=1), 1e-12)
+    w = w * (n_eff / np.maximum(w.sum(axis=1), 1e-12))[:, None]
+
+    total = np.maximum(w.sum(axis=1), 1e-12)
+    t_mean = (w * t).sum(axis=1) / total
+    y_mean = (w * y).sum(axis=1) / total
+    dt = np.where(mask, t - t_mean[:, None], 0.0)
+    sxx = (w * dt ** 2).sum(axis=1)
+    sxy = (w * dt * (y - y_mean[:, None])).sum(axis=1)
+    slope = np.divide(sxy, sxx, out=np.zeros_like(sxx), where=sxx > 1e-9)
+
+    residuals = np.where(mask, y - y_mean[:, None] - slope[:, None] * dt, 0.0)
+    dof = np.maximum(n_eff - 2, 1.0)
+    sigma = np.sqrt((w * residuals ** 2).sum(axis=1) / dof)
+    return {"t_mean": t_mean, "y_mean": y_mean, "slope": slope, "sigma": sigma, "sxx": sxx, "n_eff": n_eff}
+
+
+def forecast_series(
+    series: List[Tuple[np.ndarray, np.ndarray]],
+    horizon_weeks: int = config.FORECAST_HORIZON_WEEKS,
+    z: float = config.FORECAST_INTERVAL_Z,
+) -> List[Dict[str, np.ndarray]]:
+    """
+    Forecast a batch of series (e.g. the same metric for many users) in one pass
+
+    Args:
+        series: (day numbers, values) per series; each needs at least two points
+        horizon_weeks: Weeks to forecast past each series' last observation
+        z: Interval half-width in standard errors
+
+    Returns:
+        Per series: days, mean, lower, upper and slope_per_week
+    """
+    if not series:
+        return []
+    width = max(len(days) for days, _ in series)
+    t = np.zeros((len(series), width))
+    y = np.zeros((len(series), width))
+    mask = np.zeros((len(series), width), dtype=bool)
+    for i, (days, values) in enumerate(series):
+        t[i, :len(days)] = days
+        y[i, :len(values)] = values
+        mask[i, :len(days)] = True
+
+    fit = fit_trends(t, y, mask)
+    t_last = np.where(mask, t, -np.inf).max(axis=1)
+    steps = 7.0 * np.arange(1, horizon_weeks + 1)
+    t_future = t_last[:, None] + steps[None, :]
+    dt = t_future - fit["t_mean"][:, None]
+    mean = fit["y_mean"][:, None] + fit["slope"][:, None] * dt
+    leverage = np.divide(dt ** 2, fit["sxx"][:, None], out=np.zeros_like(dt), where=fit["sxx"][:, None] > 1e-9)
+    se = fit["sigma"][:, None] * np.sqrt(1.0 + 1.0 / fit["n_eff"][:, None] + leverage)
+
+    return [
+        {
+            "days": t_future[i],
+            "mean": mean[i],
+            "lower": mean[i] - z * se[i],
+            "upper": mean[i] + z * se[i],
+            "slope_per_week": float(fit["slope"][i] * 7.0),
+        }
+        for i in range(len(series))
+    ]
+
+
+def energy_balance_forecast(
+    user_profile: Dict[str, Any],
+    horizon_weeks: int = config.FORECAST_HORIZON_WEEKS,
+    z: float = config.FORECAST_INTERVAL_Z,
+) -> Forecast:
+    """
+    Weight forecast from the plan's calorie target versus TDEE, for users without history
+
+    Args:
+        user_profile: Profile dict as collected by enhanced_sidebar_form
+        horizon_weeks: Weeks to forecast
+        z: Interval half-width in standard deviations
+
+    Returns:
+        Weight Forecast starting at the profile weight on day 0
+    """
+    targets = calculate_nutrition_targets(user_profile)
+    weight_kg = float(user_profile.get("weight_kg", 70))
+    weekly_change = (targets["calories"] - targets["tdee"]) * 7 / KCAL_PER_KG
+    weeks = np.arange(1, horizon_weeks + 1)
+    mean = weight_kg + weekly_change * weeks
+    spread = z * PRIOR_WEEKLY_SD_KG * np.sqrt(weeks)
+    return Forecast(
+        metric="weight",
+        method="energy_balance",
+        history_days=[0.0],
+        history_values=[weight_kg],
+        days=[float(d) for d in 7.0 * weeks],
+        mean=[round(float(v), 2) for v in mean],
+        lower=[round(float(v), 2) for v in mean - spread],
+        upper=[round(float(v), 2) for v in mean + spread],
+        slope_per_week=round(weekly_change, 3),
+        points=0,
+    )
+
+
+def forecast_progress(
+    progress_data: List[Dict[str, Any]],
+    user_profile: Optional[Dict[str, Any]] = None,
+    horizon_weeks: int = config.FORECAST_HORIZON_WEEKS,
+) -> Dict[str, Forecast]:
+    """
+    Forecast every metric in a user's progress log
+
+    Args:
+        progress_data: Progress log entries (see extract_series)
+        user_profile: Profile used for the energy-balance weight forecast
+            when the log has fewer than FORECAST_MIN_POINTS weights
+        horizon_weeks: Weeks to forecast
+
+    Returns:
+        Metric -> Forecast
+    """
+    series = {metric: s for metric, s in extract_series(progress_data).items()
+              if len(s[0]) >= config.FORECAST_MIN_POINTS}
+    metrics = list(series)
+    results = forecast_series([series[m] for m in metrics], horizon_weeks)
+
+    forecasts = {}
+    for metric, result in zip(metrics, results):
+        days, values = series[metric]
+        forecasts[metric] = Forecast(
+            metric=metric,
+            method="trend",
+            history_days=[float(d) for d in days],
+            history_values=[float(v) for v in values],
+            days=[float(d) for d in result["days"]],
+            mean=[round(float(v), 2) for v in result["mean"]],
+            lower=[round(float(v), 2) for v in result["lower"]],
+            upper=[round(float(v), 2) for v in result["upper"]],
+            slope_per_week=round(result["slope_per_week"], 3),
+            points=len(days),
+        )
+    if "weight" not in forecasts and user_profile:
+        forecasts["weight"] = energy_balance_forecast(user_profile, horizon_weeks)
+    return forecasts
+
+
+def summarize_forecasts(forecasts: Dict[str, Forecast]) -> List[str]:
+    """One line of numbers per forecast, for the narration prompt"""
+    lines = []
+    for metric, fc in forecasts.items():
+        label = metric[len(LIFT_PREFIX):] if metric.startswith(LIFT_PREFIX) else metric.replace("_", " ")
+        basis = f"{fc.points} logged points" if fc.points else "calorie target vs TDEE (no history yet)"
+        lines.append(
+            f"- {label}: {fc.slope_per_week:+.2f}/week, week {len(fc.mean)} forecast {fc.mean[-1]:g} "
+            f"(range {fc.lower[-1]:g}-{fc.upper[-1]:g}), based on {basis}"
+        )
+    return lines
@@ -0,0 +1,115 @@
+"""
+Per-call-type generation settings for the AI services
+
+Every Gemini call used to ask for up to 4000 output tokens at temperature
+0.7, even for a short insight list or a chat reply. Each call type now has a
+profile in config.GENERATION_PROFILES: an output cap, a temperature, stop
+sequences and whether the reply must be JSON (Gemini's structured output
+mode, which also stops the model wrapping JSON in prose).
+
+The cap also adapts: once usage_tracking has seen enough outputs of a call
+type, the cap shrinks to the observed 95th percentile plus headroom, and
+returns to the profile cap if too many outputs hit the limit. Shorter caps
+let the server stop earlier and bound the worst-case latency.
+"""
+
+import math
+import threading
+import time
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import config
+from usage_tracking import UsageTracker, get_usage_tracker
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    """Data class for the generation settings of one call type"""
+    call_type: str
+    max_tokens: int
+    temperature: float
+    stop_sequences: Tuple[str, ...] = ()
+    json_output: bool = False
+    adapted: bool = False  # max_tokens was learned from observed outputs
+
+
+def base_profile(call_type: str) -> GenerationProfile:
+    """The configured profile for a call type (the "default" profile for unknown ones)"""
+    settings = config.GENERATION_PROFILES.get(call_type) or config.GENERATION_PROFILES["default"]
+    return GenerationProfile(
+        call_type=call_type,
+        max_tokens=settings["max_tokens"],
+        temperature=settings["temperature"],
+        stop_sequences=tuple(settings.get("stop", ())),
+        json_output=settings.get("json", False),
+    )
+
+
+def adaptive_max_tokens(profile: GenerationProfile, stats: Optional[Dict[str, float]]) -> Optional[int]:
+    """
+    Output cap learned from a call type's observed output lengths
+
+    Args:
+        profile: Configured profile (its cap is never exceeded)
+        stats: Entry of UsageTracker.output_lengths for the call type
+
+    Returns:
+        The learned cap, or None while there are too few samples or too many
+        truncated outputs to trust one
+    """
+    if not stats or stats["samples"] < config.GENERATION_ADAPTIVE_MIN_SAMPLES:
+        return None
+    if stats["truncated"] > config.GENERATION_ADAPTIVE_MAX_TRUNCATED:
+        return None
+    cap = math.ceil(stats["p95"] * config.GENERATION_ADAPTIVE_HEADROOM)
+    return min(profile.max_tokens, max(config.GENERATION_ADAPTIVE_MIN_TOKENS, cap))
+
+
+class ProfileRegistry:
+    """Resolves call types to profiles, refreshing learned caps every GENERATION_ADAPTIVE_REFRESH seconds"""
+
+    def __init__(self, tracker: Optional[UsageTracker] = None):
+        """
+        Args:
+            tracker: Usage tracker to learn from (this process's tracker by default)
+        """
+        self.tracker = tracker
+        self._lock = threading.Lock()
+        self._lengths: Dict[str, Dict[str, float]] = {}
+        self._loaded_at = float("-inf")
+
+    def _output_lengths(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            if time.monotonic() - self._loaded_at > config.GENERATION_ADAPTIVE_REFRESH:
+                try:
+                    self._lengths = (self.tracker or get_usage_tracker()).output_lengths()
+                except Exception:
+                    self._lengths = {}  # no statistics: fall back to the configured caps
+                self._loaded_at = time.monotonic()
+            return self._lengths
+
+    def profile(self, call_type: str) -> GenerationProfile:
+        """Profile for a call type, with its adaptive cap when enabled and learned"""
+        profile = base_profile(call_type)
+        if not (config.GENERATION_ADAPTIVE and config.USAGE_TRACKING_ENABLED):
+            return profile
+        learned = adaptive_max_tokens(profile, self._output_lengths().get(call_type))
+        return replace(profile, max_tokens=learned, adapted=True) if learned is not None else profile
+
+    def invalidate(self):
+        """Reload the observed output lengths on the next lookup"""
+        with self._lock:
+            self._loaded_at = float("-inf")
+
+
+@lru_cache(maxsize=1)
+def get_profile_registry() -> ProfileRegistry:
+    """Return this process's profile registry"""
+    return ProfileRegistry()
+
+
+def generation_profile(call_type: str) -> GenerationProfile:
+    """Return the current generation profile for a call type"""
+    return get_profile_registry().profile(call_type)
@@ -0,0 +1,169 @@
+"""
+Health calculators for the AI-Powered Workout & Diet Planner
+
+BMI, BMR (Mifflin-St Jeor), TDEE and calorie goals, driven by module-level
+lookup tables instead of dicts and if-chains rebuilt on every call.
+profile_metrics computes all of them for one profile at once and is
+memoized, because the plan engine, the sidebar and batch jobs ask for the
+same few profiles over and over. Run benchmarks.bench_health_metrics to
+compare it with the separate calculators.
+"""
+
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, NamedTuple, Tuple
+
+import config
+
+
+# BMI categories from config.BMI_CATEGORIES, and the upper bound of each; the last category is open-ended
+BMI_CATEGORIES = tuple(config.BMI_CATEGORIES)
+BMI_BOUNDS = tuple(float(bounds["max"]) for bounds in list(config.BMI_CATEGORIES.values())[:-1])
+
+# Mifflin-St Jeor constant by gender (lower-case); other genders use the female constant
+BMR_GENDER_OFFSETS = {"male": 5}
+BMR_DEFAULT_OFFSET = -161
+
+# TDEE multiplier per activity level
+ACTIVITY_MULTIPLIERS = {
+    "Sedentary": 1.2,
+    "Light": 1.375,
+    "Moderate": 1.55,
+    "Active": 1.725,
+    "Very Active": 1.9,
+}
+DEFAULT_ACTIVITY_MULTIPLIER = 1.2
+
+# Workout frequency -> training days per week and activity level used for TDEE
+FREQUENCY_DAYS = {
+    "3 days/week": 3,
+    "4 days/week": 4,
+    "5 days/week": 5,
+    "6 days/week": 6,
+    "Daily": 7,
+}
+FREQUENCY_ACTIVITY_LEVELS = {
+    "3 days/week": "Light",
+    "4 days/week": "Moderate",
+    "5 days/week": "Moderate",
+    "6 days/week": "Active",
+    "Daily": "Very Active",
+}
+DEFAULT_ACTIVITY_LEVEL = "Moderate"
+
+# Daily calorie adjustment per goal (negative: deficit, positive: surplus)
+GOAL_CALORIE_ADJUSTMENTS = {
+    "Weight Loss": -500,
+    "Muscle Gain": 300,
+}
+
+PROFILE_METRICS_CACHE_SIZE = 4096
+
+
+def calculate_bmi(height_cm: float, weight_kg: float) -> Tuple[float, str]:
+    """
+    Calculate BMI and return category
+
+    Args:
+        height_cm: Height in centimeters
+        weight_kg: Weight in kilograms
+
+    Returns:
+        Tuple of (BMI value, BMI category)
+    """
+    if height_cm <= 0:
+        return 0.0, "Invalid height"
+
+    height_m = height_cm / 100.0
+    bmi = weight_kg / (height_m * height_m)
+    return round(bmi, 1), BMI_CATEGORIES[bisect_right(BMI_BOUNDS, bmi)]
+
+
+def calculate_bmr(weight_kg: float, height_cm: float, age: int, gender: str) -> float:
+    """
+    Calculate Basal Metabolic Rate using Mifflin-St Jeor Equation
+
+    Args:
+        weight_kg: Weight in kilograms
+        height_cm: Height in centimeters
+        age: Age in years
+        gender: Gender (Male/Female/Other)
+
+    Returns:
+        BMR in calories per day
+    """
+    offset = BMR_GENDER_OFFSETS.get(gender.lower(), BMR_DEFAULT_OFFSET)
+    return round(10 * weight_kg + 6.25 * height_cm - 5 * age + offset, 0)
+
+
+def calculate_tdee(bmr: float, activity_level: str) -> float:
+    """
+    Calculate Total Daily Energy Expenditure
+
+    Args:
+        bmr: Basal Metabolic Rate
+        activity_level: Activity level (Sedentary, Light, Moderate, Active, Very Active)
+
+    Returns:
+        TDEE in calories per day
+    """
+    return round(bmr * ACTIVITY_MULTIPLIERS.get(activity_level, DEFAULT_ACTIVITY_MULTIPLIER), 0)
+
+
+def calculate_calorie_goals(tdee: float, goal: str) -> Dict[str, int]:
+    """
+    Calculate calorie goals based on fitness objective
+
+    Args:
+        tdee: Total Daily Energy Expenditure
+        goal: Fitness goal (Weight Loss, Muscle Gain, etc.)
+
+    Returns:
+        Dictionary with calorie goals
+    """
+    adjustment = GOAL_CALORIE_ADJUSTMENTS.get(goal, 0)
+    if adjustment < 0:
+        return {"daily_calories": int(tdee + adjustment), "deficit": -adjustment}
+    if adjustment > 0:
+        return {"daily_calories": int(tdee + adjustment), "surplus": adjustment}
+    return {"daily_calories": int(tdee), "deficit": 0, "surplus": 0}
+
+
+def activity_level(workout_frequency: str) -> str:
+    """Activity level assumed for a workout frequency (DEFAULT_ACTIVITY_LEVEL if unknown)"""
+    return FREQUENCY_ACTIVITY_LEVELS.get(workout_frequency, DEFAULT_ACTIVITY_LEVEL)
+
+
+class ProfileMetrics(NamedTuple):
+    """Every health metric of one profile (a tuple: cached results are shared, and cheap to build)"""
+    bmi: float
+    bmi_cat: str
+    bmr: float
+    tdee: float
+    daily_calories: int
+    calorie_adjustment: int  # negative: deficit, positive: surplus
+
+
+@lru_cache(maxsize=PROFILE_METRICS_CACHE_SIZE)
+def profile_metrics(height_cm: float, weight_kg: float, age: int, gender: str, activity: str,
+                    goal: str) -> ProfileMetrics:
+    """
+    BMI, BMR, TDEE and daily calories of a profile in one memoized call
+
+    Args:
+        height_cm: Height in centimeters
+        weight_kg: Weight in kilograms
+        age: Age in years
+        gender: Gender (Male/Female/Other)
+        activity: Activity level (see ACTIVITY_MULTIPLIERS and activity_level)
+        goal: Fitness goal
+
+    Returns:
+        ProfileMetrics (shared between callers, hence immutable)
+    """
+    bmi, bmi_cat = calculate_bmi(height_cm, weight_kg)
+    bmr = calculate_bmr(weight_kg, height_cm, age, gender)
+    tdee = calculate_tdee(bmr, activity)
+    adjustment = GOAL_CALORIE_ADJUSTMENTS.get(goal, 0)
+    return ProfileMetrics(bmi=bmi, bmi_cat=bmi_cat, bmr=bmr, tdee=tdee,
+                          daily_calories=int(tdee + adjustment), calorie_adjustment=adjustment)
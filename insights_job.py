@@ -0,0 +1,284 @@
+"""
+Precomputed daily insights for active users
+
+The dashboard used to call Gemini for insights every time it was opened, so
+the first view of the day always waited on the model. Profiles and progress
+entries are now recorded in the shared SQLite store, and an off-peak batch
+job refreshes insights and recommendations for every user whose data changed
+since their last run. The dashboard reads the stored results instantly and
+shows how old they are. The app keys users on the browser as well as the
+name (index_key, as for the plan index), so typing someone else's name does
+not show their insights.
+
+Usage (e.g. from cron at 03:00):
+    python -m insights_job [--workers 4] [--limit 500]
+"""
+
+import argparse
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+import config
+from ai_services import AIInsight, AIOrchestrator
+from shared_store import SharedStore, get_shared_store
+from usage_tracking import attributed_to
+
+logger = logging.getLogger(__name__)
+
+
+def user_key(user_profile: Dict[str, Any]) -> Optional[str]:
+    """Stable id for a profile's user (None for anonymous profiles)"""
+    name = " ".join((user_profile.get("name") or "").lower().split())
+    if not name:
+        return None
+    return hashlib.sha256(name.encode("utf-8")).hexdigest()[:32]
+
+
+def index_key(user_profile: Dict[str, Any], browser_id: Optional[str] = None) -> Optional[str]:
+    """
+    Key of a profile's stored data (plans, progress, insights)
+
+    Args:
+        user_profile: Profile with the user's name
+        browser_id: Unguessable per-browser id (app.browser_id); None for
+            server-side saves such as bulk imports, which the app never looks up
+
+    Returns:
+        The key, or None for anonymous profiles
+    """
+    key = user_key(user_profile)
+    if key is None or browser_id is None:
+        return key
+    return hashlib.sha256(f"{browser_id}|{key}".encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass
+class StoredInsights:
+    """Data class for a user's precomputed insights"""
+    insights: List[AIInsight]
+    recommendations: List[Dict[str, Any]]
+    computed_at: float
+    data_updated_at: float  # when the profile/progress they were computed from last changed
+    stale: bool = False  # newer data arrived, or older than INSIGHTS_MAX_AGE
+
+    @property
+    def age_hours(self) -> float:
+        return (time.time() - self.computed_at) / 3600
+
+
+class InsightStore:
+    """Users, their progress logs and their precomputed insights in the shared store"""
+
+    USERS_NAMESPACE = "users"
+    INSIGHTS_NAMESPACE = "insights"
+
+    def __init__(self, store: Optional[SharedStore] = None):
+        self.store = store or get_shared_store()
+
+    def _read(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        payload = self.store.get(namespace, key)
+        return json.loads(payload.decode("utf-8")) if payload is not None else None
+
+    def _write(self, namespace: str, key: str, value: Dict[str, Any]):
+        self.store.set(namespace, key, json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+    def user(self, key: str) -> Optional[Dict[str, Any]]:
+        """Stored {"profile", "progress", "updated_at"} for a user"""
+        return self._read(self.USERS_NAMESPACE, key)
+
+    def progress(self, key: Optional[str]) -> List[Dict[str, Any]]:
+        """A user's progress log, oldest first (empty for unknown or anonymous users)"""
+        user = self.user(key) if key else None
+        return user.get("progress", []) if user else []
+
+    def save_profile(self, user_profile: Dict[str, Any], browser_id: Optional[str] = None) -> Optional[str]:
+        """
+        Record a user's current profile, marking them active
+
+        Args:
+            user_profile: Profile dict as collected by enhanced_sidebar_form
+            browser_id: Browser the profile comes from, keying it like the plan index
+
+        Returns:
+            The user key, or None for anonymous profiles
+        """
+        key = index_key(user_profile, browser_id)
+        if key is None:
+            return None
+        user = self.user(key) or {"progress": []}
+        profile = {k: v for k, v in user_profile.items() if k != "generate"}
+        if user.get("profile") != profile:
+            user.update(profile=profile, updated_at=time.time())
+            self._write(self.USERS_NAMESPACE, key, user)
+        return key
+
+    def record_progress(self, user_profile: Dict[str, Any], entry: Dict[str, Any],
+                        browser_id: Optional[str] = None) -> Optional[str]:
+        """
+        Append a progress log entry (date, weight, calories, lifts, ...) for a user
+
+        Args:
+            user_profile: Profile of the user logging progress
+            entry: Progress entry
+            browser_id: Browser the entry comes from (see save_profile)
+
+        Returns:
+            The user key, or None for anonymous profiles
+        """
+        key = self.save_profile(user_profile, browser_id)
+        if key is None:
+            return None
+        user = self.user(key)
+        user["progress"] = (user.get("progress", []) + [entry])[-config.PROGRESS_LOG_MAX_ENTRIES:]
+        user["updated_at"] = time.time()
+        self._write(self.USERS_NAMESPACE, key, user)
+        return key
+
+    def add_progress(self, key: str, entries: List[Dict[str, Any]], name: Optional[str] = None):
+        """
+        Append several progress entries to a user in one write (used by bulk imports)
+
+        Args:
+            key: User key from index_key
+            entries: Progress entries, oldest first
+            name: Name for a user not seen before
+        """
+        user = self.user(key) or {"profile": {"name": name or ""}, "progress": []}
+        user["progress"] = (user.get("progress", []) + list(entries))[-config.PROGRESS_LOG_MAX_ENTRIES:]
+        user["updated_at"] = time.time()
+        self._write(self.USERS_NAMESPACE, key, user)
+
+    def save_insights(self, key: str, insights: List[AIInsight], recommendations: List[Dict[str, Any]],
+                      data_updated_at: float):
+        """Store freshly computed insights for a user"""
+        self._write(self.INSIGHTS_NAMESPACE, key, {
+            "insights": [dataclasses.asdict(i) if isinstance(i, AIInsight) else i for i in insights],
+            "recommendations": recommendations,
+            "computed_at": time.time(),
+            "data_updated_at": data_updated_at,
+        })
+
+    def load_insights(self, key: Optional[str]) -> Optional[StoredInsights]:
+        """
+        Read a user's precomputed insights
+
+        Args:
+            key: User key from index_key
+
+        Returns:
+            StoredInsights with the staleness flag set, or None if never computed
+        """
+        stored = self._read(self.INSIGHTS_NAMESPACE, key) if key else None
+        if stored is None:
+            return None
+        user = self.user(key) or {}
+        stale = (user.get("updated_at", 0) > stored["data_updated_at"]
+                 or time.time() - stored["computed_at"] > config.INSIGHTS_MAX_AGE)
+        return StoredInsights(
+            insights=[AIInsight(**i) for i in stored["insights"]],
+            recommendations=stored["recommendations"],
+            computed_at=stored["computed_at"],
+            data_updated_at=stored["data_updated_at"],
+            stale=stale,
+        )
+
+    def pending_users(self) -> List[str]:
+        """Users whose data changed since their insights were computed, or who lack recommendations"""
+        computed = {}
+        for key, value in self.store.items(self.INSIGHTS_NAMESPACE):
+            stored = json.loads(value.decode("utf-8"))
+            # Insights computed on demand by the dashboard come without recommendations
+            computed[key] = stored["data_updated_at"] if stored["recommendations"] else -1
+        return [key for key, value in self.store.items(self.USERS_NAMESPACE)
+                if json.loads(value.decode("utf-8")).get("updated_at", 0) > computed.get(key, -1)]
+
+
+@lru_cache(maxsize=1)
+def get_insight_store() -> InsightStore:
+    """Return the insight store on this process's shared store"""
+    return InsightStore()
+
+
+def refresh_user(orchestrator: AIOrchestrator, store: InsightStore, key: str) -> bool:
+    """
+    Compute and store insights and recommendations for one user
+
+    Returns:
+        True if the model produced something worth storing
+    """
+    user = store.user(key)
+    if not user or not user.get("profile"):
+        return False
+    profile, progress = user["profile"], user.get("progress", [])
+    insights = orchestrator.workout_ai.generate_ai_insights(profile, progress)
+    recommendations = orchestrator.analytics_ai.generate_recommendations(profile, progress[-1] if progress else {})
+    recommendations = [rec for rec in recommendations if str(rec.get("description", "")).strip()]
+    if not insights and not recommendations:
+        return False
+    store.save_insights(key, insights, recommendations, user.get("updated_at", 0))
+    return True
+
+
+def run_insights_job(
+    orchestrator: AIOrchestrator,
+    store: Optional[InsightStore] = None,
+    workers: int = config.INSIGHTS_JOB_WORKERS,
+    limit: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Refresh insights for every user with new data
+
+    Args:
+        orchestrator: Orchestrator whose services call the model
+        store: Insight store (defaults to the shared one)
+        workers: Users processed concurrently (bounds requests in flight)
+        limit: Maximum users to process in this run
+
+    Returns:
+        Counts of pending, refreshed and failed users
+    """
+    store = store or get_insight_store()
+    pending = store.pending_users()[:limit]
+
+    def refresh(key: str) -> bool:
+        try:
+            with attributed_to(key):
+                return refresh_user(orchestrator, store, key)
+        except Exception:
+            logger.exception("Insights refresh failed for user %s", key)
+            return False
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(refresh, pending))
+    refreshed = sum(results)
+    return {"pending": len(pending), "refreshed": refreshed, "failed": len(pending) - refreshed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Precompute AI insights for users with new data")
+    parser.add_argument("--workers", type=int, default=config.INSIGHTS_JOB_WORKERS, help="Concurrent users")
+    parser.add_argument("--limit", type=int, default=None, help="Maximum users to process")
+    args = parser.parse_args()
+
+    load_dotenv()
+    api_key = os.getenv("GEMINI_API_KEY", "").strip()
+    if not api_key:
+        sys.exit("GEMINI_API_KEY is missing")
+    stats = run_insights_job(AIOrchestrator(api_key), workers=args.workers, limit=args.limit)
+    print(f"Insights job: {stats['refreshed']} refreshed, {stats['failed']} failed of {stats['pending']} pending")
+    sys.exit(1 if stats["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
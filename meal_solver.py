@@ -0,0 +1,316 @@
+"""
+Macro-constrained meal solver for the AI-Powered Workout & Diet Planner
+
+Chooses serving sizes for every day of a meal plan so the daily totals land on
+the calorie and macronutrient targets. Each meal's side dish is picked to
+fill what its main dish leaves of the meal's share of the targets. All days
+are then solved at once as a batch of small bounded least-squares problems
+using NumPy only, and snapped to quarter servings with a vectorized local
+search. Daily limits (such as the Keto carb limit) are kept as constraints,
+not just targets.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from food_db import MACRO_COLUMNS, MEAL_SLOTS, FoodArrays
+
+
+SERVING_STEP = 0.25
+SIDE_SLOT = "snack"  # foods of this slot may be the side of any meal
+
+# (min, max) servings for the main dish and the optional side of each meal
+MAIN_SERVINGS = (0.5, 2.5)
+SIDE_SERVINGS = (0.0, 2.0)
+
+# Energy per gram, so every macro error is measured in kcal of the daily target
+KCAL_PER_UNIT = {
+    "calories": 1.0,
+    "protein_g": 4.0,
+    "carbs_g": 4.0,
+    "fat_g": 9.0,
+}
+
+# Relative weight of each target in the objective; calories and protein matter most
+MACRO_WEIGHTS = {
+    "calories": 4.0,
+    "protein_g": 4.0,
+    "carbs_g": 1.0,
+    "fat_g": 1.0,
+}
+# Keeps each meal near its share of the day's calories
+MEAL_BALANCE_WEIGHT = 0.5
+# Penalty on exceeding a daily limit, relative to the target weights above
+LIMIT_WEIGHT = 50.0
+# Mains rotate through this best-fitting fraction of a meal's options
+MAIN_POOL_FRACTION = 0.5
+# Sides scoring within this fraction of the best fit take turns across days
+SIDE_SCORE_SLACK = 0.15
+
+SOLVER_ITERATIONS = 300
+ROUNDING_PASSES = 12
+
+
+def _scales(targets: Dict[str, float], calories: float) -> np.ndarray:
+    """Per-macro factors turning gram errors into weighted fractions of the calories given"""
+    kcal = np.array([KCAL_PER_UNIT[c] for c in MACRO_COLUMNS])
+    weights = np.sqrt([MACRO_WEIGHTS[c] for c in MACRO_COLUMNS])
+    return weights * kcal / max(calories, 1.0)
+
+
+def _limit_vector(limits: Optional[Dict[str, float]]) -> np.ndarray:
+    """Daily limits keyed by MACRO_COLUMNS as an array (inf where unlimited)"""
+    limits = limits or {}
+    return np.array([float(limits.get(c, np.inf)) for c in MACRO_COLUMNS])
+
+
+def _side_scores(
+    arrays: FoodArrays, mains: np.ndarray, options: np.ndarray,
+    goal: np.ndarray, scale: np.ndarray, limit: np.ndarray
+) -> np.ndarray:
+    """
+    How well each option completes each day's main dish for one meal
+
+    Every (main servings, side servings) pair on the serving grid is tried;
+    the score is the best weighted squared error against the meal's share of
+    the targets, plus the penalty for exceeding its share of the limits.
+
+    Returns:
+        (days, options) scores, inf where the option is that day's main
+    """
+    main_grid = np.arange(MAIN_SERVINGS[0], MAIN_SERVINGS[1] + 1e-9, SERVING_STEP)
+    side_grid = np.arange(SERVING_STEP, SIDE_SERVINGS[1] + 1e-9, SERVING_STEP)
+    main_macros = arrays.macros[mains][:, :, None, None, None] * main_grid[None, None, None, :, None]
+    side_macros = arrays.macros[options].T[None, :, :, None, None] * side_grid[None, None, None, None, :]
+    total = main_macros + side_macros  # (days, macro, options, main grid, side grid)
+    shape = (1, len(MACRO_COLUMNS), 1, 1, 1)
+    error = ((total - goal.reshape(shape)) * scale.reshape(shape)) ** 2
+    excess = np.maximum(total - limit.reshape(shape), 0.0) * scale.reshape(shape) * np.sqrt(LIMIT_WEIGHT)
+    scores = (error + excess ** 2).sum(axis=1).min(axis=(2, 3))
+    scores[mains[:, None] == options[None, :]] = np.inf
+    return scores
+
+
+def pick_daily_candidates(
+    arrays: FoodArrays, candidates: Dict[str, np.ndarray], days: int,
+    targets: Dict[str, float], meal_split: Dict[str, float], limits: Optional[Dict[str, float]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pick a main dish and a side for every meal of every day
+
+    Mains rotate through all candidates for variety. Each side is the
+    candidate that best fills the gap its main leaves to the meal's share of
+    the calorie, macro and limit targets (a protein-light main gets a
+    protein-dense side, a carb-heavy one a low-carb side); near-equal sides
+    take turns across days.
+
+    Args:
+        arrays: Food table as column arrays
+        candidates: Meal slot -> row indices of foods allowed in that slot
+        days: Number of days
+        targets: Daily targets keyed by MACRO_COLUMNS
+        meal_split: Meal slot -> fraction of daily calories
+        limits: Daily maximums keyed by MACRO_COLUMNS (e.g. carbs on Keto)
+
+    Returns:
+        Tuple of (rows, present): (days, 2 * len(MEAL_SLOTS)) row indices into
+        arrays, and a boolean mask of which of those columns hold a food
+    """
+    width = 2 * len(MEAL_SLOTS)
+    rows = np.zeros((days, width), dtype=np.int64)
+    present = np.zeros((days, width), dtype=bool)
+    day_numbers = np.arange(days)
+    goal = np.array([float(targets[c]) for c in MACRO_COLUMNS])
+    limit = _limit_vector(limits)
+
+    for slot_no, meal in enumerate(MEAL_SLOTS):
+        options = np.asarray(candidates.get(meal, ()), dtype=np.int64)
+        n = len(options)
+        if not n:
+            continue
+        # Snacks double as sides for every meal
+        sides = np.unique(np.concatenate([options, np.asarray(candidates.get(SIDE_SLOT, ()), dtype=np.int64)]))
+        share = meal_split[meal]
+        fit = (goal * share, _scales(targets, float(targets["calories"]) * share), limit * share)
+        if len(sides) > 1:
+            # Mains rotate through the better-fitting part of the options (with their best side)
+            main_fit = _side_scores(arrays, options, sides, *fit).min(axis=1)
+            pool = np.argsort(main_fit, kind="stable")[:max(2, int(np.ceil(n * MAIN_POOL_FRACTION)))]
+            options = options[np.sort(pool)]
+            n = len(options)
+        main_pos = (day_numbers * (slot_no + 1) + slot_no) % n
+        rows[:, 2 * slot_no] = options[main_pos]
+        present[:, 2 * slot_no] = True
+        if len(sides) < 2:
+            continue
+
+        scores = _side_scores(arrays, options[main_pos], sides, *fit)
+        best = scores.min(axis=1, keepdims=True)
+        good = scores <= best * (1 + SIDE_SCORE_SLACK) + 1e-9
+        # Good sides take turns by day, best first
+        order = np.argsort(scores, axis=1, kind="stable")
+        turn = day_numbers % good.sum(axis=1)
+        rows[:, 2 * slot_no + 1] = sides[order[day_numbers, turn]]
+        present[:, 2 * slot_no + 1] = True
+
+    return rows, present
+
+
+def _system(
+    arrays: FoodArrays, rows: np.ndarray, present: np.ndarray,
+    targets: Dict[str, float], meal_split: Dict[str, float]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Weighted least-squares system A x ~ b with residuals as fractions of daily calories"""
+    days, width = rows.shape
+    macros = arrays.macros[rows] * present[..., None]  # (days, width, 4)
+
+    calories = max(float(targets["calories"]), 1.0)
+    goal = np.array([float(targets[c]) for c in MACRO_COLUMNS])
+    macro_scale = _scales(targets, calories)
+    macro_rows = np.swapaxes(macros, 1, 2) * macro_scale[None, :, None]  # (days, 4, width)
+
+    slot_of_column = np.repeat(np.arange(len(MEAL_SLOTS)), 2)
+    shares = np.array([meal_split[m] for m in MEAL_SLOTS]) * calories
+    onehot = (np.arange(len(MEAL_SLOTS))[:, None] == slot_of_column[None, :]).astype(np.float64)
+    slot_rows = onehot[None] * macros[:, None, :, 0] * (np.sqrt(MEAL_BALANCE_WEIGHT) / shares)[None, :, None]
+
+    A = np.concatenate([macro_rows, slot_rows], axis=1)
+    b = np.concatenate([
+        goal * macro_scale,
+        np.full(len(MEAL_SLOTS), np.sqrt(MEAL_BALANCE_WEIGHT)),
+    ])
+    return A, np.broadcast_to(b, (days, len(b)))
+
+
+def _limit_system(
+    arrays: FoodArrays, rows: np.ndarray, present: np.ndarray,
+    targets: Dict[str, float], limits: Optional[Dict[str, float]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Penalty system C x <= d for the limited macros, scaled like _system (empty without limits)"""
+    limit = _limit_vector(limits)
+    limited = np.flatnonzero(np.isfinite(limit))
+    macros = arrays.macros[rows] * present[..., None]
+    scale = _scales(targets, float(targets["calories"]))[limited] * np.sqrt(LIMIT_WEIGHT)
+    C = np.swapaxes(macros[..., limited], 1, 2) * scale[None, :, None]  # (days, limits, width)
+    return C, limit[limited] * scale
+
+
+def _objective(A: np.ndarray, b: np.ndarray, x: np.ndarray, C: np.ndarray, d: np.ndarray) -> np.ndarray:
+    residual = np.einsum("drw,d...w->d...r", A, x) - b.reshape(b.shape[:1] + (1,) * (x.ndim - 2) + b.shape[1:])
+    excess = np.maximum(np.einsum("drw,d...w->d...r", C, x) - d, 0.0)
+    return np.sum(residual ** 2, axis=-1) + np.sum(excess ** 2, axis=-1)
+
+
+def _enforce_limits(x: np.ndarray, C: np.ndarray, d: np.ndarray, lower: np.ndarray) -> np.ndarray:
+    """Step servings down, richest in the limited macro first, until every day is within its limits"""
+    for day in range(x.shape[0]):
+        for _ in range(int(x[day].sum() / SERVING_STEP) + 1):
+            over = C[day] @ x[day] - d > 1e-9
+            if not over.any():
+                break
+            content = np.where(x[day] - SERVING_STEP >= lower[day] - 1e-9, C[day][over].sum(axis=0), -np.inf)
+            column = int(np.argmax(content))
+            if content[column] <= 0:
+                break  # every dish is at its minimum
+            x[day, column] -= SERVING_STEP
+    return x
+
+
+def solve_servings(
+    arrays: FoodArrays, rows: np.ndarray, present: np.ndarray,
+    targets: Dict[str, float], meal_split: Dict[str, float], limits: Optional[Dict[str, float]] = None,
+) -> np.ndarray:
+    """
+    Solve serving sizes for all days at once
+
+    Minimizes the weighted relative error of the daily calorie and macro totals
+    (plus a small penalty for meals drifting from their calorie share, and a
+    large one for exceeding a limit) subject to per-dish serving bounds, using
+    accelerated projected gradient descent. After rounding, servings are cut
+    until every limit holds, unless every dish is already at its minimum.
+
+    Args:
+        arrays: Food table as column arrays
+        rows: (days, width) row indices from pick_daily_candidates
+        present: (days, width) mask of columns that hold a food
+        targets: Daily targets keyed by MACRO_COLUMNS
+        meal_split: Meal slot -> fraction of daily calories
+        limits: Daily maximums keyed by MACRO_COLUMNS
+
+    Returns:
+        (days, width) servings in SERVING_STEP increments, 0 where absent
+    """
+    days, width = rows.shape
+    if not days:
+        return np.zeros((0, width))
+    A, b = _system(arrays, rows, present, targets, meal_split)
+    C, d = _limit_system(arrays, rows, present, targets, limits)
+
+    is_main = (np.arange(width) % 2 == 0)[None, :]
+    lower = np.where(is_main, MAIN_SERVINGS[0], SIDE_SERVINGS[0]) * present
+    upper = np.where(is_main, MAIN_SERVINGS[1], SIDE_SERVINGS[1]) * present
+
+    # Step size from the largest eigenvalue of A^T A (the gradient's Lipschitz constant)
+    AtA = np.einsum("drw,drv->dwv", A, A)
+    Atb = np.einsum("drw,dr->dw", A, b)
+    CtC = np.einsum("drw,drv->dwv", C, C)
+    lipschitz = np.maximum(np.linalg.eigvalsh(AtA + CtC)[:, -1], 1e-9)[:, None]
+
+    x = np.clip(np.where(is_main, 1.0, 0.0), lower, upper)
+    y, t = x.copy(), 1.0
+    for _ in range(SOLVER_ITERATIONS):
+        excess = np.maximum(np.einsum("drw,dw->dr", C, y) - d, 0.0)
+        gradient = np.einsum("dwv,dv->dw", AtA, y) - Atb + np.einsum("drw,dr->dw", C, excess)
+        x_next = np.clip(y - gradient / lipschitz, lower, upper)
+        t_next = (1.0 + np.sqrt(1.0 + 4.0 * t * t)) / 2.0
+        y = x_next + ((t - 1.0) / t_next) * (x_next - x)
+        x, t = x_next, t_next
+
+    # Snap to the serving grid, then greedily apply the best single-step change
+    # per day until no step improves the objective
+    x = np.clip(np.round(x / SERVING_STEP) * SERVING_STEP, lower, upper)
+    moves = np.concatenate([np.eye(width), -np.eye(width)]) * SERVING_STEP  # (2 * width, width)
+    for _ in range(ROUNDING_PASSES):
+        trial = np.clip(x[:, None, :] + moves[None], lower[:, None, :], upper[:, None, :])
+        scores = _objective(A, b, trial, C, d)  # (days, 2 * width)
+        best = np.argmin(scores, axis=1)
+        improved = scores[np.arange(days), best] < _objective(A, b, x, C, d) - 1e-12
+        if not improved.any():
+            break
+        x[improved] = trial[np.arange(days), best][improved]
+    return _enforce_limits(x, C, d, lower) if len(d) else x
+
+
+def plan_meals(
+    arrays: FoodArrays, candidates: Dict[str, np.ndarray], targets: Dict[str, float],
+    meal_split: Dict[str, float], days: int, limits: Optional[Dict[str, float]] = None,
+) -> List[Dict[str, List[Tuple[int, float]]]]:
+    """
+    Build a macro-balanced meal plan
+
+    Args:
+        arrays: Food table as column arrays
+        candidates: Meal slot -> row indices of foods allowed in that slot
+        targets: Daily targets keyed by MACRO_COLUMNS
+        meal_split: Meal slot -> fraction of daily calories
+        days: Number of days
+        limits: Daily maximums keyed by MACRO_COLUMNS (e.g. carbs on Keto)
+
+    Returns:
+        Per day, meal slot -> list of (row index, servings) with servings > 0
+    """
+    rows, present = pick_daily_candidates(arrays, candidates, days, targets, meal_split, limits)
+    servings = solve_servings(arrays, rows, present, targets, meal_split, limits)
+
+    plan = []
+    for day in range(days):
+        meals = {}
+        for slot_no, meal in enumerate(MEAL_SLOTS):
+            columns = (2 * slot_no, 2 * slot_no + 1)
+            meals[meal] = [
+                (int(rows[day, c]), float(servings[day, c]))
+                for c in columns if present[day, c] and servings[day, c] > 0
+            ]
+        plan.append(meals)
+    return plan
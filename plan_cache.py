@@ -0,0 +1,288 @@
+"""
+Similarity cache for generated plans
+
+Profiles are quantized into canonical buckets (BMI band, age band, goal,
+equipment set, time band, diet, ...) so near-identical users share one Gemini
+plan. Cached plans are stored as skeletons with the user's name replaced by a
+placeholder and are re-personalized on a hit: the name is restored and the
+meal plan is re-solved locally for the exact profile.
+"""
+
+import copy
+import dataclasses
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+import config
+from food_db import parse_exclusions
+from plan_engine import available_equipment, build_nutrition_plan, plan_duration
+from plan_models import to_plain
+from shared_store import SharedStore, get_shared_store, multi_process_mode
+
+
+NAME_PLACEHOLDER = "<<name>>"
+
+
+@dataclass(frozen=True)
+class CacheTolerance:
+    """Bucket widths; wider buckets mean more hits and less personal plans"""
+    bmi_band: float = config.PLAN_CACHE_BMI_BAND
+    age_band: int = config.PLAN_CACHE_AGE_BAND  # years
+    time_band: int = config.PLAN_CACHE_TIME_BAND  # minutes
+
+
+def _band(value: float, width: float) -> int:
+    return int(float(value) // width) if width > 0 else 0
+
+
+def _terms(text: Optional[str]) -> Tuple[str, ...]:
+    return tuple(sorted(set(parse_exclusions(text))))
+
+
+def profile_bucket(user_profile: Dict[str, Any], tolerance: CacheTolerance = CacheTolerance()) -> Tuple:
+    """
+    Quantize a profile into its canonical cache key
+
+    Numeric fields are banded; safety-relevant free text (injuries, allergies,
+    dislikes) must match exactly after normalization.
+
+    Args:
+        user_profile: Profile dict as collected by enhanced_sidebar_form
+        tolerance: Bucket widths
+
+    Returns:
+        Hashable bucket key
+    """
+    return (
+        _band(user_profile.get("bmi", 22), tolerance.bmi_band),
+        _band(user_profile.get("age", 25), tolerance.age_band),
+        _band(user_profile.get("time_available", 45), tolerance.time_band),
+        user_profile.get("gender"),
+        user_profile.get("goal"),
+        (user_profile.get("experience") or "").split(" ")[0],
+        user_profile.get("workout_frequency"),
+        plan_duration(user_profile),
+        tuple(sorted(available_equipment(user_profile.get("equipment", "")))),
+        user_profile.get("dietary_pref"),
+        user_profile.get("cultural_food"),
+        user_profile.get("budget"),
+        _terms(user_profile.get("allergies")),
+        _terms(user_profile.get("dislikes")),
+        _terms(user_profile.get("injuries")),
+    )
+
+
+def _replace_strings(value: Any, replace) -> Any:
+    """Apply replace() to every string inside dicts, lists and dataclasses"""
+    if isinstance(value, str):
+        return replace(value)
+    if isinstance(value, dict):
+        return {k: _replace_strings(v, replace) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_replace_strings(v, replace) for v in value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.replace(value, **{
+            f.name: _replace_strings(getattr(value, f.name), replace) for f in dataclasses.fields(value)
+        })
+    return value
+
+
+def _name_pattern(name: str) -> Optional["re.Pattern"]:
+    name = (name or "").strip()
+    if len(name) < 2:
+        return None
+    return re.compile(r"\b" + re.escape(name) + r"\b")
+
+
+def replace_name(value: Any, old_name: Optional[str], new_name: str) -> Any:
+    """
+    Replace whole-word mentions of a user's name throughout a plan or section
+
+    Args:
+        value: Plan, section or any nesting of dicts, lists and dataclasses
+        old_name: Name to replace (names shorter than 2 characters are left alone)
+        new_name: Replacement
+
+    Returns:
+        Copy with the name replaced
+    """
+    pattern = _name_pattern(old_name)
+    if pattern is None:
+        return copy.deepcopy(value)
+    return _replace_strings(value, lambda s: pattern.sub(new_name, s))
+
+
+def make_skeleton(plan: Dict[str, Any], user_profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip the user's name from a plan so it can be served to other users"""
+    return replace_name(plan, user_profile.get("name"), NAME_PLACEHOLDER)
+
+
+def personalize(skeleton: Dict[str, Any], user_profile: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Turn a cached skeleton into a plan for this exact profile
+
+    Args:
+        skeleton: Plan stored by make_skeleton
+        user_profile: Profile the plan is served to
+
+    Returns:
+        New plan dict; the skeleton is not modified
+    """
+    name = (user_profile.get("name") or "").strip() or "there"
+    plan = _replace_strings(skeleton, lambda s: s.replace(NAME_PLACEHOLDER, name))
+
+    # Portions depend on exact weight/height, and solving them is cheap
+    cached_nutrition = plan.get("nutrition_plan") or {}
+    nutrition_plan = build_nutrition_plan(
+        user_profile, cached_nutrition.get("duration_days", config.DEFAULT_PLAN_DURATION)
+    )
+    if cached_nutrition.get("guidance"):
+        nutrition_plan["guidance"] = cached_nutrition["guidance"]
+    plan["nutrition_plan"] = nutrition_plan
+    plan["generated_at"] = datetime.now().isoformat()
+    return plan
+
+
+class PlanCache:
+    """Thread-safe LRU cache of plan skeletons keyed by profile bucket"""
+
+    def __init__(
+        self,
+        max_entries: int = config.PLAN_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = config.PLAN_CACHE_TTL,
+        tolerance: CacheTolerance = CacheTolerance(),
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.tolerance = tolerance
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_profile: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Look up a plan for a profile
+
+        Args:
+            user_profile: Profile dict as collected by enhanced_sidebar_form
+
+        Returns:
+            Personalized plan, or None on a miss
+        """
+        key = profile_bucket(user_profile, self.tolerance)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            skeleton = entry[1]
+
+        plan = personalize(skeleton, user_profile)
+        plan["cache_hit"] = True
+        return plan
+
+    def put(self, user_profile: Dict[str, Any], plan: Dict[str, Any]):
+        """
+        Store a plan for a profile's bucket
+
+        Args:
+            user_profile: Profile the plan was generated for
+            plan: Generated plan
+        """
+        key = profile_bucket(user_profile, self.tolerance)
+        skeleton = make_skeleton(plan, user_profile)
+        with self._lock:
+            self._entries[key] = (time.time(), skeleton)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit-rate metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class SharedPlanCache(PlanCache):
+    """
+    Plan cache kept in the node-wide SQLite store
+
+    Used in multi-process deployments so every worker serves (and counts
+    hits for) the same entries. Skeletons are stored as JSON, so dataclass
+    values such as AIInsight come back as plain dicts.
+    """
+
+    NAMESPACE = "plan_cache"
+    STATS_NAMESPACE = "plan_cache_stats"
+
+    def __init__(self, store: Optional[SharedStore] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store or get_shared_store()
+
+    def _key(self, user_profile: Dict[str, Any]) -> str:
+        bucket = profile_bucket(user_profile, self.tolerance)
+        return hashlib.sha256(repr(bucket).encode("utf-8")).hexdigest()
+
+    def get(self, user_profile: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        payload = self.store.get(self.NAMESPACE, self._key(user_profile))
+        if payload is None:
+            self.store.incr(self.STATS_NAMESPACE, "misses")
+            return None
+        self.store.incr(self.STATS_NAMESPACE, "hits")
+        plan = personalize(json.loads(payload.decode("utf-8")), user_profile)
+        plan["cache_hit"] = True
+        return plan
+
+    def put(self, user_profile: Dict[str, Any], plan: Dict[str, Any]):
+        skeleton = {key: to_plain(value) for key, value in make_skeleton(plan, user_profile).items()}
+        payload = json.dumps(skeleton, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        self.store.set(self.NAMESPACE, self._key(user_profile), payload, ttl=self.ttl_seconds)
+        self.store.trim(self.NAMESPACE, self.max_entries)
+
+    def clear(self):
+        self.store.delete(self.NAMESPACE)
+        self.store.delete(self.STATS_NAMESPACE)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = int(self.store.get(self.STATS_NAMESPACE, "hits") or 0)
+        misses = int(self.store.get(self.STATS_NAMESPACE, "misses") or 0)
+        lookups = hits + misses
+        return {
+            "entries": self.store.count(self.NAMESPACE),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_plan_cache() -> PlanCache:
+    """Return the plan cache shared by every session (node-wide in multi-process mode)"""
+    return SharedPlanCache() if multi_process_mode() else PlanCache()
@@ -0,0 +1,151 @@
+"""
+Week-by-week chunking for long workout plans
+
+A 30-day plan does not fit in one bounded completion, so workout plans are
+requested a week at a time. The local plan engine lays out the whole plan
+first (schedule, split and the progressive-overload volume for every week);
+each week's request then carries that week's skeleton plus a one-line summary
+of every earlier week. Because the summaries come from the skeleton rather
+than from earlier responses, the weeks can be requested in parallel and
+stitched back together in order.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from exercise_catalog import get_exercise_index
+from plan_engine import WORK_SECONDS_PER_SET
+
+
+def week_ranges(day_count: int, chunk_days: int = config.PLAN_CHUNK_DAYS) -> List[Tuple[int, int]]:
+    """
+    Split a plan into chunks
+
+    Args:
+        day_count: Plan length in days
+        chunk_days: Days per chunk
+
+    Returns:
+        List of 0-based (start, end) day ranges, end exclusive
+    """
+    return [(start, min(start + chunk_days, day_count)) for start in range(0, day_count, chunk_days)]
+
+
+def _volume(day: Dict[str, Any]) -> str:
+    ex = day["exercises"][0] if day.get("exercises") else None
+    if ex is None:
+        return ""
+    reps = f"{ex['reps']} reps" if ex["reps"] else f"{ex['work_seconds']} s"
+    return f"{ex['sets']} x {reps}, rest {ex['rest_seconds']} s"
+
+
+def summarize_week(week_no: int, days: List[Dict[str, Any]]) -> str:
+    """One-line summary of a week of plan_engine days, e.g. for progressive overload context"""
+    sessions = [day for day in days if day["type"] == "workout"]
+    if not sessions:
+        return f"Week {week_no}: rest"
+    focuses = "/".join(day["focus"] for day in sessions)
+    return f"Week {week_no}: {len(sessions)} sessions ({focuses}), {_volume(sessions[0])}"
+
+
+def week_skeleton(days: List[Dict[str, Any]]) -> str:
+    """Day-by-day outline of one week for the request prompt"""
+    lines = []
+    for day in days:
+        if day["type"] == "rest":
+            lines.append(f"- Day {day['day']} ({day['weekday']}): rest")
+        else:
+            lines.append(f"- Day {day['day']} ({day['weekday']}): {day['focus']}, "
+                         f"{len(day['exercises'])} exercises, {_volume(day)}")
+    return "\n".join(lines)
+
+
+def parse_week_response(response: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Extract the day list from a week response
+
+    Args:
+        response: Model output, a JSON object with a "days" list (optionally fenced)
+
+    Returns:
+        List of day dicts, or None if the response is not usable
+    """
+    text = response or ""
+    if "```json" in text:
+        start = text.find("```json") + 7
+        text = text[start:text.find("```", start)]
+    else:
+        text = text[text.find("{"):text.rfind("}") + 1]
+    try:
+        days = json.loads(text).get("days")
+    except (ValueError, AttributeError):
+        return None
+    return days if isinstance(days, list) else None
+
+
+def _exercise(entry: Dict[str, Any], template: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """An AI exercise entry in the plan_engine layout, with defaults from the skeleton day"""
+    name = entry.get("name") if isinstance(entry, dict) else None
+    if not isinstance(name, str) or not name.strip():
+        return None
+    known = get_exercise_index().get(name.strip())
+    try:
+        sets = int(entry.get("sets") or template["sets"])
+        reps = int(entry["reps"]) if entry.get("reps") else None
+        rest_seconds = int(entry.get("rest_seconds") or template["rest_seconds"])
+    except (TypeError, ValueError):
+        return None
+    return {
+        "name": known.name if known else name.strip(),
+        "category": known.category if known else template["category"],
+        "sets": sets,
+        "reps": reps,
+        "work_seconds": None if reps else WORK_SECONDS_PER_SET,
+        "rest_seconds": rest_seconds,
+        "muscle_groups": list(known.muscle_groups) if known else [],
+        "equipment": list(known.equipment) if known else [],
+        "minutes": round(sets * (WORK_SECONDS_PER_SET + rest_seconds) / 60.0, 1),
+    }
+
+
+def merge_week(skeleton_days: List[Dict[str, Any]], ai_days: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Apply the exercises from a week response to the skeleton days
+
+    Schedule, focus and time estimates stay as planned; only the exercise
+    selection and volume of training days come from the response. Days are
+    matched by their plan-wide number; a response that numbers the week's
+    days from 1 instead (none of its numbers is in the week) is shifted to
+    the week's first day.
+
+    Args:
+        skeleton_days: The week's days from plan_engine.build_workout_plan
+        ai_days: Days parsed by parse_week_response
+
+    Returns:
+        Merged days, or None if the response matched no training day
+    """
+    by_day = {}
+    for ai_day in ai_days:
+        try:
+            by_day[int(ai_day.get("day"))] = ai_day
+        except (AttributeError, TypeError, ValueError):
+            continue
+    if skeleton_days and not by_day.keys() & {day["day"] for day in skeleton_days}:
+        offset = skeleton_days[0]["day"] - 1
+        by_day = {number + offset: ai_day for number, ai_day in by_day.items()}
+    merged, matched = [], 0
+    for day in skeleton_days:
+        ai_day = by_day.get(day["day"])
+        if day["type"] != "workout" or not ai_day or not day["exercises"]:
+            merged.append(day)
+            continue
+        template = day["exercises"][0]
+        exercises = [ex for ex in (_exercise(e, template) for e in ai_day.get("exercises") or []) if ex]
+        if not exercises:
+            merged.append(day)
+            continue
+        merged.append(dict(day, exercises=exercises))
+        matched += 1
+    return merged if matched else None
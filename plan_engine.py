@@ -0,0 +1,576 @@
+"""
+Deterministic rule-based plan engine for the AI-Powered Workout & Diet Planner
+
+Builds 7-30 day workout and meal plans from the sidebar profile, the health
+calculators in health_metrics and the bundled exercise and food tables. It needs no
+network access and runs in milliseconds, so it serves both as the degraded-mode
+fallback when Gemini fails and as an instant first draft.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+import config
+from exercise_catalog import Exercise, get_exercise_index
+from food_db import MEAL_SLOTS, Food, FoodArrays, get_food_arrays
+from health_metrics import activity_level, profile_metrics
+from meal_solver import plan_meals
+from utils import generate_weekly_schedule
+
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Session focus sequence by number of training days per week
+WEEKLY_SPLITS = {
+    3: ["Full Body", "Full Body", "Full Body"],
+    4: ["Upper Body", "Lower Body", "Upper Body", "Lower Body"],
+    5: ["Push", "Pull", "Legs", "Upper Body", "Lower Body"],
+    6: ["Push", "Pull", "Legs", "Push", "Pull", "Legs"],
+    7: ["Push", "Pull", "Legs", "Core & Conditioning", "Upper Body", "Lower Body", "Active Recovery"],
+}
+
+# Focus -> (exercise categories, target muscle groups in priority order)
+FOCUS_TARGETS = {
+    "Full Body": (("strength", "core"), ["quads", "chest", "back", "glutes", "shoulders", "hamstrings", "abs", "triceps"]),
+    "Upper Body": (("strength",), ["chest", "back", "shoulders", "lats", "biceps", "triceps", "upper back"]),
+    "Lower Body": (("strength",), ["quads", "glutes", "hamstrings", "calves", "adductors"]),
+    "Push": (("strength",), ["chest", "shoulders", "triceps", "upper chest"]),
+    "Pull": (("strength",), ["back", "lats", "biceps", "rear delts", "upper back", "traps"]),
+    "Legs": (("strength",), ["quads", "glutes", "hamstrings", "calves"]),
+    "Core & Conditioning": (("core", "cardio"), ["abs", "obliques", "core", "full body"]),
+    "Cardio Endurance": (("cardio",), ["full body", "legs", "core", "calves"]),
+    "Active Recovery": (("mobility", "flexibility"), ["hips", "hamstrings", "spine", "shoulders"]),
+}
+
+# Goal -> (base reps, rest seconds)
+GOAL_SCHEMES = {
+    "Weight Loss": (12, 45),
+    "Muscle Gain": (10, 75),
+    "Maintain Fitness": (12, 60),
+    "Improve Endurance": (15, 40),
+    "Build Strength": (5, 150),
+    "General Health": (12, 60),
+}
+
+# Experience prefix -> base sets
+EXPERIENCE_SETS = {
+    "Beginner": 2,
+    "Intermediate": 3,
+    "Advanced": 4,
+}
+
+# Approximate MET values by exercise category
+CATEGORY_METS = {
+    "strength": 5.0,
+    "core": 4.0,
+    "cardio": 8.0,
+    "plyometric": 8.0,
+    "mobility": 2.5,
+    "flexibility": 2.5,
+}
+
+# Injury keyword -> exercise name fragments to avoid
+INJURY_EXCLUSIONS = {
+    "knee": ("jump", "lunge", "pistol", "sprint", "burpee", "box"),
+    "back": ("deadlift", "good morning", "bent-over", "swing", "rack pull", "snatch", "clean"),
+    "shoulder": ("overhead", "handstand", "military", "snatch", "push press", "dip"),
+    "wrist": ("push-up", "plank", "crow", "handstand", "burpee"),
+}
+
+# Skill movements only programmed for advanced trainees
+ADVANCED_ONLY = (
+    "muscle-up", "handstand", "pistol", "l-sit", "archer", "toes-to-bar", "nordic",
+    "snatch", "clean and jerk", "overhead squat", "rope climb", "crow pose", "dead hang",
+)
+
+# Protein grams per kg of body weight by goal
+PROTEIN_PER_KG = {
+    "Weight Loss": 1.8,
+    "Muscle Gain": 2.0,
+    "Build Strength": 1.8,
+    "Improve Endurance": 1.4,
+}
+
+# Share of daily calories from fat by diet (default 27%); Keto fills everything but protein and carbs with fat
+FAT_SHARE = {
+    "Paleo": 0.35,
+}
+# Minimum share of daily calories from protein by diet (Paleo relies on meat, fish and eggs, not grains)
+MIN_PROTEIN_SHARE = {
+    "Paleo": 0.25,
+}
+
+# Share of daily calories per meal slot
+MEAL_CALORIE_SPLIT = {
+    "breakfast": 0.25,
+    "lunch": 0.35,
+    "dinner": 0.30,
+    "snack": 0.10,
+}
+
+# Name fragments of isometric/carry movements prescribed by time, not reps
+TIMED_FRAGMENTS = ("plank", "hold", "wall sit", "hang", "carry", "l-sit")
+
+WARM_UP_MINUTES = 5
+COOL_DOWN_MINUTES = 5
+WORK_SECONDS_PER_SET = 45
+
+
+def available_equipment(equipment: str) -> Set[str]:
+    """
+    Expand the sidebar equipment string into the set of usable equipment
+
+    Args:
+        equipment: Comma-separated values from config.EQUIPMENT_OPTIONS
+
+    Returns:
+        Set of equipment values, always including bodyweight ("None")
+    """
+    items = {e.strip() for e in (equipment or "").split(",") if e.strip()}
+    items.add("None")
+    if "Gym Access" in items:
+        items.update(["Dumbbells", "Kettlebell", "Resistance Bands", "Pull-up Bar", "Yoga Mat"])
+    return items
+
+
+def plan_duration(user_profile: Dict[str, Any]) -> int:
+    """Requested plan length in days, clamped to DEFAULT..MAX_PLAN_DURATION"""
+    days = int(user_profile.get("plan_days") or config.DEFAULT_PLAN_DURATION)
+    return max(config.DEFAULT_PLAN_DURATION, min(days, config.MAX_PLAN_DURATION))
+
+
+def _experience_key(experience: str) -> str:
+    for key in EXPERIENCE_SETS:
+        if (experience or "").startswith(key):
+            return key
+    return "Beginner"
+
+
+def _weekly_focuses(goal: str, days_per_week: int) -> List[str]:
+    focuses = list(WEEKLY_SPLITS.get(days_per_week, WEEKLY_SPLITS[3]))
+    if goal == "Improve Endurance":
+        focuses = [f if i % 2 == 0 else "Cardio Endurance" for i, f in enumerate(focuses)]
+    elif goal in ("Weight Loss", "General Health") and days_per_week >= 4:
+        focuses[-1] = "Core & Conditioning"
+    return focuses
+
+
+def _exercise_allowed(exercise: Exercise, equipment: Set[str], experience: str, injuries: str) -> bool:
+    if not set(exercise.equipment) <= equipment:
+        return False
+    if experience == "Beginner" and exercise.category == "plyometric":
+        return False
+    name = exercise.name.lower()
+    if experience != "Advanced" and any(f in name for f in ADVANCED_ONLY):
+        return False
+    for keyword, fragments in INJURY_EXCLUSIONS.items():
+        if keyword in injuries and any(f in name for f in fragments):
+            return False
+    return True
+
+
+def _select_exercises(
+    focus: str,
+    pool: List[Exercise],
+    count: int,
+    rotation: int,
+    prefer_equipment: Set[str],
+) -> List[Exercise]:
+    """Pick ``count`` exercises covering the focus muscles, rotating choices by ``rotation``"""
+    categories, muscles = FOCUS_TARGETS[focus]
+    candidates = [ex for ex in pool if ex.category in categories]
+    # Prefer movements that use the user's equipment over bodyweight-only ones
+    candidates.sort(key=lambda ex: 0 if set(ex.equipment) & prefer_equipment else 1)
+
+    # Match on the primary (first-listed) muscle so e.g. a chest slot gets a press, not a muscle-up
+    by_muscle = {m: [ex for ex in candidates if ex.muscle_groups[0] == m] for m in muscles}
+    chosen: List[Exercise] = []
+    chosen_names = set()
+    order = muscles[rotation % len(muscles):] + muscles[:rotation % len(muscles)]
+
+    for round_no in range(count):
+        progressed = False
+        for muscle in order:
+            if len(chosen) >= count:
+                break
+            options = [ex for ex in by_muscle[muscle] if ex.name not in chosen_names]
+            if not options:
+                continue
+            pick = options[(rotation + round_no) % len(options)]
+            chosen.append(pick)
+            chosen_names.add(pick.name)
+            progressed = True
+        if len(chosen) >= count or not progressed:
+            break
+
+    if len(chosen) < count:
+        for ex in candidates:
+            if len(chosen) >= count:
+                break
+            if ex.name not in chosen_names:
+                chosen.append(ex)
+                chosen_names.add(ex.name)
+    return chosen
+
+
+def _session_calories(exercises: List[Dict[str, Any]], weight_kg: float) -> int:
+    kcal = 0.0
+    for ex in exercises:
+        minutes = ex["minutes"]
+        kcal += CATEGORY_METS.get(ex["category"], 4.0) * weight_kg * minutes / 60.0
+    return int(round(kcal))
+
+
+def build_workout_plan(user_profile: Dict[str, Any], days: int = config.DEFAULT_PLAN_DURATION) -> Dict[str, Any]:
+    """
+    Build a deterministic multi-day workout plan
+
+    Args:
+        user_profile: Profile dict as collected by enhanced_sidebar_form
+        days: Plan length in days (clamped to DEFAULT..MAX_PLAN_DURATION)
+
+    Returns:
+        JSON-serializable workout plan
+    """
+    days = max(config.DEFAULT_PLAN_DURATION, min(int(days), config.MAX_PLAN_DURATION))
+    goal = user_profile.get("goal", "General Health")
+    experience = _experience_key(user_profile.get("experience", ""))
+    injuries = (user_profile.get("injuries") or "").lower()
+    weight_kg = float(user_profile.get("weight_kg", 70))
+    time_available = int(user_profile.get("time_available", 45))
+    equipment = available_equipment(user_profile.get("equipment", ""))
+    prefer_equipment = equipment - {"None", "Yoga Mat"}
+
+    schedule = generate_weekly_schedule(user_profile.get("workout_frequency", "3 days/week"))
+    focuses = _weekly_focuses(goal, len(schedule))
+    base_reps, rest_seconds = GOAL_SCHEMES.get(goal, GOAL_SCHEMES["General Health"])
+    base_sets = EXPERIENCE_SETS[experience]
+
+    catalogue = get_exercise_index().exercises
+    pool = [ex for ex in catalogue if _exercise_allowed(ex, equipment, experience, injuries)]
+    # Stretches and mobility drills only need floor space, mat or not
+    floor_equipment = equipment | {"Yoga Mat"}
+    warm_up_pool = [ex for ex in catalogue if ex.category == "mobility"
+                    and _exercise_allowed(ex, floor_equipment, experience, injuries)]
+    cool_down_pool = [ex for ex in catalogue if ex.category == "flexibility"
+                      and _exercise_allowed(ex, floor_equipment, experience, injuries)]
+
+    plan_days = []
+    for day in range(days):
+        week = day // 7
+        weekday = WEEKDAYS[day % 7]
+        warm_up = [warm_up_pool[(day + i) % len(warm_up_pool)].name for i in range(2)] if warm_up_pool else []
+        cool_down = [cool_down_pool[(day + i) % len(cool_down_pool)].name for i in range(2)] if cool_down_pool else []
+
+        if weekday not in schedule:
+            plan_days.append({
+                "day": day + 1,
+                "week": week + 1,
+                "weekday": weekday,
+                "type": "rest",
+                "focus": "Rest & Recovery",
+                "activities": ["Brisk Walking (20-30 min)"] + cool_down,
+                "duration_minutes": 30,
+                "estimated_calories": int(round(3.5 * weight_kg * 0.5)),
+            })
+            continue
+
+        focus = focuses[schedule.index(weekday) % len(focuses)]
+        # Progressive overload: +1 rep per week (max +3), +1 set from week 3
+        sets = base_sets + (1 if week >= 2 else 0)
+        reps = base_reps + min(week, 3)
+        minutes_per_exercise = sets * (WORK_SECONDS_PER_SET + rest_seconds) / 60.0
+        main_minutes = max(time_available - WARM_UP_MINUTES - COOL_DOWN_MINUTES, 5)
+        count = max(2, min(8, int(main_minutes // minutes_per_exercise)))
+
+        selected = _select_exercises(focus, pool, count, day, prefer_equipment)
+        exercises = []
+        for ex in selected:
+            timed = (ex.category in ("cardio", "mobility", "flexibility")
+                     or any(f in ex.name.lower() for f in TIMED_FRAGMENTS))
+            exercises.append({
+                "name": ex.name,
+                "category": ex.category,
+                "sets": sets,
+                "reps": None if timed else reps,
+                "work_seconds": WORK_SECONDS_PER_SET if timed else None,
+                "rest_seconds": rest_seconds,
+                "muscle_groups": list(ex.muscle_groups),
+                "equipment": list(ex.equipment),
+                "minutes": round(minutes_per_exercise, 1),
+            })
+
+        plan_days.append({
+            "day": day + 1,
+            "week": week + 1,
+            "weekday": weekday,
+            "type": "workout",
+            "focus": focus,
+            "warm_up": warm_up,
+            "exercises": exercises,
+            "cool_down": cool_down,
+            "duration_minutes": min(time_available, int(round(
+                WARM_UP_MINUTES + COOL_DOWN_MINUTES + sum(e["minutes"] for e in exercises)
+            ))),
+            "estimated_calories": _session_calories(exercises, weight_kg),
+        })
+
+    return {
+        "duration_days": days,
+        "schedule": schedule,
+        "split": focuses,
+        "difficulty": experience,
+        "days": plan_days,
+        "notes": [
+            "Warm up before and stretch after every session.",
+            "Add one rep per set each week; add a set from week 3 if form stays solid.",
+            "Stop any exercise that causes pain and consult a professional.",
+        ],
+    }
+
+
+def calculate_nutrition_targets(user_profile: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Calculate daily calorie and macronutrient targets for a profile
+
+    Args:
+        user_profile: Profile dict as collected by enhanced_sidebar_form
+
+    Returns:
+        Dictionary with calories, protein_g, carbs_g, fat_g and the activity level used
+    """
+    weight_kg = float(user_profile.get("weight_kg", 70))
+    activity = activity_level(user_profile.get("workout_frequency", ""))
+    metrics = profile_metrics(float(user_profile.get("height_cm", 170)), weight_kg, int(user_profile.get("age", 25)),
+                              user_profile.get("gender", "Other"), activity,
+                              user_profile.get("goal", "General Health"))
+    calories = max(metrics.daily_calories, 1200)
+
+    diet = user_profile.get("dietary_pref")
+    protein_g = round(max(weight_kg * PROTEIN_PER_KG.get(user_profile.get("goal"), 1.4),
+                          calories * MIN_PROTEIN_SHARE.get(diet, 0.0) / 4))
+    if diet == "Keto":
+        carbs_g = 30
+        fat_g = round(max(calories - protein_g * 4 - carbs_g * 4, 0) / 9)
+    else:
+        fat_g = round(calories * FAT_SHARE.get(diet, 0.27) / 9)
+        carbs_g = round(max(calories - protein_g * 4 - fat_g * 9, 0) / 4)
+
+    return {
+        "calories": int(calories),
+        "protein_g": int(protein_g),
+        "carbs_g": int(carbs_g),
+        "fat_g": int(fat_g),
+        "bmr": metrics.bmr,
+        "tdee": metrics.tdee,
+        "activity_level": activity,
+    }
+
+
+def _meal_candidates(user_profile: Dict[str, Any], arrays: FoodArrays, meal: str) -> Tuple[np.ndarray, bool]:
+    """
+    Food rows for a slot, relaxing cuisine when too few match
+
+    Budget stays a hard filter unless no food of the slot fits it at all.
+
+    Returns:
+        Tuple of (rows, whether the budget had to be relaxed)
+    """
+    base = dict(
+        dietary_pref=user_profile.get("dietary_pref"),
+        allergies=user_profile.get("allergies"),
+        dislikes=user_profile.get("dislikes"),
+        meal=meal,
+    )
+    budget = user_profile.get("budget")
+    rows = np.flatnonzero(arrays.mask(cuisine=user_profile.get("cultural_food"), budget=budget, **base))
+    if len(rows) < 2:
+        rows = np.flatnonzero(arrays.mask(cuisine=None, budget=budget, **base))
+    if len(rows) or not budget:
+        return rows, False
+    return np.flatnonzero(arrays.mask(cuisine=None, budget=None, **base)), True
+
+
+def _portion(food: Food, servings: float) -> Dict[str, Any]:
+    return {
+        "name": food.name,
+        "serving": food.serving,
+        "servings": servings,
+        "calories": int(round(food.calories * servings)),
+        "protein_g": round(food.protein_g * servings, 1),
+        "carbs_g": round(food.carbs_g * servings, 1),
+        "fat_g": round(food.fat_g * servings, 1),
+    }
+
+
+def build_nutrition_plan(user_profile: Dict[str, Any], days: int = config.DEFAULT_PLAN_DURATION) -> Dict[str, Any]:
+    """
+    Build a deterministic, macro-balanced multi-day meal plan from the bundled food table
+
+    Args:
+        user_profile: Profile dict as collected by enhanced_sidebar_form
+        days: Plan length in days (clamped to DEFAULT..MAX_PLAN_DURATION)
+
+    Returns:
+        JSON-serializable nutrition plan
+    """
+    days = max(config.DEFAULT_PLAN_DURATION, min(int(days), config.MAX_PLAN_DURATION))
+    targets = calculate_nutrition_targets(user_profile)
+    arrays = get_food_arrays()
+    candidates, relaxed = {}, []
+    for meal in MEAL_SLOTS:
+        candidates[meal], budget_relaxed = _meal_candidates(user_profile, arrays, meal)
+        if budget_relaxed:
+            relaxed.append(meal)
+    # Keto's carb target is a ceiling, not just an aim
+    limits = {"carbs_g": targets["carbs_g"]} if user_profile.get("dietary_pref") == "Keto" else None
+    solved = plan_meals(arrays, candidates, targets, MEAL_CALORIE_SPLIT, days, limits)
+
+    plan_days = []
+    shopping: Dict[str, float] = {}
+    for day, day_meals in enumerate(solved):
+        meals = {}
+        for meal, portions in day_meals.items():
+            meals[meal] = [_portion(arrays.foods[row], servings) for row, servings in portions]
+            if day < 7:
+                for row, servings in portions:
+                    name = arrays.foods[row].name
+                    shopping[name] = shopping.get(name, 0.0) + servings
+
+        items = [item for slot in meals.values() for item in slot]
+        plan_days.append({
+            "day": day + 1,
+            "weekday": WEEKDAYS[day % 7],
+            "meals": meals,
+            "totals": {
+                "calories": sum(i["calories"] for i in items),
+                "protein_g": round(sum(i["protein_g"] for i in items), 1),
+                "carbs_g": round(sum(i["carbs_g"] for i in items), 1),
+                "fat_g": round(sum(i["fat_g"] for i in items), 1),
+            },
+        })
+
+    weight_kg = float(user_profile.get("weight_kg", 70))
+    plan = {
+        "duration_days": days,
+        "targets": targets,
+        "hydration_liters": round(weight_kg * 0.035 + 0.5, 1),
+        "days": plan_days,
+        "shopping_list": [
+            {"name": name, "servings": servings} for name, servings in sorted(shopping.items())
+        ],
+    }
+    if relaxed:
+        plan["notes"] = [f"No {', '.join(relaxed)} foods fit your {user_profile.get('budget')} budget and "
+                         f"preferences, so these meals include pricier options."]
+    return plan
+
+
+def build_insights(user_profile: Dict[str, Any], targets: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Rule-based insights in the AIInsight field layout"""
+    bmi_cat = user_profile.get("bmi_cat", "Normal")
+    insights = [{
+        "type": "nutrition",
+        "title": "Daily Energy Target",
+        "description": (
+            f"Aim for about {targets['calories']} kcal/day with {targets['protein_g']} g protein "
+            f"(TDEE {int(targets['tdee'])} kcal at a {targets['activity_level'].lower()} activity level)."
+        ),
+        "confidence": 0.9,
+        "actionable": True,
+        "priority": "high",
+    }]
+    if bmi_cat != "Normal":
+        insights.append({
+            "type": "health",
+            "title": f"BMI: {bmi_cat}",
+            "description": "Progress gradually and consider checking in with a healthcare provider.",
+            "confidence": 0.8,
+            "actionable": True,
+            "priority": "high" if bmi_cat == "Obese" else "medium",
+        })
+    insights.append({
+        "type": "consistency",
+        "title": "Consistency Beats Intensity",
+        "description": f"Protect your {user_profile.get('workout_frequency', '3 days/week')} schedule; missed sessions matter more than perfect ones.",
+        "confidence": 0.85,
+        "actionable": True,
+        "priority": "medium",
+    })
+    return insights
+
+
+def build_recommendations(user_profile: Dict[str, Any], targets: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Rule-based recommendations in the generate_recommendations layout"""
+    return [
+        {"title": "Track your meals", "description": f"Log intake daily and stay within ±10% of {targets['calories']} kcal."},
+        {"title": "Hit your protein", "description": f"Spread {targets['protein_g']} g of protein across your meals."},
+        {"title": "Recover well", "description": "Sleep 7-9 hours and keep rest days light and active."},
+    ]
+
+
+def generate_local_plan(user_profile: Dict[str, Any], days: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Generate a complete plan locally, in the AIOrchestrator.generate_comprehensive_plan layout
+
+    Args:
+        user_profile: Profile dict as collected by enhanced_sidebar_form
+        days: Plan length in days (defaults to the profile's plan_days)
+
+    Returns:
+        Plan dict; insights are plain dicts with the AIInsight fields
+    """
+    days = days or plan_duration(user_profile)
+    nutrition_plan = build_nutrition_plan(user_profile, days)
+    targets = nutrition_plan["targets"]
+    return {
+        "workout_plan": build_workout_plan(user_profile, days),
+        "nutrition_plan": nutrition_plan,
+        "ai_insights": build_insights(user_profile, targets),
+        "recommendations": build_recommendations(user_profile, targets),
+        "generated_at": datetime.now().isoformat(),
+        "source": "local",
+    }
+
+
+def format_workout_text(workout_plan: Dict[str, Any]) -> str:
+    """Render a workout plan as plain text (for tabs and PDF export)"""
+    lines = []
+    for day in workout_plan.get("days", []):
+        lines.append(f"Day {day['day']} ({day['weekday']}) - {day['focus']}")
+        if day["type"] == "rest":
+            lines.extend(f"- {a}" for a in day["activities"])
+        else:
+            if day["warm_up"]:
+                lines.append(f"- Warm-up ({WARM_UP_MINUTES} min): {', '.join(day['warm_up'])}")
+            for ex in day["exercises"]:
+                volume = f"{ex['sets']} x {ex['reps']} reps" if ex["reps"] else f"{ex['sets']} x {ex['work_seconds']} s"
+                lines.append(f"- {ex['name']}: {volume}, rest {ex['rest_seconds']} s")
+            if day["cool_down"]:
+                lines.append(f"- Cool-down ({COOL_DOWN_MINUTES} min): {', '.join(day['cool_down'])}")
+            lines.append(f"- Estimated calories burned: {day['estimated_calories']} kcal")
+        lines.append("")
+    return "\n".join(lines).strip()
+
+
+def format_nutrition_text(nutrition_plan: Dict[str, Any]) -> str:
+    """Render a nutrition plan as plain text (for tabs and PDF export)"""
+    targets = nutrition_plan.get("targets", {})
+    lines = [
+        f"Daily target: {targets.get('calories')} kcal | P {targets.get('protein_g')} g | "
+        f"C {targets.get('carbs_g')} g | F {targets.get('fat_g')} g",
+        f"Hydration: {nutrition_plan.get('hydration_liters')} L water per day",
+        *(f"Note: {note}" for note in nutrition_plan.get("notes", [])),
+        "",
+    ]
+    for day in nutrition_plan.get("days", []):
+        lines.append(f"Day {day['day']} ({day['weekday']})")
+        for meal, items in day["meals"].items():
+            for item in items:
+                lines.append(f"- {meal.title()}: {item['name']} x{item['servings']:g} ({item['calories']} kcal)")
+        totals = day["totals"]
+        lines.append(f"- Total: {totals['calories']} kcal | P {totals['protein_g']} g | C {totals['carbs_g']} g | F {totals['fat_g']} g")
+        lines.append("")
+    return "\n".join(lines).strip()
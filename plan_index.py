@@ -0,0 +1,144 @@
+"""
+Per-user index of generated plans
+
+plans_history.csv only records the profile and the motivation line under a
+free-text name, so a returning user always paid for a new generation. Every
+generated plan is now kept in the shared store under the user's key (see
+insights_job.index_key): a small entry per user lists their recent plans and
+the profile each came from, and the full PackedPlan bytes are stored next to
+it. The sidebar reads the entry to prefill the form and restores the last
+plan without calling the model. Plans saved from the app are keyed on the
+browser as well as the name (index_key), so typing someone else's name does
+not reveal their profile or plan. Saved plans are also added to the plan
+search index (plan_search) and dropped from it when evicted.
+"""
+
+import json
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import config
+from insights_job import index_key
+from plan_models import PackedPlan
+from plan_search import PlanSearch, plan_terms
+from shared_store import SharedStore, get_shared_store
+
+
+@dataclass
+class IndexedPlan:
+    """Data class for one saved plan in a user's index entry"""
+    plan_id: str
+    saved_at: float
+    source: str  # ai, local, mixed
+    profile: Dict[str, Any]
+
+
+class PlanIndex:
+    """User-keyed index over saved plans in the shared store"""
+
+    ENTRIES_NAMESPACE = "plan_index"
+    PLANS_NAMESPACE = "indexed_plans"
+
+    def __init__(
+        self,
+        store: Optional[SharedStore] = None,
+        max_per_user: int = config.PLAN_INDEX_MAX_PER_USER,
+        search: Optional[PlanSearch] = None,
+    ):
+        self.store = store or get_shared_store()
+        self.max_per_user = max_per_user
+        self.search = search or PlanSearch(self.store)
+
+    def save(
+        self, user_profile: Dict[str, Any], plan: PackedPlan, browser_id: Optional[str] = None
+    ) -> Optional[IndexedPlan]:
+        """
+        Store a plan under its user, dropping their oldest plans beyond max_per_user
+
+        Args:
+            user_profile: Profile the plan was generated for
+            plan: The generated plan
+            browser_id: Browser the plan was generated in (see index_key)
+
+        Returns:
+            The new index record, or None for anonymous profiles
+        """
+        key = index_key(user_profile, browser_id)
+        if key is None:
+            return None
+        saved_at = time.time()
+        record = IndexedPlan(
+            # The random suffix keeps ids unique when one user saves twice within a millisecond
+            plan_id=f"{key}|{int(saved_at * 1000):013d}-{uuid.uuid4().hex[:8]}",
+            saved_at=saved_at,
+            source=str(plan.meta.get("source", "ai")),
+            profile={k: v for k, v in user_profile.items() if k != "generate"},
+        )
+        # The plan goes in first so an entry never points at a missing plan
+        self.store.set(self.PLANS_NAMESPACE, record.plan_id, plan.data)
+        evicted: List[str] = []
+
+        def update(_key: str, payload: Optional[bytes]) -> bytes:
+            plans = json.loads(payload.decode("utf-8"))["plans"] if payload else []
+            plans.append(asdict(record))
+            evicted.extend(p["plan_id"] for p in plans[:-self.max_per_user])
+            return json.dumps({"plans": plans[-self.max_per_user:]}, separators=(",", ":")).encode("utf-8")
+
+        self.store.update_many(self.ENTRIES_NAMESPACE, [key], update)
+        self.search.add(record.plan_id, key, saved_at, record.profile, plan)
+        for plan_id in evicted:
+            self.store.delete(self.PLANS_NAMESPACE, plan_id)
+            self.search.remove(plan_id)
+        return record
+
+    def plans(self, key: Optional[str]) -> List[IndexedPlan]:
+        """A user's saved plans, newest last (reads only the small index entry)"""
+        payload = self.store.get(self.ENTRIES_NAMESPACE, key) if key else None
+        if payload is None:
+            return []
+        return [IndexedPlan(**p) for p in json.loads(payload.decode("utf-8"))["plans"]]
+
+    def latest(self, key: Optional[str]) -> Optional[IndexedPlan]:
+        """A user's most recent plan record, or None"""
+        plans = self.plans(key)
+        return plans[-1] if plans else None
+
+    def load(self, record: IndexedPlan) -> Optional[PackedPlan]:
+        """The stored plan for an index record, or None if it is gone"""
+        return self.load_plan(record.plan_id)
+
+    def load_plan(self, plan_id: str) -> Optional[PackedPlan]:
+        """A stored plan by id (e.g. of a search hit), or None if it is gone"""
+        data = self.store.get(self.PLANS_NAMESPACE, plan_id)
+        return PackedPlan(data) if data is not None else None
+
+    def reindex_search(self, chunk_plans: int = 1000) -> int:
+        """
+        Rebuild the search index from the stored plans (e.g. plans saved before search existed)
+
+        Returns:
+            Number of plans indexed
+        """
+        self.search.clear()
+        chunk = []
+        total = 0
+        for key, payload in self.store.iter_items(self.ENTRIES_NAMESPACE):
+            for p in json.loads(payload.decode("utf-8"))["plans"]:
+                record = IndexedPlan(**p)
+                plan = self.load(record)
+                if plan is not None:
+                    chunk.append((record.plan_id, key, record.saved_at, record.profile,
+                                  plan_terms(record.profile, plan)))
+            if len(chunk) >= chunk_plans:
+                total += self.search.add_many(chunk)
+                chunk = []
+        return total + self.search.add_many(chunk)
+
+
+@lru_cache(maxsize=1)
+def get_plan_index() -> PlanIndex:
+    """Return the plan index on this process's shared store"""
+    return PlanIndex()
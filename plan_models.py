@@ -0,0 +1,315 @@
+"""
+Typed plan models and compact serialization
+
+Plan days, exercises and meals are slotted dataclasses. A whole plan packs
+into one compact binary blob (PackedPlan): a compressed header with the plan
+metadata, followed by one independently compressed record per day, so a
+session can keep just the bytes and decode a single day when it is rendered.
+"""
+
+import dataclasses
+import json
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from food_db import MEAL_SLOTS
+
+
+FORMAT_MAGIC = b"WDP1"
+_LENGTH = struct.Struct("<I")
+_COMPRESSION_LEVEL = 6
+
+
+@dataclass
+class ExerciseEntry:
+    """Data class for one prescribed exercise"""
+    __slots__ = ("name", "category", "sets", "reps", "work_seconds", "rest_seconds",
+                 "muscle_groups", "equipment", "minutes")
+    name: str
+    category: str
+    sets: int
+    reps: Optional[int]  # None for timed exercises
+    work_seconds: Optional[int]
+    rest_seconds: int
+    muscle_groups: List[str]
+    equipment: List[str]
+    minutes: float
+
+    def to_row(self) -> list:
+        return [getattr(self, f) for f in self.__slots__]
+
+    @classmethod
+    def from_row(cls, row: list) -> "ExerciseEntry":
+        return cls(*row)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ExerciseEntry":
+        return cls(
+            name=data["name"],
+            category=data.get("category", ""),
+            sets=data.get("sets", 0),
+            reps=data.get("reps"),
+            work_seconds=data.get("work_seconds"),
+            rest_seconds=data.get("rest_seconds", 0),
+            muscle_groups=list(data.get("muscle_groups", [])),
+            equipment=list(data.get("equipment", [])),
+            minutes=data.get("minutes", 0.0),
+        )
+
+
+@dataclass
+class WorkoutDay:
+    """Data class for one day of a workout plan (training or rest)"""
+    __slots__ = ("day", "week", "weekday", "type", "focus", "warm_up", "exercises",
+                 "cool_down", "activities", "duration_minutes", "estimated_calories")
+    day: int
+    week: int
+    weekday: str
+    type: str  # workout, rest
+    focus: str
+    warm_up: List[str]
+    exercises: List[ExerciseEntry]
+    cool_down: List[str]
+    activities: List[str]
+    duration_minutes: int
+    estimated_calories: int
+
+    def to_row(self) -> list:
+        row = [getattr(self, f) for f in self.__slots__]
+        row[6] = [ex.to_row() for ex in self.exercises]
+        return row
+
+    @classmethod
+    def from_row(cls, row: list) -> "WorkoutDay":
+        row = list(row)
+        row[6] = [ExerciseEntry.from_row(ex) for ex in row[6]]
+        return cls(*row)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WorkoutDay":
+        return cls(
+            day=data["day"],
+            week=data.get("week", (data["day"] - 1) // 7 + 1),
+            weekday=data.get("weekday", ""),
+            type=data.get("type", "workout"),
+            focus=data.get("focus", ""),
+            warm_up=list(data.get("warm_up", [])),
+            exercises=[ExerciseEntry.from_dict(ex) for ex in data.get("exercises", [])],
+            cool_down=list(data.get("cool_down", [])),
+            activities=list(data.get("activities", [])),
+            duration_minutes=data.get("duration_minutes", 0),
+            estimated_calories=data.get("estimated_calories", 0),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict in the plan_engine day layout"""
+        data = {f: getattr(self, f) for f in self.__slots__}
+        data["exercises"] = [{f: getattr(ex, f) for f in ex.__slots__} for ex in self.exercises]
+        if self.type == "rest":
+            for key in ("warm_up", "exercises", "cool_down"):
+                del data[key]
+        else:
+            del data["activities"]
+        return data
+
+
+@dataclass
+class MealItem:
+    """Data class for one portion of a food"""
+    __slots__ = ("name", "serving", "servings", "calories", "protein_g", "carbs_g", "fat_g")
+    name: str
+    serving: str
+    servings: float
+    calories: int
+    protein_g: float
+    carbs_g: float
+    fat_g: float
+
+    def to_row(self) -> list:
+        return [getattr(self, f) for f in self.__slots__]
+
+    @classmethod
+    def from_row(cls, row: list) -> "MealItem":
+        return cls(*row)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MealItem":
+        return cls(**{f: data[f] for f in cls.__slots__})
+
+
+@dataclass
+class NutritionDay:
+    """Data class for one day of a meal plan"""
+    __slots__ = ("day", "weekday", "meals", "totals")
+    day: int
+    weekday: str
+    meals: Dict[str, List[MealItem]]  # keyed by food_db.MEAL_SLOTS
+    totals: Dict[str, float]
+
+    def to_row(self) -> list:
+        return [
+            self.day,
+            self.weekday,
+            [[item.to_row() for item in self.meals.get(meal, [])] for meal in MEAL_SLOTS],
+            self.totals,
+        ]
+
+    @classmethod
+    def from_row(cls, row: list) -> "NutritionDay":
+        meals = {meal: [MealItem.from_row(item) for item in items] for meal, items in zip(MEAL_SLOTS, row[2])}
+        return cls(day=row[0], weekday=row[1], meals=meals, totals=row[3])
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NutritionDay":
+        meals = {meal: [MealItem.from_dict(item) for item in data["meals"].get(meal, [])] for meal in MEAL_SLOTS}
+        return cls(day=data["day"], weekday=data.get("weekday", ""), meals=meals, totals=dict(data["totals"]))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict in the plan_engine day layout"""
+        return {
+            "day": self.day,
+            "weekday": self.weekday,
+            "meals": {meal: [{f: getattr(item, f) for f in item.__slots__} for item in items]
+                      for meal, items in self.meals.items()},
+            "totals": dict(self.totals),
+        }
+
+
+def to_plain(value: Any) -> Any:
+    """Convert dataclasses (e.g. AIInsight) to dicts for JSON"""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if isinstance(value, list):
+        return [to_plain(v) for v in value]
+    return value
+
+
+def _split_days(section: Dict[str, Any], day_cls) -> list:
+    """Pop and type a section's days; AI-shaped days that don't fit stay in the section"""
+    try:
+        days = [day_cls.from_dict(d) for d in section.get("days", [])]
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return []
+    section.pop("days", None)
+    return days
+
+
+def _compress(data: Any) -> bytes:
+    raw = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return zlib.compress(raw, _COMPRESSION_LEVEL)
+
+
+def _decompress(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class PackedPlan:
+    """
+    A plan held as compact bytes, decoded a day at a time
+
+    Layout: FORMAT_MAGIC, header length, compressed header, then the
+    compressed day records. The header carries everything except the day
+    lists plus the byte offsets of every day record.
+    """
+
+    __slots__ = ("data", "_header", "_payload_start")
+
+    def __init__(self, data: bytes):
+        if data[:4] != FORMAT_MAGIC:
+            raise ValueError("Not a packed plan")
+        (header_length,) = _LENGTH.unpack_from(data, 4)
+        start = 4 + _LENGTH.size
+        self.data = data
+        self._header = _decompress(data[start:start + header_length])
+        self._payload_start = start + header_length
+
+    @classmethod
+    def from_dict(cls, plan: Dict[str, Any]) -> "PackedPlan":
+        """
+        Pack a plan dict as produced by AIOrchestrator or plan_engine
+
+        Args:
+            plan: Plan dictionary
+
+        Returns:
+            PackedPlan over the encoded bytes
+        """
+        meta = {key: to_plain(value) for key, value in plan.items()
+                if key not in ("workout_plan", "nutrition_plan")}
+        workout = dict(plan.get("workout_plan") or {})
+        nutrition = dict(plan.get("nutrition_plan") or {})
+        workout_days = _split_days(workout, WorkoutDay)
+        nutrition_days = _split_days(nutrition, NutritionDay)
+
+        blobs = [_compress(d.to_row()) for d in workout_days] + [_compress(d.to_row()) for d in nutrition_days]
+        offsets = [0]
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+
+        header = _compress({
+            "meta": meta,
+            "workout": workout,
+            "nutrition": nutrition,
+            "workout_days": len(workout_days),
+            "nutrition_days": len(nutrition_days),
+            "offsets": offsets,
+        })
+        return cls(FORMAT_MAGIC + _LENGTH.pack(len(header)) + header + b"".join(blobs))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        """Plan-level fields: source, generated_at, ai_insights, recommendations, ..."""
+        return self._header["meta"]
+
+    @property
+    def workout(self) -> Dict[str, Any]:
+        """Workout plan fields other than the days (or the raw AI response)"""
+        return self._header["workout"]
+
+    @property
+    def nutrition(self) -> Dict[str, Any]:
+        """Nutrition plan fields other than the days (targets, guidance, ...)"""
+        return self._header["nutrition"]
+
+    @property
+    def workout_day_count(self) -> int:
+        return self._header["workout_days"]
+
+    @property
+    def nutrition_day_count(self) -> int:
+        return self._header["nutrition_days"]
+
+    def _record(self, index: int) -> Any:
+        offsets = self._header["offsets"]
+        start = self._payload_start + offsets[index]
+        return _decompress(self.data[start:self._payload_start + offsets[index + 1]])
+
+    def workout_day(self, index: int) -> WorkoutDay:
+        """Decode one workout day (0-based)"""
+        if not 0 <= index < self.workout_day_count:
+            raise IndexError(index)
+        return WorkoutDay.from_row(self._record(index))
+
+    def nutrition_day(self, index: int) -> NutritionDay:
+        """Decode one nutrition day (0-based)"""
+        if not 0 <= index < self.nutrition_day_count:
+            raise IndexError(index)
+        return NutritionDay.from_row(self._record(self.workout_day_count + index))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Decode the whole plan back into the plain dict layout"""
+        plan = dict(self.meta)
+        workout = dict(self.workout)
+        if self.workout_day_count:
+            workout["days"] = [self.workout_day(i).to_dict() for i in range(self.workout_day_count)]
+        nutrition = dict(self.nutrition)
+        if self.nutrition_day_count:
+            nutrition["days"] = [self.nutrition_day(i).to_dict() for i in range(self.nutrition_day_count)]
+        plan["workout_plan"] = workout
+        plan["nutrition_plan"] = nutrition
+        return plan
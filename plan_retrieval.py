@@ -0,0 +1,116 @@
+"""
+Retrieval of similar past plans to ground workout generation
+
+Every workout plan used to be generated cold from instructions alone.
+Before the weekly requests go out, the profile's goal, experience, schedule,
+BMI category and equipment are turned into weighted terms and matched with
+BM25 against the plan search index (plan_search), restricted to plans the
+model generated successfully. Short excerpts of the best matches (focus and
+exercises of their first training days) are added to the week prompts as
+examples, which keeps exercise choice and volume consistent across similar
+users and lets the prompt itself stay short. No embeddings or extra
+dependencies are involved: the index already exists for plan search.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+import config
+from context_packing import estimate_tokens
+from plan_models import PackedPlan
+from plan_search import words
+
+
+logger = logging.getLogger(__name__)
+
+# Profile field -> (search field, weight) of the terms a similar plan should share
+QUERY_FIELDS = {
+    "goal": ("goal", 3.0),
+    "experience": ("level", 2.0),
+    "equipment": ("equipment", 1.5),
+    "workout_frequency": ("frequency", 1.0),
+    "bmi_cat": ("bmi", 0.5),
+}
+SUCCESS_TERM = "source:ai"  # plans the model generated (not the local fallback)
+MAX_EXCERPT_DAYS = 3
+
+
+def profile_query(user_profile: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Weighted search terms describing a profile
+
+    A field's weight is split over its words, so "Weight Loss" counts as
+    much as "Beginner".
+    """
+    terms: Dict[str, float] = {}
+    for field, (search_field, weight) in QUERY_FIELDS.items():
+        field_words = words(user_profile.get(field))
+        for word in field_words:
+            terms[f"{search_field}:{word}"] = weight / len(field_words)
+    return terms
+
+
+def plan_excerpt(plan: PackedPlan, profile: Dict[str, Any], budget_tokens: int) -> str:
+    """
+    One-line summary of a plan's first training days within a token budget
+
+    Returns:
+        "[goal, experience, equipment] Focus: Exercise 3x10, ... | ...", or ""
+        if the plan has no training day that fits
+    """
+    header = f"[{profile.get('goal', '')}, {profile.get('experience', '')}, {profile.get('equipment', '')}] "
+    text = ""
+    days = 0
+    for index in range(plan.workout_day_count):
+        day = plan.workout_day(index)
+        if day.type == "rest" or not day.exercises:
+            continue
+        exercises = ", ".join(f"{ex.name} {ex.sets}x{ex.reps if ex.reps else f'{ex.work_seconds}s'}"
+                              for ex in day.exercises)
+        candidate = f"{text} | {day.focus}: {exercises}" if text else f"{header}{day.focus}: {exercises}"
+        if estimate_tokens(candidate) > budget_tokens:
+            break
+        text = candidate
+        days += 1
+        if days == MAX_EXCERPT_DAYS:
+            break
+    return text
+
+
+def grounding_examples(
+    user_profile: Dict[str, Any],
+    plans: Optional[Any] = None,
+    limit: int = config.GROUNDING_EXAMPLES,
+    budget_tokens: int = config.GROUNDING_TOKENS,
+) -> str:
+    """
+    Excerpts of the past plans most similar to a profile, for a prompt
+
+    Args:
+        user_profile: Profile a plan is about to be generated for
+        plans: plan_index.PlanIndex to retrieve from (this process's by default)
+        limit: Maximum number of excerpts
+        budget_tokens: Budget shared by all excerpts
+
+    Returns:
+        One "- excerpt" line per plan, or "" when disabled, nothing matches
+        or retrieval fails (generation then proceeds without examples)
+    """
+    if not config.GROUNDING_ENABLED or limit <= 0:
+        return ""
+    try:
+        if plans is None:
+            # Imported here: plan_index -> insights_job -> ai_services imports this module
+            from plan_index import get_plan_index
+            plans = get_plan_index()
+        hits = plans.search.similar(profile_query(user_profile), required=(SUCCESS_TERM,), limit=limit)
+        excerpts = []
+        for hit in hits:
+            plan = plans.load_plan(hit.plan_id)
+            excerpt = plan_excerpt(plan, hit.profile, budget_tokens // len(hits)) if plan is not None else ""
+            if excerpt:
+                excerpts.append(f"- {excerpt}")
+        return "\n".join(excerpts)
+    except Exception as e:
+        logger.warning("Plan retrieval failed: %s", e)
+        return ""
@@ -0,0 +1,376 @@
+"""
+Inverted index over saved plans
+
+Finding "plans with burpees for vegan users" used to mean regex-scanning
+plan text. When PlanIndex saves a plan, the exercises, foods, muscle groups
+and profile tags (goal, diet, cuisine, ...) it contains are split into terms
+such as "exercise:burpee" or "diet:vegan" and added to per-term postings in
+the shared store. A posting is columnar: a sorted uint32 array of document
+ids followed by a uint16 array of term counts, split into segments of
+PLAN_SEARCH_SEGMENT_DOCS ids so a save only rewrites the last segment of
+each of its terms. A query reads just the postings of its terms and
+intersects them with NumPy, so it stays in the millisecond range however
+many plans are indexed.
+
+Query syntax (see parse_query):
+    burpees diet:vegan         all terms must match (words match any field)
+    squat OR lunge             either term
+    -keto                      exclude plans with the term
+    food:lent*                 prefix match
+"""
+
+import json
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import config
+from plan_models import PackedPlan
+from shared_store import SharedStore, get_shared_store
+from utils import extract_exercises_from_text
+
+
+# Query field -> profile field its terms come from (plan content fields have no profile field)
+PROFILE_FIELDS = {
+    "goal": "goal",
+    "diet": "dietary_pref",
+    "cuisine": "cultural_food",
+    "level": "experience",
+    "budget": "budget",
+    "bmi": "bmi_cat",
+    "frequency": "workout_frequency",
+}
+CONTENT_FIELDS = ("exercise", "food", "muscle", "equipment", "focus", "source")
+FIELDS = CONTENT_FIELDS + tuple(PROFILE_FIELDS)
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset({"a", "and", "in", "of", "on", "or", "the", "to", "with"})
+_TF_MAX = np.iinfo(np.uint16).max
+BM25_K1 = 1.2  # term-frequency saturation of PlanSearch.similar
+
+
+def normalize(word: str) -> str:
+    """Lower-case a word and strip a plural "s" so "Burpees" and "burpee" match"""
+    word = word.lower()
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def words(text: Any) -> List[str]:
+    """Normalized words of a field value"""
+    return [normalize(w) for w in _WORD.findall(str(text or "").lower()) if w not in _STOPWORDS]
+
+
+def plan_terms(user_profile: Dict[str, Any], plan: PackedPlan) -> Dict[str, int]:
+    """
+    Search terms of a plan with their counts
+
+    Args:
+        user_profile: Profile the plan was generated for
+        plan: The plan
+
+    Returns:
+        Term ("field:word") -> number of occurrences
+    """
+    counts: Dict[str, int] = {}
+
+    def add(field: str, text: Any):
+        for word in words(text):
+            term = f"{field}:{word}"
+            counts[term] = counts.get(term, 0) + 1
+
+    for index in range(plan.workout_day_count):
+        day = plan.workout_day(index)
+        add("focus", day.focus)
+        for exercise in day.exercises:
+            add("exercise", exercise.name)
+            add("equipment", exercise.equipment)
+            for muscle in exercise.muscle_groups or []:
+                add("muscle", muscle)
+    if not plan.workout_day_count and plan.workout.get("raw_response"):
+        for exercise in extract_exercises_from_text(plan.workout["raw_response"]):
+            add("exercise", exercise["name"])
+    for index in range(plan.nutrition_day_count):
+        for items in plan.nutrition_day(index).meals.values():
+            for item in items:
+                add("food", item.name)
+    add("source", plan.meta.get("source", "ai"))
+    for field, profile_field in PROFILE_FIELDS.items():
+        add(field, user_profile.get(profile_field))
+    return counts
+
+
+@dataclass
+class Clause:
+    """One query clause: matches plans containing any of its terms"""
+    terms: List[Tuple[str, bool]]  # (field:word or bare word, is prefix)
+    negated: bool = False
+
+
+def parse_query(query: str) -> List[Clause]:
+    """
+    Parse a search query into clauses that must all match
+
+    Whitespace separates clauses; "OR" joins terms into one clause; a
+    leading "-" excludes plans matching the clause; a trailing "*" makes a
+    prefix term; "field:word" restricts a word to one of FIELDS.
+    """
+    clauses: List[Clause] = []
+    join_next = False
+    for token in query.split():
+        if token == "OR":
+            join_next = bool(clauses)
+            continue
+        negated = token.startswith("-")
+        token = token.lstrip("-")
+        prefix = token.endswith("*")
+        field, _, text = token.rstrip("*").rpartition(":")
+        if field and field.lower() not in FIELDS:
+            field, text = "", token.rstrip("*")
+        terms = [(f"{field.lower()}:{w}" if field else w, prefix) for w in
+                 (_WORD.findall(text.lower()) if prefix else words(text))]
+        if not terms:
+            continue
+        if join_next and not negated:
+            clauses[-1].terms.extend(terms)
+        else:
+            clauses.append(Clause(terms=terms[:1], negated=negated))
+            # Words of one token ("goblet-squat") must all match
+            clauses.extend(Clause(terms=[term], negated=negated) for term in terms[1:])
+        join_next = False
+    return clauses
+
+
+@dataclass
+class SearchHit:
+    """Data class for one ranked search result"""
+    plan_id: str
+    user: str
+    saved_at: float
+    score: float
+    profile: Dict[str, Any]
+
+
+def _encode(ids: np.ndarray, tfs: np.ndarray) -> bytes:
+    return ids.astype(np.uint32).tobytes() + tfs.astype(np.uint16).tobytes()
+
+
+def _decode(payload: Optional[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    if not payload:
+        return np.empty(0, np.uint32), np.empty(0, np.uint16)
+    count = len(payload) // 6
+    return (np.frombuffer(payload, np.uint32, count),
+            np.frombuffer(payload, np.uint16, count, offset=count * 4))
+
+
+class PlanSearch:
+    """Inverted index over saved plans in the shared store"""
+
+    POSTINGS_NAMESPACE = "plan_search_postings"
+    DOCS_NAMESPACE = "plan_search_docs"
+    IDS_NAMESPACE = "plan_search_ids"
+    META_NAMESPACE = "plan_search_meta"
+
+    def __init__(self, store: Optional[SharedStore] = None, segment_docs: int = config.PLAN_SEARCH_SEGMENT_DOCS):
+        self.store = store or get_shared_store()
+        self.segment_docs = segment_docs
+
+    def _segment_key(self, term: str, doc_id: int) -> str:
+        return f"{term}|{doc_id // self.segment_docs:06d}"
+
+    def add(self, plan_id: str, user: str, saved_at: float, user_profile: Dict[str, Any], plan: PackedPlan):
+        """Index one saved plan"""
+        self.add_many([(plan_id, user, saved_at, user_profile, plan_terms(user_profile, plan))])
+
+    def add_many(self, entries: Iterable[Tuple[str, str, float, Dict[str, Any], Dict[str, int]]]) -> int:
+        """
+        Index several plans, writing each posting segment once
+
+        Args:
+            entries: (plan_id, user key, saved_at, profile, plan_terms) per plan
+
+        Returns:
+            Number of plans indexed
+        """
+        entries = list(entries)
+        if not entries:
+            return 0
+        last = self.store.incr(self.META_NAMESPACE, "next_doc", len(entries))
+        docs: Dict[str, bytes] = {}
+        doc_ids: Dict[str, bytes] = {}
+        additions: Dict[str, List[Tuple[int, int]]] = {}
+        for doc_id, (plan_id, user, saved_at, profile, terms) in enumerate(entries, last - len(entries)):
+            docs[f"{doc_id:010d}"] = json.dumps({
+                "plan_id": plan_id, "user": user, "saved_at": saved_at, "profile": profile,
+                "terms": list(terms)}, separators=(",", ":")).encode("utf-8")
+            doc_ids[plan_id] = str(doc_id).encode()
+            segment = self._segment_key("", doc_id)
+            for term, tf in terms.items():
+                additions.setdefault(term + segment, []).append((doc_id, tf))
+        self.store.update_many(self.DOCS_NAMESPACE, docs, lambda key, _: docs[key])
+        self.store.update_many(self.IDS_NAMESPACE, doc_ids, lambda key, _: doc_ids[key])
+
+        def update(key: str, payload: Optional[bytes]) -> bytes:
+            ids, tfs = _decode(payload)
+            new_ids, new_tfs = zip(*additions[key])
+            # Doc ids only grow, so appending keeps the segment sorted
+            return _encode(np.concatenate([ids, np.array(new_ids, np.uint32)]),
+                           np.concatenate([tfs, np.minimum(new_tfs, _TF_MAX).astype(np.uint16)]))
+
+        self.store.update_many(self.POSTINGS_NAMESPACE, additions, update)
+        self.store.incr(self.META_NAMESPACE, "docs", len(entries))
+        return len(entries)
+
+    def remove(self, plan_id: str) -> bool:
+        """Drop a plan from the index (e.g. when PlanIndex evicts it); False if it was not indexed"""
+        doc_id = self.store.get(self.IDS_NAMESPACE, plan_id)
+        if doc_id is None:
+            return False
+        doc_id = int(doc_id)
+        doc_key = f"{doc_id:010d}"
+        doc = self.store.get(self.DOCS_NAMESPACE, doc_key)
+        terms = json.loads(doc.decode("utf-8"))["terms"] if doc else []
+
+        def update(_key: str, payload: Optional[bytes]) -> bytes:
+            ids, tfs = _decode(payload)
+            keep = ids != doc_id
+            return _encode(ids[keep], tfs[keep])
+
+        self.store.update_many(self.POSTINGS_NAMESPACE, [self._segment_key(t, doc_id) for t in terms], update)
+        self.store.delete(self.DOCS_NAMESPACE, doc_key)
+        self.store.delete(self.IDS_NAMESPACE, plan_id)
+        self.store.incr(self.META_NAMESPACE, "docs", -1)
+        return True
+
+    def doc_count(self) -> int:
+        payload = self.store.get(self.META_NAMESPACE, "docs")
+        return int(payload) if payload else 0
+
+    def _postings(self, term: str, prefix: bool) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """Postings of a term (of every indexed term starting with it, for a prefix), across segments"""
+        fields = [term] if ":" in term else [f"{field}:{term}" for field in FIELDS]
+        segments: Dict[str, List[Tuple[np.ndarray, np.ndarray]]] = {}
+        for key_prefix in fields:
+            for key, payload in self.store.items(self.POSTINGS_NAMESPACE, key_prefix if prefix else key_prefix + "|"):
+                segments.setdefault(key.rpartition("|")[0], []).append(_decode(payload))
+        return {t: (np.concatenate([ids for ids, _ in parts]), np.concatenate([tfs for _, tfs in parts]))
+                for t, parts in segments.items()}
+
+    def _clause_scores(self, clause: Clause, doc_count: int, size: int) -> np.ndarray:
+        """Dense per-doc-id tf-idf scores of a clause (NaN where it does not match)"""
+        scores = np.zeros(size)
+        matched = np.zeros(size, dtype=bool)
+        for term, prefix in clause.terms:
+            for ids, tfs in self._postings(term, prefix).values():
+                if not len(ids):
+                    continue
+                idf = math.log(1 + doc_count / len(ids))
+                # A doc id appears once per term, so fancy-index addition is exact
+                scores[ids] += idf * (1 + np.log(tfs.astype(np.float64)))
+                matched[ids] = True
+        scores[~matched] = np.nan
+        return scores
+
+    def search(self, query: str, limit: int = config.PLAN_SEARCH_RESULTS) -> List[SearchHit]:
+        """
+        Ranked plans matching a query
+
+        Args:
+            query: Query string (see parse_query)
+            limit: Maximum number of hits
+
+        Returns:
+            Hits by descending score (summed tf-idf of the matched terms), newest first on ties
+        """
+        clauses = parse_query(query)
+        if limit <= 0 or all(c.negated for c in clauses):
+            return []
+        payload = self.store.get(self.META_NAMESPACE, "next_doc")
+        size = int(payload) if payload else 0
+        doc_count = max(self.doc_count(), 1)
+        # Doc ids are dense, so clauses combine as whole-array operations (NaN: no match)
+        total = np.zeros(size)
+        for clause in clauses:
+            scores = self._clause_scores(clause, doc_count, size)
+            if clause.negated:
+                total[~np.isnan(scores)] = np.nan
+            else:
+                total += scores
+
+        return self._top_hits(total, limit)
+
+    def similar(
+        self,
+        terms: Dict[str, float],
+        required: Iterable[str] = (),
+        limit: int = config.GROUNDING_EXAMPLES,
+    ) -> List[SearchHit]:
+        """
+        Plans most similar to a weighted set of terms, ranked by BM25
+
+        Unlike search, a plan needs only one of the terms to be a candidate.
+        The index keeps no document lengths, so this is BM25 with b=0
+        (term-frequency saturation without length normalization).
+
+        Args:
+            terms: Exact "field:word" terms with their query weights
+            required: Terms every returned plan must contain (e.g. "source:ai")
+            limit: Maximum number of hits
+
+        Returns:
+            Hits by descending BM25 score, newest first on ties
+        """
+        payload = self.store.get(self.META_NAMESPACE, "next_doc")
+        size = int(payload) if payload else 0
+        if limit <= 0 or not size:
+            return []
+        doc_count = max(self.doc_count(), 1)
+        total = np.full(size, np.nan)
+        for term, weight in terms.items():
+            for ids, tfs in self._postings(term, False).values():
+                if not len(ids):
+                    continue
+                idf = math.log(1 + (doc_count - len(ids) + 0.5) / (len(ids) + 0.5))
+                tf = tfs.astype(np.float64)
+                total[ids] = np.nan_to_num(total[ids]) + weight * idf * tf * (BM25_K1 + 1) / (tf + BM25_K1)
+        for term in required:
+            present = np.zeros(size, dtype=bool)
+            for ids, _ in self._postings(term, False).values():
+                present[ids] = True
+            total[~present] = np.nan
+        return self._top_hits(total, limit)
+
+    def _top_hits(self, total: np.ndarray, limit: int) -> List[SearchHit]:
+        """The `limit` best-scored docs of a dense score array (NaN: no match) with their records"""
+        ids = np.flatnonzero(~np.isnan(total))
+        if len(ids) > limit:
+            # Top `limit` without sorting every match: all above the cut-off score, then the newest ties
+            matched = total[ids]
+            cutoff = np.partition(matched, len(ids) - limit)[len(ids) - limit]
+            above = ids[matched > cutoff]
+            ids = np.concatenate([above, ids[matched == cutoff][::-1][:limit - len(above)]])
+        ids = ids[np.lexsort((-ids, -total[ids]))]
+        hits = []
+        for doc_id in ids:
+            doc = self.store.get(self.DOCS_NAMESPACE, f"{int(doc_id):010d}")
+            if doc is None:
+                continue
+            data = json.loads(doc.decode("utf-8"))
+            hits.append(SearchHit(plan_id=data["plan_id"], user=data["user"], saved_at=data["saved_at"],
+                                  score=round(float(total[doc_id]), 3), profile=data["profile"]))
+        return hits
+
+    def clear(self):
+        for namespace in (self.POSTINGS_NAMESPACE, self.DOCS_NAMESPACE, self.IDS_NAMESPACE, self.META_NAMESPACE):
+            self.store.delete(namespace)
+
+
+@lru_cache(maxsize=1)
+def get_plan_search() -> PlanSearch:
+    """Return the plan search index on this process's shared store"""
+    return PlanSearch()
@@ -0,0 +1,96 @@
+"""
+Incremental section parsing for streamed model output
+
+Parsing a sectioned response only after the whole text arrived kept every
+section hidden until the last one finished. SectionStreamParser consumes the
+stream chunk by chunk and emits a section as soon as the heading of a later
+section appears, so the UI can show it while the rest is still generating.
+Only complete lines are matched against the headings, so a heading split
+across chunks is still recognised, and each character is scanned once.
+"""
+
+import re
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+def numbered_heading(number: int, keyword: str) -> str:
+    """
+    Pattern for a numbered section heading line such as "2. HYDRATION PROTOCOLS"
+
+    Markdown decoration ("### 2) **Hydration**") is tolerated.
+    """
+    return rf"^[#*_\s]*{number}\s*[\).:-]\s*[*_\s]*{keyword}"
+
+
+# Topics of the nutrition guidance prompt (NutritionAIService.generate_smart_nutrition_plan)
+GUIDANCE_HEADINGS = (
+    ("meal_timing", numbered_heading(1, "meal timing")),
+    ("hydration", numbered_heading(2, "hydration")),
+    ("micronutrients", numbered_heading(3, "micronutrient")),
+    ("supplements", numbered_heading(4, "supplement")),
+    ("cultural_budget", numbered_heading(5, "cultural")),
+)
+
+
+class SectionStreamParser:
+    """Split streamed text into named sections at their heading lines"""
+
+    def __init__(self, headings: Sequence[Tuple[str, str]]):
+        """
+        Args:
+            headings: (section name, heading line regex) in the order the sections appear
+        """
+        self._headings = [(name, re.compile(pattern, re.IGNORECASE)) for name, pattern in headings]
+        self._next = 0  # index of the first heading still expected
+        self._current: Optional[str] = None
+        self._lines: List[str] = []
+        self._pending = ""  # trailing text without a newline yet
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """
+        Consume a chunk of the stream
+
+        Args:
+            chunk: Next piece of model output
+
+        Returns:
+            (name, text) of the sections this chunk completed, usually none or one
+        """
+        *lines, self._pending = (self._pending + chunk).split("\n")
+        finished = []
+        for line in lines:
+            finished.extend(self._line(line))
+        return finished
+
+    def close(self) -> List[Tuple[str, str]]:
+        """End of stream: emit the last open section"""
+        finished = self._line(self._pending) if self._pending else []
+        self._pending = ""
+        return finished + self._emit()
+
+    def _line(self, line: str) -> List[Tuple[str, str]]:
+        # Any later heading closes the open section, in case the model skips one
+        for index in range(self._next, len(self._headings)):
+            name, pattern = self._headings[index]
+            if pattern.match(line):
+                finished = self._emit()
+                self._current, self._lines, self._next = name, [line], index + 1
+                return finished
+        if self._current is not None:  # lines before the first heading are dropped
+            self._lines.append(line)
+        return []
+
+    def _emit(self) -> List[Tuple[str, str]]:
+        if self._current is None:
+            return []
+        section = (self._current, "\n".join(self._lines).strip())
+        self._current, self._lines = None, []
+        return [section]
+
+
+def stream_sections(chunks: Iterable[str], headings: Sequence[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+    """Yield (name, text) for each section of a chunk stream as soon as it is complete"""
+    parser = SectionStreamParser(headings)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
@@ -0,0 +1,391 @@
+"""
+Session state size management for the AI-Powered Workout & Diet Planner
+
+Large session values (AI responses, packed plans, chat history) are moved out
+of st.session_state into a content-addressed blob store shared by every
+session in the process, so identical text is held once. Blobs are written
+through to a local directory and only a bounded, recently used set stays in
+memory. Blob files not written or read for SESSION_TTL are deleted when the
+store is created and periodically after that. Each session keeps small references instead, plus per-key size
+accounting, and spills its coldest entries when it exceeds its budget.
+
+In multi-process mode the references are also written to the shared SQLite
+store under the session id, so a session that reconnects to another worker
+picks up where it left off. The id travels in a cookie rather than the URL,
+so a shared link does not hand over the session.
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, MutableMapping, Optional, Tuple
+
+import config
+from plan_models import PackedPlan
+from shared_store import SharedStore, get_shared_store, multi_process_mode
+
+
+META_KEY = "_session_store_meta"
+
+_SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+SESSION_COOKIE = "planner_sid"
+SESSION_ID_KEY = "_shared_session_id"  # st.session_state key holding the id for the current connection
+
+
+@dataclass(frozen=True)
+class BlobRef:
+    """Reference to a value held in the blob store"""
+    digest: str
+    size: int  # encoded bytes
+    codec: str  # text, bytes, json, packed_plan
+
+
+def encode_value(value: Any) -> Optional[Tuple[str, bytes]]:
+    """
+    Encode a session value for the blob store
+
+    Args:
+        value: Session value
+
+    Returns:
+        Tuple of (codec, payload), or None if the value must stay in memory
+    """
+    if isinstance(value, str):
+        return "text", value.encode("utf-8")
+    if isinstance(value, bytes):
+        return "bytes", value
+    if isinstance(value, PackedPlan):
+        return "packed_plan", value.data
+    if isinstance(value, (list, dict)):
+        try:
+            return "json", json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def decode_value(codec: str, payload: bytes) -> Any:
+    """Inverse of encode_value"""
+    if codec == "text":
+        return payload.decode("utf-8")
+    if codec == "bytes":
+        return payload
+    if codec == "packed_plan":
+        return PackedPlan(payload)
+    if codec == "json":
+        return json.loads(payload.decode("utf-8"))
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory held by a session value, in bytes"""
+    if isinstance(value, BlobRef):
+        return 0
+    encoded = encode_value(value)
+    if encoded is not None:
+        return len(encoded[1])
+    return sys.getsizeof(value)
+
+
+class BlobStore:
+    """
+    Content-addressed, write-through blob store with an in-memory LRU
+
+    A blob file's mtime is its last use (writes and disk reads refresh it);
+    files unused for ttl_seconds are swept, except those held in memory here.
+    """
+
+    def __init__(self, directory: str = config.SESSION_STORE_DIR,
+                 memory_bytes: int = config.SESSION_BLOB_MEMORY_BYTES,
+                 ttl_seconds: float = config.SESSION_TTL,
+                 sweep_interval: float = config.SESSION_BLOB_SWEEP_INTERVAL):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+        os.makedirs(directory, exist_ok=True)
+        self.sweep()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest)
+
+    def _remember(self, digest: str, payload: bytes):
+        if digest in self._memory:
+            self._memory.move_to_end(digest)
+            return
+        self._memory[digest] = payload
+        self._memory_size += len(payload)
+        while self._memory_size > self.memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def put(self, payload: bytes) -> str:
+        """
+        Store a payload (a no-op when identical content is already stored)
+
+        Args:
+            payload: Bytes to store
+
+        Returns:
+            Content digest
+        """
+        digest = hashlib.sha256(payload).hexdigest()
+        path = self._path(digest)
+        with self._lock:
+            try:
+                os.utime(path)  # already stored: mark it used
+            except FileNotFoundError:
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+            self._remember(digest, payload)
+        if time.time() >= self._next_sweep:
+            self.sweep()
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        """
+        Load a payload, from memory or disk
+
+        Args:
+            digest: Digest returned by put
+
+        Returns:
+            Stored bytes
+        """
+        with self._lock:
+            payload = self._memory.get(digest)
+            if payload is not None:
+                self._memory.move_to_end(digest)
+                return payload
+        with open(self._path(digest), "rb") as f:
+            payload = f.read()
+        try:
+            os.utime(self._path(digest))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._remember(digest, payload)
+        return payload
+
+    def sweep(self) -> int:
+        """
+        Delete blob files unused for ttl_seconds (and abandoned temporary files)
+
+        Blobs held in this process's memory are kept and marked used; other
+        workers sharing the directory refresh theirs on their own sweeps.
+
+        Returns:
+            Number of files deleted
+        """
+        now = time.time()
+        with self._lock:
+            held = set(self._memory)
+            self._next_sweep = now + self.sweep_interval
+        removed = 0
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.name in held:
+                    os.utime(entry.path)
+                elif entry.is_file() and entry.stat().st_mtime < now - self.ttl_seconds:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                continue  # removed by another worker's sweep
+        return removed
+
+    def memory_usage(self) -> int:
+        """Bytes currently held in memory"""
+        with self._lock:
+            return self._memory_size
+
+
+@lru_cache(maxsize=1)
+def get_blob_store() -> BlobStore:
+    """Return the process-wide blob store shared by every session"""
+    return BlobStore()
+
+
+class SessionStore:
+    """
+    Size-aware accessor for a session state mapping
+
+    Values set through put() that are larger than dedup_bytes are stored by
+    reference. Smaller values stay inline until the session's inline total
+    exceeds budget_bytes, at which point the least recently used ones spill
+    to the blob store. get() transparently resolves references, so keys
+    written through a SessionStore must also be read through one.
+    """
+
+    def __init__(
+        self,
+        state: MutableMapping,
+        store: Optional[BlobStore] = None,
+        budget_bytes: int = config.SESSION_BUDGET_BYTES,
+        dedup_bytes: int = config.SESSION_DEDUP_BYTES,
+        shared: Optional[SharedStore] = None,
+        session_id: Optional[str] = None,
+    ):
+        self.state = state
+        self.store = store or get_blob_store()
+        self.budget_bytes = budget_bytes
+        self.dedup_bytes = dedup_bytes
+        self.shared = shared if session_id else None
+        self.namespace = f"session:{session_id}"
+        if META_KEY not in state:
+            state[META_KEY] = {}
+        # key -> last access time
+        self._access: Dict[str, float] = state[META_KEY]
+
+    def _touch(self, key: str):
+        self._access[key] = time.time()
+
+    def _to_ref(self, value: Any) -> Optional[BlobRef]:
+        encoded = encode_value(value)
+        if encoded is None:
+            return None
+        codec, payload = encoded
+        return BlobRef(self.store.put(payload), len(payload), codec)
+
+    def _publish(self, key: str, ref: BlobRef):
+        """Record a key's value in the shared store for other workers"""
+        self.shared.set(self.namespace, key, json.dumps(dataclasses.asdict(ref)).encode("utf-8"),
+                        ttl=config.SESSION_TTL)
+
+    def _restore(self, key: str) -> bool:
+        """Load a key another worker wrote for this session; True if found"""
+        payload = self.shared.get(self.namespace, key)
+        if payload is None:
+            return False
+        self.state[key] = BlobRef(**json.loads(payload.decode("utf-8")))
+        return True
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Read a value, loading it from the blob store if it was moved out"""
+        if key not in self.state and not (self.shared and self._restore(key)):
+            return default
+        self._touch(key)
+        value = self.state[key]
+        if isinstance(value, BlobRef):
+            try:
+                return decode_value(value.codec, self.store.get(value.digest))
+            except FileNotFoundError:
+                # Swept after going unused for SESSION_TTL
+                del self.state[key]
+                self._access.pop(key, None)
+                return default
+        return value
+
+    def put(self, key: str, value: Any):
+        """Write a value, storing large ones by reference"""
+        self._touch(key)
+        ref = None
+        if self.shared or estimate_size(value) >= self.dedup_bytes:
+            ref = self._to_ref(value)
+        if ref is not None and self.shared:
+            self._publish(key, ref)
+        if ref is not None and ref.size >= self.dedup_bytes:
+            self.state[key] = ref
+            return
+        self.state[key] = value
+        self.enforce_budget()
+
+    def setdefault(self, key: str, value: Any):
+        """Initialize a key if it is not set yet (here or, when shared, on another worker)"""
+        if key not in self.state and not (self.shared and self._restore(key)):
+            self.put(key, value)
+
+    def sizes(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-key size accounting
+
+        Returns:
+            Key -> {"inline": bytes held in session state, "stored": bytes
+            held by reference in the blob store}
+        """
+        report = {}
+        for key, value in self.state.items():
+            if key == META_KEY:
+                continue
+            if isinstance(value, BlobRef):
+                report[key] = {"inline": 0, "stored": value.size}
+            else:
+                report[key] = {"inline": estimate_size(value), "stored": 0}
+        return report
+
+    def inline_size(self) -> int:
+        """Bytes held directly in session state"""
+        return sum(entry["inline"] for entry in self.sizes().values())
+
+    def enforce_budget(self) -> int:
+        """
+        Spill least recently used inline values until the session fits its budget
+
+        Returns:
+            Number of values spilled
+        """
+        sizes = {key: entry["inline"] for key, entry in self.sizes().items() if entry["inline"]}
+        total = sum(sizes.values())
+        spilled = 0
+        # Only keys accessed through this store are safe to replace with references
+        managed = [key for key in sizes if key in self._access]
+        for key in sorted(managed, key=lambda k: self._access[k]):
+            if total <= self.budget_bytes:
+                break
+            ref = self._to_ref(self.state[key])
+            if ref is None:
+                continue
+            self.state[key] = ref
+            total -= sizes[key]
+            spilled += 1
+        return spilled
+
+
+def _cookie_session_id() -> str:
+    """Session id from this browser's cookie ("" if none)"""
+    import streamlit as st
+    return st.context.cookies.get(SESSION_COOKIE, "")
+
+
+def _set_session_cookie(session_id: str) -> None:
+    """Store the session id in a browser cookie (Streamlit cannot set response cookies itself)"""
+    import streamlit.components.v1 as components
+    components.html(
+        "<script>parent.document.cookie = "
+        f"'{SESSION_COOKIE}={session_id}; path=/; max-age={config.SESSION_TTL}; SameSite=Strict';</script>",
+        height=0,
+    )
+
+
+def streamlit_session() -> SessionStore:
+    """
+    SessionStore for the current Streamlit session
+
+    In multi-process mode the session id is kept in a cookie (SESSION_COOKIE)
+    so whichever worker serves the next connection from the same browser can
+    restore the state. It used to be a ?sid= query parameter, which let
+    anyone given the URL take over the session.
+    """
+    import streamlit as st
+    if not multi_process_mode():
+        return SessionStore(st.session_state)
+    session_id = st.session_state.get(SESSION_ID_KEY) or _cookie_session_id()
+    if not _SESSION_ID.match(session_id):
+        session_id = uuid.uuid4().hex
+        _set_session_cookie(session_id)
+    st.session_state[SESSION_ID_KEY] = session_id
+    return SessionStore(st.session_state, shared=get_shared_store(), session_id=session_id)
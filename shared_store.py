@@ -0,0 +1,286 @@
+"""
+Shared local storage for multi-process deployments
+
+When several Streamlit worker processes serve one node, anything kept in a
+process (the plan cache, session state) is invisible to the others and lost
+when a session reconnects to a different worker. This module provides the
+node-wide pieces used in "multi" deployment mode:
+
+- SharedStore: a SQLite key/value table (WAL mode, safe across processes)
+- FileLock / append_csv_row: locked, append-only writes to the plan history CSV
+"""
+
+import csv
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+class SharedStore:
+    """SQLite-backed namespaced key/value store shared by every process on a node"""
+
+    def __init__(self, path: Optional[str] = None, timeout: float = config.SHARED_DB_TIMEOUT):
+        # Default read at construction, so config.SHARED_DB_PATH can be pointed elsewhere (tests)
+        self.path = path or config.SHARED_DB_PATH
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not cross threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        """
+        Read a value
+
+        Args:
+            namespace: Logical table, e.g. "plan_cache"
+            key: Key within the namespace
+
+        Returns:
+            Stored bytes, or None when missing or expired
+        """
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return row[0]
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None):
+        """
+        Write a value
+
+        Args:
+            namespace: Logical table
+            key: Key within the namespace
+            value: Bytes to store
+            ttl: Seconds until the value expires (None for never)
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (namespace, key, value, updated_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, value, now, now + ttl if ttl is not None else None),
+            )
+
+    def delete(self, namespace: str, key: Optional[str] = None):
+        """Delete one key, or the whole namespace when key is None"""
+        with self._transaction() as conn:
+            if key is None:
+                conn.execute("DELETE FROM kv WHERE namespace = ?", (namespace,))
+            else:
+                conn.execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def incr(self, namespace: str, key: str, amount: int = 1) -> int:
+        """Atomically add to an integer counter and return the new value"""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            value = (int(row[0]) if row else 0) + amount
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (namespace, key, value, updated_at, expires_at) VALUES (?, ?, ?, ?, NULL)",
+                (namespace, key, str(value).encode(), time.time()),
+            )
+        return value
+
+    def items(self, namespace: str, prefix: str = "") -> List[Tuple[str, bytes]]:
+        """All live (key, value) pairs in a namespace, optionally only keys starting with prefix"""
+        return self._connection().execute(
+            "SELECT key, value FROM kv WHERE namespace = ? AND key >= ? AND key < ? "
+            "AND (expires_at IS NULL OR expires_at >= ?) ORDER BY key",
+            (namespace, prefix, prefix + "\U0010ffff", time.time()),
+        ).fetchall()
+
+    def update_many(self, namespace: str, keys: Iterable[str], update: Callable[[str, Optional[bytes]], bytes]):
+        """
+        Read-modify-write several keys in one transaction
+
+        Args:
+            namespace: Logical table
+            keys: Keys to update
+            update: Called with (key, current bytes or None); returns the new bytes
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            for key in keys:
+                row = conn.execute(
+                    "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+                ).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO kv (namespace, key, value, updated_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, NULL)",
+                    (namespace, key, update(key, row[0] if row else None), now),
+                )
+
+    def iter_items(self, namespace: str, batch_size: int = 500) -> Iterator[Tuple[str, bytes]]:
+        """Like items(), but reads the namespace in key-ordered pages to bound memory"""
+        last_key = ""
+        while True:
+            page = self._connection().execute(
+                "SELECT key, value FROM kv WHERE namespace = ? AND key > ? "
+                "AND (expires_at IS NULL OR expires_at >= ?) ORDER BY key LIMIT ?",
+                (namespace, last_key, time.time(), batch_size),
+            ).fetchall()
+            yield from page
+            if len(page) < batch_size:
+                return
+            last_key = page[-1][0]
+
+    def count(self, namespace: str) -> int:
+        """Number of live keys in a namespace"""
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM kv WHERE namespace = ? AND (expires_at IS NULL OR expires_at >= ?)",
+            (namespace, time.time()),
+        ).fetchone()
+        return row[0]
+
+    def trim(self, namespace: str, max_entries: int) -> int:
+        """
+        Drop expired keys and then the least recently written ones beyond max_entries
+
+        Returns:
+            Number of keys removed
+        """
+        with self._transaction() as conn:
+            removed = conn.execute(
+                "DELETE FROM kv WHERE namespace = ? AND expires_at < ?", (namespace, time.time())
+            ).rowcount
+            removed += conn.execute(
+                "DELETE FROM kv WHERE namespace = ? AND key NOT IN ("
+                "SELECT key FROM kv WHERE namespace = ? ORDER BY updated_at DESC LIMIT ?)",
+                (namespace, namespace, max_entries),
+            ).rowcount
+        return removed
+
+
+@lru_cache(maxsize=1)
+def get_shared_store() -> SharedStore:
+    """Return this process's handle on the node-wide shared store"""
+    return SharedStore()
+
+
+def multi_process_mode() -> bool:
+    """True when the app is deployed as several worker processes per node"""
+    return config.DEPLOYMENT_MODE == "multi"
+
+
+class FileLock:
+    """Exclusive inter-process lock on a sidecar file (blocking)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self) -> "FileLock":
+        self._file = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+
+def append_csv_row(path: str, row: Dict[str, object], fieldnames: Optional[List[str]] = None):
+    """
+    Append one row to a CSV under an exclusive lock
+
+    The header is written when the file is new or empty. Rows are appended
+    rather than rewriting the file, so concurrent writers never lose rows.
+    Columns missing from an existing header are dropped.
+
+    Args:
+        path: CSV path
+        row: Row values keyed by column
+        fieldnames: Column order for a new file (defaults to the row's keys)
+    """
+    append_csv_rows(path, [row], fieldnames)
+
+
+def append_csv_rows(path: str, rows: List[Dict[str, object]], fieldnames: Optional[List[str]] = None):
+    """
+    Append a batch of rows to a CSV under one lock and one fsync
+
+    Args:
+        path: CSV path
+        rows: Row values keyed by column
+        fieldnames: Column order for a new file (defaults to the first row's keys)
+    """
+    if not rows:
+        return
+    with FileLock(path + ".lock"):
+        header = None
+        needs_newline = False
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                header = next(csv.reader(f), None)
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) not in (b"\n", b"\r")
+        with open(path, "a", encoding="utf-8", newline="") as f:
+            if needs_newline:
+                f.write("\n")
+            writer = csv.DictWriter(f, fieldnames=header or fieldnames or list(rows[0]),
+                                    extrasaction="ignore", lineterminator="\n")
+            if header is None:
+                writer.writeheader()
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
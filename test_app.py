@@ -2,8 +2,84 @@
 Basic tests for the AI-Powered Workout & Diet Planner
 """
 
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
-from utils import calculate_bmi, calculate_bmr, calculate_tdee, validate_user_inputs
+from types import SimpleNamespace
+from unittest import mock
+from datetime import date, timedelta
+from utils import (calculate_bmi, calculate_bmr, calculate_tdee, validate_user_inputs, extract_exercises_from_text,
+                   generate_weekly_schedule)
+from health_metrics import activity_level, calculate_calorie_goals, profile_metrics
+from exercise_catalog import get_exercise_index
+from config import DIETARY_PREFERENCES
+from food_db import filter_foods, get_food_arrays, get_foods
+from plan_cache import PlanCache, SharedPlanCache, get_plan_cache, profile_bucket
+from shared_store import SharedStore, append_csv_row
+from plan_models import PackedPlan, WorkoutDay
+from session_store import BlobRef, BlobStore, SessionStore
+from plan_engine import build_nutrition_plan, build_workout_plan, generate_local_plan, available_equipment, format_nutrition_text
+from ui_components import minify_css, load_stylesheet
+from ai_services import (AIOrchestrator, AIChatService, AIInsight, NutritionAIService, WorkoutAIService,
+                         changed_sections)
+from plan_chunks import merge_week, parse_week_response, week_ranges
+from forecasting import extract_series, forecast_progress, forecast_series
+from insights_job import InsightStore, run_insights_job, user_key
+from plan_index import PlanIndex, index_key
+from plan_search import PlanSearch, parse_query, plan_terms
+from plan_retrieval import grounding_examples, plan_excerpt, profile_query
+from generation_profiles import ProfileRegistry, base_profile
+from section_stream import GUIDANCE_HEADINGS, SectionStreamParser, stream_sections
+from usage_tracking import UsageRecord, UsageTracker, attributed_to
+from cohort_analytics import CohortStore, rebuild_cohorts, time_bucket
+from data_transfer import (PROGRESS_COLUMNS, PROGRESS_NUMERIC, export_rows, import_history_chunk,
+                           import_progress_chunk,
+                           import_rows, iter_plan_history, iter_progress, read_rows)
+from context_packing import estimate_tokens, pack_history, pack_mapping, weekly_stats
+from benchmarks.bench_imports import parse_importtime
+from fake_model import FakeModel
+import cohort_analytics
+import generation_profiles
+import insights_job
+import plan_index
+import plan_search
+import shared_store
+import usage_tracking
+
+# Singletons holding a handle on the node-wide shared store
+STORE_SINGLETONS = (shared_store.get_shared_store, usage_tracking.get_usage_tracker, plan_index.get_plan_index,
+                    plan_search.get_plan_search, insights_job.get_insight_store, cohort_analytics.get_cohort_store,
+                    generation_profiles.get_profile_registry, get_plan_cache)
+
+
+def setUpModule():
+    """Keep the shared store (usage tracking, plan index, ...) out of the checkout"""
+    global _store_dir, _store_patches
+    _store_dir = tempfile.TemporaryDirectory()
+    path = os.path.join(_store_dir.name, 'planner.db')
+    _store_patches = [mock.patch('config.SHARED_DB_PATH', path),
+                      mock.patch.dict(os.environ, {'PLANNER_SHARED_DB': path})]
+    for patcher in _store_patches:
+        patcher.start()
+    for singleton in STORE_SINGLETONS:
+        singleton.cache_clear()
+
+
+def tearDownModule():
+    for singleton in STORE_SINGLETONS:
+        singleton.cache_clear()
+    for patcher in reversed(_store_patches):
+        patcher.stop()
+    _store_dir.cleanup()
 
 
 class TestWorkoutPlanner(unittest.TestCase):
@@ -83,5 +159,1418 @@ class TestWorkoutPlanner(unittest.TestCase):
         self.assertIn("goal is required", errors)
 
 
+class TestHealthMetrics(unittest.TestCase):
+    """Test cases for the table-driven, memoized health calculators"""
+    
+    def test_bmi_category_bounds(self):
+        """Test BMI categories switch exactly at 18.5, 25 and 30"""
+        self.assertEqual(calculate_bmi(100, 18.49)[1], "Underweight")
+        self.assertEqual(calculate_bmi(100, 18.5)[1], "Normal")
+        self.assertEqual(calculate_bmi(100, 25)[1], "Overweight")
+        self.assertEqual(calculate_bmi(100, 30)[1], "Obese")
+        self.assertEqual(calculate_bmi(0, 70), (0.0, "Invalid height"))
+    
+    def test_activity_levels(self):
+        """Test the frequency -> activity level table the sidebar used before the move"""
+        self.assertEqual(activity_level("3 days/week"), "Light")
+        self.assertEqual(activity_level("6 days/week"), "Active")
+        self.assertEqual(activity_level("Daily"), "Very Active")
+        self.assertEqual(activity_level(""), "Moderate")
+        self.assertEqual(activity_level("Twice a month"), "Moderate")
+    
+    def test_profile_metrics_match_calculators(self):
+        """Test the memoized profile metrics equal the separate calculators and are cached"""
+        profile_metrics.cache_clear()
+        metrics = profile_metrics(180, 85, 35, "Male", "Active", "Weight Loss")
+        bmr = calculate_bmr(85, 180, 35, "Male")
+        tdee = calculate_tdee(bmr, "Active")
+        self.assertEqual((metrics.bmi, metrics.bmi_cat), calculate_bmi(180, 85))
+        self.assertEqual((metrics.bmr, metrics.tdee), (bmr, tdee))
+        self.assertEqual(metrics.daily_calories, calculate_calorie_goals(tdee, "Weight Loss")["daily_calories"])
+        self.assertEqual(calculate_calorie_goals(2000, "Muscle Gain"), {"daily_calories": 2300, "surplus": 300})
+        self.assertIs(profile_metrics(180, 85, 35, "Male", "Active", "Weight Loss"), metrics)
+        self.assertEqual(profile_metrics.cache_info().hits, 1)
+    
+    def test_weekly_schedule(self):
+        """Test training days per frequency, capped by the available days"""
+        self.assertEqual(generate_weekly_schedule("4 days/week"), ['Monday', 'Tuesday', 'Wednesday', 'Thursday'])
+        self.assertEqual(len(generate_weekly_schedule("Daily")), 7)
+        self.assertEqual(generate_weekly_schedule("Daily", ['Monday', 'Friday']), ['Monday', 'Friday'])
+    
+    def test_benchmark_runs(self):
+        """Test the micro-benchmark reports matching results"""
+        from benchmarks.bench_health_metrics import run
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(run(rows=500, profiles=50, runs=1), 0)
+
+
+
+class TestStylesheet(unittest.TestCase):
+    """Test cases for the consolidated stylesheet"""
+    
+    def test_minify_css(self):
+        """Test comments and whitespace are stripped"""
+        css = "/* theme */\n.a  >  .b {\n    color: #fff;\n    margin: 0 1rem;\n}\n"
+        self.assertEqual(minify_css(css), ".a>.b{color:#fff;margin:0 1rem}")
+    
+    def test_stylesheet_is_offline(self):
+        """Test the stylesheet never references an external URL"""
+        css = load_stylesheet()
+        self.assertNotIn("@import", css)
+        self.assertIsNone(re.search(r"url\(\s*['\"]?(https?:)?//", css))
+        self.assertNotIn("googleapis", css)
+        self.assertIn("@font-face{", css)
+        self.assertIn(".ai-metric-card{", css)
+
+
+
+class TestLazyLoading(unittest.TestCase):
+    """Test cases for lazily constructed AI services"""
+    
+    def test_orchestrator_builds_services_on_demand(self):
+        """Test services and model clients are created on first access only"""
+        orchestrator = AIOrchestrator("test-key")
+        self.assertEqual(orchestrator._services, {})
+        
+        chat = orchestrator.chat_ai
+        self.assertIsInstance(chat, AIChatService)
+        self.assertIs(orchestrator.chat_ai, chat)
+        self.assertIsNone(chat._model)
+    
+    def test_parse_importtime(self):
+        """Test parsing of -X importtime output"""
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   utils\n"
+            "import time:      5000 |       9000 | app\n"
+        )
+        timings = parse_importtime(stderr)
+        self.assertEqual(timings["utils"], (120, 120))
+        self.assertEqual(timings["app"], (5000, 9000))
+
+
+
+class TestExerciseExtraction(unittest.TestCase):
+    """Test cases for catalogue-based exercise extraction"""
+    
+    def test_catalogue_size(self):
+        """Test the bundled catalogue covers hundreds of movements"""
+        index = get_exercise_index()
+        self.assertGreater(len(index.exercises), 200)
+        self.assertEqual(index.get("goblet squat").equipment, ("Dumbbells",))
+    
+    def test_longest_match_and_word_boundaries(self):
+        """Test longer aliases win and partial words are ignored"""
+        names = [m.exercise.name for m in get_exercise_index().find(
+            "Walking lunges, then dumbbell bench press. Throw it away tomorrow."
+        )]
+        self.assertEqual(names, ["Walking Lunge", "Dumbbell Bench Press"])
+    
+    def test_extract_exercises_from_text(self):
+        """Test structured extraction with sets and reps"""
+        plan = (
+            "## Day 1\n"
+            "- Push-ups: 3 sets of 12 reps\n"
+            "* Goblet squat 4x8\n"
+            "Rest and hydrate"
+        )
+        exercises = extract_exercises_from_text(plan)
+        self.assertEqual([e["name"] for e in exercises], ["Push-up", "Goblet Squat"])
+        self.assertEqual((exercises[0]["sets"], exercises[0]["reps"]), (3, 12))
+        self.assertEqual((exercises[1]["sets"], exercises[1]["reps"]), (4, 8))
+        self.assertIn("chest", exercises[0]["muscle_groups"])
+
+
+
+SAMPLE_PROFILE = {
+    'name': 'John Doe',
+    'age': 30,
+    'gender': 'Male',
+    'height_cm': 175,
+    'weight_kg': 80,
+    'goal': 'Muscle Gain',
+    'experience': 'Intermediate (6 months - 2 years)',
+    'injuries': '',
+    'cultural_food': 'Indian',
+    'dietary_pref': 'Vegan',
+    'allergies': 'peanuts',
+    'dislikes': '',
+    'equipment': 'Dumbbells',
+    'time_available': 45,
+    'budget': 'Low',
+    'workout_frequency': '4 days/week',
+    'bmi': 26.1,
+    'bmi_cat': 'Overweight'
+}
+
+# Fake Gemini reply that every service can parse (insights, recommendations, week days)
+GEMINI_RESPONSE = ('```json\n{"insights": [{"title": "Keep going", "description": "Nice work, John Doe"}], '
+                   '"recommendations": [{"title": "Rest", "description": "Sleep well"}], '
+                   '"days": [{"day": 1, "exercises": [{"name": "Goblet Squat", "sets": 3, "reps": 10}]}]}\n```')
+
+
+class TestPlanEngine(unittest.TestCase):
+    """Test cases for the local rule-based plan engine"""
+    
+    def test_plan_length_and_schedule(self):
+        """Test plans cover the requested days and follow the weekly schedule"""
+        plan = generate_local_plan(SAMPLE_PROFILE, days=30)
+        workout_days = plan['workout_plan']['days']
+        self.assertEqual(len(workout_days), 30)
+        self.assertEqual(len(plan['nutrition_plan']['days']), 30)
+        self.assertEqual(sum(1 for d in workout_days[:7] if d['type'] == 'workout'), 4)
+    
+    def test_constraints_respected(self):
+        """Test equipment, diet and allergy constraints"""
+        plan = generate_local_plan(SAMPLE_PROFILE)
+        usable = available_equipment(SAMPLE_PROFILE['equipment'])
+        for day in plan['workout_plan']['days']:
+            for exercise in day.get('exercises', []):
+                self.assertTrue(set(exercise['equipment']) <= usable)
+        
+        foods = {food.name: food for food in get_foods()}
+        for day in plan['nutrition_plan']['days']:
+            for items in day['meals'].values():
+                for item in items:
+                    self.assertIn('Vegan', foods[item['name']].diets)
+                    self.assertNotIn('peanuts', foods[item['name']].allergens)
+    
+    def test_deterministic(self):
+        """Test the same profile always yields the same plan"""
+        first = generate_local_plan(SAMPLE_PROFILE)
+        second = generate_local_plan(SAMPLE_PROFILE)
+        self.assertEqual(first['workout_plan'], second['workout_plan'])
+        self.assertEqual(first['nutrition_plan'], second['nutrition_plan'])
+    
+    def test_orchestrator_falls_back_to_local_plan(self):
+        """Test empty Gemini responses are replaced by local sections"""
+        orchestrator = AIOrchestrator("test-key")
+        for service in (orchestrator.workout_ai, orchestrator.nutrition_ai, orchestrator.analytics_ai):
+            service.generate_content = lambda prompt, temperature=0.7, **kwargs: ""
+        
+        plan = orchestrator.generate_comprehensive_plan(SAMPLE_PROFILE)
+        self.assertEqual(plan['source'], 'local')
+        self.assertIn('days', plan['workout_plan'])
+        self.assertIsInstance(plan['ai_insights'][0], AIInsight)
+
+
+
+class TestMealSolver(unittest.TestCase):
+    """Test cases for the vectorized food table and meal solver"""
+    
+    def test_array_mask_matches_filter(self):
+        """Test FoodArrays.mask selects the same foods as filter_foods"""
+        arrays = get_food_arrays()
+        for kwargs in (
+            dict(dietary_pref='Vegan', cuisine='Indian', budget='Low', allergies='peanuts, soy'),
+            dict(dietary_pref='Pescatarian', budget='Moderate', dislikes='mushroom', meal='dinner'),
+            dict(dietary_pref='Keto', allergies='milk'),
+        ):
+            expected = [food.name for food in filter_foods(get_foods(), **kwargs)]
+            selected = [food.name for food, keep in zip(arrays.foods, arrays.mask(**kwargs)) if keep]
+            self.assertEqual(selected, expected)
+    
+    def test_free_text_allergies_block_allergens(self):
+        """Test everyday allergy phrasings exclude every food carrying the allergen"""
+        arrays = get_food_arrays()
+        for allergies, allergen in (
+            ('peanut allergy', 'peanuts'),
+            ('allergic to milk', 'dairy'),
+            ('Lactose intolerant', 'dairy'),
+            ('Gluten-free', 'gluten'),
+            ('no dairy; severe tree nut allergy', 'nuts'),
+        ):
+            foods = filter_foods(get_foods(), 'Non-Vegetarian', allergies=allergies)
+            self.assertTrue(foods)
+            self.assertEqual([f.name for f in foods if allergen in f.allergens], [], allergies)
+            selected = [food for food, keep in zip(arrays.foods, arrays.mask('Non-Vegetarian', allergies=allergies))
+                        if keep]
+            self.assertEqual(selected, foods)
+            
+            plan = build_nutrition_plan(dict(SAMPLE_PROFILE, dietary_pref='Vegetarian', allergies=allergies), days=7)
+            served = {food.name: food for food in get_foods()}
+            self.assertEqual([item['name'] for day in plan['days'] for items in day['meals'].values()
+                              for item in items if allergen in served[item['name']].allergens], [], allergies)
+    
+    def test_budget_kept_unless_nothing_fits(self):
+        """Test cuisine is relaxed before budget, and a relaxed budget is reported in the plan"""
+        profile = dict(SAMPLE_PROFILE, dietary_pref='Keto', budget='Low', cultural_food='Indian', allergies='dairy, egg')
+        plan = build_nutrition_plan(profile, days=7)
+        costs = {food.name: food.cost for food in get_foods()}
+        self.assertEqual({costs[item['name']] for day in plan['days'] for item in day['meals']['breakfast']}, {'Low'})
+        self.assertEqual(len(plan['notes']), 1)
+        self.assertIn('lunch, dinner', plan['notes'][0])
+        self.assertIn('Note: No lunch, dinner foods fit your Low budget', format_nutrition_text(plan))
+        self.assertNotIn('notes', build_nutrition_plan(dict(profile, budget='High'), days=7))
+    
+    def test_daily_totals_hit_calorie_target(self):
+        """Test solved days land near the calorie target in quarter servings"""
+        profile = dict(SAMPLE_PROFILE, dietary_pref='Non-Vegetarian', allergies='')
+        plan = build_nutrition_plan(profile, days=14)
+        target = plan['targets']['calories']
+        for day in plan['days']:
+            self.assertLess(abs(day['totals']['calories'] - target) / target, 0.05)
+            for items in day['meals'].values():
+                for item in items:
+                    self.assertEqual(item['servings'] % 0.25, 0)
+                    self.assertLessEqual(item['servings'], 2.5)
+
+    def test_daily_totals_hit_every_macro(self):
+        """Test solved days land near the protein, carb and fat targets for every diet"""
+        for diet in DIETARY_PREFERENCES:
+            profile = dict(SAMPLE_PROFILE, goal='Weight Loss', dietary_pref=diet, cultural_food='Other',
+                           allergies='', budget='High')
+            plan = build_nutrition_plan(profile, days=7)
+            targets = plan['targets']
+            for day in plan['days']:
+                for macro in ('protein_g', 'carbs_g', 'fat_g'):
+                    error = (day['totals'][macro] - targets[macro]) / targets[macro]
+                    self.assertLess(abs(error), 0.3 if diet == 'Keto' else 0.2, (diet, macro))
+                if diet == 'Keto':
+                    self.assertLessEqual(day['totals']['carbs_g'], targets['carbs_g'] + 0.5)
+
+    def test_legume_dishes_not_paleo(self):
+        """Test legume and grain dishes are not tagged Paleo"""
+        paleo = {food.name for food in get_foods() if 'Paleo' in food.diets}
+        for name in ('Moong Dal Chilla', 'Sprouts Chaat', 'Quinoa and Black Bean Salad'):
+            self.assertNotIn(name, paleo)
+
+
+
+class TestPlanCache(unittest.TestCase):
+    """Test cases for the similar-profile plan cache"""
+    
+    def setUp(self):
+        get_plan_cache().clear()
+    
+    def test_similar_profiles_share_bucket(self):
+        """Test small numeric differences share a bucket but constraints do not"""
+        similar = dict(SAMPLE_PROFILE, weight_kg=81, bmi=26.4, age=33, time_available=50)
+        self.assertEqual(profile_bucket(SAMPLE_PROFILE), profile_bucket(similar))
+        self.assertNotEqual(profile_bucket(SAMPLE_PROFILE), profile_bucket(dict(SAMPLE_PROFILE, allergies='soy')))
+        self.assertNotEqual(profile_bucket(SAMPLE_PROFILE), profile_bucket(dict(SAMPLE_PROFILE, equipment='None')))
+    
+    def test_hit_is_personalized(self):
+        """Test cached plans get the new user's name and their own meal plan"""
+        cache = PlanCache()
+        plan = {'workout_plan': {'raw_response': 'Great work, John Doe!'}, 'nutrition_plan': {'guidance': 'Eat well'}}
+        cache.put(SAMPLE_PROFILE, plan)
+        
+        other = dict(SAMPLE_PROFILE, name='Sam', weight_kg=81, bmi=26.4)
+        hit = cache.get(other)
+        self.assertEqual(hit['workout_plan']['raw_response'], 'Great work, Sam!')
+        self.assertEqual(hit['nutrition_plan']['guidance'], 'Eat well')
+        self.assertEqual(hit['nutrition_plan']['targets'], build_nutrition_plan(other)['targets'])
+        self.assertIsNone(cache.get(dict(SAMPLE_PROFILE, goal='Weight Loss')))
+        self.assertEqual(cache.stats()['hit_rate'], 0.5)
+    
+    def test_orchestrator_serves_similar_profile_from_cache(self):
+        """Test a similar profile does not call Gemini again"""
+        orchestrator = AIOrchestrator("test-key")
+        calls = []
+        
+        def fake_generate(prompt, temperature=0.7, **kwargs):
+            calls.append(prompt)
+            return GEMINI_RESPONSE
+        
+        for service in (orchestrator.workout_ai, orchestrator.nutrition_ai, orchestrator.analytics_ai):
+            service.generate_content = fake_generate
+        
+        first = orchestrator.generate_comprehensive_plan(SAMPLE_PROFILE)
+        self.assertEqual(first['source'], 'gemini')
+        call_count = len(calls)
+        second = orchestrator.generate_comprehensive_plan(dict(SAMPLE_PROFILE, name='Sam', weight_kg=81, bmi=26.4))
+        self.assertEqual(len(calls), call_count)
+        self.assertTrue(second['cache_hit'])
+
+
+
+class TestPlanModels(unittest.TestCase):
+    """Test cases for typed plan models and packed serialization"""
+    
+    def test_round_trip(self):
+        """Test a packed plan decodes back to the original dict and is smaller than JSON"""
+        plan = generate_local_plan(SAMPLE_PROFILE, days=30)
+        packed = PackedPlan.from_dict(plan)
+        self.assertEqual(PackedPlan(packed.data).to_dict(), plan)
+        self.assertLess(len(packed), len(json.dumps(plan)) / 2)
+    
+    def test_single_day_access(self):
+        """Test individual days decode into typed models"""
+        plan = generate_local_plan(SAMPLE_PROFILE, days=14)
+        packed = PackedPlan.from_dict(plan)
+        self.assertEqual(packed.workout_day_count, 14)
+        day = packed.workout_day(9)
+        self.assertIsInstance(day, WorkoutDay)
+        self.assertEqual(day.to_dict(), plan['workout_plan']['days'][9])
+        self.assertEqual(packed.nutrition_day(3).to_dict(), plan['nutrition_plan']['days'][3])
+        with self.assertRaises(IndexError):
+            packed.workout_day(14)
+    
+    def test_ai_shaped_sections_kept_verbatim(self):
+        """Test free-form AI sections survive packing untouched"""
+        plan = {'workout_plan': {'days': [{'title': 'Leg day'}]}, 'nutrition_plan': {'raw_response': 'Eat'},
+                'ai_insights': [AIInsight('general', 'T', 'D', 0.9, True, 'high')], 'source': 'gemini'}
+        unpacked = PackedPlan.from_dict(plan).to_dict()
+        self.assertEqual(unpacked['workout_plan'], plan['workout_plan'])
+        self.assertEqual(unpacked['ai_insights'][0]['title'], 'T')
+
+
+
+class TestSessionStore(unittest.TestCase):
+    """Test cases for size-managed session storage"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.blobs = BlobStore(self.tmp.name, memory_bytes=1024)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_large_values_deduplicated_across_sessions(self):
+        """Test identical large text is stored once and read back"""
+        text = "Day 1: squats and lunges. " * 400
+        first, second = SessionStore({}, self.blobs), SessionStore({}, self.blobs)
+        first.put("full_response", text)
+        second.put("full_response", text)
+        self.assertIsInstance(first.state["full_response"], BlobRef)
+        self.assertEqual(first.state["full_response"], second.state["full_response"])
+        self.assertEqual(len(os.listdir(self.tmp.name)), 1)
+        self.assertEqual(second.get("full_response"), text)
+        self.assertEqual(first.sizes()["full_response"], {"inline": 0, "stored": len(text)})
+    
+    def test_unused_blobs_swept_after_ttl(self):
+        """Test blob files unused for the TTL are deleted when a store starts, unless still in memory"""
+        session = SessionStore({}, self.blobs, dedup_bytes=10)
+        session.put("old_response", "stale " * 50)
+        session.put("chat_history", "fresh " * 50)
+        old_path = os.path.join(self.tmp.name, session.state["old_response"].digest)
+        month_ago = time.time() - 30 * 24 * 60 * 60
+        os.utime(old_path, (month_ago, month_ago))
+        
+        self.assertEqual(self.blobs.sweep(), 0)  # still held in this store's memory
+        self.assertGreater(os.path.getmtime(old_path), month_ago)
+        os.utime(old_path, (month_ago, month_ago))
+        restarted = BlobStore(self.tmp.name)
+        
+        self.assertFalse(os.path.exists(old_path))
+        self.assertEqual(len(os.listdir(self.tmp.name)), 1)
+        session.store = restarted
+        self.assertIsNone(session.get("old_response"))
+        self.assertNotIn("old_response", session.state)
+        self.assertEqual(session.get("chat_history"), "fresh " * 50)
+    
+    def test_cold_entries_spill_over_budget(self):
+        """Test least recently used values spill when the session is over budget"""
+        session = SessionStore({}, self.blobs, budget_bytes=3000, dedup_bytes=10_000)
+        session.put("chat_history", [{"content": "x" * 1500, "is_user": True}])
+        session.put("workout_text", "w" * 1500)
+        session.put("diet_text", "d" * 1500)
+        self.assertIsInstance(session.state["chat_history"], BlobRef)
+        self.assertLessEqual(session.inline_size(), 3000)
+        self.assertEqual(session.get("chat_history")[0]["content"], "x" * 1500)
+    
+    def test_packed_plan_round_trip(self):
+        """Test packed plans come back from the blob store intact"""
+        plan = generate_local_plan(SAMPLE_PROFILE, days=30)
+        session = SessionStore({}, self.blobs)
+        session.put("ai_plan", PackedPlan.from_dict(plan))
+        self.assertIsInstance(session.state["ai_plan"], BlobRef)
+        self.assertEqual(session.get("ai_plan").to_dict(), plan)
+
+
+
+class TestSharedStore(unittest.TestCase):
+    """Test cases for the multi-process deployment mode"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.shared = SharedStore(os.path.join(self.tmp.name, 'planner.db'))
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_plan_cache_shared_between_instances(self):
+        """Test a plan cached by one worker is served by another"""
+        plan = generate_local_plan(SAMPLE_PROFILE)
+        SharedPlanCache(store=self.shared).put(SAMPLE_PROFILE, plan)
+        other_worker = SharedPlanCache(store=SharedStore(self.shared.path))
+        hit = other_worker.get(dict(SAMPLE_PROFILE, name='Sam', weight_kg=81, bmi=26.4))
+        self.assertEqual(hit['workout_plan'], plan['workout_plan'])
+        self.assertEqual(other_worker.stats()['hits'], 1)
+    
+    def test_session_restored_on_another_worker(self):
+        """Test session values written by one worker are readable from a fresh state"""
+        blobs = BlobStore(os.path.join(self.tmp.name, 'blobs'))
+        SessionStore({}, blobs, shared=self.shared, session_id='a' * 32).put('chat_history', [{'content': 'hi'}])
+        resumed = SessionStore({}, blobs, shared=self.shared, session_id='a' * 32)
+        self.assertEqual(resumed.get('chat_history'), [{'content': 'hi'}])
+        self.assertIsNone(SessionStore({}, blobs, shared=self.shared, session_id='b' * 32).get('chat_history'))
+
+    @mock.patch('session_store.multi_process_mode', return_value=True)
+    @mock.patch('session_store._cookie_session_id', return_value='')
+    def test_session_id_not_in_url(self, cookie, _):
+        """Test the shared session id stays out of the URL, so a copied link starts a new session"""
+        from streamlit.testing.v1 import AppTest
+
+        def script():
+            import streamlit as st
+            from session_store import streamlit_session
+            st.session_state.namespace = streamlit_session().namespace
+
+        at = AppTest.from_function(script, default_timeout=30).run()
+        namespace = at.session_state['namespace']
+        self.assertEqual(at.run().session_state['namespace'], namespace)
+        self.assertNotIn('sid', at.query_params)
+
+        other = AppTest.from_function(script, default_timeout=30)
+        other.query_params.update(at.query_params)
+        self.assertNotEqual(other.run().session_state['namespace'], namespace)
+
+        cookie.return_value = namespace.split(':')[1]  # same browser reconnecting
+        self.assertEqual(AppTest.from_function(script, default_timeout=30).run().session_state['namespace'], namespace)
+
+    def test_csv_append_keeps_existing_rows(self):
+        """Test locked appends follow the existing header and fix a missing final newline"""
+        path = os.path.join(self.tmp.name, 'history.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('timestamp,name\n2025-01-01,Ann')
+        append_csv_row(path, {'name': 'Bob', 'timestamp': '2025-01-02', 'extra': 1})
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'timestamp,name\n2025-01-01,Ann\n2025-01-02,Bob\n')
+    
+    def test_multi_process_load(self):
+        """Test concurrent worker processes lose no rows, cache entries or sessions"""
+        from benchmarks.load_multiprocess import run
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(run(workers=3, iterations=8), 0)
+
+
+
+class TestDeltaRegeneration(unittest.TestCase):
+    """Test cases for regenerating only the plan sections a profile change affects"""
+    
+    def test_dependency_map(self):
+        """Test profile fields map to the sections that use them"""
+        self.assertEqual(changed_sections(SAMPLE_PROFILE, dict(SAMPLE_PROFILE, budget='High')), ['nutrition_plan'])
+        self.assertEqual(changed_sections(SAMPLE_PROFILE, dict(SAMPLE_PROFILE, dislikes='okra')), ['nutrition_plan'])
+        self.assertEqual(changed_sections(SAMPLE_PROFILE, dict(SAMPLE_PROFILE, equipment='None')), ['workout_plan'])
+        self.assertEqual(len(changed_sections(SAMPLE_PROFILE, dict(SAMPLE_PROFILE, goal='Weight Loss'))), 4)
+        self.assertEqual(changed_sections(SAMPLE_PROFILE, dict(SAMPLE_PROFILE, name='Sam')), [])
+        self.assertEqual(len(changed_sections(None, SAMPLE_PROFILE)), 4)
+    
+    def test_only_affected_service_called(self):
+        """Test a budget change re-invokes only the nutrition service"""
+        orchestrator = AIOrchestrator("test-key")
+        calls = []
+        for name in ('workout_ai', 'nutrition_ai', 'analytics_ai'):
+            def fake_generate(prompt, temperature=0.7, name=name, **kwargs):
+                calls.append(name)
+                return GEMINI_RESPONSE
+            getattr(orchestrator, name).generate_content = fake_generate
+        
+        first = orchestrator.generate_comprehensive_plan(SAMPLE_PROFILE, use_cache=False)
+        calls.clear()
+        updated_profile = dict(SAMPLE_PROFILE, budget='High', name='Sam')
+        second = orchestrator.generate_comprehensive_plan(
+            updated_profile, use_cache=False,
+            previous_plan=PackedPlan.from_dict(first).to_dict(), previous_profile=SAMPLE_PROFILE
+        )
+        self.assertEqual(calls, ['nutrition_ai'])
+        self.assertEqual(second['regenerated_sections'], ['nutrition_plan'])
+        self.assertEqual(second['source'], 'gemini')
+        self.assertEqual(second['workout_plan'], first['workout_plan'])
+        self.assertEqual(second['ai_insights'][0].description, 'Nice work, Sam')
+        self.assertEqual(second['nutrition_plan']['targets'], build_nutrition_plan(updated_profile)['targets'])
+
+    def test_local_fallback_sections_retried(self):
+        """Test a section filled by the local engine is regenerated on the next call"""
+        orchestrator = AIOrchestrator("test-key")
+        calls = []
+        responses = {'workout_ai': GEMINI_RESPONSE, 'nutrition_ai': GEMINI_RESPONSE, 'analytics_ai': ''}
+        for name in responses:
+            def fake_generate(prompt, temperature=0.7, name=name, **kwargs):
+                calls.append(name)
+                return responses[name]
+            getattr(orchestrator, name).generate_content = fake_generate
+
+        first = orchestrator.generate_comprehensive_plan(SAMPLE_PROFILE, use_cache=False)
+        self.assertEqual(first['local_sections'], ['recommendations'])
+        calls.clear()
+        responses['analytics_ai'] = GEMINI_RESPONSE
+        second = orchestrator.generate_comprehensive_plan(
+            SAMPLE_PROFILE, use_cache=False,
+            previous_plan=PackedPlan.from_dict(first).to_dict(), previous_profile=SAMPLE_PROFILE
+        )
+        self.assertEqual(calls, ['analytics_ai'])
+        self.assertEqual(second['regenerated_sections'], ['recommendations'])
+        self.assertEqual(second['source'], 'gemini')
+        self.assertNotIn('local_sections', second)
+
+
+
+class TestChunkedGeneration(unittest.TestCase):
+    """Test cases for week-by-week workout plan generation"""
+    
+    def test_week_ranges(self):
+        """Test plans split into week-sized chunks"""
+        self.assertEqual(week_ranges(7), [(0, 7)])
+        self.assertEqual(week_ranges(30), [(0, 7), (7, 14), (14, 21), (21, 28), (28, 30)])
+        self.assertEqual(parse_week_response('{"days": [{"day": 8}]}'), [{"day": 8}])
+        self.assertIsNone(parse_week_response('no plan today'))
+    
+    def test_long_plan_stitched_week_by_week(self):
+        """Test a 30-day plan is requested per week and failed weeks fall back locally"""
+        service = WorkoutAIService("test-key")
+        prompts = []
+        
+        def fake_generate(prompt, temperature=None, **kwargs):
+            prompts.append(prompt)
+            self.assertEqual(kwargs['call_type'], 'workout_week')
+            if "exercises for week 3\n" in prompt:
+                return ""
+            training_days = re.findall(r"- Day (\d+) \(\w+\): (?!rest)", prompt)
+            return json.dumps({"days": [
+                {"day": int(day), "exercises": [{"name": "Goblet Squat", "sets": 4, "reps": 8}]} for day in training_days
+            ]})
+        
+        service.generate_content = fake_generate
+        ready = []
+        plan = service.generate_smart_workout_plan(dict(SAMPLE_PROFILE, plan_days=30),
+                                                   on_week=lambda week, days: ready.append(week))
+        
+        self.assertEqual(len(prompts), 5)
+        self.assertEqual(sorted(ready), [1, 2, 3, 4, 5])
+        self.assertEqual([day['day'] for day in plan['days']], list(range(1, 31)))
+        self.assertEqual(plan['local_weeks'], [3])
+        self.assertEqual(plan['days'][7]['exercises'][0]['name'], 'Goblet Squat')
+        self.assertNotEqual(plan['days'][14]['exercises'][0]['name'], 'Goblet Squat')
+        week_two = next(p for p in prompts if "exercises for week 2\n" in p)
+        self.assertIn("Week 1: 4 sessions", week_two)
+        self.assertIn('"day": 8', week_two)
+    
+    def test_week_failures_reported_once_from_caller(self):
+        """Test week call errors are collected in the workers and shown once after stitching"""
+        service = WorkoutAIService("test-key")
+        
+        def flaky(prompt, profile, stream=False):
+            if "exercises for week 1\n" not in prompt:
+                raise RuntimeError("quota")
+            return FakeModel(latency=0).generate_content(prompt)
+        
+        service._call_model = flaky
+        error_threads = []
+        with mock.patch('ai_services.st') as fake_st:
+            fake_st.error.side_effect = lambda message: error_threads.append(threading.current_thread())
+            plan = service.generate_smart_workout_plan(dict(SAMPLE_PROFILE, plan_days=21))
+        
+        self.assertEqual(plan['local_weeks'], [2, 3])
+        self.assertEqual(error_threads, [threading.main_thread()])
+        self.assertIn("2 of 3 week(s): quota", fake_st.error.call_args[0][0])
+    
+    def test_week_relative_day_numbers_merged(self):
+        """Test a week answered with days numbered from 1 still lands on its own days"""
+        skeleton = build_workout_plan(dict(SAMPLE_PROFILE, plan_days=14), 14)['days'][7:14]
+        workout_days = [day['day'] for day in skeleton if day['type'] == 'workout']
+        ai_days = [{"day": day - 7, "exercises": [{"name": "Goblet Squat", "sets": 4, "reps": 8}]}
+                   for day in workout_days]
+        
+        merged = merge_week(skeleton, ai_days)
+        
+        self.assertEqual([day['day'] for day in merged], list(range(8, 15)))
+        self.assertTrue(all(day['exercises'][0]['name'] == 'Goblet Squat'
+                            for day in merged if day['type'] == 'workout'))
+        absolute = merge_week(skeleton, [dict(ai_days[0], day=workout_days[0])])
+        self.assertEqual(absolute[workout_days[0] - 8]['exercises'][0]['name'], 'Goblet Squat')
+        self.assertNotEqual(absolute[workout_days[1] - 8]['exercises'][0]['name'], 'Goblet Squat')
+
+
+
+class TestForecasting(unittest.TestCase):
+    """Test cases for the local progress forecasting engine"""
+    
+    def _weight_log(self, start=80.0, per_week=-0.5, weeks=10):
+        noise = [0.3, -0.2, 0.1, -0.3, 0.2, 0.0, -0.1, 0.25, -0.15, 0.05]
+        return [
+            {'date': (date(2024, 1, 1) + timedelta(days=day)).isoformat(),
+             'weight': start + per_week * day / 7 + noise[i % len(noise)],
+             'lifts': {'Bench Press': 60 + day / 7 * 2.5}}
+            for i, day in enumerate(range(0, weeks * 7, 7))
+        ]
+    
+    def test_trend_recovered_with_interval(self):
+        """Test a noisy linear weight log yields its slope and a widening interval"""
+        forecasts = forecast_progress(self._weight_log())
+        weight = forecasts['weight']
+        self.assertEqual(weight.method, 'trend')
+        self.assertAlmostEqual(weight.slope_per_week, -0.5, delta=0.1)
+        self.assertTrue(all(lo < m < hi for lo, m, hi in zip(weight.lower, weight.mean, weight.upper)))
+        self.assertGreater(weight.upper[-1] - weight.lower[-1], weight.upper[0] - weight.lower[0])
+        self.assertAlmostEqual(forecasts['lift:Bench Press'].slope_per_week, 2.5, places=3)
+    
+    def test_malformed_dates_skipped(self):
+        """Test entries whose date doesn't parse are left out instead of failing the forecast"""
+        log = self._weight_log()
+        broken = log + [{'date': '2024-13-45', 'weight': 200.0}, {'date': 'yesterday', 'weight': 0.0},
+                        {'date': 'NaT', 'weight': 5.0}]
+        self.assertEqual(extract_series(broken)['weight'][1].tolist(), extract_series(log)['weight'][1].tolist())
+        self.assertAlmostEqual(forecast_progress(broken)['weight'].slope_per_week, -0.5, delta=0.1)
+    
+    def test_batch_matches_individual_fits(self):
+        """Test series of different lengths fitted together match one-by-one fits"""
+        series = [extract_series(self._weight_log(start=70 + i, per_week=-0.1 * i, weeks=4 + i))['weight']
+                  for i in range(5)]
+        batch = forecast_series(series)
+        for one, result in zip(series, batch):
+            single = forecast_series([one])[0]
+            self.assertAlmostEqual(result['slope_per_week'], single['slope_per_week'], places=9)
+            self.assertTrue((abs(result['upper'] - single['upper']) < 1e-9).all())
+    
+    def test_energy_balance_without_history(self):
+        """Test the weight forecast falls back to the calorie target when nothing is logged"""
+        weight = forecast_progress([], SAMPLE_PROFILE)['weight']
+        self.assertEqual(weight.method, 'energy_balance')
+        self.assertGreater(weight.slope_per_week, 0)  # muscle gain surplus
+        self.assertEqual(forecast_progress([]), {})
+    
+    def test_ai_only_narrates(self):
+        """Test the predictions prompt carries the computed numbers"""
+        orchestrator = AIOrchestrator("test-key")
+        prompts = []
+        orchestrator.analytics_ai.generate_content = lambda prompt, **kwargs: prompts.append(prompt) or "Narration"
+        result = orchestrator.analytics_ai.generate_predictions(SAMPLE_PROFILE, self._weight_log())
+        self.assertEqual(result['predictions'], "Narration")
+        self.assertIn("Bench Press: +2.50/week", prompts[0])
+        self.assertNotIn("2024-01-01", prompts[0])
+
+    def test_predictions_dashboard_narrates_once(self):
+        """Test the predictions tab calls the model again only when the forecasts change"""
+        from streamlit.testing.v1 import AppTest
+
+        def script():
+            import streamlit as st
+            from ai_dashboard import AIDashboard
+            from ai_services import AIOrchestrator
+
+            calls = st.session_state.setdefault('calls', [])
+            orchestrator = AIOrchestrator("test-key")
+            orchestrator.analytics_ai.generate_content = (
+                lambda prompt, call_type=None, **kwargs: calls.append(call_type) or "Narration")
+            log = st.session_state.get('log', [])
+            AIDashboard(orchestrator).render_predictions_dashboard({'name': 'Ann', 'goal': 'Weight Loss'}, log)
+
+        at = AppTest.from_function(script, default_timeout=30)
+        at.session_state['log'] = self._weight_log()
+        at.run().run()
+        self.assertFalse(at.exception)
+        self.assertEqual(at.session_state['calls'], ['predictions', 'recommendations'])
+        at.session_state['log'] = self._weight_log(per_week=-0.8)
+        at.run()
+        self.assertEqual(at.session_state['calls'], ['predictions', 'recommendations'] * 2)
+
+
+
+class TestContextPacking(unittest.TestCase):
+    """Test cases for compact prompt context"""
+    
+    def _log(self, days):
+        return [{'date': (date(2024, 1, 1) + timedelta(days=d)).isoformat(), 'weight': 80 - d * 0.05,
+                 'calories_consumed': 2200 + (d % 3) * 100, 'lifts': {'Squat': 100 + d // 7}}
+                for d in range(days)]
+    
+    def test_short_history_sent_as_table(self):
+        """Test a short log is one CSV table with every entry"""
+        text = pack_history(self._log(5))
+        lines = text.splitlines()
+        self.assertEqual(lines[0], 'date,weight,calories_consumed,lifts.Squat')
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(pack_history([]), 'none')
+    
+    def test_long_history_fits_budget(self):
+        """Test a year of entries is aggregated and thinned into the token budget"""
+        log = self._log(365)
+        text = pack_history(log, budget_tokens=400)
+        self.assertLessEqual(estimate_tokens(text), 400)
+        self.assertIn('weekly averages (older):', text)
+        self.assertIn(log[-1]['date'], text)  # newest entry always kept
+        self.assertLess(estimate_tokens(text), estimate_tokens(json.dumps(log, indent=2)) / 20)
+    
+    def test_weekly_stats(self):
+        """Test weekly rows average numeric columns per Monday-starting week"""
+        rows = weekly_stats([{'date': '2024-01-01', 'weight': 80}, {'date': '2024-01-03', 'weight': 79},
+                             {'date': '2024-01-08', 'weight': 78, 'note': 'felt good'}])
+        self.assertEqual(rows, [{'week': '2024-01-01', 'n': 2, 'weight': 79.5},
+                                {'week': '2024-01-08', 'n': 1, 'weight': 78.0}])
+    
+    def test_profile_line(self):
+        """Test profiles are one compact line without empty or form-only fields"""
+        text = pack_mapping(dict(SAMPLE_PROFILE, generate=True))
+        self.assertIn('goal: Muscle Gain; experience: Intermediate', text)
+        self.assertNotIn('injuries', text)
+        self.assertNotIn('generate', text)
+        self.assertNotIn('\n', text)
+
+
+
+class TestInsightsJob(unittest.TestCase):
+    """Test cases for the precomputed daily insights job"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = InsightStore(SharedStore(os.path.join(self.tmp.name, 'planner.db')))
+        self.orchestrator = AIOrchestrator("test-key")
+        self.calls = []
+        
+        def fake_generate(prompt, temperature=0.7, **kwargs):
+            self.calls.append(prompt)
+            return GEMINI_RESPONSE
+        
+        for service in (self.orchestrator.workout_ai, self.orchestrator.analytics_ai):
+            service.generate_content = fake_generate
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_only_users_with_new_data_refreshed(self):
+        """Test the job refreshes changed users once and the results read back fresh"""
+        for name in ('Ann', 'Ben', 'Cat'):
+            self.store.record_progress(dict(SAMPLE_PROFILE, name=name), {'date': '2024-01-01', 'weight': 80})
+        
+        self.assertEqual(run_insights_job(self.orchestrator, self.store, workers=2),
+                         {'pending': 3, 'refreshed': 3, 'failed': 0})
+        self.assertEqual(len(self.calls), 6)
+        self.assertEqual(run_insights_job(self.orchestrator, self.store)['pending'], 0)
+        
+        key = self.store.record_progress(dict(SAMPLE_PROFILE, name='Ben'), {'date': '2024-01-02', 'weight': 79.8})
+        stored = self.store.load_insights(key)
+        self.assertTrue(stored.stale)
+        self.assertEqual(stored.insights[0].title, 'Keep going')
+        self.assertEqual(run_insights_job(self.orchestrator, self.store)['refreshed'], 1)
+        self.assertFalse(self.store.load_insights(key).stale)
+        self.assertEqual(self.store.load_insights(key).recommendations[0]['title'], 'Rest')
+    
+    def test_failed_users_retried(self):
+        """Test users whose model calls came back empty stay pending"""
+        self.store.save_profile(SAMPLE_PROFILE)
+        self.orchestrator.workout_ai.generate_content = lambda prompt, **kwargs: ""
+        self.orchestrator.analytics_ai.generate_content = lambda prompt, **kwargs: ""
+        self.assertEqual(run_insights_job(self.orchestrator, self.store)['failed'], 1)
+        self.assertEqual(len(self.store.pending_users()), 1)
+        self.assertIsNone(self.store.save_profile(dict(SAMPLE_PROFILE, name='  ')))
+
+    def test_browser_scoped_progress(self):
+        """Test progress logged on one browser is not read back under the same name elsewhere"""
+        key = self.store.record_progress(SAMPLE_PROFILE, {'date': '2024-01-01', 'weight': 80}, 'browser-a')
+        self.assertEqual(key, index_key(SAMPLE_PROFILE, 'browser-a'))
+        self.assertEqual(self.store.progress(key), [{'date': '2024-01-01', 'weight': 80}])
+        self.assertEqual(self.store.progress(index_key(SAMPLE_PROFILE, 'browser-b')), [])
+        self.assertEqual(self.store.progress(user_key(SAMPLE_PROFILE)), [])
+
+    def test_refresh_errors_logged(self):
+        """Test an exception while refreshing a user is logged and counted as a failure"""
+        self.store.save_profile(SAMPLE_PROFILE)
+        self.orchestrator.workout_ai.generate_ai_insights = mock.Mock(side_effect=RuntimeError("boom"))
+        with self.assertLogs('insights_job', level='ERROR') as logs:
+            self.assertEqual(run_insights_job(self.orchestrator, self.store)['failed'], 1)
+        self.assertIn('boom', logs.output[0])
+
+    def test_overview_reuses_result_across_reruns(self):
+        """Test the AI overview calls the model and store again only when the profile changes"""
+        from streamlit.testing.v1 import AppTest
+
+        def script():
+            import streamlit as st
+            from ai_dashboard import AIDashboard
+            from ai_services import AIInsight, AIOrchestrator
+
+            calls = st.session_state.setdefault('calls', [])
+            orchestrator = AIOrchestrator("test-key")
+            orchestrator.workout_ai.generate_ai_insights = lambda profile, progress: calls.append(profile['goal']) or [
+                AIInsight(type='progress', title='Keep going', description='', confidence=0.9, actionable=True,
+                          priority='medium')]
+            AIDashboard(orchestrator).render_ai_overview({'name': '', 'goal': st.session_state.goal}, [])
+
+        at = AppTest.from_function(script, default_timeout=30)
+        at.session_state['goal'] = 'Weight Loss'
+        at.run().run()
+        self.assertFalse(at.exception)
+        self.assertEqual(at.session_state['calls'], ['Weight Loss'])
+        at.session_state['goal'] = 'Muscle Gain'
+        at.run()
+        self.assertEqual(at.session_state['calls'], ['Weight Loss', 'Muscle Gain'])
+
+
+
+class TestDataTransfer(unittest.TestCase):
+    """Test cases for streaming export and import"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = InsightStore(SharedStore(os.path.join(self.tmp.name, 'planner.db')))
+        for name in ('Ann', 'Ben'):
+            key = user_key({'name': name})
+            self.store.add_progress(key, [{'date': (date(2024, 1, 1) + timedelta(days=d)).isoformat(),
+                                           'weight': 70 + d / 10, 'lifts': {'Squat': 100}} for d in range(25)], name)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def _path(self, name):
+        return os.path.join(self.tmp.name, name)
+    
+    def test_filters_and_round_trip(self):
+        """Test a filtered JSONL export imports back into an empty store"""
+        out = self._path('progress.jsonl')
+        rows = iter_progress(self.store, users=['ann'], since='2024-01-10', until='2024-01-19')
+        self.assertEqual(export_rows(rows, out, PROGRESS_COLUMNS, PROGRESS_NUMERIC, chunk_rows=4), 10)
+        
+        target = InsightStore(SharedStore(self._path('target.db')))
+        imported = import_rows(read_rows(out), lambda chunk: import_progress_chunk(chunk, target),
+                               self._path('import.checkpoint.json'), chunk_rows=3)
+        self.assertEqual(imported, 10)
+        progress = target.user(user_key({'name': 'Ann'}))['progress']
+        self.assertEqual([e['date'] for e in progress][:2], ['2024-01-10', '2024-01-11'])
+        self.assertEqual(progress[0]['lifts'], {'Squat': 100})
+        self.assertAlmostEqual(progress[0]['weight'], 70.9)
+    
+    def test_import_skips_malformed_dates(self):
+        """Test imported progress rows without a valid ISO date are not stored"""
+        target = InsightStore(SharedStore(self._path('target.db')))
+        rows = [{'name': 'Ann', 'date': '2024-02-01', 'weight': '70.5'},
+                {'name': 'Ann', 'date': '01/02/2024', 'weight': '71'},
+                {'name': 'Ann', 'date': '', 'weight': '72'}]
+        with self.assertLogs('data_transfer', level='WARNING'):
+            import_progress_chunk(rows, target)
+        progress = target.user(user_key({'name': 'Ann'}))['progress']
+        self.assertEqual([e['date'] for e in progress], ['2024-02-01'])
+    
+    def test_resume_after_failure(self):
+        """Test an interrupted CSV export resumes from its checkpoint without duplicates"""
+        out = self._path('progress.csv')
+        
+        def failing(rows, after):
+            for i, row in enumerate(rows):
+                if i == after:
+                    raise IOError("disk went away")
+                yield row
+        
+        with self.assertRaises(IOError):
+            export_rows(failing(iter_progress(self.store), 23), out, PROGRESS_COLUMNS, PROGRESS_NUMERIC, chunk_rows=10)
+        self.assertTrue(os.path.exists(out + '.checkpoint.json'))
+        total = export_rows(iter_progress(self.store), out, PROGRESS_COLUMNS, PROGRESS_NUMERIC, chunk_rows=10,
+                            resume=True)
+        self.assertEqual(total, 50)
+        self.assertFalse(os.path.exists(out + '.checkpoint.json'))
+        dates = [(r['user_key'], r['date']) for r in read_rows(out)]
+        self.assertEqual(len(dates), 50)
+        self.assertEqual(len(set(dates)), 50)
+    
+    def test_history_date_filter(self):
+        """Test plan history rows stream with a date filter"""
+        path = self._path('history.csv')
+        for day in ('2025-01-01', '2025-02-01', '2025-03-01'):
+            append_csv_row(path, {'timestamp': day + 'T10:00:00', 'name': 'Ann', 'age': 30})
+        rows = list(iter_plan_history(path, since='2025-01-15', until='2025-02-28'))
+        self.assertEqual([r['timestamp'][:10] for r in rows], ['2025-02-01'])
+    
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow not installed')
+    def test_parquet_parts(self):
+        """Test Parquet exports are one part file per chunk and read back typed"""
+        out = self._path('progress.parquet')
+        self.assertEqual(export_rows(iter_progress(self.store), out, PROGRESS_COLUMNS, PROGRESS_NUMERIC,
+                                     chunk_rows=20), 50)
+        self.assertEqual(len(os.listdir(out)), 3)
+        rows = list(read_rows(out, batch_rows=7))
+        self.assertEqual(len(rows), 50)
+        self.assertIsInstance(rows[0]['weight'], float)
+
+
+
+class TestCohortAnalytics(unittest.TestCase):
+    """Test cases for the incremental cohort aggregates"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cohorts = CohortStore(SharedStore(os.path.join(self.tmp.name, 'planner.db')),
+                                   os.path.join(self.tmp.name, 'history.csv'))
+        self.rows = [
+            {'timestamp': '2025-01-06T09:00:00', 'goal': 'Weight Loss', 'bmi': 27.0, 'bmi_cat': 'Overweight', 'age': 30},
+            {'timestamp': '2025-01-08T09:00:00', 'goal': 'Weight Loss', 'bmi': 29.0, 'bmi_cat': 'Overweight', 'age': 40},
+            {'timestamp': '2025-01-15T09:00:00', 'goal': 'Muscle Gain', 'bmi': 21.0, 'bmi_cat': 'Normal', 'age': ''},
+        ]
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_time_bucket(self):
+        """Test weeks start on Monday and months are YYYY-MM"""
+        self.assertEqual(time_bucket('2025-01-08T09:00:00', 'week'), '2025-01-06')
+        self.assertEqual(time_bucket('2025-01-08', 'month'), '2025-01')
+        self.assertEqual(time_bucket('garbage', 'week'), '')
+    
+    def test_incremental_aggregates(self):
+        """Test saving plans updates per-cohort counts and means"""
+        for row in self.rows:
+            self.cohorts.save_plans([row])
+        self.assertEqual(self.cohorts.total_plans(), 3)
+        summary = {row['value']: row for row in self.cohorts.summary('goal')}
+        self.assertEqual(summary['Weight Loss']['plans'], 2)
+        self.assertAlmostEqual(summary['Weight Loss']['mean_bmi'], 28.0)
+        self.assertAlmostEqual(summary['Weight Loss']['std_bmi'], 1.4)
+        self.assertIsNone(summary['Muscle Gain']['mean_age'])
+        self.assertEqual(self.cohorts.summary('budget')[0]['value'], 'Unknown')
+        
+        weekly = self.cohorts.plans_over_time('goal', 'week')
+        self.assertEqual(weekly['periods'], ['2025-01-06', '2025-01-13'])
+        self.assertEqual(weekly['Weight Loss'], [2, 0])
+        self.assertEqual(weekly['Muscle Gain'], [0, 1])
+    
+    def test_rebuild_matches_incremental(self):
+        """Test rebuilding from the CSV reproduces the incrementally maintained aggregates"""
+        import_history_chunk(self.rows, self.cohorts)
+        incremental = self.cohorts.summary('bmi_cat')
+        self.assertEqual(rebuild_cohorts(self.cohorts, chunk_rows=2), 3)
+        self.assertEqual(self.cohorts.summary('bmi_cat'), incremental)
+        self.assertEqual(self.cohorts.plans_over_time(grain='month'), {'periods': ['2025-01'], 'all': [3]})
+
+
+
+class TestPlanIndex(unittest.TestCase):
+    """Test cases for the per-user plan index"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SharedStore(os.path.join(self.tmp.name, 'planner.db'))
+        self.index = PlanIndex(self.store, max_per_user=2)
+        self.profile = {'name': 'Ann Lee', 'age': 30, 'gender': 'Female', 'height_cm': 165, 'weight_kg': 60,
+                        'goal': 'Muscle Gain', 'dietary_pref': 'Veg', 'cultural_food': 'Indian',
+                        'equipment': 'Dumbbells', 'time_available': 45, 'budget': 'Low', 'generate': True}
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_restore_latest_plan(self):
+        """Test the latest plan and its profile come back without regeneration"""
+        plans = [generate_local_plan(dict(self.profile, weight_kg=w)) for w in (60, 61, 62)]
+        for weight, plan in zip((60, 61, 62), plans):
+            self.index.save(dict(self.profile, weight_kg=weight), PackedPlan.from_dict(plan))
+        
+        key = user_key({'name': '  ann   LEE '})
+        records = self.index.plans(key)
+        self.assertEqual(len(records), 2)
+        latest = self.index.latest(key)
+        self.assertEqual(latest.profile['weight_kg'], 62)
+        self.assertNotIn('generate', latest.profile)
+        self.assertEqual(latest.source, 'local')
+        self.assertEqual(self.index.load(latest).to_dict()['workout_plan'],
+                         PackedPlan.from_dict(plans[2]).to_dict()['workout_plan'])
+        # The evicted oldest plan is deleted along with its index record
+        self.assertEqual(self.store.count(PlanIndex.PLANS_NAMESPACE), 2)
+    
+    def test_unknown_and_anonymous_users(self):
+        """Test anonymous profiles are not indexed and unknown users have no plans"""
+        plan = PackedPlan.from_dict(generate_local_plan(self.profile))
+        self.assertIsNone(self.index.save(dict(self.profile, name=''), plan))
+        self.assertIsNone(self.index.latest(user_key({'name': 'Nobody'})))
+        self.assertIsNone(self.index.latest(None))
+    
+    def test_plans_keyed_on_browser(self):
+        """Test a plan saved from one browser can't be found by name alone or from another browser"""
+        plan = PackedPlan.from_dict(generate_local_plan(self.profile))
+        self.index.save(self.profile, plan, browser_id='browser-a')
+        self.assertIsNotNone(self.index.latest(index_key({'name': 'Ann Lee'}, 'browser-a')))
+        self.assertIsNone(self.index.latest(index_key({'name': 'Ann Lee'}, 'browser-b')))
+        self.assertIsNone(self.index.latest(user_key({'name': 'Ann Lee'})))
+    
+    @mock.patch.dict(os.environ, {'GEMINI_API_KEY': 'test-key'})
+    def test_sidebar_restores_only_on_same_browser(self):
+        """Test typing a saved user's name prefills nothing without their browser id"""
+        from streamlit.testing.v1 import AppTest
+        
+        plan = PackedPlan.from_dict(generate_local_plan(self.profile))
+        self.index.save(self.profile, plan, browser_id='A' * 22)
+        app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+        with mock.patch('plan_index.get_plan_index', return_value=self.index):
+            stranger = AppTest.from_file(app_path, default_timeout=30).run()
+            stranger.sidebar.text_input[0].input('Ann Lee').run()
+            self.assertNotEqual(stranger.query_params['device'], ['A' * 22])
+            self.assertFalse([b for b in stranger.sidebar.button if 'Restore' in b.label])
+            self.assertEqual(stranger.session_state['profile_inputs']['gender'], 'Male')
+            
+            owner = AppTest.from_file(app_path, default_timeout=30)
+            owner.query_params['device'] = 'A' * 22
+            owner.run()
+            owner.sidebar.text_input[0].input('Ann Lee').run()
+            self.assertTrue([b for b in owner.sidebar.button if 'Restore' in b.label])
+            self.assertEqual(owner.session_state['profile_inputs']['gender'], 'Female')
+
+
+def _search_plan(exercises, foods):
+    """Minimal typed plan with one training day and one breakfast"""
+    items = [{'name': f, 'serving': '100 g', 'servings': 1, 'calories': 100, 'protein_g': 5, 'carbs_g': 10,
+              'fat_g': 2} for f in foods]
+    return PackedPlan.from_dict({
+        'source': 'ai',
+        'workout_plan': {'days': [{'day': 1, 'exercises': [{'name': n, 'muscle_groups': ['legs']}
+                                                            for n in exercises]}]},
+        'nutrition_plan': {'days': [{'day': 1, 'meals': {'breakfast': items}, 'totals': {}}]},
+    })
+
+
+class TestPlanSearch(unittest.TestCase):
+    """Test cases for the inverted index over saved plans"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        store = SharedStore(os.path.join(self.tmp.name, 'planner.db'))
+        self.search = PlanSearch(store, segment_docs=2)  # tiny segments to cover multi-segment postings
+        self.index = PlanIndex(store, max_per_user=1, search=self.search)
+        self.base = {'age': 30, 'gender': 'Female', 'goal': 'Weight Loss', 'dietary_pref': 'Vegan',
+                     'cultural_food': 'Indian', 'budget': 'Low'}
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def _save(self, name, exercises, foods, **profile):
+        return self.index.save(dict(self.base, name=name, **profile), _search_plan(exercises, foods))
+    
+    def test_terms_and_query_parsing(self):
+        """Test plans yield field terms with counts and queries parse into clauses"""
+        terms = plan_terms(self.base, _search_plan(['Burpees', 'Goblet Squat', 'Burpee'], ['Red Lentils and Rice']))
+        self.assertEqual(terms['exercise:burpee'], 2)
+        self.assertEqual((terms['food:lentil'], terms['diet:vegan'], terms['muscle:leg']), (1, 1, 3))
+        self.assertNotIn('food:and', terms)
+        
+        clauses = parse_query('squat OR Lunges -diet:keto food:lent*')
+        self.assertEqual([(c.terms, c.negated) for c in clauses], [
+            ([('squat', False), ('lunge', False)], False),
+            ([('diet:keto', False)], True),
+            ([('food:lent', True)], False),
+        ])
+    
+    def test_boolean_prefix_and_ranking(self):
+        """Test AND, OR, NOT and prefix queries, ranked by term weight and then recency"""
+        self._save('Ann', ['Burpees', 'Burpees', 'Plank'], ['Tofu Scramble'])
+        self._save('Ben', ['Burpees', 'Goblet Squat'], ['Lentil Soup'])
+        self._save('Cal', ['Goblet Squat'], ['Lentil Soup'], dietary_pref='Keto')
+        self._save('Dee', ['Walking Lunges'], ['Greek Yogurt'], dietary_pref='Keto')
+        
+        names = lambda query: [hit.profile['name'] for hit in self.search.search(query)]
+        self.assertEqual(names('burpees diet:vegan'), ['Ann', 'Ben'])  # Ann has burpees twice
+        self.assertEqual(names('squat OR lunge'), ['Dee', 'Cal', 'Ben'])
+        self.assertEqual(names('food:lent* -keto'), ['Ben'])
+        self.assertEqual(names('tofu'), ['Ann'])
+        self.assertEqual(names('-keto'), [])
+        self.assertEqual(len(self.search.search('lentil', limit=1)), 1)
+        hit = self.search.search('plank')[0]
+        self.assertEqual(self.index.load_plan(hit.plan_id).workout_day(0).exercises[2].name, 'Plank')
+    
+    def test_evicted_plans_leave_the_index(self):
+        """Test a user's evicted plan no longer matches, and a rebuild restores the live plans"""
+        self._save('Ann', ['Burpees'], ['Tofu'])
+        self._save('Ann', ['Plank'], ['Tofu'])
+        self.assertEqual(self.search.search('burpee'), [])
+        self.assertEqual(len(self.search.search('plank tofu')), 1)
+        self.assertEqual(self.search.doc_count(), 1)
+        
+        self.assertEqual(self.index.reindex_search(), 1)
+        self.assertEqual([hit.profile['name'] for hit in self.search.search('plank')], ['Ann'])
+
+
+
+class TestPlanRetrieval(unittest.TestCase):
+    """Test cases for grounding workout generation in similar past plans"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        store = SharedStore(os.path.join(self.tmp.name, 'planner.db'))
+        self.index = PlanIndex(store, max_per_user=1, search=PlanSearch(store, segment_docs=2))
+        self.base = {'age': 30, 'gender': 'Female', 'goal': 'Weight Loss', 'experience': 'Beginner',
+                     'workout_frequency': '3 days/week', 'equipment': 'Dumbbells'}
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def _save(self, name, exercises, source='ai', **profile):
+        plan = PackedPlan.from_dict({'source': source, 'workout_plan': {'days': [
+            {'day': 1, 'focus': 'Full Body', 'exercises': [{'name': n, 'sets': 3, 'reps': 10} for n in exercises]}]}})
+        self.index.save(dict(self.base, name=name, **profile), plan)
+    
+    def test_similar_plans_ranked_by_profile(self):
+        """Test plans sharing the goal and level rank first and local fallbacks are never examples"""
+        self._save('Ann', ['Goblet Squat'], goal='Muscle Gain', experience='Advanced')
+        self._save('Ben', ['Burpees'])
+        self._save('Cal', ['Plank'], experience='Advanced')
+        self._save('Dee', ['Lunges'], source='local')
+        
+        query = profile_query(self.base)
+        self.assertEqual((query['goal:weight'], query['goal:loss'], query['level:beginner']), (1.5, 1.5, 2.0))
+        hits = self.index.search.similar(query, required=('source:ai',), limit=3)
+        self.assertEqual([hit.profile['name'] for hit in hits], ['Ben', 'Cal', 'Ann'])
+        
+        examples = grounding_examples(self.base, plans=self.index, limit=1)
+        self.assertEqual(examples, '- [Weight Loss, Beginner, Dumbbells] Full Body: Burpees 3x10')
+        with mock.patch('config.GROUNDING_ENABLED', False):
+            self.assertEqual(grounding_examples(self.base, plans=self.index), '')
+    
+    def test_excerpt_within_budget(self):
+        """Test excerpts stop adding training days at the token budget"""
+        plan = PackedPlan.from_dict(generate_local_plan(SAMPLE_PROFILE))
+        short, long = plan_excerpt(plan, SAMPLE_PROFILE, 60), plan_excerpt(plan, SAMPLE_PROFILE, 1000)
+        self.assertLessEqual(estimate_tokens(short), 60)
+        self.assertTrue(long.startswith(short))
+        self.assertGreater(long.count(' | '), short.count(' | '))
+        self.assertEqual(plan_excerpt(plan, SAMPLE_PROFILE, 5), '')
+    
+    def test_examples_reach_week_prompts(self):
+        """Test every week prompt carries the retrieved examples and a compact profile line"""
+        service = WorkoutAIService("test-key")
+        prompts = []
+        service.generate_content = lambda prompt, **kwargs: prompts.append(prompt) or ''
+        with mock.patch('plan_retrieval.grounding_examples', return_value='- [Weight Loss] Legs: Squat 3x10'):
+            service.generate_smart_workout_plan(dict(SAMPLE_PROFILE, plan_days=14))
+        
+        self.assertEqual(len(prompts), 2)
+        for prompt in prompts:
+            self.assertIn('SIMILAR PAST PLANS (match their style and volume):\n- [Weight Loss] Legs: Squat 3x10', prompt)
+            self.assertIn(f"USER PROFILE: age: {SAMPLE_PROFILE['age']}; gender:", prompt)
+            self.assertNotIn(SAMPLE_PROFILE['name'], prompt)
+
+
+class TestUsageTracking(unittest.TestCase):
+    """Test cases for token, latency and cost accounting"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tracker = UsageTracker(SharedStore(os.path.join(self.tmp.name, 'planner.db')),
+                                    daily_budget_usd=1.0, user_daily_budget_usd=0.5)
+        patcher = mock.patch('usage_tracking.get_usage_tracker', return_value=self.tracker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_calls_record_metadata_per_service_and_user(self):
+        """Test model calls record usage metadata, charged to the user even from week threads"""
+        orchestrator = AIOrchestrator("test-key")
+        response = SimpleNamespace(text=GEMINI_RESPONSE, usage_metadata=SimpleNamespace(
+            prompt_token_count=1000, candidates_token_count=200, cached_content_token_count=400))
+        orchestrator.workout_ai._call_model = lambda prompt, profile, stream=False: response
+        
+        with attributed_to('user-a'):
+            orchestrator.workout_ai.generate_smart_workout_plan(dict(SAMPLE_PROFILE, plan_days=14))
+        
+        by_user = self.tracker.report(days=1, by='user')
+        self.assertEqual([(row['user'], row['calls']) for row in by_user], [('user-a', 2)])
+        workout = self.tracker.report(days=1, by='service')[0]
+        self.assertEqual(workout['service'], 'workout')
+        self.assertEqual((workout['prompt_tokens'], workout['cached_tokens'], workout['completion_tokens']),
+                         (2000, 800, 400))
+        # 1200 uncached + 800 cached prompt tokens and 400 output tokens at the configured prices
+        self.assertAlmostEqual(workout['cost_usd'], round((1200 * 0.10 + 800 * 0.025 + 400 * 0.40) / 1e6, 4))
+    
+    def test_failed_call_is_estimated_error(self):
+        """Test a failing call counts as an error with estimated prompt tokens"""
+        service = WorkoutAIService("test-key")
+        
+        def fail(prompt, profile, stream=False):
+            raise RuntimeError("quota")
+        
+        service._call_model = fail
+        self.assertEqual(service.generate_content("x" * 400), "")
+        row = self.tracker.report(days=1)[0]
+        self.assertEqual((row['calls'], row['errors'], row['prompt_tokens']), (1, 1, 100))
+    
+    def test_budget_alert_fires_once_and_report_groups(self):
+        """Test crossing a daily budget alerts once and reports group by day and service"""
+        expensive = dict(service='chat', prompt_tokens=0, completion_tokens=1_000_000, latency_ms=1500.0,
+                         user='user-b', day='2025-03-01')
+        self.assertEqual(self.tracker.record(UsageRecord(**expensive)), [])
+        alerts = self.tracker.record(UsageRecord(**expensive))
+        self.assertEqual(len(alerts), 1)
+        self.assertIn('user user-b', alerts[0])
+        self.assertIn('all users', self.tracker.record(UsageRecord(**expensive))[0])
+        self.assertEqual(self.tracker.record(UsageRecord(**expensive)), [])
+        self.assertEqual(len(self.tracker.alerts()), 2)
+        
+        self.tracker.record(UsageRecord(service='plan_cache', prompt_tokens=0, completion_tokens=0, latency_ms=0.0,
+                                        cache='hit', day='2025-03-01'))
+        rows = self.tracker.report(days=1, by='service', today=date(2025, 3, 1))
+        self.assertEqual([row['service'] for row in rows], ['chat', 'plan_cache'])
+        self.assertEqual(rows[0]['p95_latency_ms'], 2000.0)
+        self.assertEqual(rows[1]['cache_hits'], 1)
+        self.assertIsNone(rows[1]['mean_latency_ms'])
+        self.assertEqual(self.tracker.report(days=1, by='day', today=date(2025, 3, 1))[0]['calls'], 5)
+
+
+
+GUIDANCE_RESPONSE = """Here is your guidance.
+**1. Meal Timing Strategies**
+Eat protein at every meal.
+### 2) Hydration Protocols
+Drink 3 L of water.
+3. MICRONUTRIENT FOCUS
+Iron and B12.
+5. Cultural and Budget Tips
+Buy lentils in bulk."""
+
+
+class TestSectionStream(unittest.TestCase):
+    """Test cases for incremental section parsing of streamed output"""
+    
+    def test_sections_emit_at_next_heading(self):
+        """Test a section is emitted once the next heading line is complete, even when split across chunks"""
+        parser = SectionStreamParser(GUIDANCE_HEADINGS)
+        self.assertEqual(parser.feed("Here is your guidance.\n**1. Meal Timing Strategies**\nEat protein"), [])
+        self.assertEqual(parser.feed(" at every meal.\n### 2) Hydr"), [])
+        self.assertEqual(parser.feed("ation Protocols\nDrink"),
+                         [('meal_timing', '**1. Meal Timing Strategies**\nEat protein at every meal.')])
+        self.assertEqual(parser.close(), [('hydration', '### 2) Hydration Protocols\nDrink')])
+    
+    def test_chunking_does_not_change_result(self):
+        """Test one-character chunks give the same sections as a single chunk, skipping a missing topic"""
+        whole = list(stream_sections([GUIDANCE_RESPONSE], GUIDANCE_HEADINGS))
+        by_char = list(stream_sections(list(GUIDANCE_RESPONSE), GUIDANCE_HEADINGS))
+        self.assertEqual(whole, by_char)
+        self.assertEqual([name for name, _ in whole], ['meal_timing', 'hydration', 'micronutrients', 'cultural_budget'])
+        self.assertEqual(whole[-1][1], '5. Cultural and Budget Tips\nBuy lentils in bulk.')
+    
+    @mock.patch('config.USAGE_TRACKING_ENABLED', False)
+    def test_nutrition_guidance_streams_progressively(self):
+        """Test the nutrition plan is reported with meals first, then growing guidance"""
+        service = NutritionAIService("test-key")
+        chunks = [GUIDANCE_RESPONSE[i:i + 7] for i in range(0, len(GUIDANCE_RESPONSE), 7)]
+        service._call_model = lambda prompt, profile, stream=False: (
+            SimpleNamespace(text=c) for c in chunks)
+        updates = []
+        plan = service.generate_smart_nutrition_plan(SAMPLE_PROFILE, on_update=updates.append)
+        
+        self.assertNotIn('guidance', updates[0])
+        self.assertTrue(updates[0]['days'])
+        guidance = [update['guidance'] for update in updates[1:]]
+        self.assertEqual(len(guidance), 4)
+        self.assertTrue(guidance[0].startswith('**1. Meal Timing'))
+        self.assertTrue(all(later.startswith(earlier) for earlier, later in zip(guidance, guidance[1:])))
+        self.assertEqual(plan['guidance'], GUIDANCE_RESPONSE)
+
+
+class TestGenerationProfiles(unittest.TestCase):
+    """Test cases for per-call-type generation profiles and adaptive output caps"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tracker = UsageTracker(SharedStore(os.path.join(self.tmp.name, 'planner.db')))
+        self.registry = ProfileRegistry(self.tracker)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def _observe(self, call_type, completion_tokens, truncated=False, times=1):
+        for _ in range(times):
+            self.tracker.record(UsageRecord(service='chat', prompt_tokens=100, completion_tokens=completion_tokens,
+                                            latency_ms=500.0, call_type=call_type, truncated=truncated))
+        self.registry.invalidate()
+    
+    def test_base_profiles(self):
+        """Test call types get their configured settings and unknown ones the default"""
+        chat = base_profile('chat')
+        self.assertEqual((chat.max_tokens, chat.stop_sequences, chat.json_output), (700, ('\nUser:',), False))
+        self.assertTrue(base_profile('insights').json_output)
+        self.assertEqual(base_profile('unknown').max_tokens, base_profile('default').max_tokens)
+    
+    @mock.patch('config.USAGE_TRACKING_ENABLED', True)
+    def test_cap_adapts_to_observed_outputs(self):
+        """Test the cap shrinks to p95 plus headroom once enough outputs were seen, and reverts on truncation"""
+        self._observe('chat', 200, times=19)
+        self.assertFalse(self.registry.profile('chat').adapted)
+        self._observe('chat', 200)
+        adapted = self.registry.profile('chat')
+        self.assertTrue(adapted.adapted)
+        self.assertEqual(adapted.max_tokens, 333)  # 256-token bucket * 1.3 headroom
+        
+        self._observe('chat', 4000, times=3)
+        self.assertEqual(self.registry.profile('chat').max_tokens, 700)  # never above the configured cap
+        self._observe('chat', 700, truncated=True)
+        self.assertFalse(self.registry.profile('chat').adapted)
+    
+    @mock.patch('config.USAGE_TRACKING_ENABLED', False)
+    def test_services_pass_profiles_to_the_model(self):
+        """Test chat uses its stop sequence and insights use JSON mode, parsed without a fence"""
+        profiles = []
+        
+        def fake_model(prompt, profile, stream=False):
+            profiles.append(profile)
+            payload = {'insights': [{'type': 'recovery', 'title': 'Sleep more', 'priority': 'high'}]}
+            return SimpleNamespace(text=json.dumps(payload) if profile.json_output else 'Keep going!')
+        
+        chat = AIChatService("test-key")
+        chat._call_model = fake_model
+        self.assertEqual(chat.chat_with_ai("How often should I train?"), 'Keep going!')
+        workout = WorkoutAIService("test-key")
+        workout._call_model = fake_model
+        insights = workout.generate_ai_insights(SAMPLE_PROFILE, [])
+        
+        self.assertEqual(profiles[0].stop_sequences, ('\nUser:',))
+        self.assertTrue(profiles[1].json_output)
+        self.assertEqual([(i.type, i.title, i.priority) for i in insights], [('recovery', 'Sleep more', 'high')])
+
+
+class TestSidebarFragment(unittest.TestCase):
+    """Test cases for the sidebar profile fragment"""
+    
+    @mock.patch.dict(os.environ, {'GEMINI_API_KEY': 'test-key'})
+    def test_profile_edits_stay_local(self):
+        """Test profile edits update metrics and validation without rebuilding the orchestrator"""
+        from streamlit.testing.v1 import AppTest
+        
+        at = AppTest.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py'),
+                               default_timeout=30).run()
+        generate = next(b for b in at.sidebar.button if 'Generate' in b.label)
+        self.assertTrue(generate.disabled)  # a name is required
+        orchestrator = at.session_state['ai_orchestrator']
+        
+        at.sidebar.text_input[0].input('Fragment Tester').run()
+        at.sidebar.slider[0].set_value(60).run()
+        generate = next(b for b in at.sidebar.button if 'Generate' in b.label)
+        self.assertFalse(generate.disabled)
+        self.assertEqual(at.session_state['profile_inputs']['time_available'], 60)
+        self.assertIs(at.session_state['ai_orchestrator'], orchestrator)
+        self.assertEqual([m.label for m in at.sidebar.metric], ['BMR', 'TDEE'])
+
+
+class TestFakeBackend(unittest.TestCase):
+    """Test cases for the fake model backend and the session load test"""
+    
+    def test_services_parse_fake_replies(self):
+        """Test every service gets replies its parser accepts, without Gemini"""
+        with mock.patch('config.AI_BACKEND', 'fake'), mock.patch('config.FAKE_MODEL_LATENCY', 0.0):
+            orchestrator = AIOrchestrator('')
+            self.assertIsInstance(orchestrator.workout_ai.model, FakeModel)
+            plan = orchestrator.workout_ai.generate_smart_workout_plan(dict(SAMPLE_PROFILE, plan_days=14))
+            insights = orchestrator.workout_ai.generate_ai_insights(SAMPLE_PROFILE, [])
+            recommendations = orchestrator.analytics_ai.generate_recommendations(SAMPLE_PROFILE, {})
+            sections = []
+            nutrition = orchestrator.nutrition_ai.generate_smart_nutrition_plan(
+                SAMPLE_PROFILE, on_update=lambda update: sections.append(update.get('guidance')))
+        
+        self.assertNotIn('local_weeks', plan)
+        self.assertEqual(plan['days'][0]['exercises'][0]['name'], 'Goblet Squat')
+        self.assertEqual(insights[0].title, 'Consistent training')
+        self.assertEqual(recommendations[0]['timeframe'], 'next 7 days')
+        self.assertIn('HYDRATION PROTOCOLS', nutrition['guidance'])
+        self.assertGreater(len(sections), 2)  # meals first, then guidance topic by topic
+    
+    def test_load_sessions_smoke(self):
+        """Test a one-session load test completes its whole flow"""
+        # A fresh process, as in CI: the harness moves the relative store paths to a temporary directory
+        result = subprocess.run([sys.executable, '-m', 'benchmarks.load_sessions', '--sessions', '1', '--latency', '0'],
+                                cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+                                timeout=120)
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        self.assertIn('RSS per session', result.stdout)
+        self.assertRegex(result.stdout, r'export +p50')
+
+
 if __name__ == '__main__':
     unittest.main()
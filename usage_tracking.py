@@ -0,0 +1,382 @@
+"""
+Token usage, latency and cost accounting for Gemini calls
+
+AIService.generate_content used to drop the response metadata, so nothing
+showed which service drives spend or latency. Every call now records its
+prompt, cached and completion tokens, latency and cache status. Records are
+aggregated in the shared store per (day, service, user), with "*" rows for
+the service, user and day totals, so a budget check or a report reads a
+handful of rows. Crossing the daily budget (overall or per user) logs a
+warning and keeps an alert for the report.
+
+The user a call is charged to is set with attributed_to(); worker threads
+must run in a copy of the caller's context (contextvars.copy_context) to
+inherit it.
+
+Usage:
+    python -m usage_tracking [--days 7] [--by service|user|day]
+"""
+
+import argparse
+import contextvars
+import json
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+
+import config
+from context_packing import estimate_tokens
+from shared_store import SharedStore, get_shared_store
+
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS = "anonymous"
+TOTAL = "*"  # service or user of a total row
+
+# Upper bounds (tokens) of the output length histogram kept per call type
+OUTPUT_BUCKETS = (64, 128, 256, 384, 512, 768, 1024, 1536, 2048, 3072, 4096, 8192)
+OUTPUT_WINDOW = 500  # counts are halved past this many samples, so old outputs fade
+
+_current_user: contextvars.ContextVar = contextvars.ContextVar("usage_user", default=ANONYMOUS)
+
+
+@contextmanager
+def attributed_to(user: Optional[str]) -> Iterator[None]:
+    """Charge the model calls made inside the block to a user key"""
+    token = _current_user.set(user or ANONYMOUS)
+    try:
+        yield
+    finally:
+        _current_user.reset(token)
+
+
+def current_user() -> str:
+    return _current_user.get()
+
+
+@dataclass
+class UsageRecord:
+    """Data class for one model call (or one request served from the plan cache)"""
+    service: str  # workout, nutrition, analytics, chat, plan_cache
+    prompt_tokens: int
+    completion_tokens: int
+    latency_ms: float
+    cache: str = "miss"  # miss, partial (prompt prefix served from Gemini's cache), hit (no model call)
+    cached_tokens: int = 0
+    error: bool = False
+    estimated: bool = False  # token counts estimated from text (no usage metadata)
+    user: str = ANONYMOUS
+    day: str = ""
+    call_type: str = ""  # generation profile used (see generation_profiles)
+    truncated: bool = False  # output stopped at max_tokens
+
+    @property
+    def cost_usd(self) -> float:
+        prices = config.USAGE_PRICE_PER_MTOK
+        uncached = max(self.prompt_tokens - self.cached_tokens, 0)
+        return (uncached * prices["prompt"] + self.cached_tokens * prices["cached"]
+                + self.completion_tokens * prices["completion"]) / 1_000_000
+
+
+def _truncated(response: Any) -> bool:
+    candidates = getattr(response, "candidates", None) or []
+    reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    return getattr(reason, "name", reason) in ("MAX_TOKENS", 2)
+
+
+def usage_from_response(
+    service: str, prompt: str, response: Any, text: str, latency_ms: float, call_type: str = ""
+) -> UsageRecord:
+    """
+    Build a record from a Gemini response's usage metadata
+
+    Args:
+        service: Name of the calling service
+        prompt: Prompt sent (for estimating when metadata is missing)
+        response: Gemini response, or None if the call failed
+        text: Generated text ("" on failure)
+        latency_ms: Wall time of the call
+        call_type: Generation profile the call used
+
+    Returns:
+        UsageRecord charged to the current user
+    """
+    meta = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(meta, "prompt_token_count", None)
+    completion_tokens = getattr(meta, "candidates_token_count", None)
+    cached_tokens = getattr(meta, "cached_content_token_count", None) or 0
+    estimated = prompt_tokens is None
+    return UsageRecord(
+        service=service,
+        prompt_tokens=int(prompt_tokens) if prompt_tokens is not None else estimate_tokens(prompt),
+        completion_tokens=int(completion_tokens or 0) if not estimated else estimate_tokens(text),
+        latency_ms=latency_ms,
+        cache="partial" if cached_tokens else "miss",
+        cached_tokens=int(cached_tokens),
+        error=response is None,
+        estimated=estimated,
+        user=current_user(),
+        call_type=call_type,
+        truncated=_truncated(response),
+    )
+
+
+def _empty_stats() -> Dict[str, Any]:
+    return {"calls": 0, "errors": 0, "cache_hits": 0, "prompt_tokens": 0, "cached_tokens": 0,
+            "completion_tokens": 0, "cost_usd": 0.0, "latency_ms_sum": 0.0, "latency_ms_max": 0.0,
+            "latency_hist": [0] * (len(config.USAGE_LATENCY_BUCKETS_MS) + 1)}
+
+
+def _add(stats: Dict[str, Any], record: UsageRecord):
+    stats["calls"] += 1
+    stats["errors"] += int(record.error)
+    stats["cache_hits"] += int(record.cache == "hit")
+    stats["prompt_tokens"] += record.prompt_tokens
+    stats["cached_tokens"] += record.cached_tokens
+    stats["completion_tokens"] += record.completion_tokens
+    stats["cost_usd"] += record.cost_usd
+    if record.cache != "hit":
+        stats["latency_ms_sum"] += record.latency_ms
+        stats["latency_ms_max"] = max(stats["latency_ms_max"], record.latency_ms)
+        bucket = sum(record.latency_ms > bound for bound in config.USAGE_LATENCY_BUCKETS_MS)
+        stats["latency_hist"][bucket] += 1
+
+
+def _merge(total: Dict[str, Any], stats: Dict[str, Any]):
+    for field in ("calls", "errors", "cache_hits", "prompt_tokens", "cached_tokens", "completion_tokens",
+                  "cost_usd", "latency_ms_sum"):
+        total[field] += stats[field]
+    total["latency_ms_max"] = max(total["latency_ms_max"], stats["latency_ms_max"])
+    total["latency_hist"] = [a + b for a, b in zip(total["latency_hist"], stats["latency_hist"])]
+
+
+def latency_percentile(stats: Dict[str, Any], fraction: float = 0.95) -> Optional[float]:
+    """Upper bound (ms) of the histogram bucket holding the given fraction of model calls"""
+    hist = stats["latency_hist"]
+    timed = sum(hist)
+    if not timed:
+        return None
+    seen = 0
+    for bound, count in zip(list(config.USAGE_LATENCY_BUCKETS_MS) + [stats["latency_ms_max"]], hist):
+        seen += count
+        if seen >= fraction * timed:
+            return float(bound)
+    return stats["latency_ms_max"]
+
+
+def output_percentile(stats: Dict[str, Any], fraction: float = 0.95) -> int:
+    """Upper bound (tokens) of the output histogram bucket holding the given fraction of outputs"""
+    hist = stats["hist"]
+    total = sum(hist)
+    seen = 0.0
+    for bound, count in zip(OUTPUT_BUCKETS, hist):
+        seen += count
+        if seen >= fraction * total:
+            return bound
+    return OUTPUT_BUCKETS[-1]
+
+
+class UsageTracker:
+    """Per-day usage aggregates and budget alerts in the shared store"""
+
+    NAMESPACE = "usage"
+    ALERTS_NAMESPACE = "usage_alerts"
+    OUTPUTS_NAMESPACE = "usage_outputs"  # output length histogram per call type
+
+    def __init__(
+        self,
+        store: Optional[SharedStore] = None,
+        daily_budget_usd: float = config.USAGE_DAILY_BUDGET_USD,
+        user_daily_budget_usd: float = config.USAGE_USER_DAILY_BUDGET_USD,
+    ):
+        self.store = store or get_shared_store()
+        self.daily_budget_usd = daily_budget_usd
+        self.user_daily_budget_usd = user_daily_budget_usd
+
+    def record(self, record: UsageRecord) -> List[str]:
+        """
+        Add one call to the aggregates of its day, service and user
+
+        Args:
+            record: The call; day defaults to today
+
+        Returns:
+            Budget alerts this call triggered (usually none)
+        """
+        day = record.day or date.today().isoformat()
+        keys = {f"{day}|{service}|{user}" for service in (record.service, TOTAL) for user in (record.user, TOTAL)}
+        before: Dict[str, float] = {}
+        after: Dict[str, float] = {}
+
+        def update(key: str, payload: Optional[bytes]) -> bytes:
+            stats = json.loads(payload.decode("utf-8")) if payload else _empty_stats()
+            before[key] = stats["cost_usd"]
+            _add(stats, record)
+            after[key] = stats["cost_usd"]
+            return json.dumps(stats, separators=(",", ":")).encode("utf-8")
+
+        self.store.update_many(self.NAMESPACE, sorted(keys), update)
+        if record.call_type and not record.error and record.cache != "hit":
+            self._observe_output(record)
+
+        alerts = []
+        checks = [(f"{day}|{TOTAL}|{TOTAL}", self.daily_budget_usd, "all users")]
+        if record.user != ANONYMOUS:
+            checks.append((f"{day}|{TOTAL}|{record.user}", self.user_daily_budget_usd, f"user {record.user[:8]}"))
+        for key, budget, scope in checks:
+            if budget > 0 and before[key] < budget <= after[key]:
+                message = f"{day}: Gemini spend for {scope} reached ${after[key]:.2f} (daily budget ${budget:.2f})"
+                logger.warning(message)
+                self.store.set(self.ALERTS_NAMESPACE, key, json.dumps(
+                    {"message": message, "at": time.time()}).encode("utf-8"))
+                alerts.append(message)
+        return alerts
+
+    def _observe_output(self, record: UsageRecord):
+        bucket = min(sum(record.completion_tokens > bound for bound in OUTPUT_BUCKETS), len(OUTPUT_BUCKETS) - 1)
+
+        def update(_key: str, payload: Optional[bytes]) -> bytes:
+            stats = json.loads(payload.decode("utf-8")) if payload else {
+                "samples": 0.0, "truncated": 0.0, "hist": [0.0] * len(OUTPUT_BUCKETS)}
+            if stats["samples"] >= OUTPUT_WINDOW:
+                stats["samples"] /= 2
+                stats["truncated"] /= 2
+                stats["hist"] = [count / 2 for count in stats["hist"]]
+            stats["samples"] += 1
+            stats["truncated"] += int(record.truncated)
+            stats["hist"][bucket] += 1
+            return json.dumps(stats, separators=(",", ":")).encode("utf-8")
+
+        self.store.update_many(self.OUTPUTS_NAMESPACE, [record.call_type], update)
+
+    def output_lengths(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Observed output lengths per call type
+
+        Returns:
+            Call type -> {"samples", "truncated" (share), "p50", "p95"} with
+            recent outputs weighted most; samples decay past OUTPUT_WINDOW
+        """
+        lengths = {}
+        for call_type, payload in self.store.items(self.OUTPUTS_NAMESPACE):
+            stats = json.loads(payload.decode("utf-8"))
+            lengths[call_type] = {
+                "samples": stats["samples"],
+                "truncated": stats["truncated"] / stats["samples"] if stats["samples"] else 0.0,
+                "p50": output_percentile(stats, 0.5),
+                "p95": output_percentile(stats, 0.95),
+            }
+        return lengths
+
+    def report(self, days: int = 7, by: str = "service", today: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        Usage over the last days grouped by service, user or day, costliest first
+
+        Returns:
+            One row per group: calls, errors, cache hits, tokens, cost, mean/p95/max latency
+        """
+        today = today or date.today()
+        groups: Dict[str, Dict[str, Any]] = {}
+        for offset in range(days):
+            day = (today - timedelta(days=offset)).isoformat()
+            for key, payload in self.store.items(self.NAMESPACE, prefix=f"{day}|"):
+                _, service, user = key.split("|", 2)
+                if by == "service" and user == TOTAL and service != TOTAL:
+                    group = service
+                elif by == "user" and service == TOTAL and user != TOTAL:
+                    group = user
+                elif by == "day" and service == TOTAL and user == TOTAL:
+                    group = day
+                else:
+                    continue
+                _merge(groups.setdefault(group, _empty_stats()), json.loads(payload.decode("utf-8")))
+
+        rows = []
+        for group, stats in groups.items():
+            model_calls = stats["calls"] - stats["cache_hits"]
+            rows.append({
+                by: group,
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "cache_hits": stats["cache_hits"],
+                "prompt_tokens": stats["prompt_tokens"],
+                "cached_tokens": stats["cached_tokens"],
+                "completion_tokens": stats["completion_tokens"],
+                "cost_usd": round(stats["cost_usd"], 4),
+                "mean_latency_ms": round(stats["latency_ms_sum"] / model_calls) if model_calls else None,
+                "p95_latency_ms": latency_percentile(stats),
+                "max_latency_ms": round(stats["latency_ms_max"]),
+            })
+        rows.sort(key=lambda row: (-row["cost_usd"], str(row[by])))
+        return rows
+
+    def alerts(self) -> List[str]:
+        """Budget alerts raised so far, oldest first"""
+        stored = [json.loads(value.decode("utf-8")) for _, value in self.store.items(self.ALERTS_NAMESPACE)]
+        return [alert["message"] for alert in sorted(stored, key=lambda alert: alert["at"])]
+
+
+@lru_cache(maxsize=1)
+def get_usage_tracker() -> UsageTracker:
+    """Return the usage tracker on this process's shared store"""
+    return UsageTracker()
+
+
+def record_usage(record: UsageRecord) -> List[str]:
+    """Record a call if accounting is enabled; accounting failures never fail the call"""
+    if not config.USAGE_TRACKING_ENABLED:
+        return []
+    try:
+        return get_usage_tracker().record(record)
+    except Exception as e:
+        logger.warning("Usage accounting failed: %s", e)
+        return []
+
+
+def format_report(rows: List[Dict[str, Any]], by: str) -> str:
+    """Plain-text table of report rows"""
+    if not rows:
+        return "No usage recorded."
+    header = f"{by:<18} {'calls':>7} {'errors':>6} {'cached':>6} {'prompt tok':>11} {'output tok':>11} " \
+             f"{'cost $':>9} {'mean ms':>8} {'p95 ms':>8}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{str(row[by])[:18]:<18} {row['calls']:>7} {row['errors']:>6} {row['cache_hits']:>6} "
+            f"{row['prompt_tokens']:>11} {row['completion_tokens']:>11} {row['cost_usd']:>9.4f} "
+            f"{row['mean_latency_ms'] if row['mean_latency_ms'] is not None else '-':>8} "
+            f"{row['p95_latency_ms'] if row['p95_latency_ms'] is not None else '-':>8}"
+        )
+    lines.append(f"{'total':<18} {sum(r['calls'] for r in rows):>7} {'':>6} {'':>6} "
+                 f"{sum(r['prompt_tokens'] for r in rows):>11} {sum(r['completion_tokens'] for r in rows):>11} "
+                 f"{sum(r['cost_usd'] for r in rows):>9.4f}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report Gemini token usage, cost and latency")
+    parser.add_argument("--days", type=int, default=7, help="Days to include, ending today")
+    parser.add_argument("--by", choices=("service", "user", "day"), default="service", help="Grouping")
+    args = parser.parse_args()
+
+    tracker = get_usage_tracker()
+    print(format_report(tracker.report(args.days, args.by), args.by))
+    lengths = tracker.output_lengths()
+    if lengths:
+        print("\nOutput length by call type (tokens):")
+        for call_type, stats in sorted(lengths.items()):
+            print(f"- {call_type:<20} p50 <= {stats['p50']:>5}  p95 <= {stats['p95']:>5}  "
+                  f"truncated {stats['truncated']:.1%} of {stats['samples']:.0f}")
+    alerts = tracker.alerts()
+    if alerts:
+        print("\nBudget alerts:")
+        print("\n".join(f"- {alert}" for alert in alerts[-10:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,111 +3,26 @@ Utility functions for the AI-Powered Workout & Diet Planner
 """
 
 import re
-from typing import Dict, List, Tuple, Optional
+from bisect import bisect_right
+from typing import Any, Dict, List, Tuple, Optional
 from datetime import datetime, timedelta
-import pandas as pd
 
+from exercise_catalog import get_exercise_index
+# The health calculators live in health_metrics; re-exported for existing callers
+from health_metrics import (  # noqa: F401
+    FREQUENCY_DAYS,
+    calculate_bmi,
+    calculate_bmr,
+    calculate_calorie_goals,
+    calculate_tdee,
+)
 
-def calculate_bmi(height_cm: float, weight_kg: float) -> Tuple[float, str]:
-    """
-    Calculate BMI and return category
-    
-    Args:
-        height_cm: Height in centimeters
-        weight_kg: Weight in kilograms
-        
-    Returns:
-        Tuple of (BMI value, BMI category)
-    """
-    if height_cm <= 0:
-        return 0.0, "Invalid height"
-    
-    height_m = height_cm / 100.0
-    bmi = weight_kg / (height_m * height_m)
-    
-    if bmi < 18.5:
-        category = "Underweight"
-    elif bmi < 25:
-        category = "Normal"
-    elif bmi < 30:
-        category = "Overweight"
-    else:
-        category = "Obese"
-    
-    return round(bmi, 1), category
-
-
-def calculate_bmr(weight_kg: float, height_cm: float, age: int, gender: str) -> float:
-    """
-    Calculate Basal Metabolic Rate using Mifflin-St Jeor Equation
-    
-    Args:
-        weight_kg: Weight in kilograms
-        height_cm: Height in centimeters  
-        age: Age in years
-        gender: Gender (Male/Female/Other)
-        
-    Returns:
-        BMR in calories per day
-    """
-    if gender.lower() == "male":
-        bmr = 10 * weight_kg + 6.25 * height_cm - 5 * age + 5
-    else:  # Female or Other
-        bmr = 10 * weight_kg + 6.25 * height_cm - 5 * age - 161
-    
-    return round(bmr, 0)
-
-
-def calculate_tdee(bmr: float, activity_level: str) -> float:
-    """
-    Calculate Total Daily Energy Expenditure
-    
-    Args:
-        bmr: Basal Metabolic Rate
-        activity_level: Activity level (Sedentary, Light, Moderate, Active, Very Active)
-        
-    Returns:
-        TDEE in calories per day
-    """
-    activity_multipliers = {
-        "Sedentary": 1.2,
-        "Light": 1.375, 
-        "Moderate": 1.55,
-        "Active": 1.725,
-        "Very Active": 1.9
-    }
-    
-    multiplier = activity_multipliers.get(activity_level, 1.2)
-    return round(bmr * multiplier, 0)
 
-
-def calculate_calorie_goals(tdee: float, goal: str) -> Dict[str, int]:
-    """
-    Calculate calorie goals based on fitness objective
-    
-    Args:
-        tdee: Total Daily Energy Expenditure
-        goal: Fitness goal (Weight Loss, Muscle Gain, etc.)
-        
-    Returns:
-        Dictionary with calorie goals
-    """
-    if goal == "Weight Loss":
-        return {
-            "daily_calories": int(tdee - 500),  # 500 calorie deficit
-            "deficit": 500
-        }
-    elif goal == "Muscle Gain":
-        return {
-            "daily_calories": int(tdee + 300),  # 300 calorie surplus
-            "surplus": 300
-        }
-    else:  # Maintain Fitness
-        return {
-            "daily_calories": int(tdee),
-            "deficit": 0,
-            "surplus": 0
-        }
+_SETS_PATTERN = re.compile(r'(\d+)\s*sets?', re.IGNORECASE)
+_REPS_PATTERN = re.compile(r'(\d+)\s*reps?', re.IGNORECASE)
+_SETS_X_REPS_PATTERN = re.compile(r'(\d+)\s*[x×]\s*(\d+)', re.IGNORECASE)
+_BOLD_HEADING_PATTERN = re.compile(r'^\*\*[^*]+\*\*:?$')
+_WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
 
 
 def parse_workout_duration(duration_str: str) -> int:
@@ -144,37 +59,68 @@ def parse_workout_duration(duration_str: str) -> int:
     return total_minutes
 
 
-def extract_exercises_from_text(text: str) -> List[Dict[str, str]]:
+def extract_exercises_from_text(text: str) -> List[Dict[str, Any]]:
     """
     Extract exercise information from workout text
     
+    Scans the whole text once against the bundled exercise catalogue, then
+    reads sets/reps from the line each exercise appears on.
+    
     Args:
         text: Workout plan text
         
     Returns:
         List of exercise dictionaries
     """
-    exercises = []
+    matches = get_exercise_index().find(text)
+    if not matches:
+        return []
+    
+    line_starts = [0] + [m.end() for m in re.finditer('\n', text)]
     lines = text.split('\n')
+    sets_reps_by_line: Dict[int, Tuple[Optional[int], Optional[int]]] = {}
+    exercises = []
     
-    for line in lines:
-        line = line.strip()
-        if not line or line.startswith('#') or line.startswith('*'):
+    for match in matches:
+        line_no = bisect_right(line_starts, match.start) - 1
+        line = lines[line_no].strip()
+        if line.startswith('#') or _BOLD_HEADING_PATTERN.match(line):
             continue
-            
-        # Look for exercise patterns
-        if any(keyword in line.lower() for keyword in ['push-up', 'squat', 'lunge', 'plank', 'burpee']):
-            exercise = {
-                'name': line.split('-')[0].strip() if '-' in line else line,
-                'description': line,
-                'sets': extract_sets_reps(line),
-                'reps': extract_sets_reps(line, 'reps')
-            }
-            exercises.append(exercise)
+        
+        if line_no not in sets_reps_by_line:
+            sets_reps_by_line[line_no] = _parse_sets_reps(line)
+        sets, reps = sets_reps_by_line[line_no]
+        
+        exercise = match.exercise
+        exercises.append({
+            'name': exercise.name,
+            'description': line,
+            'sets': sets,
+            'reps': reps,
+            'category': exercise.category,
+            'muscle_groups': list(exercise.muscle_groups),
+            'equipment': list(exercise.equipment)
+        })
     
     return exercises
 
 
+def _parse_sets_reps(text: str) -> Tuple[Optional[int], Optional[int]]:
+    """Parse (sets, reps) from one line, accepting "3 sets of 10 reps" and "3x10" forms"""
+    sets_match = _SETS_PATTERN.search(text)
+    reps_match = _REPS_PATTERN.search(text)
+    sets = int(sets_match.group(1)) if sets_match else None
+    reps = int(reps_match.group(1)) if reps_match else None
+    
+    if sets is None or reps is None:
+        sets_x_reps = _SETS_X_REPS_PATTERN.search(text)
+        if sets_x_reps:
+            sets = sets if sets is not None else int(sets_x_reps.group(1))
+            reps = reps if reps is not None else int(sets_x_reps.group(2))
+    
+    return sets, reps
+
+
 def extract_sets_reps(text: str, target: str = 'sets') -> Optional[int]:
     """
     Extract sets or reps from exercise text
@@ -186,13 +132,8 @@ def extract_sets_reps(text: str, target: str = 'sets') -> Optional[int]:
     Returns:
         Number of sets or reps
     """
-    if target == 'sets':
-        pattern = r'(\d+)\s*sets?'
-    else:
-        pattern = r'(\d+)\s*reps?'
-    
-    match = re.search(pattern, text.lower())
-    return int(match.group(1)) if match else None
+    sets, reps = _parse_sets_reps(text)
+    return sets if target == 'sets' else reps
 
 
 def generate_weekly_schedule(workout_frequency: str, available_days: List[str] = None) -> List[str]:
@@ -207,23 +148,10 @@ def generate_weekly_schedule(workout_frequency: str, available_days: List[str] =
         List of scheduled workout days
     """
     if available_days is None:
-        available_days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    
-    frequency_map = {
-        "3 days/week": 3,
-        "4 days/week": 4,
-        "5 days/week": 5,
-        "6 days/week": 6,
-        "Daily": 7
-    }
-    
-    num_days = frequency_map.get(workout_frequency, 3)
+        available_days = _WEEKDAYS
     
     # Simple scheduling - distribute evenly
-    if num_days <= len(available_days):
-        return available_days[:num_days]
-    else:
-        return available_days
+    return list(available_days[:FREQUENCY_DAYS.get(workout_frequency, 3)])
 
 
 def format_duration(minutes: int) -> str:
@@ -293,6 +221,7 @@ def create_progress_summary(progress_data: List[Dict]) -> Dict[str, float]:
     if not progress_data:
         return {}
     
+    import pandas as pd
     df = pd.DataFrame(progress_data)
     
     summary = {}